@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+
+"""
+Times the construction of a BandStructure on a dense uniform kpoint mesh
+with a few labelled kpoints, and the extraction of its band edges and band
+gaps, on synthetic free-electron-like bands.
+
+Usage: python profile_bandstructure.py [nkpoints] [nbands]
+"""
+
+from __future__ import print_function
+
+import sys
+import time
+
+import numpy as np
+
+from pymatgen.core.lattice import Lattice
+from pymatgen.electronic_structure.bandstructure import BandStructure
+from pymatgen.electronic_structure.core import Spin
+
+
+def get_synthetic_bands(kpoints, nbands, lattice):
+    """
+    Returns {spin: (nbands, nk) array} of sorted, spin split energies of
+    plane waves folded in the first Brillouin zone, with a gap of 1 eV
+    opened around the Fermi level (0 eV) above the band nbands // 2 - 1.
+    """
+    cart_coords = lattice.get_cartesian_coords(kpoints)
+    shifts = lattice.get_cartesian_coords(
+        np.array([[i, j, k] for i in range(-2, 3) for j in range(-2, 3)
+                  for k in range(-2, 3)]))
+    bands = np.empty((nbands, len(kpoints)))
+    for start in range(0, len(kpoints), 1000):
+        k = cart_coords[start:start + 1000]
+        energies = np.sum((k[:, None, :] + shifts[None, :, :]) ** 2, axis=2)
+        energies.sort(axis=1)
+        reps = -(-nbands // energies.shape[1])
+        energies = np.hstack([energies + 40 * i for i in range(reps)])
+        bands[:, start:start + 1000] = energies[:, :nbands].T
+    vb, cb = bands[nbands // 2 - 1], bands[nbands // 2]
+    bands[nbands // 2:] += vb.max() - cb.min() + 1
+    bands -= vb.max() + 0.5
+    return {Spin.up: bands, Spin.down: bands + 0.1}
+
+
+def timed(f):
+    t = time.time()
+    result = f()
+    return result, time.time() - t
+
+
+if __name__ == "__main__":
+    nkpoints = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    nbands = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    lattice = Lattice.cubic(5.43).reciprocal_lattice
+    n = int(round(nkpoints ** (1 / 3)))
+    kpoints = np.array([[i, j, k] for i in range(n) for j in range(n)
+                        for k in range(n)]) / n
+    kpoints[kpoints >= 0.5] -= 1
+    labels_dict = {"\\Gamma": [0, 0, 0], "X": [0.5, 0, 0],
+                   "M": [0.5, 0.5, 0], "R": [0.5, 0.5, 0.5]}
+    bands = get_synthetic_bands(kpoints, nbands, lattice)
+    print("%d kpoints, %d bands" % (len(kpoints), nbands))
+
+    bs, t = timed(lambda: BandStructure(kpoints, bands, lattice, 0.0,
+                                        labels_dict))
+    print("%-20s %8.3f s" % ("construction", t))
+    for name in ["is_metal", "get_vbm", "get_cbm", "get_band_gap",
+                 "get_direct_band_gap"]:
+        result, t = timed(getattr(bs, name))
+        print("%-20s %8.3f s  %s" % (
+            name, t, result["energy"] if isinstance(result, dict)
+            else result))
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+
+"""
+Times the parsing of a large cif, made of nsites general positions of the
+Fm-3m space group (192 symmetry operations) and a few special positions, and
+of a batch of copies of it in parallel.
+
+Usage: python profile_cif.py [nsites] [ncopies] [ncpus]
+"""
+
+from __future__ import print_function
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from pymatgen import Lattice, Structure
+from pymatgen.io.cif import CifParser, CifWriter
+
+
+def timed(f):
+    t = time.time()
+    result = f()
+    return result, time.time() - t
+
+
+if __name__ == "__main__":
+    nsites = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    ncopies = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    ncpus = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    np.random.seed(0)
+    coords = [[0, 0, 0], [0.25, 0.25, 0.25], [0.1, 0, 0]]
+    coords.extend(np.random.rand(nsites, 3) * 0.25)
+    species = ["Na", "Cl", "O"] + ["Si"] * nsites
+    s = Structure.from_spacegroup("Fm-3m", Lattice.cubic(60), species,
+                                  coords)
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        filenames = [os.path.join(tmp_dir, "%d.cif" % i)
+                     for i in range(ncopies)]
+        for f in filenames:
+            CifWriter(s, symprec=0.01).write_file(f)
+        print("%d sites" % len(s))
+        structures, t = timed(lambda: CifParser(filenames[0]).get_structures(
+            primitive=False))
+        assert len(structures[0]) == len(s)
+        print("%-20s %8.3f s" % ("get_structures", t))
+        if hasattr(CifParser, "get_structures_batch"):
+            for n in [None, ncpus]:
+                (structures, errors), t = timed(
+                    lambda: CifParser.get_structures_batch(
+                        filenames, primitive=False, ncpus=n))
+                assert not errors
+                print("%-20s %8.3f s" % ("batch, ncpus=%s" % n, t))
+    finally:
+        shutil.rmtree(tmp_dir)
@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+
+"""
+Times the imports of pymatgen in fresh interpreters and reports the median
+wall time of each statement over a number of runs. If a budget in seconds is
+given, exits with a non-zero status if the median time of "import pymatgen"
+exceeds it, so that the script can be used to catch import time regressions.
+
+Usage: python profile_import.py [nruns] [budget]
+"""
+
+from __future__ import print_function
+
+import subprocess
+import sys
+
+import numpy as np
+
+STATEMENTS = ["pass",
+              "import pymatgen",
+              "from pymatgen import Element",
+              "from pymatgen import Structure",
+              "from pymatgen import MPRester",
+              "from pymatgen.io.vasp import Vasprun"]
+
+HEAVY_MODULES = ["matplotlib", "requests", "scipy", "yaml",
+                 "pymatgen.core.structure", "pymatgen.matproj.rest"]
+
+
+def time_statement(statement, nruns):
+    code = "import time; t = time.time(); {}; print(time.time() - t)".format(
+        statement)
+    times = [float(subprocess.check_output([sys.executable, "-c", code]))
+             for i in range(nruns)]
+    return np.median(times)
+
+
+def get_imported_heavy_modules(statement):
+    code = "import sys; {}; print(' '.join(m for m in {} if m in " \
+           "sys.modules))".format(statement, HEAVY_MODULES)
+    return subprocess.check_output([sys.executable, "-c", code]).decode(
+        "utf-8").split()
+
+
+if __name__ == "__main__":
+    nruns = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    budget = float(sys.argv[2]) if len(sys.argv) > 2 else None
+    results = {}
+    for statement in STATEMENTS:
+        results[statement] = time_statement(statement, nruns)
+        print("%-40s %8.3f s  %s" % (
+            statement, results[statement],
+            " ".join(get_imported_heavy_modules(statement))))
+    if budget is not None and results["import pymatgen"] > budget:
+        print("import pymatgen took %.3f s, over the budget of %.3f s" % (
+            results["import pymatgen"], budget))
+        sys.exit(1)
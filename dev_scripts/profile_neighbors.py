@@ -0,0 +1,31 @@
+#!/usr/bin/env python
+
+"""
+Compares the array based Structure.get_neighbor_list with the tuple based
+Structure.get_all_neighbors on 1k and 10k site rocksalt supercells.
+"""
+
+from __future__ import print_function
+
+import timeit
+
+from pymatgen import Lattice, Structure
+
+
+def get_structure(scaling):
+    s = Structure(Lattice.cubic(4.2), ["Na", "Cl"], [[0, 0, 0],
+                                                     [0.5, 0.5, 0.5]])
+    s.make_supercell(scaling)
+    s.perturb(0.1)
+    return s
+
+
+if __name__ == "__main__":
+    r = 4.0
+    for scaling in ([10, 10, 5], [10, 20, 25]):
+        s = get_structure(scaling)
+        t_list = min(timeit.repeat(lambda: s.get_neighbor_list(r),
+                                   number=1, repeat=3))
+        t_tuples = timeit.timeit(lambda: s.get_all_neighbors(r), number=1)
+        print("%d sites, r = %.1f: get_neighbor_list %.3f s, "
+              "get_all_neighbors %.3f s" % (len(s), r, t_list, t_tuples))
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+
+"""
+Times the parsing of a large OUTCAR, made of copies of
+test_files/OUTCAR.lepsilon, with the readers called one by one and with all
+of them read in a single pass by read_properties.
+
+Usage: python profile_outcar.py [ncopies]
+"""
+
+from __future__ import print_function
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from pymatgen.io.vasp.outputs import Outcar
+
+module_dir = os.path.dirname(os.path.abspath(__file__))
+
+PATTERNS = {"efermi": r"E-fermi\s*:\s*(\S+)",
+            "toten": r"free  energy   TOTEN\s+=\s+([\d\-\.]+)",
+            "nelect": r"number of electron\s+(\S+)\s+magnetization"}
+
+# The LEPSILON data is read by Outcar.__init__.
+PROPERTIES = ["piezo_tensor", "lcalcpol", "neb", "core_state_eigen",
+              ("pattern", {"patterns": PATTERNS})]
+
+
+def timed(f):
+    t = time.time()
+    result = f()
+    return result, time.time() - t
+
+
+def read_one_by_one(filename):
+    outcar = Outcar(filename)
+    for prop in PROPERTIES:
+        name, kwargs = (prop, {}) if isinstance(prop, str) else prop
+        getattr(outcar, "read_" + name)(**kwargs)
+    return outcar
+
+
+if __name__ == "__main__":
+    ncopies = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    with open(os.path.join(module_dir, "..", "test_files",
+                           "OUTCAR.lepsilon")) as f:
+        text = f.read()
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        filename = os.path.join(tmp_dir, "OUTCAR")
+        with open(filename, "w") as f:
+            for i in range(ncopies):
+                f.write(text)
+        print("%d copies: %.1f MB" % (ncopies,
+                                      os.path.getsize(filename) / 1e6))
+        outcar, t = timed(lambda: Outcar(filename))
+        print("%-12s %8.3f s" % ("init", t))
+        outcar, t = timed(lambda: read_one_by_one(filename))
+        print("%-12s %8.3f s" % ("one by one", t))
+        if hasattr(Outcar, "read_properties"):
+            outcar2, t = timed(lambda: Outcar(filename,
+                                              properties=PROPERTIES))
+            print("%-12s %8.3f s" % ("single pass", t))
+            assert outcar2.data == outcar.data
+    finally:
+        shutil.rmtree(tmp_dir)
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+
+"""
+Times the reading of a synthetic spin-polarized PROCAR with phase factors
+(LORBIT = 12) of nkpoints x nbands x nions, with all the data, without the
+phase factors and with a selection of ions and orbitals in float32.
+
+Usage: python profile_procar.py [nkpoints] [nbands] [nions]
+"""
+
+from __future__ import print_function
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from pymatgen.io.vasp.outputs import Procar
+
+ORBITALS = ["s", "py", "pz", "px", "dxy", "dyz", "dz2", "dxz", "dx2"]
+
+
+def write_procar(filename, nkpoints, nbands, nions):
+    """
+    Writes a PROCAR with random projections and phase factors.
+    """
+    norb = len(ORBITALS)
+    header = "ion " + "".join("%7s" % o for o in ORBITALS)
+    fmt = "%3d" + "%7.3f" * norb
+    with open(filename, "w") as f:
+        f.write("PROCAR lm decomposed + phase\n")
+        for spin in range(2):
+            f.write("# of k-points: %4d         # of bands: %3d         "
+                    "# of ions: %3d\n\n" % (nkpoints, nbands, nions))
+            for k in range(nkpoints):
+                f.write(" k-point %4d :    0.00000000 0.00000000 0.00000000"
+                        "     weight = %.8f\n\n" % (k + 1, 1 / nkpoints))
+                for b in range(nbands):
+                    f.write("band %3d # energy %13.8f # occ.  1.00000000\n \n"
+                            % (b + 1, b * 0.1))
+                    data = np.random.rand(nions, norb) / nions
+                    lines = [header + "    tot"]
+                    lines.extend(fmt % ((i + 1,) + tuple(row)) +
+                                 "%7.3f" % sum(row)
+                                 for i, row in enumerate(data))
+                    lines.append("tot" + "%7.3f" * (norb + 1) % (
+                        tuple(data.sum(axis=0)) + (data.sum(),)))
+                    lines.append(header)
+                    phase = np.random.rand(2 * nions, norb) - 0.5
+                    lines.extend(fmt % ((i // 2 + 1,) + tuple(row))
+                                 for i, row in enumerate(phase))
+                    f.write("\n".join(lines) + "\n \n")
+                f.write("\n")
+
+
+def timed(f):
+    t = time.time()
+    result = f()
+    return result, time.time() - t
+
+
+if __name__ == "__main__":
+    nkpoints = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    nbands = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    nions = int(sys.argv[3]) if len(sys.argv) > 3 else 50
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        filename = os.path.join(tmp_dir, "PROCAR")
+        write_procar(filename, nkpoints, nbands, nions)
+        print("%d kpoints, %d bands, %d ions: %.1f MB" % (
+            nkpoints, nbands, nions, os.path.getsize(filename) / 1e6))
+        for name, kwargs in [
+                ("all", {}),
+                ("no phase", {"parse_phase_factors": False}),
+                ("selection", {"parse_phase_factors": False,
+                               "ions": range(0, nions, 10),
+                               "orbitals": ["s", "pz"],
+                               "dtype": np.float32})]:
+            try:
+                p, t = timed(lambda: Procar(filename, **kwargs))
+            except TypeError:
+                # Older versions of Procar do not support the options.
+                continue
+            nbytes = sum(d.nbytes for d in p.data.values()) + sum(
+                d.nbytes for d in p.phase_factors.values())
+            print("%-10s %8.3f s, arrays %.1f MB" % (name, t, nbytes / 1e6))
+    finally:
+        shutil.rmtree(tmp_dir)
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+
+"""
+Times the point group detection (PointGroupAnalyzer) and the generation of
+the full set of symmetry operations (get_pointgroup) of C60 and of
+icosahedral clusters made of nshells concentric shells of icosahedra,
+dodecahedra and truncated icosahedra (fullerenes).
+
+Usage: python profile_symmetry.py [nshells]
+"""
+
+from __future__ import print_function
+
+import itertools
+import os
+import sys
+import time
+
+import numpy as np
+
+from pymatgen.core.structure import Molecule
+from pymatgen.symmetry.analyzer import PointGroupAnalyzer
+
+PHI = (1 + 5 ** 0.5) / 2
+
+module_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+def get_polyhedron(*vertices):
+    """
+    Returns the points obtained from all sign combinations and cyclic
+    permutations of vertices, normalized to unit radius.
+    """
+    points = []
+    for v in vertices:
+        for signs in itertools.product([-1, 1], repeat=3):
+            p = np.array(v) * signs
+            for i in range(3):
+                points.append(np.roll(p, i))
+    points = np.unique(np.round(points, 8), axis=0)
+    return points / np.linalg.norm(points[0])
+
+
+def get_icosahedral_cluster(nshells):
+    shells = [("Si", get_polyhedron((0, 1, PHI))),
+              ("O", get_polyhedron((1, 1, 1), (0, PHI, 1 / PHI))),
+              ("C", get_polyhedron((0, 1, 3 * PHI), (1, 2 + PHI, 2 * PHI),
+                                   (PHI, 2, 2 * PHI + 1)))]
+    species = ["Fe"]
+    coords = [[0, 0, 0]]
+    for i in range(nshells):
+        sp, points = shells[i % 3]
+        species.extend([sp] * len(points))
+        coords.extend(points * (2.5 + 2 * i))
+    return Molecule(species, coords)
+
+
+def timed(f):
+    t = time.time()
+    result = f()
+    return result, time.time() - t
+
+
+if __name__ == "__main__":
+    nshells = int(sys.argv[1]) if len(sys.argv) > 1 else 9
+    c60 = Molecule.from_file(os.path.join(module_dir, "..", "test_files",
+                                          "molecules", "c60.xyz"))
+    for name, mol in [("C60", c60),
+                      ("Ih cluster", get_icosahedral_cluster(nshells))]:
+        a, t1 = timed(lambda: PointGroupAnalyzer(mol))
+        ops, t2 = timed(a.get_pointgroup)
+        print("%-12s %4d sites: %s, %d operations, analysis %.3f s, "
+              "operations %.3f s" % (name, len(mol), a.sch_symbol, len(ops),
+                                     t1, t2))
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+
+"""
+Times the parsing of a vasprun.xml with large projected eigenvalues. The file
+is made from test_files/vasprun_Si_bands.xml, whose <projected> block is
+replaced by a synthetic one of nkpoints x nbands x nions x 9 orbitals.
+
+Usage: python profile_vasprun.py [nkpoints] [nbands] [nions]
+"""
+
+from __future__ import print_function
+
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from pymatgen.io.vasp.outputs import Vasprun, BSVasprun
+
+module_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+def get_projected_block(nkpoints, nbands, nions, norbitals=9):
+    """
+    Returns the text of a <projected> block of random projections.
+    """
+    fmt = "      <r>" + "%8.4f" * norbitals + " </r>"
+    lines = ["  <projected>", "   <array>", "    <set>"]
+    for spin in range(2):
+        lines.append('     <set comment="spin%d">' % (spin + 1))
+        for k in range(nkpoints):
+            lines.append('      <set comment="kpoint %d">' % (k + 1))
+            for b in range(nbands):
+                lines.append('       <set comment="band %d">' % (b + 1))
+                data = np.random.rand(nions, norbitals)
+                lines.extend(fmt % tuple(row) for row in data)
+                lines.append("       </set>")
+            lines.append("      </set>")
+        lines.append("     </set>")
+    lines.extend(["    </set>", "   </array>", "  </projected>"])
+    return "\n".join(lines)
+
+
+def timed(f):
+    t = time.time()
+    result = f()
+    return result, time.time() - t
+
+
+if __name__ == "__main__":
+    nkpoints = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    nbands = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    nions = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+    with open(os.path.join(module_dir, "..", "test_files",
+                           "vasprun_Si_bands.xml")) as f:
+        xml = f.read()
+    xml = re.sub(r"<projected>.*</projected>",
+                 lambda m: get_projected_block(nkpoints, nbands, nions), xml,
+                 flags=re.DOTALL)
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        filename = os.path.join(tmp_dir, "vasprun.xml")
+        with open(filename, "w") as f:
+            f.write(xml)
+        print("%d kpoints, %d bands, %d ions: %.1f MB" % (
+            nkpoints, nbands, nions, os.path.getsize(filename) / 1e6))
+        for cls, dtype in [(Vasprun, np.float), (BSVasprun, np.float),
+                           (BSVasprun, np.float32)]:
+            v, t = timed(lambda: cls(filename, parse_projected_eigen=True,
+                                     parse_potcar_file=False,
+                                     projected_eigen_dtype=dtype))
+            nbytes = sum(p.nbytes for p in v.projected_eigenvalues.values())
+            print("%-10s %-8s %8.3f s, projections %.1f MB" % (
+                cls.__name__, np.dtype(dtype).name, t, nbytes / 1e6))
+    finally:
+        shutil.rmtree(tmp_dir)
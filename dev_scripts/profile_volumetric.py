@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+
+"""
+Times reading and writing of a spin polarized CHGCAR with a synthetic n x n x
+n grid (default 100), both as a plain and as a gzipped file, with the grids
+held in memory and memory-mapped.
+
+Usage: python profile_volumetric.py [n]
+"""
+
+from __future__ import print_function
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from pymatgen import Lattice, Structure
+from pymatgen.io.vasp.inputs import Poscar
+from pymatgen.io.vasp.outputs import Chgcar
+
+
+def get_chgcar(n):
+    s = Structure(Lattice.cubic(4.2), ["Na", "Cl"], [[0, 0, 0],
+                                                     [0.5, 0.5, 0.5]])
+    data = {"total": np.random.rand(n, n, n),
+            "diff": np.random.rand(n, n, n) - 0.5}
+    aug = ["augmentation occupancies   1   5",
+           "  0.1000000E+00 -0.2000000E-01  0.0000000E+00  0.0000000E+00  "
+           "0.3000000E-02"]
+    data_aug = {"total": aug, "diff": aug}
+    return Chgcar(Poscar(s), data, data_aug)
+
+
+def timed(f):
+    t = time.time()
+    f()
+    return time.time() - t
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    chg = get_chgcar(n)
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        for fname in ["CHGCAR", "CHGCAR.gz"]:
+            path = os.path.join(tmp_dir, fname)
+            t_write = timed(lambda: chg.write_file(path))
+            t_read = timed(lambda: Chgcar.from_file(path))
+            t_mmap = timed(lambda: Chgcar.from_file(path, memmap_dir=tmp_dir))
+            print("%s (%d^3 grid, %.1f MB): write %.2f s, read %.2f s, "
+                  "read to memmap %.2f s" % (
+                      fname, n, os.path.getsize(path) / 1024 ** 2, t_write,
+                      t_read, t_mmap))
+    finally:
+        shutil.rmtree(tmp_dir)
@@ -15,8 +15,9 @@ SETTINGS_FILE = os.path.join(os.path.expanduser("~"), ".pmgrc.yaml")
 
 def _load_pmg_settings():
     try:
-        import yaml
         with open(SETTINGS_FILE, "rt") as f:
+            # yaml is slow to import, so it is only imported if needed.
+            import yaml
             d = yaml.load(f)
     except IOError:
         # If there are any errors, default to using environment variables
@@ -48,9 +49,36 @@ SETTINGS = _load_pmg_settings()
 # del(spglib, optimization, util)
 
 # Useful aliases for commonly used objects and modules.
-# Allows from pymatgen import <class> for quick usage.
+# Allows from pymatgen import <class> for quick usage. The aliases (and the
+# subpackages) are only imported on first access to keep "import pymatgen"
+# fast, e.g., MPRester is not imported unless it is used.
 
-from pymatgen.core import *
-from .electronic_structure.core import Spin, Orbital
-from .matproj.rest import MPRester
-from monty.json import MontyEncoder, MontyDecoder, MSONable
+from pymatgen.util.lazy_import import lazy_import
+
+_ALIASES = {
+    "Element": "pymatgen.core.periodic_table",
+    "Specie": "pymatgen.core.periodic_table",
+    "DummySpecie": "pymatgen.core.periodic_table",
+    "Composition": "pymatgen.core.composition",
+    "Structure": "pymatgen.core.structure",
+    "IStructure": "pymatgen.core.structure",
+    "Molecule": "pymatgen.core.structure",
+    "IMolecule": "pymatgen.core.structure",
+    "Lattice": "pymatgen.core.lattice",
+    "Site": "pymatgen.core.sites",
+    "PeriodicSite": "pymatgen.core.sites",
+    "SymmOp": "pymatgen.core.operations",
+    "Unit": "pymatgen.core.units",
+    "FloatWithUnit": "pymatgen.core.units",
+    "ArrayWithUnit": "pymatgen.core.units",
+    "Spin": "pymatgen.electronic_structure.core",
+    "Orbital": "pymatgen.electronic_structure.core",
+    "MPRester": "pymatgen.matproj.rest",
+    "MontyEncoder": "monty.json",
+    "MontyDecoder": "monty.json",
+    "MSONable": "monty.json"
+}
+
+__all__ = ["SETTINGS", "SETTINGS_FILE"] + sorted(_ALIASES.keys())
+
+lazy_import(__name__, _ALIASES)
@@ -29,9 +29,6 @@ from pymatgen.core.sites import PeriodicSite
 from pymatgen.analysis.structure_analyzer import VoronoiCoordFinder
 from pymatgen.core.surface import generate_all_slabs
 
-from matplotlib import patches
-from matplotlib.path import Path
-
 __author__ = "Joseph Montoya"
 __copyright__ = "Copyright 2016, The Materials Project"
 __version__ = "0.1"
@@ -478,6 +475,8 @@ def plot_slab(slab, ax, scale=0.8, repeat=5, window=1.5,
         draw_unit_cell (bool): flag indicating whether or not to draw cell
         decay (float): how the alpha-value decays along the z-axis
     """
+    from matplotlib import patches
+    from matplotlib.path import Path
     orig_slab = slab.copy()
     slab = reorient_z(slab)
     orig_cell = slab.lattice.matrix.copy()
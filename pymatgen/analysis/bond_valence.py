@@ -18,7 +18,6 @@ __date__ = "Oct 26, 2012"
 
 import collections
 import numpy as np
-import operator
 import os
 from math import exp, sqrt
 
@@ -133,6 +132,68 @@ def calculate_bv_sum_unordered(site, nn_list, scale_factor=1):
     return bvsum
 
 
+def calculate_bv_sums(structure, max_radius=4, scale_factor=1.0, sites=None):
+    """
+    Calculates the BV sums of many sites of a structure at once, using a
+    single neighbor search. The BV sum of each site is the same as the one
+    given by calculate_bv_sum for ordered sites, and by
+    calculate_bv_sum_unordered for disordered sites.
+
+    Args:
+        structure (Structure): Structure containing the sites.
+        max_radius (float): Maximum radius in Angstrom used to find nearest
+            neighbors.
+        scale_factor (float): A scale factor to be applied to the distances.
+            See calculate_bv_sum.
+        sites ([Site]): Sites to calculate the BV sums of. Defaults to None,
+            which means all sites in the structure.
+
+    Returns:
+        np.array of the BV sums of the sites.
+    """
+    sites = structure.sites if sites is None else list(sites)
+    els = sorted(set(Element(sp.symbol) for site in structure.sites + sites
+                     for sp in site.species_and_occu))
+    if not set(els).issubset(BV_PARAMS.keys()):
+        raise ValueError(
+            "Structure contains elements not in set of BV parameters!")
+
+    # The bond valence of a pair of elements i, j at a distance d is
+    # exp((R_ij - d) / 0.31) = exp(R_ij / 0.31) * exp(-d / 0.31), so the
+    # element dependent prefactors are tabulated once.
+    r = np.array([BV_PARAMS[el]["r"] for el in els])
+    c = np.array([BV_PARAMS[el]["c"] for el in els])
+    x = np.array([el.X for el in els])
+    r1, r2 = r[:, None], r[None, :]
+    c1, c2 = c[:, None], c[None, :]
+    R = r1 + r2 - r1 * r2 * (np.sqrt(c1) - np.sqrt(c2)) ** 2 / \
+        (c1 * r1 + c2 * r2)
+    eneg = np.array([el in ELECTRONEG for el in els])
+    bonded = (eneg[:, None] | eneg[None, :]) & ~np.eye(len(els), dtype=bool)
+    sign = np.where(x[:, None] < x[None, :], 1, -1)
+    prefactors = np.where(bonded, sign * np.exp(R / 0.31), 0)
+
+    cinds, inds, _, dists = structure.get_neighbor_list(max_radius,
+                                                        sites=sites)
+    bvs = np.einsum("ka,ab,kb->k", _get_occupancies(sites, els)[cinds],
+                    prefactors, _get_occupancies(structure, els)[inds])
+    bvs *= np.exp(-dists * scale_factor / 0.31)
+    return np.bincount(cinds, weights=bvs, minlength=len(sites))
+
+
+def _get_occupancies(sites, els):
+    """
+    Returns the (len(sites), len(els)) array of the occupancies of the
+    elements els on the sites.
+    """
+    indices = {el: i for i, el in enumerate(els)}
+    occupancies = np.zeros((len(sites), len(els)))
+    for i, site in enumerate(sites):
+        for sp, occu in site.species_and_occu.items():
+            occupancies[i, indices[Element(sp.symbol)]] += occu
+    return occupancies
+
+
 class BVAnalyzer(object):
     """
     This class implements a maximum a posteriori (MAP) estimation method to
@@ -195,51 +256,39 @@ class BVAnalyzer(object):
                              if not specie in forbidden_species} \
             if len(forbidden_species) > 0 else ICSD_BV_DATA
 
-    def _calc_site_probabilities(self, site, nn):
-        el = site.specie.symbol
-        bv_sum = calculate_bv_sum(site, nn,
-                                  scale_factor=self.dist_scale_factor)
-        prob = {}
+        # Tabulate the oxidation states of each element, with the mean and
+        # std deviation of their BV sums and their prior probabilities, so
+        # that all posterior probabilities of a site are computed at once.
+        oxi_data = collections.defaultdict(list)
         for sp, data in self.icsd_bv_data.items():
-            if sp.symbol == el and sp.oxi_state != 0 and data["std"] > 0:
-                u = data["mean"]
-                sigma = data["std"]
-                # Calculate posterior probability. Note that constant
-                # factors are ignored. They have no effect on the results.
-                prob[sp.oxi_state] = exp(-(bv_sum - u) ** 2 / 2 /
-                                         (sigma ** 2)) \
-                    / sigma * PRIOR_PROB[sp]
-        # Normalize the probabilities
-        try:
-            prob = {k: v / sum(prob.values()) for k, v in prob.items()}
-        except ZeroDivisionError:
-            prob = {k: 0.0 for k in prob}
-        return prob
-
-    def _calc_site_probabilities_unordered(self, site, nn):
-        bv_sum = calculate_bv_sum_unordered(
-            site, nn, scale_factor=self.dist_scale_factor)
-        prob = {}
-        for specie, occu in six.iteritems(site.species_and_occu):
-            el = specie.symbol
-
-            prob[el] = {}
-            for sp, data in self.icsd_bv_data.items():
-                if sp.symbol == el and sp.oxi_state != 0 and data["std"] > 0:
-                    u = data["mean"]
-                    sigma = data["std"]
-                    #Calculate posterior probability. Note that constant
-                    #factors are ignored. They have no effect on the results.
-                    prob[el][sp.oxi_state] = exp(-(bv_sum - u) ** 2 / 2 /
-                                                 (sigma ** 2)) \
-                        / sigma * PRIOR_PROB[sp]
-            #Normalize the probabilities
-            try:
-                prob[el] = {k: v / sum(prob[el].values())
-                            for k, v in prob[el].items()}
-            except ZeroDivisionError:
-                prob[el] = {k: 0.0 for k in prob[el]}
-        return prob
+            if sp.oxi_state != 0 and data["std"] > 0:
+                oxi_data[sp.symbol].append((sp.oxi_state, data["mean"],
+                                            data["std"], PRIOR_PROB[sp]))
+        self._oxi_data = {el: (np.array([d[0] for d in data]),
+                               np.array([d[1:] for d in data]).T)
+                          for el, data in oxi_data.items()}
+
+    def _get_oxi_probabilities(self, el, bv_sum):
+        """
+        Returns the normalized posterior probabilities of the oxidation
+        states of an element given a BV sum as {oxi_state: probability}.
+        """
+        if el not in self._oxi_data:
+            return {}
+        oxi_states, (u, sigma, prior) = self._oxi_data[el]
+        # Calculate posterior probability. Note that constant factors are
+        # ignored. They have no effect on the results.
+        prob = np.exp(-(bv_sum - u) ** 2 / 2 / (sigma ** 2)) / sigma * prior
+        total = np.sum(prob)
+        prob = prob / total if total > 0 else np.zeros(len(prob))
+        return dict(zip(oxi_states.tolist(), prob.tolist()))
+
+    def _calc_site_probabilities(self, site, bv_sum):
+        return self._get_oxi_probabilities(site.specie.symbol, bv_sum)
+
+    def _calc_site_probabilities_unordered(self, site, bv_sum):
+        return {sp.symbol: self._get_oxi_probabilities(sp.symbol, bv_sum)
+                for sp in site.species_and_occu}
 
     def get_valences(self, structure):
         """
@@ -279,15 +328,19 @@ class BVAnalyzer(object):
                             key=lambda sites: -sites[0].species_and_occu
                             .average_electroneg)
 
+        #Calculate the BV sums of all symmetrically distinct sites at once.
+        test_sites = [sites[0] for sites in equi_sites]
+        bv_sums = calculate_bv_sums(structure, self.max_radius,
+                                    scale_factor=self.dist_scale_factor,
+                                    sites=test_sites)
+
         #Get a list of valences and probabilities for each symmetrically
         #distinct site.
         valences = []
         all_prob = []
         if structure.is_ordered:
-            for sites in equi_sites:
-                test_site = sites[0]
-                nn = structure.get_neighbors(test_site, self.max_radius)
-                prob = self._calc_site_probabilities(test_site, nn)
+            for test_site, bv_sum in zip(test_sites, bv_sums):
+                prob = self._calc_site_probabilities(test_site, bv_sum)
                 all_prob.append(prob)
                 val = list(prob.keys())
                 #Sort valences in order of decreasing probability.
@@ -297,13 +350,10 @@ class BVAnalyzer(object):
                     list(filter(lambda v: prob[v] > 0.01 * prob[val[0]],
                                 val)))
         else:
-            full_all_prob = []
-            for sites in equi_sites:
-                test_site = sites[0]
-                nn = structure.get_neighbors(test_site, self.max_radius)
-                prob = self._calc_site_probabilities_unordered(test_site, nn)
+            for test_site, bv_sum in zip(test_sites, bv_sums):
+                prob = self._calc_site_probabilities_unordered(test_site,
+                                                               bv_sum)
                 all_prob.append(prob)
-                full_all_prob.extend(prob.values())
                 vals = []
                 for (elsp, occ) in get_z_ordered_elmap(
                         test_site.species_and_occu):
@@ -318,144 +368,35 @@ class BVAnalyzer(object):
                                 elsp.symbol][val[0]], val)))
                 valences.append(vals)
 
-        #make variables needed for recursion
+        #Flatten the assignment problem into a list of variables, one for
+        #each symmetrically distinct site (or each element on each
+        #disordered site), with the number of charges per unit of valence.
+        nsites = [len(sites) for sites in equi_sites]
         if structure.is_ordered:
-            nsites = np.array([len(i) for i in equi_sites])
-            vmin = np.array([min(i) for i in valences])
-            vmax = np.array([max(i) for i in valences])
-
-            self._n = 0
-            self._best_score = 0
-            self._best_vset = None
-
-            def evaluate_assignment(v_set):
-                el_oxi = collections.defaultdict(list)
-                for i, sites in enumerate(equi_sites):
-                    el_oxi[sites[0].specie.symbol].append(v_set[i])
-                max_diff = max([max(v) - min(v) for v in el_oxi.values()])
-                if max_diff > 1:
-                    return
-                score = six.moves.reduce(
-                    operator.mul, [all_prob[i][v] for i, v in enumerate(v_set)])
-                if score > self._best_score:
-                    self._best_vset = v_set
-                    self._best_score = score
-
-            def _recurse(assigned=[]):
-                #recurses to find permutations of valences based on whether a
-                #charge balanced assignment can still be found
-                if self._n > self.max_permutations:
-                    return
-
-                i = len(assigned)
-                highest = vmax.copy()
-                highest[:i] = assigned
-                highest *= nsites
-                highest = np.sum(highest)
-
-                lowest = vmin.copy()
-                lowest[:i] = assigned
-                lowest *= nsites
-                lowest = np.sum(lowest)
-
-                if highest < 0 or lowest > 0:
-                    self._n += 1
-                    return
-
-                if i == len(valences):
-                    evaluate_assignment(assigned)
-                    self._n += 1
-                    return
-                else:
-                    for v in valences[i]:
-                        new_assigned = list(assigned)
-                        _recurse(new_assigned + [v])
+            candidates = valences
+            probs = all_prob
+            weights = np.array(nsites, np.float)
+            labels = [sites[0].specie.symbol for sites in equi_sites]
+            best_vset = self._get_best_assignment(candidates, probs, weights,
+                                                  labels, 1, 0)
         else:
-            nsites = np.array([len(i) for i in equi_sites])
-            tmp = []
-            attrib = []
-            for insite, nsite in enumerate(nsites):
-                for val in valences[insite]:
-                    tmp.append(nsite)
-                    attrib.append(insite)
-            new_nsites = np.array(tmp)
-            fractions = []
-            elements = []
-            for sites in equi_sites:
-                for sp, occu in get_z_ordered_elmap(sites[0].species_and_occu):
-                    elements.append(sp.symbol)
-                    fractions.append(occu)
-            fractions = np.array(fractions, np.float)
-            new_valences = []
-            for vals in valences:
-                for val in vals:
-                    new_valences.append(val)
-            vmin = np.array([min(i) for i in new_valences], np.float)
-            vmax = np.array([max(i) for i in new_valences], np.float)
-
-            self._n = 0
-            self._best_score = 0
-            self._best_vset = None
-
-            def evaluate_assignment(v_set):
-                el_oxi = collections.defaultdict(list)
-                jj = 0
-                for i, sites in enumerate(equi_sites):
-                    for specie, occu in get_z_ordered_elmap(
-                            sites[0].species_and_occu):
-                        el_oxi[specie.symbol].append(v_set[jj])
-                        jj += 1
-                max_diff = max([max(v) - min(v) for v in el_oxi.values()])
-                if max_diff > 2:
-                    return
-
-                score = six.moves.reduce(
-                    operator.mul,
-                    [all_prob[attrib[iv]][elements[iv]][vv]
-                     for iv, vv in enumerate(v_set)])
-                if score > self._best_score:
-                    self._best_vset = v_set
-                    self._best_score = score
-
-            def _recurse(assigned=[]):
-                #recurses to find permutations of valences based on whether a
-                #charge balanced assignment can still be found
-                if self._n > self.max_permutations:
-                    return
-
-                i = len(assigned)
-                highest = vmax.copy()
-                highest[:i] = assigned
-                highest *= new_nsites
-                highest *= fractions
-                highest = np.sum(highest)
-
-                lowest = vmin.copy()
-                lowest[:i] = assigned
-                lowest *= new_nsites
-                lowest *= fractions
-                lowest = np.sum(lowest)
-
-                if (highest < -self.charge_neutrality_tolerance or
-                        lowest > self.charge_neutrality_tolerance):
-                    self._n += 1
-                    return
-
-                if i == len(new_valences):
-                    evaluate_assignment(assigned)
-                    self._n += 1
-                    return
-                else:
-                    for v in new_valences[i]:
-                        new_assigned = list(assigned)
-                        _recurse(new_assigned + [v])
-
-        _recurse()
-
-        if self._best_vset:
+            candidates, probs, weights, labels, attrib = [], [], [], [], []
+            for i, (sites, vals) in enumerate(zip(equi_sites, valences)):
+                elmap = get_z_ordered_elmap(sites[0].species_and_occu)
+                for (sp, occu), val in zip(elmap, vals):
+                    candidates.append(val)
+                    probs.append(all_prob[i][sp.symbol])
+                    weights.append(nsites[i] * occu)
+                    labels.append(sp.symbol)
+                    attrib.append(i)
+            best_vset = self._get_best_assignment(
+                candidates, probs, np.array(weights), labels, 2,
+                self.charge_neutrality_tolerance)
+
+        if best_vset:
             if structure.is_ordered:
                 assigned = {}
-                for val, sites in zip(self._best_vset, equi_sites):
+                for val, sites in zip(best_vset, equi_sites):
                     for site in sites:
                         assigned[site] = val
 
@@ -465,7 +406,7 @@ class BVAnalyzer(object):
                 new_best_vset = []
                 for ii in range(len(equi_sites)):
                     new_best_vset.append(list())
-                for ival, val in enumerate(self._best_vset):
+                for ival, val in enumerate(best_vset):
                     new_best_vset[attrib[ival]].append(val)
                 for val, sites in zip(new_best_vset, equi_sites):
                     for site in sites:
@@ -476,6 +417,77 @@ class BVAnalyzer(object):
         else:
             raise ValueError("Valences cannot be assigned!")
 
+    def _get_best_assignment(self, candidates, probs, weights, labels,
+                             max_diff, tol):
+        """
+        Finds the most probable charge balanced assignment of valences with
+        a depth first search over the candidate valences of each variable.
+        Branches are pruned as soon as charge neutrality cannot be reached
+        with the remaining variables, when two valences of the same element
+        differ by more than max_diff, or when their probability cannot
+        exceed the one of the best assignment found so far.
+
+        Args:
+            candidates ([[int]]): Candidate valences of each variable, in
+                order of decreasing probability.
+            probs ([dict]): Probabilities {valence: probability} of each
+                variable.
+            weights (np.array): Charge contributed by each unit of valence
+                of each variable, i.e., its number of sites times its
+                occupancy.
+            labels ([str]): Element of each variable.
+            max_diff (int): Maximum difference between the valences of the
+                same element.
+            tol (float): Tolerance on the charge neutrality.
+
+        Returns:
+            The most probable assignment as a list of valences, or None if
+            none was found within max_permutations tested permutations.
+        """
+        nvars = len(candidates)
+        #Range of the charge of the variables from i onwards.
+        highest = np.append(np.cumsum(
+            (np.array([max(c) for c in candidates]) * weights)[::-1])[::-1], 0)
+        lowest = np.append(np.cumsum(
+            (np.array([min(c) for c in candidates]) * weights)[::-1])[::-1], 0)
+        #Highest probability of the variables from i onwards. The bound is
+        #slightly inflated so that rounding never prunes a better assignment.
+        max_probs = [max(p[v] for v in c) for p, c in zip(probs, candidates)]
+        best_rest = np.append(np.cumprod(max_probs[::-1])[::-1], 1) * \
+            (1 + 1e-10)
+        same_label = [[j for j in range(i) if labels[j] == labels[i]]
+                      for i in range(nvars)]
+        state = {"n": 0, "score": 0, "vset": None}
+
+        def _recurse(assigned, charge, score):
+            #recurses to find permutations of valences based on whether a
+            #charge balanced and more probable assignment can still be found
+            if state["n"] > self.max_permutations:
+                return
+
+            i = len(assigned)
+            if (charge + highest[i] < -tol or charge + lowest[i] > tol or
+                    score * best_rest[i] <= state["score"]):
+                state["n"] += 1
+                return
+
+            if i == nvars:
+                if score > state["score"]:
+                    state["score"] = score
+                    state["vset"] = assigned
+                state["n"] += 1
+                return
+
+            for v in candidates[i]:
+                if any(abs(v - assigned[j]) > max_diff for j in same_label[i]):
+                    state["n"] += 1
+                    continue
+                _recurse(assigned + [v], charge + v * weights[i],
+                         score * probs[i][v])
+
+        _recurse([], 0, 1)
+        return state["vset"]
+
     def get_oxi_state_decorated_structure(self, structure):
         """
         Get an oxidation state decorated structure. This currently works only
@@ -499,6 +511,33 @@ class BVAnalyzer(object):
             s = add_oxidation_state_by_site_fraction(s, valences)
         return s
 
+    def get_valences_batch(self, structures, ncpus=None):
+        """
+        Returns the valences of many structures, e.g., for the high
+        throughput oxidation state decoration of imported structures.
+
+        Args:
+            structures ([Structure]): Structures to analyze.
+            ncpus (int): Number of processes to use. Default of None means
+                serial processing.
+
+        Returns:
+            A list of the valences of each structure as given by
+            get_valences, with None for the structures whose valences cannot
+            be determined.
+        """
+        args = [(self, s) for s in structures]
+        if ncpus and ncpus > 1:
+            import multiprocessing as mp
+            p = mp.Pool(ncpus)
+            chunksize = max(1, len(args) // (4 * ncpus))
+            results = p.map(_get_valences, args, chunksize)
+            p.close()
+            p.join()
+        else:
+            results = [_get_valences(a) for a in args]
+        return results
+
 
 def get_z_ordered_elmap(comp):
     """
@@ -537,3 +576,11 @@ def add_oxidation_state_by_site_fraction(structure, oxidation_states):
         except IndexError:
             raise ValueError("Oxidation state of all sites must be "
                              "specified in the list.")
+
+
+def _get_valences(args):
+    analyzer, structure = args
+    try:
+        return analyzer.get_valences(structure)
+    except ValueError:
+        return None
@@ -19,6 +19,7 @@ __date__ = "5/22/14"
 import unittest2 as unittest
 from pymatgen.core.lattice import Lattice
 from pymatgen.core.structure import Structure
+from pymatgen.analysis.diffraction import xrd
 from pymatgen.analysis.diffraction.xrd import XRDCalculator
 from pymatgen.util.testing import PymatgenTest
 
@@ -84,6 +85,40 @@ class XRDCalculatorTest(PymatgenTest):
         self.assertAlmostEqual(data[0][1], 2377745.2296686019)
         self.assertAlmostEqual(data[0][3], 2.2382050944897789)
 
+    def test_get_xrd_data_batch(self):
+        c = XRDCalculator()
+        structures = [self.get_structure(n) for n in
+                      ["CsCl", "LiFePO4", "Graphite"]]
+        data = c.get_xrd_data_batch(structures)
+        for s, d in zip(structures, data):
+            self.assertEqual(d, c.get_xrd_data(s))
+        self.assertEqual(c.get_xrd_data_batch(structures, ncpus=2), data)
+
+        two_thetas, profiles = c.get_xrd_data_batch(
+            structures, two_theta_range=(10, 60), profile_step=0.5)
+        self.assertEqual(profiles.shape, (3, 100))
+        self.assertArrayAlmostEqual(two_thetas[:2], [10.25, 10.75])
+        two_thetas, profile = c.get_xrd_profile(
+            structures[0], two_theta_range=(10, 60), step=0.5)
+        self.assertArrayAlmostEqual(profile, profiles[0])
+        # The 100 peak at 21.1 and the 110 peak at 30.0.
+        self.assertAlmostEqual(profile[22], 36.483184003748946)
+        self.assertAlmostEqual(profile[40], 100)
+        self.assertAlmostEqual(profile.sum(), sum(
+            d[1] for d in c.get_xrd_data(structures[0],
+                                         two_theta_range=(10, 60))))
+
+    def test_hkl_chunks(self):
+        c = XRDCalculator()
+        s = self.get_structure("LiFePO4")
+        data = c.get_xrd_data(s)
+        chunk_size = xrd._HKL_CHUNK_SIZE
+        try:
+            xrd._HKL_CHUNK_SIZE = 7
+            self.assertEqual(c.get_xrd_data(s), data)
+        finally:
+            xrd._HKL_CHUNK_SIZE = chunk_size
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -16,7 +16,7 @@ __email__ = "ongsp@ucsd.edu"
 __date__ = "5/22/14"
 
 
-from math import sin, cos, asin, pi, degrees, radians
+from math import sin, pi, radians
 import os
 import collections
 
@@ -57,6 +57,9 @@ with open(os.path.join(os.path.dirname(__file__),
                        "atomic_scattering_params.json")) as f:
     ATOMIC_SCATTERING_PARAMS = json.load(f)
 
+# Number of hkl whose structure factors are computed at once.
+_HKL_CHUNK_SIZE = 1000
+
 
 class XRDCalculator(object):
     """
@@ -188,12 +191,17 @@ class XRDCalculator(object):
         min_r, max_r = (0, 2 / wavelength) if two_theta_range is None else \
             [2 * sin(radians(t / 2)) / wavelength for t in two_theta_range]
 
-        # Obtain crystallographic reciprocal lattice points within range
+        # Obtain crystallographic reciprocal lattice points within range.
+        # |h| is bounded by max_r times the length of the real lattice
+        # vector a, and similarly for k and l.
         recip_latt = latt.reciprocal_lattice_crystallographic
-        recip_pts = recip_latt.get_points_in_sphere(
-            [[0, 0, 0]], [0, 0, 0], max_r)
-        if min_r:
-            recip_pts = [pt for pt in recip_pts if pt[1] >= min_r]
+        nmax = np.floor(max_r * np.array(latt.abc) + 1e-8).astype(np.int)
+        hkls = np.mgrid[-nmax[0]:nmax[0] + 1, -nmax[1]:nmax[1] + 1,
+                        -nmax[2]:nmax[2] + 1].reshape((3, -1)).T
+        g_hkls = np.linalg.norm(np.dot(hkls, recip_latt.matrix), axis=1)
+        mask = (g_hkls <= max_r) & (g_hkls >= min_r)
+        hkls = hkls[mask]
+        g_hkls = g_hkls[mask]
 
         # Create a flattened array of zs, coeffs, fcoords and occus. This is
         # used to perform vectorized computation of atomic scattering factors
@@ -225,83 +233,141 @@ class XRDCalculator(object):
         fcoords = np.array(fcoords)
         occus = np.array(occus)
         dwfactors = np.array(dwfactors)
-        peaks = {}
-        two_thetas = []
-
-        for hkl, g_hkl, ind in sorted(
-                recip_pts, key=lambda i: (i[1], -i[0][0], -i[0][1], -i[0][2])):
-            hkl = [int(round(i)) for i in hkl] #Force miller indices to be integers.
-            if g_hkl != 0:
-
-                d_hkl = 1 / g_hkl
-
-                # Bragg condition
-                theta = asin(wavelength * g_hkl / 2)
-
-                # s = sin(theta) / wavelength = 1 / 2d = |ghkl| / 2 (d =
-                # 1/|ghkl|)
-                s = g_hkl / 2
-
-                #Store s^2 since we are using it a few times.
-                s2 = s ** 2
-
-                # Vectorized computation of g.r for all fractional coords and
-                # hkl.
-                g_dot_r = np.dot(fcoords, np.transpose([hkl])).T[0]
-
-                # Highly vectorized computation of atomic scattering factors.
-                # Equivalent non-vectorized code is::
-                #
-                #   for site in structure:
-                #      el = site.specie
-                #      coeff = ATOMIC_SCATTERING_PARAMS[el.symbol]
-                #      fs = el.Z - 41.78214 * s2 * sum(
-                #          [d[0] * exp(-d[1] * s2) for d in coeff])
-                fs = zs - 41.78214 * s2 * np.sum(
-                    coeffs[:, :, 0] * np.exp(-coeffs[:, :, 1] * s2), axis=1)
-
-                dw_correction = np.exp(-dwfactors * s2)
-
-                # Structure factor = sum of atomic scattering factors (with
-                # position factor exp(2j * pi * g.r and occupancies).
-                # Vectorized computation.
-                f_hkl = np.sum(fs * occus * np.exp(2j * pi * g_dot_r)
-                               * dw_correction)
-
-                # Lorentz polarization correction for hkl
-                lorentz_factor = (1 + cos(2 * theta) ** 2) / \
-                    (sin(theta) ** 2 * cos(theta))
-
-                # Intensity for hkl is modulus square of structure factor.
-                i_hkl = (f_hkl * f_hkl.conjugate()).real
-
-                two_theta = degrees(2 * theta)
-
-                if is_hex:
-                    # Use Miller-Bravais indices for hexagonal lattices.
-                    hkl = (hkl[0], hkl[1], - hkl[0] - hkl[1], hkl[2])
-                # Deal with floating point precision issues.
-                ind = np.where(np.abs(np.subtract(two_thetas, two_theta)) <
-                               XRDCalculator.TWO_THETA_TOL)
-                if len(ind[0]) > 0:
-                    peaks[two_thetas[ind[0][0]]][0] += i_hkl * lorentz_factor
-                    peaks[two_thetas[ind[0][0]]][1].append(tuple(hkl))
-                else:
-                    peaks[two_theta] = [i_hkl * lorentz_factor, [tuple(hkl)],
-                                        d_hkl]
-                    two_thetas.append(two_theta)
+
+        # Sort by |g_hkl| and then by decreasing Miller indices, and remove
+        # the origin.
+        order = np.lexsort((-hkls[:, 2], -hkls[:, 1], -hkls[:, 0], g_hkls))
+        order = order[g_hkls[order] != 0]
+        hkls = hkls[order]
+        g_hkls = g_hkls[order]
+
+        d_hkls = 1 / g_hkls
+
+        # Bragg condition
+        thetas = np.arcsin(wavelength * g_hkls / 2)
+
+        # s = sin(theta) / wavelength = 1 / 2d = |ghkl| / 2 (d =
+        # 1/|ghkl|). Store s^2 since we are using it a few times.
+        s2s = (g_hkls / 2) ** 2
+
+        # Structure factors are computed for chunks of hkl so that the
+        # intermediate arrays, of size nhkl x nsites (x ncoeffs), stay
+        # bounded for large cells.
+        f_hkls = np.empty(len(hkls), dtype=np.complex)
+        for start in range(0, len(hkls), _HKL_CHUNK_SIZE):
+            chunk = slice(start, start + _HKL_CHUNK_SIZE)
+            f_hkls[chunk] = _get_structure_factors(
+                hkls[chunk], s2s[chunk], zs, coeffs, fcoords, occus,
+                dwfactors)
+
+        # Lorentz polarization correction for hkl
+        lorentz_factors = (1 + np.cos(2 * thetas) ** 2) / \
+            (np.sin(thetas) ** 2 * np.cos(thetas))
+
+        # Intensity for hkl is modulus square of structure factor.
+        i_hkls = (f_hkls * f_hkls.conjugate()).real
+
+        two_thetas = np.degrees(2 * thetas)
+
+        # Merge the peaks with the same two theta. Since the two thetas are
+        # sorted, only the last peak needs to be compared with. This also
+        # deals with floating point precision issues.
+        peaks = []
+        for hkl, two_theta, intensity, d_hkl in zip(
+                hkls.tolist(), two_thetas.tolist(),
+                (i_hkls * lorentz_factors).tolist(), d_hkls.tolist()):
+            if is_hex:
+                # Use Miller-Bravais indices for hexagonal lattices.
+                hkl = (hkl[0], hkl[1], - hkl[0] - hkl[1], hkl[2])
+            if peaks and abs(two_theta - peaks[-1][0]) < \
+                    XRDCalculator.TWO_THETA_TOL:
+                peaks[-1][1] += intensity
+                peaks[-1][2].append(tuple(hkl))
+            else:
+                peaks.append([two_theta, intensity, [tuple(hkl)], d_hkl])
 
         # Scale intensities so that the max intensity is 100.
-        max_intensity = max([v[0] for v in peaks.values()])
+        max_intensity = max([v[1] for v in peaks])
         data = []
-        for k in sorted(peaks.keys()):
-            v = peaks[k]
-            scaled_intensity = v[0] / max_intensity * 100 if scaled else v[0]
-            fam = get_unique_families(v[1])
+        for two_theta, intensity, hkls, d_hkl in peaks:
+            scaled_intensity = intensity / max_intensity * 100 if scaled \
+                else intensity
+            fam = get_unique_families(hkls)
             if scaled_intensity > XRDCalculator.SCALED_INTENSITY_TOL:
-                data.append([k, scaled_intensity, fam, v[2]])
+                data.append([two_theta, scaled_intensity, fam, d_hkl])
         return data
 
+    def get_xrd_profile(self, structure, scaled=True, two_theta_range=(0, 90),
+                        step=0.1):
+        """
+        Calculates the XRD pattern of a structure as a profile binned on a
+        fixed two theta grid, e.g., for similarity searches against
+        experimental scans. The intensities of all peaks within each bin are
+        summed.
+
+        Args:
+            structure (Structure): Input structure
+            scaled (bool): Whether the peak intensities are scaled such that
+                the maximum peak is 100 before binning.
+            two_theta_range ([float of length 2]): Range of the two theta
+                grid in degrees. Defaults to (0, 90). None means (0, 180).
+            step (float): Width of the bins in degrees.
+
+        Returns:
+            (two_thetas, intensities) as np.arrays, with two_thetas being the
+            centers of the bins.
+        """
+        if two_theta_range is None:
+            two_theta_range = (0, 180)
+        edges = _get_two_theta_edges(two_theta_range, step)
+        data = self.get_xrd_data(structure, scaled=scaled,
+                                 two_theta_range=two_theta_range)
+        intensities, edges = np.histogram(
+            [d[0] for d in data], bins=edges, weights=[d[1] for d in data])
+        return (edges[:-1] + edges[1:]) / 2, intensities
+
+    def get_xrd_data_batch(self, structures, scaled=True,
+                           two_theta_range=(0, 90), profile_step=None,
+                           ncpus=None):
+        """
+        Calculates the XRD data for a list of structures.
+
+        Args:
+            structures ([Structure]): Input structures
+            scaled (bool): Whether to return scaled intensities. See
+                get_xrd_data.
+            two_theta_range ([float of length 2]): Tuple for range of
+                two_thetas to calculate in degrees. See get_xrd_data.
+            profile_step (float): If set, the patterns are returned as
+                profiles binned on a two theta grid with this step, as
+                given by get_xrd_profile.
+            ncpus (int): Number of processes to use. Default of None means
+                serial processing.
+
+        Returns:
+            A list of the output of get_xrd_data for each structure, or if
+            profile_step is set, (two_thetas, intensities), with
+            intensities being an np.array of shape (len(structures),
+            len(two_thetas)).
+        """
+        args = [(self, s, scaled, two_theta_range, profile_step)
+                for s in structures]
+        if ncpus and ncpus > 1:
+            import multiprocessing as mp
+            p = mp.Pool(ncpus)
+            chunksize = max(1, len(args) // (4 * ncpus))
+            results = p.map(_get_xrd_data, args, chunksize)
+            p.close()
+            p.join()
+        else:
+            results = [_get_xrd_data(a) for a in args]
+        if profile_step is None:
+            return results
+        edges = _get_two_theta_edges(two_theta_range or (0, 180),
+                                     profile_step)
+        return (edges[:-1] + edges[1:]) / 2, \
+            np.reshape([r[1] for r in results], (len(results), -1))
+
     def get_xrd_plot(self, structure, two_theta_range=(0, 90),
                      annotate_peaks=True):
         """
@@ -354,6 +420,48 @@ class XRDCalculator(object):
                           annotate_peaks=annotate_peaks).show()
 
 
+def _get_structure_factors(hkls, s2s, zs, coeffs, fcoords, occus,
+                           dwfactors):
+    # Vectorized computation of g.r for all hkl and fractional coords.
+    g_dot_r = np.dot(hkls, fcoords.T)
+
+    # Vectorized computation of atomic scattering factors for all hkl
+    # and sites. Equivalent non-vectorized code for each hkl is::
+    #
+    #   for site in structure:
+    #      el = site.specie
+    #      coeff = ATOMIC_SCATTERING_PARAMS[el.symbol]
+    #      fs = el.Z - 41.78214 * s2 * sum(
+    #          [d[0] * exp(-d[1] * s2) for d in coeff])
+    s2s = s2s[:, None]
+    fs = zs - 41.78214 * s2s * np.sum(
+        coeffs[None, :, :, 0] * np.exp(-coeffs[None, :, :, 1] *
+                                       s2s[:, :, None]), axis=2)
+
+    dw_correction = np.exp(-dwfactors * s2s)
+
+    # Structure factor = sum of atomic scattering factors (with
+    # position factor exp(2j * pi * g.r and occupancies), for all hkl
+    # of the chunk at once.
+    return np.sum(fs * occus * np.exp(2j * pi * g_dot_r) * dw_correction,
+                  axis=1)
+
+
+def _get_two_theta_edges(two_theta_range, step):
+    nbins = int(round((two_theta_range[1] - two_theta_range[0]) / step))
+    return np.linspace(two_theta_range[0], two_theta_range[1], nbins + 1)
+
+
+def _get_xrd_data(args):
+    calculator, structure, scaled, two_theta_range, profile_step = args
+    if profile_step is None:
+        return calculator.get_xrd_data(structure, scaled=scaled,
+                                       two_theta_range=two_theta_range)
+    return calculator.get_xrd_profile(structure, scaled=scaled,
+                                      two_theta_range=two_theta_range,
+                                      step=profile_step)
+
+
 def get_unique_families(hkls):
     """
     Returns unique families of Miller indices. Families must be permutations
@@ -365,22 +473,11 @@ def get_unique_families(hkls):
     Returns:
         {hkl: multiplicity}: A dict with unique hkl and multiplicity.
     """
-    # TODO: Definitely can be sped up.
-    def is_perm(hkl1, hkl2):
-        h1 = np.abs(hkl1)
-        h2 = np.abs(hkl2)
-        return all([i == j for i, j in zip(sorted(h1), sorted(h2))])
-
-    unique = collections.defaultdict(list)
-    for hkl1 in hkls:
-        found = False
-        for hkl2 in unique.keys():
-            if is_perm(hkl1, hkl2):
-                found = True
-                unique[hkl2].append(hkl1)
-                break
-        if not found:
-            unique[hkl1].append(hkl1)
+    # Permutations of each other have the same sorted absolute indices.
+    unique = collections.OrderedDict()
+    for hkl in hkls:
+        key = tuple(sorted(abs(i) for i in hkl))
+        unique.setdefault(key, []).append(hkl)
 
     pretty_unique = {}
     for k, v in unique.items():
@@ -538,10 +538,26 @@ class DiffusionAnalyzer(MSONable):
                 structure = s
             p.append(np.array(s.frac_coords)[:, None])
 
+        return cls._from_frac_coords(
+            structure, p, specie, temperature, time_step, step_skip,
+            smoothed=smoothed, min_obs=min_obs, avg_nsteps=avg_nsteps,
+            initial_disp=initial_disp, initial_structure=initial_structure)
+
+    @classmethod
+    def _from_frac_coords(cls, structure, p, specie, temperature, time_step,
+                          step_skip, smoothed="max", min_obs=30,
+                          avg_nsteps=1000, initial_disp=None,
+                          initial_structure=None):
+        """
+        Constructs the analyzer from a list of fractional coordinates arrays
+        of shape (nsites, nsteps, 3), in sequence of the run. See
+        from_structures for the other arguments.
+        """
+        p = list(p)
         if initial_structure is not None:
             p.insert(0, np.array(initial_structure.frac_coords)[:, None])
         else:
-            p.insert(0, p[0])
+            p.insert(0, p[0][:, :1])
         p = np.concatenate(p, axis=1)
         dp = p[:, 1:] - p[:, :-1]
         dp = dp - np.round(dp)
@@ -609,14 +625,25 @@ class DiffusionAnalyzer(MSONable):
                 are computed.
         """
 
-        def get_structures(vaspruns):
+        def get_frac_coords(vaspruns):
             for i, vr in enumerate(vaspruns):
+                # Use the arrays of a Vasprun parsed with ionic_step_fields
+                # if available, to avoid creating a Structure per step.
+                arrays = getattr(vr, "ionic_step_arrays", {})
+                if "frac_coords" in arrays and "lattice" in arrays:
+                    fcoords = arrays["frac_coords"]
+                    structure = Structure(arrays["lattice"][0],
+                                          vr.atomic_symbols, fcoords[0])
+                else:
+                    structures = vr.structures
+                    fcoords = np.array([s.frac_coords for s in structures])
+                    structure = structures[0]
                 if i == 0:
                     step_skip = vr.ionic_step_skip or 1
                     final_structure = vr.initial_structure
                     temperature = vr.parameters['TEEND']
                     time_step = vr.parameters['POTIM']
-                    yield step_skip, temperature, time_step
+                    yield step_skip, temperature, time_step, structure
                 # check that the runs are continuous
                 fdist = pbc_diff(vr.initial_structure.frac_coords,
                                  final_structure.frac_coords)
@@ -626,16 +653,16 @@ class DiffusionAnalyzer(MSONable):
                 final_structure = vr.final_structure
 
                 assert (vr.ionic_step_skip or 1) == step_skip
-                for s in vr.ionic_steps:
-                    yield s['structure']
+                yield np.swapaxes(fcoords, 0, 1)
 
-        s = get_structures(vaspruns)
-        step_skip, temperature, time_step = next(s)
+        p = get_frac_coords(vaspruns)
+        step_skip, temperature, time_step, structure = next(p)
 
-        return cls.from_structures(structures=s, specie=specie,
-            temperature=temperature, time_step=time_step, step_skip=step_skip,
-            smoothed=smoothed, min_obs=min_obs, avg_nsteps=avg_nsteps,
-            initial_disp=initial_disp, initial_structure=initial_structure)
+        return cls._from_frac_coords(
+            structure, p, specie=specie, temperature=temperature,
+            time_step=time_step, step_skip=step_skip, smoothed=smoothed,
+            min_obs=min_obs, avg_nsteps=avg_nsteps, initial_disp=initial_disp,
+            initial_structure=initial_structure)
 
     @classmethod
     def from_files(cls, filepaths, specie, step_skip=10, smoothed="max",
@@ -713,7 +740,8 @@ class DiffusionAnalyzer(MSONable):
                 offset = 0
                 for p in filepaths:
                     v = Vasprun(p, ionic_step_offset=offset,
-                                ionic_step_skip=step_skip)
+                                ionic_step_skip=step_skip,
+                                ionic_step_fields=["lattice", "frac_coords"])
                     yield v
                     # Recompute offset.
                     offset = (-(v.nionic_steps - offset)) % step_skip
@@ -781,7 +809,8 @@ def _get_vasprun(args):
     Internal method to support multiprocessing.
     """
     return Vasprun(args[0], ionic_step_skip=args[1],
-                   parse_dos=False, parse_eigen=False)
+                   parse_dos=False, parse_eigen=False,
+                   ionic_step_fields=["lattice", "frac_coords"])
 
 
 def fit_arrhenius(temps, diffusivities):
@@ -17,11 +17,17 @@ __email__ = "shyuep@gmail.com"
 __status__ = "Production"
 __date__ = "Aug 1 2012"
 
+import os
+import json
+import hashlib
+import logging
 from math import pi, sqrt, log
 from datetime import datetime
-from copy import deepcopy, copy
+from copy import copy
 from warnings import warn
 import bisect
+import heapq
+import itertools
 
 import numpy as np
 from scipy.special import erfc
@@ -29,6 +35,11 @@ from scipy.misc import comb
 
 import scipy.constants as constants
 
+from monty.json import MontyEncoder
+from monty.serialization import dumpfn, loadfn
+
+logger = logging.getLogger(__name__)
+
 
 class EwaldSummation(object):
     """
@@ -47,8 +58,12 @@ class EwaldSummation(object):
     # Converts unit of q*q/r into eV
     CONV_FACT = 1e10 * constants.e / (4 * pi * constants.epsilon_0)
 
+    # Default maximum real space cutoff in angstroms for the "pme" method.
+    PME_REAL_SPACE_CUT = 8.0
+
     def __init__(self, structure, real_space_cut=None, recip_space_cut=None,
-                 eta=None, acc_factor=12.0, w=1 / sqrt(2), compute_forces=False):
+                 eta=None, acc_factor=12.0, w=1 / sqrt(2), compute_forces=False,
+                 method="matrix", pme_order=8, pme_grid=None):
         """
         Initializes and calculates the Ewald sum. Default convergence
         parameters have been specified, but you can override them if you wish.
@@ -65,7 +80,9 @@ class EwaldSummation(object):
                 Defaults to None, which means determine automagically using
                 the formula given in gulp 3.1 documentation.
             eta (float): The screening parameter. Defaults to None, which means
-                determine automatically.
+                determine automatically. For the "pme" method, the default
+                is increased if necessary such that the automatic real space
+                cutoff does not exceed PME_REAL_SPACE_CUT.
             acc_factor (float): No. of significant figures each sum is
                 converged to.
             w (float): Weight parameter, w, has been included that represents
@@ -77,22 +94,56 @@ class EwaldSummation(object):
                 cutoffs are set to None.
             compute_forces (bool): Whether to compute forces. False by
                 default since it is usually not needed.
+            method (str): "matrix" (default) computes the full N x N
+                interaction energy matrices, which are needed for
+                compute_partial_energy, compute_sub_structure and the
+                EwaldMinimizer. "pme" computes only the energies (and forces)
+                without ever allocating N x N arrays, using a smooth
+                particle-mesh Ewald (FFT based) reciprocal space sum and a
+                neighbor list real space sum. This scales as O(N log N) in
+                the reciprocal space and is much faster for large
+                structures. The energy matrix properties are not available
+                in this mode.
+            pme_order (int): Order of the cardinal B-splines used to
+                interpolate the charges on the mesh in the "pme" method.
+                Must be at least 3. Even orders are slightly more accurate
+                than odd orders, for which the B-spline modulus that vanishes
+                at the Nyquist frequency is interpolated from its neighbors.
+            pme_grid ([int]): Number of mesh points along each lattice
+                vector in the "pme" method. Defaults to None, which means
+                1.5 times the number needed to resolve all reciprocal
+                lattice vectors within the reciprocal space cutoff, which
+                reproduces the "matrix" energies to better than 1e-6 eV per
+                site with the default order.
         """
+        if method not in ("matrix", "pme"):
+            raise ValueError("Unknown method %s. Supported methods are "
+                             "'matrix' and 'pme'." % method)
+        if method == "pme" and pme_order < 3:
+            raise ValueError("pme_order must be at least 3.")
         self._s = structure
         self._charged = abs(structure.charge) > 1e-8
         self._vol = structure.volume
         self._compute_forces = compute_forces
+        self._method = method
+        self._pme_order = pme_order
 
         self._acc_factor = acc_factor
+        # acc factor used to automatically determine the optimal real and
+        # reciprocal space cutoff radii
+        self._accf = sqrt(log(10 ** acc_factor))
+
         # set screening length
         self._eta = eta if eta \
             else (len(structure) * w / (self._vol ** 2)) ** (1 / 3) * pi
+        if method == "pme" and not eta:
+            # Reciprocal space terms are cheap with a mesh, so the real
+            # space sum is limited to a cutoff of PME_REAL_SPACE_CUT.
+            self._eta = max(self._eta,
+                            (self._accf / EwaldSummation.PME_REAL_SPACE_CUT)
+                            ** 2)
         self._sqrt_eta = sqrt(self._eta)
 
-        # acc factor used to automatically determine the optimal real and
-        # reciprocal space cutoff radii
-        self._accf = sqrt(log(10 ** acc_factor))
-
         self._rmax = real_space_cut if real_space_cut \
             else self._accf / self._sqrt_eta
         self._gmax = recip_space_cut if recip_space_cut \
@@ -106,9 +157,17 @@ class EwaldSummation(object):
 
         self._coords = np.array(self._s.cart_coords)
 
+        if method == "pme":
+            self._pme_grid = pme_grid if pme_grid is not None else [
+                _get_fft_size(1.5 * (self._gmax / pi * a + 1))
+                for a in structure.lattice.abc]
+
         # Now we call the relevant private methods to calculate the reciprocal
         # and real space terms.
-        (self._recip, recip_forces) = self._calc_recip()
+        if method == "pme":
+            (self._recip_energy, recip_forces) = self._calc_recip_pme()
+        else:
+            (self._recip, recip_forces) = self._calc_recip()
         (self._real, self._point, real_point_forces) = \
             self._calc_real_and_point()
         if self._compute_forces:
@@ -117,13 +176,13 @@ class EwaldSummation(object):
     def compute_partial_energy(self, removed_indices):
         """
         Gives total ewald energy for certain sites being removed, i.e. zeroed
-        out.
+        out. Only the rows and columns of the removed sites are summed, using
+        the cached row and column sums of the total energy matrix.
         """
-        total_energy_matrix = self.total_energy_matrix.copy()
-        for i in removed_indices:
-            total_energy_matrix[i, :] = 0
-            total_energy_matrix[:, i] = 0
-        return sum(sum(total_energy_matrix))
+        matrix, row_sums, col_sums = self._get_total_energy_sums()
+        inds = np.unique(np.array(removed_indices, dtype=np.int))
+        return np.sum(row_sums) - np.sum(row_sums[inds]) - \
+            np.sum(col_sums[inds]) + np.sum(matrix[np.ix_(inds, inds)])
 
     def compute_sub_structure(self, sub_structure, tol=1e-3):
         """
@@ -138,45 +197,71 @@ class EwaldSummation(object):
         Returns:
             Ewald sum of substructure.
         """
-        total_energy_matrix = self.total_energy_matrix.copy()
+        charges = [compute_average_oxidation_state(site)
+                   for site in sub_structure]
+        return self.compute_sub_structure_energy(sub_structure.frac_coords,
+                                                 charges, tol=tol)
 
-        def find_match(site):
-            for test_site in sub_structure:
-                frac_diff = abs(np.array(site.frac_coords)
-                                - np.array(test_site.frac_coords)) % 1
-                frac_diff = [abs(a) < tol or abs(a) > 1 - tol
-                             for a in frac_diff]
-                if all(frac_diff):
-                    return test_site
-            return None
+    def compute_sub_structure_energy(self, frac_coords, charges, tol=1e-3):
+        """
+        Gives total ewald energy for a sub structure given as the fractional
+        coordinates and the oxidation states of its sites, which avoids
+        creating a Structure for each of many sub structures of the same
+        structure.
+
+        Args:
+            frac_coords (Nx3 array): Fractional coordinates of the sites of
+                the sub structure in the lattice of the structure.
+            charges ([float]): Oxidation states of the sites.
+            tol (float): Tolerance for site matching in fractional coordinates.
 
-        matches = []
-        for i, site in enumerate(self._s):
-            matching_site = find_match(site)
-            if matching_site:
-                new_charge = compute_average_oxidation_state(matching_site)
-                old_charge = self._oxi_states[i]
-                scaling_factor = new_charge / old_charge
-                matches.append(matching_site)
-            else:
-                scaling_factor = 0
-            total_energy_matrix[i, :] *= scaling_factor
-            total_energy_matrix[:, i] *= scaling_factor
-
-        if len(matches) != len(sub_structure):
+        Returns:
+            Ewald sum of substructure.
+        """
+        matrix = self._get_total_energy_sums()[0]
+        frac_coords = np.reshape(frac_coords, (-1, 3))
+
+        # Each site is matched with the first site of the sub structure at
+        # the same position, accounting for periodic boundary conditions.
+        frac_diff = self._s.frac_coords[:, None, :] - frac_coords[None, :, :]
+        frac_diff = np.abs(frac_diff - np.round(frac_diff))
+        is_match = np.all(frac_diff < tol, axis=2)
+        has_match = np.any(is_match, axis=1)
+        match_inds = np.argmax(is_match, axis=1)
+
+        scaling_factors = np.zeros(len(self._s))
+        scaling_factors[has_match] = \
+            np.asarray(charges, dtype=np.float)[match_inds[has_match]] / \
+            np.asarray(self._oxi_states)[has_match]
+
+        if np.sum(has_match) != len(frac_coords):
+            matched = set(match_inds[has_match])
             output = ["Missing sites."]
-            for site in sub_structure:
-                if site not in matches:
-                    output.append("unmatched = {}".format(site))
+            for i, coords in enumerate(frac_coords):
+                if i not in matched:
+                    output.append("unmatched = {}".format(coords))
             raise ValueError("\n".join(output))
 
-        return sum(sum(total_energy_matrix))
+        return np.dot(scaling_factors, np.dot(matrix, scaling_factors))
+
+    def _get_total_energy_sums(self):
+        """
+        Returns the total energy matrix and its row and column sums, which
+        are computed only once.
+        """
+        if getattr(self, "_total_energy_sums", None) is None:
+            matrix = self.total_energy_matrix
+            self._total_energy_sums = (matrix, np.sum(matrix, axis=1),
+                                       np.sum(matrix, axis=0))
+        return self._total_energy_sums
 
     @property
     def reciprocal_space_energy(self):
         """
         The reciprocal space energy.
         """
+        if self._method == "pme":
+            return self._recip_energy
         return sum(sum(self._recip))
 
     @property
@@ -186,6 +271,7 @@ class EwaldSummation(object):
         corresponds to the interaction energy between site i and site j in
         reciprocal space.
         """
+        self._check_matrix_method()
         return self._recip
 
     @property
@@ -193,6 +279,8 @@ class EwaldSummation(object):
         """
         The real space space energy.
         """
+        if self._method == "pme":
+            return self._real
         return sum(sum(self._real))
 
     @property
@@ -201,6 +289,7 @@ class EwaldSummation(object):
         The real space energy matrix. Each matrix element (i, j) corresponds to
         the interaction energy between site i and site j in real space.
         """
+        self._check_matrix_method()
         return self._real
 
     @property
@@ -227,7 +316,8 @@ class EwaldSummation(object):
             warn('Charged structures not supported in EwaldSummation, but '
                  'charged input structures can be used for '
                  'EwaldSummation.compute_sub_structure')
-        return sum(sum(self._recip)) + sum(sum(self._real)) + sum(self._point)
+        return self.reciprocal_space_energy + self.real_space_energy + \
+            sum(self._point)
 
     @property
     def total_energy_matrix(self):
@@ -235,6 +325,7 @@ class EwaldSummation(object):
         The total energy matrix. Each matrix element (i, j) corresponds to the
         total interaction energy between site i and site j.
         """
+        self._check_matrix_method()
         totalenergy = self._recip + self._real
         for i in range(len(self._point)):
             totalenergy[i, i] += self._point[i]
@@ -251,6 +342,11 @@ class EwaldSummation(object):
                 "Forces are available only if compute_forces is True!")
         return self._forces
 
+    def _check_matrix_method(self):
+        if self._method != "matrix":
+            raise AttributeError("Energy matrices are available only with "
+                                 "the 'matrix' method!")
+
     def _calc_recip(self):
         """
         Perform the reciprocal space summation. Calculates the quantity
@@ -308,6 +404,82 @@ class EwaldSummation(object):
         erecip *= prefactor * EwaldSummation.CONV_FACT * qiqj * 2 ** 0.5
         return erecip, forces
 
+    def _calc_recip_pme(self):
+        """
+        Perform the reciprocal space summation with the smooth particle-mesh
+        Ewald method (Essmann et al., J. Chem. Phys. 103, 8577 (1995)). The
+        charges are interpolated onto a mesh with cardinal B-splines, and
+        E_recip = 1/(2PiV) sum_{m != 0} exp(-Pi**2 m.m/eta)/(m.m) B(m) |F(Q)(m)|**2
+        is evaluated with FFTs, where m are the reciprocal lattice vectors
+        without the 2Pi factor, Q is the charge mesh and B(m) corrects for
+        the interpolation.
+
+        Returns:
+            (energy, forces)
+        """
+        latt = self._s.lattice
+        numsites = self._s.num_sites
+        order = self._pme_order
+        grid = np.array(self._pme_grid)
+        inv_matrix = latt.inv_matrix
+        qs = np.array(self._oxi_states, dtype=np.float)
+
+        # Each site contributes to order**3 mesh points k = k0 - j, with a
+        # weight of prod_d M_n(u_d - k_d) = prod_d M_n(frac_d + j_d).
+        u = np.mod(self._s.frac_coords, 1) * grid
+        k0 = np.floor(u).astype(np.int)
+        j = np.arange(order)
+        x = (u - k0)[:, :, None] + j
+        w = _cardinal_bspline(x, order)
+        dw = _cardinal_bspline(x, order - 1) - \
+            _cardinal_bspline(x - 1, order - 1)
+        mesh_inds = np.mod(k0[:, :, None] - j, grid[None, :, None])
+        flat_inds = ((mesh_inds[:, 0, :, None, None] * grid[1] +
+                      mesh_inds[:, 1, None, :, None]) * grid[2] +
+                     mesh_inds[:, 2, None, None, :]).reshape((numsites, -1))
+        weights = (w[:, 0, :, None, None] * w[:, 1, None, :, None] *
+                   w[:, 2, None, None, :]).reshape((numsites, -1))
+
+        charge_mesh = np.bincount(flat_inds.ravel(),
+                                  weights=(qs[:, None] * weights).ravel(),
+                                  minlength=np.prod(grid)).reshape(grid)
+        f_mesh = np.fft.fftn(charge_mesh)
+
+        # Influence function B(m) exp(-Pi**2 m.m/eta) / (Pi V m.m).
+        ms = [np.fft.fftfreq(n, 1 / n) for n in grid]
+        rcp = inv_matrix.T
+        mcart = ms[0][:, None, None, None] * rcp[0] + \
+            ms[1][None, :, None, None] * rcp[1] + \
+            ms[2][None, None, :, None] * rcp[2]
+        m2 = np.sum(mcart ** 2, axis=-1)
+        m2[0, 0, 0] = 1
+        bsp_mod = [_get_bspline_moduli(n, order) for n in grid]
+        influence = bsp_mod[0][:, None, None] * bsp_mod[1][None, :, None] * \
+            bsp_mod[2][None, None, :] * np.exp(-pi ** 2 * m2 / self._eta) / \
+            (pi * self._vol * m2)
+        influence[0, 0, 0] = 0
+
+        energy = 0.5 * np.sum(influence * np.abs(f_mesh) ** 2) * \
+            EwaldSummation.CONV_FACT
+
+        forces = np.zeros((numsites, 3), dtype=np.float)
+        if self._compute_forces:
+            # Derivative of the energy with respect to the charge mesh.
+            potential = np.real(np.fft.ifftn(influence * f_mesh)) * \
+                np.prod(grid)
+            dweights = np.stack([
+                dw[:, 0, :, None, None] * w[:, 1, None, :, None] *
+                w[:, 2, None, None, :],
+                w[:, 0, :, None, None] * dw[:, 1, None, :, None] *
+                w[:, 2, None, None, :],
+                w[:, 0, :, None, None] * w[:, 1, None, :, None] *
+                dw[:, 2, None, None, :]], axis=-1).reshape((numsites, -1, 3))
+            grads = np.dot(dweights * grid, inv_matrix.T)
+            forces = -qs[:, None] * np.einsum(
+                "ij,ijk->ik", potential.ravel()[flat_inds], grads)
+            forces *= EwaldSummation.CONV_FACT
+        return energy, forces
+
     def _calc_real_and_point(self):
         """
         Determines the self energy -(eta/pi)**(1/2) * sum_{i=1}^{N} q_i**2
@@ -318,7 +490,6 @@ class EwaldSummation(object):
         forcepf = 2.0 * self._sqrt_eta / sqrt(pi)
         coords = self._coords
         numsites = self._s.num_sites
-        ereal = np.empty((numsites, numsites), dtype=np.float)
 
         forces = np.zeros((numsites, 3), dtype=np.float)
 
@@ -326,34 +497,34 @@ class EwaldSummation(object):
 
         epoint = - qs ** 2 * sqrt(self._eta / pi)
 
-        for i in range(numsites):
-            nfcoords, rij, js = self._s.lattice.get_points_in_sphere(fcoords,
-                                    coords[i], self._rmax, zip_results=False)
-
-            # remove the rii term
-            inds = rij > 1e-8
-            js = js[inds]
-            rij = rij[inds]
-            nfcoords = nfcoords[inds]
+        # A single neighbor search for all sites. The rii term is excluded.
+        latt = self._s.lattice
+        inds, js, images, rij = latt.get_neighbor_list(self._rmax, fcoords)
 
-            qi = qs[i]
-            qj = qs[js]
+        qi = qs[inds]
+        qj = qs[js]
 
-            erfcval = erfc(self._sqrt_eta * rij)
-            new_ereals = erfcval * qi * qj / rij
+        erfcval = erfc(self._sqrt_eta * rij)
+        new_ereals = erfcval * qi * qj / rij
 
-            # insert new_ereals
-            for k in range(numsites):
-                ereal[k, i] = np.sum(new_ereals[js == k])
+        if self._method == "pme":
+            ereal = np.sum(new_ereals)
+        else:
+            # ereal[j, i] is the sum over all images of j around i.
+            ereal = np.bincount(js * numsites + inds, weights=new_ereals,
+                                minlength=numsites * numsites)
+            ereal = ereal.reshape((numsites, numsites))
 
-            if self._compute_forces:
-                nccoords = self._s.lattice.get_cartesian_coords(nfcoords)
+        if self._compute_forces:
+            nccoords = latt.get_cartesian_coords(fcoords[js] + images)
 
-                fijpf = qj / rij ** 3 * (erfcval + forcepf * rij *
-                                         np.exp(-self._eta * rij ** 2))
-                forces[i] += np.sum(np.expand_dims(fijpf, 1) *
-                                    (np.array([coords[i]]) - nccoords) *
-                                    qi * EwaldSummation.CONV_FACT, axis=0)
+            fijpf = qj / rij ** 3 * (erfcval + forcepf * rij *
+                                     np.exp(-self._eta * rij ** 2))
+            fij = np.expand_dims(fijpf * qi * EwaldSummation.CONV_FACT, 1) * \
+                (coords[inds] - nccoords)
+            for k in range(3):
+                forces[:, k] = np.bincount(inds, weights=fij[:, k],
+                                           minlength=numsites)
 
         ereal *= 0.5 * EwaldSummation.CONV_FACT
         epoint *= EwaldSummation.CONV_FACT
@@ -372,7 +543,7 @@ class EwaldSummation(object):
         return "\n".join(output)
 
 
-class EwaldMinimizer:
+class EwaldMinimizer(object):
     """
     This class determines the manipulations that will minimize an ewald matrix,
     given a list of possible manipulations. This class does not perform the
@@ -403,6 +574,23 @@ class EwaldMinimizer:
             structures so it may be necessary to overestimate and then
             remove the duplicates later. (duplicate checking in this
             process is extremely expensive)
+        algo: Algorithm to use, one of the ALGO_* class attributes.
+        equivalent_indices: Optional list of lists of symmetrically
+            equivalent indices, e.g., the equivalent_indices of
+            SpacegroupAnalyzer(structure).get_symmetrized_structure().
+            If supplied, and the indices of every manipulation are a union
+            of these orbits, branches of the search that are equivalent by
+            symmetry to one already searched are skipped. Note that the
+            returned lists then contain only one of each set of
+            symmetrically equivalent orderings sharing the first index.
+        ncpus: Number of processes among which the branches of the search
+            are distributed (ALGO_FAST only). Default of None means serial
+            processing.
+        checkpoint_file: Optional path of a file in which the completed
+            branches and the current best lists are periodically stored.
+            If the file exists, the minimization is resumed from it.
+        checkpoint_interval: Minimum time in seconds between two writes of
+            the checkpoint file.
     """
 
     ALGO_FAST = 0
@@ -416,15 +604,33 @@ class EwaldMinimizer:
     """
     ALGO_TIME_LIMIT = 3
 
-    def __init__(self, matrix, m_list, num_to_return=1, algo=ALGO_FAST):
-        # Setup and checking of inputs
-        self._matrix = copy(matrix)
-        # Make the matrix diagonally symmetric (so matrix[i,:] == matrix[:,j])
-        for i in range(len(self._matrix)):
-            for j in range(i, len(self._matrix)):
-                value = (self._matrix[i, j] + self._matrix[j, i]) / 2
-                self._matrix[i, j] = value
-                self._matrix[j, i] = value
+    def __init__(self, matrix, m_list, num_to_return=1, algo=ALGO_FAST,
+                 equivalent_indices=None, ncpus=None, checkpoint_file=None,
+                 checkpoint_interval=60):
+        self._setup(matrix, m_list, algo)
+        self._num_to_return = num_to_return
+        self._equivalent_indices = equivalent_indices
+        self._ncpus = ncpus
+        self._checkpoint_file = checkpoint_file
+        self._checkpoint_interval = checkpoint_interval
+        # Minimum shared between the worker processes of a parallel search.
+        self._shared_minimum = None
+
+        self._output_lists = []
+        # Tag that the recurse function looks at at each level. If a method
+        # sets this to true it breaks the recursion and stops the search.
+        self._finished = False
+
+        self.minimize_matrix()
+
+        self._best_m_list = self._output_lists[0][1]
+        self._minimized_sum = self._output_lists[0][0]
+
+    def _setup(self, matrix, m_list, algo):
+        # Setup and checking of inputs. Make the matrix diagonally symmetric
+        # (so matrix[i,:] == matrix[:,j])
+        matrix = np.array(matrix, dtype=np.float)
+        self._matrix = (matrix + matrix.T) / 2
 
         # sort the m_list based on number of permutations
         self._m_list = sorted(m_list, key=lambda x: comb(len(x[2]), x[1]),
@@ -434,33 +640,278 @@ class EwaldMinimizer:
             if mlist[0] > 1:
                 raise ValueError('multiplication fractions must be <= 1')
         self._current_minimum = float('inf')
-        self._num_to_return = num_to_return
         self._algo = algo
         if algo == EwaldMinimizer.ALGO_COMPLETE:
             raise NotImplementedError('Complete algo not yet implemented for '
                                       'EwaldMinimizer')
-
-        self._output_lists = []
-        # Tag that the recurse function looks at at each level. If a method
-        # sets this to true it breaks the recursion and stops the search.
-        self._finished = False
-
         self._start_time = datetime.utcnow()
 
-        self.minimize_matrix()
+    @classmethod
+    def iter_m_lists(cls, matrix, m_list, max_queue_size=None,
+                     time_limit=None):
+        """
+        Generates the orderings of an ewald matrix in order of increasing
+        matrix sum, as they are found by a best first search. Unlike the
+        minimizer itself, which only returns its output lists once the
+        whole search is done, this yields the lowest orderings as soon as
+        they are known, and the search only goes as far as the orderings
+        are consumed.
+
+        The search keeps the partial orderings in a priority queue sorted by
+        their best case. Each of them takes O(N) memory, N being the size of
+        the matrix, so the queue can be bounded with max_queue_size. When it
+        is full, the least promising half of the queue is discarded, after
+        which the orderings are only approximately in increasing order and
+        some of them may be missed.
 
-        self._best_m_list = self._output_lists[0][1]
-        self._minimized_sum = self._output_lists[0][0]
+        Args:
+            matrix: A matrix of the ewald sum interaction energies.
+            m_list: list of manipulations. See __init__.
+            max_queue_size (int): Maximum number of partial orderings kept
+                in the queue. Default of None means no limit.
+            time_limit (float): Time in seconds after which the search is
+                stopped. Default of None means no limit.
+
+        Returns:
+            A generator of [matrix_sum, m_list], in the same format as the
+            output_lists.
+        """
+        minimizer = cls.__new__(cls)
+        minimizer._setup(matrix, m_list, cls.ALGO_FAST)
+        return minimizer._iter_best_first(max_queue_size, time_limit)
+
+    def _iter_best_first(self, max_queue_size, time_limit):
+        # The queue holds (priority, tie breaker, node, output_m_list), node
+        # being the (state, m_list, indices) of a partial ordering with its
+        # best case as priority, or None for a complete ordering with its
+        # exact sum as priority. The lists of the nodes are never modified
+        # in place, so that they can be shared between nodes.
+        queue = []
+        counter = itertools.count()
+
+        def push(state, m_list, indices, output_m_list):
+            while m_list and m_list[-1][1] == 0:
+                m_list = m_list[:-1]
+            if not m_list:
+                scales = state[0]
+                matrix_sum = np.sum(self._matrix * scales[:, None] *
+                                    scales[None, :])
+                heapq.heappush(queue, (matrix_sum, next(counter), None,
+                                       output_m_list))
+            elif m_list[-1][1] <= len(indices.intersection(m_list[-1][2])):
+                heapq.heappush(queue, (
+                    self._best_case(state, m_list, indices), next(counter),
+                    (state, m_list, indices), output_m_list))
+
+        n = len(self._matrix)
+        push((np.ones(n), np.sum(self._matrix, axis=1), np.sum(self._matrix)),
+             [[m[0], m[1], list(m[2]), m[3]] for m in self._m_list],
+             set(range(n)), [])
+
+        while queue:
+            if time_limit is not None and (
+                    datetime.utcnow() - self._start_time).total_seconds() > \
+                    time_limit:
+                logger.info("Time limit of {} s reached with {} partial "
+                            "orderings left".format(time_limit, len(queue)))
+                return
+            priority, _, node, output_m_list = heapq.heappop(queue)
+            if node is None:
+                yield [priority, output_m_list]
+                continue
+
+            # Branch on the index with the most negative effect on the
+            # matrix sum, manipulating it or not.
+            state, m_list, indices = node
+            m = m_list[-1]
+            index = self._get_next_index(state, m, indices)
+            m_indices = [i for i in m[2] if i != index]
+            indices2 = copy(indices)
+            indices2.remove(index)
+            push(self._apply(state, index, m[0]),
+                 m_list[:-1] + [[m[0], m[1] - 1, m_indices, m[3]]],
+                 indices2, output_m_list + [[index, m[3]]])
+            push(state, m_list[:-1] + [[m[0], m[1], m_indices, m[3]]],
+                 indices, output_m_list)
+
+            if max_queue_size and len(queue) > max_queue_size:
+                queue = heapq.nsmallest(max(1, max_queue_size // 2), queue)
+                logger.debug("Discarded the least promising partial "
+                             "orderings, minimum best case of the queue "
+                             "{}".format(queue[0][0]))
 
     def minimize_matrix(self):
         """
         This method finds and returns the permutations that produce the lowest
-        ewald sum calls recursive function to iterate through permutations
+        ewald sum calls recursive function to iterate through permutations.
+
+        The search tree is split into the independent branches of its root,
+        i.e., the manipulation processed first is applied to each of its
+        candidate indices in turn, every branch excluding the indices of the
+        previous ones. With the ALGO_FAST algorithm, these branches are
+        distributed over ncpus processes. Branches that are mapped onto the
+        first one by a symmetry operation are skipped if equivalent_indices
+        are supplied, and the completed branches are checkpointed if a
+        checkpoint_file is supplied.
+        """
+        if self._algo not in (EwaldMinimizer.ALGO_FAST,
+                              EwaldMinimizer.ALGO_BEST_FIRST):
+            return
+        key = self._get_checkpoint_key()
+        branches = self._get_branches()
+        completed = set()
+        if self._checkpoint_file and os.path.exists(self._checkpoint_file):
+            d = loadfn(self._checkpoint_file)
+            if d["key"] != key:
+                raise ValueError("Checkpoint file {} belongs to a different "
+                                 "minimization".format(self._checkpoint_file))
+            completed = set(d["completed_branches"])
+            for matrix_sum, output_m_list in d["output_lists"]:
+                self.add_m_list(matrix_sum, output_m_list)
+            logger.info("Resuming from {} with {} of {} branches "
+                        "completed".format(self._checkpoint_file,
+                                           len(completed), len(branches)))
+
+        todo = [i for i, b in enumerate(branches)
+                if i not in completed and not b[1]]
+        last_checkpoint = [datetime.utcnow()]
+
+        def branch_done(i):
+            completed.add(i)
+            logger.info("Completed branch {} ({} of {} left), current "
+                        "minimum {}, elapsed time {}".format(
+                            i, len(todo) - len(completed), len(branches),
+                            self._current_minimum,
+                            datetime.utcnow() - self._start_time))
+            if self._checkpoint_file and (
+                    datetime.utcnow() - last_checkpoint[0]).total_seconds() \
+                    >= self._checkpoint_interval:
+                self._write_checkpoint(key, branches, completed)
+                last_checkpoint[0] = datetime.utcnow()
+
+        if self._ncpus and self._ncpus > 1 and len(todo) > 1 and \
+                self._algo == EwaldMinimizer.ALGO_FAST:
+            import multiprocessing as mp
+            shared_minimum = mp.Value("d", self._current_minimum)
+            p = mp.Pool(self._ncpus, initializer=_init_minimizer_worker,
+                        initargs=(self, shared_minimum))
+            try:
+                for i, output_lists in p.imap_unordered(
+                        _run_minimizer_branch,
+                        [(i, branches[i][2]) for i in todo]):
+                    for matrix_sum, output_m_list in output_lists:
+                        if matrix_sum < self._current_minimum:
+                            self.add_m_list(matrix_sum, output_m_list)
+                    with shared_minimum.get_lock():
+                        shared_minimum.value = min(shared_minimum.value,
+                                                   self._current_minimum)
+                    branch_done(i)
+            finally:
+                p.close()
+                p.join()
+        else:
+            for i in todo:
+                bound = branches[i][0]
+                # The bound of the root node at which the branch is split
+                # off prunes this and all the subsequent branches.
+                if self._finished or (bound is not None and
+                                      bound > self._current_minimum):
+                    break
+                self._recurse(*branches[i][2])
+                branch_done(i)
+
+        if self._checkpoint_file:
+            self._write_checkpoint(key, branches, completed)
+
+    def _get_checkpoint_key(self):
+        """
+        Returns a fingerprint of the matrix and the manipulations to make
+        sure that a checkpoint file is only used to resume the same
+        minimization.
         """
-        if self._algo == EwaldMinimizer.ALGO_FAST or \
-                        self._algo == EwaldMinimizer.ALGO_BEST_FIRST:
-            return self._recurse(self._matrix, self._m_list,
-                                 set(range(len(self._matrix))))
+        md5 = hashlib.md5(self._matrix.tobytes())
+        md5.update(json.dumps([self._m_list, self._num_to_return, self._algo,
+                               self._equivalent_indices],
+                              cls=MontyEncoder).encode("utf-8"))
+        return md5.hexdigest()
+
+    def _write_checkpoint(self, key, branches, completed):
+        # The first index manipulated in each branch is stored for reference.
+        dumpfn({"key": key,
+                "branch_indices": [b[2][3][0][0] for b in branches],
+                "completed_branches": sorted(completed),
+                "output_lists": self._output_lists}, self._checkpoint_file)
+
+    def _get_branches(self):
+        """
+        Splits the search tree into the independent branches of the root
+        node.
+
+        Returns:
+            List of (bound, skip, args) for each branch, where bound is the
+            best case of the root node at which the branch is split off (None
+            if it is not evaluated there), skip indicates whether the branch
+            is equivalent to the first one by symmetry and args are the
+            arguments of _recurse for the branch.
+        """
+        n = len(self._matrix)
+        state = (np.ones(n), np.sum(self._matrix, axis=1),
+                 np.sum(self._matrix))
+        m_list = [[m[0], m[1], list(m[2]), m[3]] for m in self._m_list]
+        indices = set(range(n))
+
+        while m_list and m_list[-1][1] == 0:
+            m_list.pop()
+        if not m_list:
+            self.add_m_list(np.sum(self._matrix), [])
+            return []
+
+        orbits = self._get_orbits(m_list)
+        first_orbit = None
+        branches = []
+        while m_list[-1][1] <= len(indices.intersection(m_list[-1][2])):
+            bound = None
+            if len(m_list) == 1 or m_list[-1][1] > 1:
+                bound = self._best_case(state, m_list, indices)
+            index = self._get_next_index(state, m_list[-1], indices)
+            m_list[-1][2].remove(index)
+
+            skip = False
+            if orbits is not None:
+                if first_orbit is None:
+                    first_orbit = orbits[index]
+                else:
+                    skip = index in first_orbit
+
+            m_list2 = [[m[0], m[1], list(m[2]), m[3]] for m in m_list]
+            m_list2[-1][1] -= 1
+            indices2 = copy(indices)
+            indices2.remove(index)
+            branches.append((bound, skip, (
+                self._apply(state, index, m_list[-1][0]), m_list2, indices2,
+                [[index, m_list[-1][3]]])))
+        return branches
+
+    def _get_orbits(self, m_list):
+        """
+        Returns a dict mapping each index to the set of its symmetrically
+        equivalent indices, or None if symmetry cannot be used to prune the
+        search. This is only valid if the indices of every manipulation are
+        a union of orbits.
+        """
+        if self._equivalent_indices is None:
+            return None
+        orbits = {}
+        for orbit in self._equivalent_indices:
+            for i in orbit:
+                orbits[i] = set(orbit)
+        if len(orbits) != len(self._matrix):
+            return None
+        for m in m_list:
+            m_indices = set(m[2])
+            if any(not orbits[i].issubset(m_indices) for i in m_indices):
+                return None
+        return orbits
 
     def add_m_list(self, matrix_sum, m_list):
         """
@@ -478,6 +929,15 @@ class EwaldMinimizer:
             self._output_lists.pop()
         if len(self._output_lists) == self._num_to_return:
             self._current_minimum = self._output_lists[-1][0]
+            if self._shared_minimum is not None:
+                with self._shared_minimum.get_lock():
+                    if self._current_minimum < self._shared_minimum.value:
+                        self._shared_minimum.value = self._current_minimum
+
+    def _get_current_minimum(self):
+        if self._shared_minimum is not None:
+            return min(self._current_minimum, self._shared_minimum.value)
+        return self._current_minimum
 
     def best_case(self, matrix, m_list, indices_left):
         """
@@ -491,6 +951,34 @@ class EwaldMinimizer:
             indices: Set of indices which haven't had a permutation
                 performed on them.
         """
+        return self._get_bound(np.sum(matrix), np.sum(matrix, axis=1),
+                               lambda inds: matrix[inds, :][:, inds],
+                               m_list, indices_left)
+
+    def _best_case(self, state, m_list, indices_left):
+        """
+        Equivalent of best_case for a search state.
+        """
+        scales, potentials, total = state
+
+        def get_interactions(inds):
+            inds = np.array(inds, dtype=np.int)
+            s = scales[inds]
+            interactions = self._matrix[inds[:, None], inds]
+            interactions *= s[:, None]
+            interactions *= s
+            return interactions
+
+        return self._get_bound(total, scales * potentials, get_interactions,
+                               m_list, indices_left)
+
+    def _get_bound(self, total, row_sums, get_interactions, m_list,
+                   indices_left):
+        """
+        Computes a best case from the current matrix sum, the current row
+        sums and a function returning the current interaction matrix of a
+        list of indices.
+        """
         m_indices = []
         fraction_list = []
         for m in m_list:
@@ -499,25 +987,28 @@ class EwaldMinimizer:
 
         indices = list(indices_left.intersection(m_indices))
 
-        interaction_matrix = matrix[indices, :][:, indices]
+        interaction_matrix = get_interactions(indices)
 
-        fractions = np.zeros(len(interaction_matrix)) + 1
+        fractions = np.ones(len(interaction_matrix))
         fractions[:len(fraction_list)] = fraction_list
-        fractions = np.sort(fractions)
+        fractions.sort()
 
         # Sum associated with each index (disregarding interactions between
         # indices)
-        sums = 2 * np.sum(matrix[indices], axis=1)
-        sums = np.sort(sums)
+        sums = 2 * row_sums[indices]
+        sums.sort()
 
         # Interaction corrections. Can be reduced to (1-x)(1-y) for x,y in
         # fractions each element in a column gets multiplied by (1-x), and then
         # the sum of the columns gets multiplied by (1-y) since fractions are
         # less than 1, there is no effect of one choice on the other
-        step1 = np.sort(interaction_matrix) * (1 - fractions)
-        step2 = np.sort(np.sum(step1, axis=1))
+        # (the interaction matrix is a copy, so it can be sorted in place).
+        interaction_matrix.sort()
+        step1 = interaction_matrix * (1 - fractions)
+        step2 = step1.sum(axis=1)
+        step2.sort()
         step3 = step2 * (1 - fractions)
-        interaction_correction = np.sum(step3)
+        interaction_correction = step3.sum()
 
         if self._algo == self.ALGO_TIME_LIMIT:
             elapsed_time = datetime.utcnow() - self._start_time
@@ -529,7 +1020,7 @@ class EwaldMinimizer:
             interaction_correction = average_correction * speedup_parameter \
                 + interaction_correction * (1 - speedup_parameter)
 
-        best_case = np.sum(matrix) + np.inner(sums[::-1], fractions - 1) \
+        best_case = total + np.inner(sums[::-1], fractions - 1) \
             + interaction_correction
 
         return best_case
@@ -539,9 +1030,21 @@ class EwaldMinimizer:
         Returns an index that should have the most negative effect on the
         matrix sum
         """
+        return self._select_index(np.sum(matrix, axis=1), manipulation,
+                                  indices_left)
+
+    def _get_next_index(self, state, manipulation, indices_left):
+        """
+        Equivalent of get_next_index for a search state.
+        """
+        return self._select_index(state[0] * state[1], manipulation,
+                                  indices_left)
+
+    @staticmethod
+    def _select_index(row_sums, manipulation, indices_left):
         f = manipulation[0]
         indices = list(indices_left.intersection(manipulation[2]))
-        sums = np.sum(matrix[indices], axis=1)
+        sums = row_sums[indices]
         if f < 1:
             next_index = indices[sums.argmax(axis=0)]
         else:
@@ -549,14 +1052,32 @@ class EwaldMinimizer:
 
         return next_index
 
-    def _recurse(self, matrix, m_list, indices, output_m_list=[]):
+    def _apply(self, state, index, fraction):
+        """
+        Returns the search state after multiplying the row and column of an
+        index with a fraction. A state is a tuple of the fractions by which
+        each row and column has been multiplied so far, the product of the
+        original matrix with these fractions and the current matrix sum,
+        which allows a manipulation to be applied in O(N) instead of copying
+        the entire matrix.
+        """
+        scales, potentials, total = state
+        row = self._matrix[index]
+        ds = scales[index] * (fraction - 1)
+        total = total + 2 * ds * potentials[index] + ds * ds * row[index]
+        potentials = potentials + ds * row
+        scales = scales.copy()
+        scales[index] *= fraction
+        return scales, potentials, total
+
+    def _recurse(self, state, m_list, indices, output_m_list=[]):
         """
         This method recursively finds the minimal permutations using a binary
         tree search strategy.
 
         Args:
-            matrix: The current matrix (with some permutations already
-                performed).
+            state: The current search state (with some permutations already
+                performed). See _apply.
             m_list: The list of permutations still to be performed
             indices: Set of indices which haven't had a permutation
                 performed on them.
@@ -571,8 +1092,11 @@ class EwaldMinimizer:
             m_list.pop()
             # if there are no more manipulations left to do check the value
             if not m_list:
-                matrix_sum = np.sum(matrix)
-                if matrix_sum < self._current_minimum:
+                if state[2] < self._get_current_minimum():
+                    # The exact sum is only recomputed for accepted leaves.
+                    scales = state[0]
+                    matrix_sum = np.sum(self._matrix * scales[:, None] *
+                                        scales[None, :])
                     self.add_m_list(matrix_sum, output_m_list)
                 return
 
@@ -581,30 +1105,29 @@ class EwaldMinimizer:
             return
 
         if len(m_list) == 1 or m_list[-1][1] > 1:
-            if self.best_case(matrix, m_list, indices) > self._current_minimum:
+            if self._best_case(state, m_list, indices) > \
+                    self._get_current_minimum():
                 return
 
-        index = self.get_next_index(matrix, m_list[-1], indices)
+        index = self._get_next_index(state, m_list[-1], indices)
 
         m_list[-1][2].remove(index)
 
-        # Make the matrix and new m_list where we do the manipulation to the
+        # Make the state and new m_list where we do the manipulation to the
         # index that we just got
-        matrix2 = np.copy(matrix)
-        m_list2 = deepcopy(m_list)
+        m_list2 = [[m[0], m[1], list(m[2]), m[3]] for m in m_list]
         output_m_list2 = copy(output_m_list)
 
-        matrix2[index, :] *= m_list[-1][0]
-        matrix2[:, index] *= m_list[-1][0]
+        state2 = self._apply(state, index, m_list[-1][0])
         output_m_list2.append([index, m_list[-1][3]])
         indices2 = copy(indices)
         indices2.remove(index)
         m_list2[-1][1] -= 1
 
-        # recurse through both the modified and unmodified matrices
+        # recurse through both the modified and unmodified states
 
-        self._recurse(matrix2, m_list2, indices2, output_m_list2)
-        self._recurse(matrix, m_list, indices, output_m_list)
+        self._recurse(state2, m_list2, indices2, output_m_list2)
+        self._recurse(state, m_list, indices, output_m_list)
 
     @property
     def best_m_list(self):
@@ -619,6 +1142,268 @@ class EwaldMinimizer:
         return self._output_lists
 
 
+# Data shared with the worker processes of EwaldMinimizer.
+_MINIMIZER_DATA = {}
+
+
+def _init_minimizer_worker(minimizer, shared_minimum):
+    minimizer._shared_minimum = shared_minimum
+    _MINIMIZER_DATA["minimizer"] = minimizer
+
+
+def _run_minimizer_branch(args):
+    i, branch = args
+    minimizer = _MINIMIZER_DATA["minimizer"]
+    minimizer._output_lists = []
+    minimizer._current_minimum = float('inf')
+    minimizer._recurse(*branch)
+    return i, minimizer._output_lists
+
+
+class EwaldDeltaEvaluator(object):
+    """
+    Evaluates the change of the Ewald energy of a structure when the charges
+    of some of its sites change, e.g., when sites are swapped or removed, in
+    O(N) per changed site instead of re-summing the N x N energy matrix. A
+    batch form of each method scores many candidate changes at once, which
+    allows, e.g., Monte Carlo or greedy orderings to be driven efficiently.
+
+    The energy is written as E = sum_ij q_i q_j U_ij, where U is the
+    (symmetrized) total energy matrix per unit charges, and the site
+    potentials v = U q are updated whenever a change is applied. A change
+    dq of the charges of a set of sites S then changes the energy by
+    2 dq.v_S + dq.U_SS.dq.
+
+    Note that U cannot be obtained for sites with zero charge in the
+    original structure, and the charges of these sites cannot be changed.
+
+    Args:
+        matrix: Total energy matrix of the structure, e.g.,
+            EwaldSummation.total_energy_matrix.
+        charges ([float]): Charges of the sites the matrix was computed
+            with.
+    """
+
+    def __init__(self, matrix, charges):
+        charges = np.array(charges, dtype=np.float)
+        matrix = np.array(matrix, dtype=np.float)
+        self._fixed = charges == 0
+        qq = np.outer(charges, charges)
+        qq[qq == 0] = np.inf
+        self._unit_matrix = (matrix + matrix.T) / 2 / qq
+        self._charges = charges
+        self._potentials = np.dot(self._unit_matrix, charges)
+        self._energy = np.sum(matrix)
+
+    @classmethod
+    def from_ewald_summation(cls, ewald_summation):
+        """
+        Creates an evaluator from an EwaldSummation with the "matrix"
+        method.
+
+        Args:
+            ewald_summation (EwaldSummation): Ewald summation of the
+                structure.
+        """
+        return cls(ewald_summation.total_energy_matrix,
+                   ewald_summation._oxi_states)
+
+    @property
+    def energy(self):
+        """
+        The current total energy.
+        """
+        return self._energy
+
+    @property
+    def charges(self):
+        """
+        The current charges of the sites as a np.array.
+        """
+        return self._charges.copy()
+
+    def get_deltas(self, indices, charges):
+        """
+        Gives the energy changes for many candidate changes of the charges
+        of a set of sites.
+
+        Args:
+            indices: Array of shape (number of candidates, k) of the indices
+                of the k sites changed in each candidate. The indices of a
+                candidate must be unique.
+            charges: Array of the same shape as indices, or of shape (k,),
+                of the new charges of the sites.
+
+        Returns:
+            np.array of the energy changes of the candidates.
+        """
+        indices = np.array(indices, dtype=np.int)
+        if indices.ndim == 1:
+            indices = indices[:, None]
+        dq = np.array(charges, dtype=np.float) - self._charges[indices]
+        if np.any(self._fixed[indices] & (dq != 0)):
+            raise ValueError("The charges of sites with zero charge in the "
+                             "original structure cannot be changed.")
+        interactions = self._unit_matrix[indices[:, :, None],
+                                         indices[:, None, :]]
+        return 2 * np.sum(dq * self._potentials[indices], axis=1) + \
+            np.einsum("ij,ijk,ik->i", dq, interactions, dq)
+
+    def get_delta(self, indices, charges):
+        """
+        Gives the energy change for changing the charges of a set of sites.
+
+        Args:
+            indices ([int]): Unique indices of the sites.
+            charges ([float]): New charges of the sites.
+
+        Returns:
+            Energy change.
+        """
+        return self.get_deltas([indices], [charges])[0]
+
+    def get_swap_deltas(self, pairs):
+        """
+        Gives the energy changes for swapping the charges of many pairs of
+        sites.
+
+        Args:
+            pairs: Array of shape (number of candidates, 2) of site indices.
+
+        Returns:
+            np.array of the energy changes of the swaps.
+        """
+        pairs = np.array(pairs, dtype=np.int).reshape((-1, 2))
+        i, j = pairs[:, 0], pairs[:, 1]
+        dq = self._charges[j] - self._charges[i]
+        if np.any((self._fixed[i] | self._fixed[j]) & (dq != 0)):
+            raise ValueError("The charges of sites with zero charge in the "
+                             "original structure cannot be changed.")
+        u = self._unit_matrix
+        return 2 * dq * (self._potentials[i] - self._potentials[j]) + \
+            dq ** 2 * (u[i, i] + u[j, j] - 2 * u[i, j])
+
+    def get_swap_delta(self, i, j):
+        """
+        Gives the energy change for swapping the charges of two sites.
+
+        Args:
+            i (int): Index of first site.
+            j (int): Index of second site.
+
+        Returns:
+            Energy change.
+        """
+        return self.get_swap_deltas([[i, j]])[0]
+
+    def get_removal_deltas(self, indices):
+        """
+        Gives the energy changes for removing many sets of sites, i.e.,
+        setting their charges to zero.
+
+        Args:
+            indices: Array of shape (number of candidates, k) of the indices
+                of the k sites removed in each candidate.
+
+        Returns:
+            np.array of the energy changes.
+        """
+        indices = np.array(indices, dtype=np.int)
+        return self.get_deltas(indices, np.zeros(indices.shape))
+
+    def get_removal_delta(self, indices):
+        """
+        Gives the energy change for removing a set of sites.
+
+        Args:
+            indices ([int]): Unique indices of the sites to remove.
+
+        Returns:
+            Energy change.
+        """
+        return self.get_removal_deltas([indices])[0]
+
+    def apply(self, indices, charges):
+        """
+        Changes the charges of a set of sites and updates the energy and
+        the site potentials in O(N k).
+
+        Args:
+            indices ([int]): Unique indices of the sites.
+            charges ([float]): New charges of the sites.
+        """
+        indices = np.array(indices, dtype=np.int).reshape(-1)
+        charges = np.array(charges, dtype=np.float).reshape(-1)
+        self._energy += self.get_delta(indices, charges)
+        dq = charges - self._charges[indices]
+        self._potentials += np.dot(self._unit_matrix[:, indices], dq)
+        self._charges[indices] = charges
+
+    def swap(self, i, j):
+        """
+        Swaps the charges of two sites.
+
+        Args:
+            i (int): Index of first site.
+            j (int): Index of second site.
+        """
+        if i != j:
+            self.apply([i, j], [self._charges[j], self._charges[i]])
+
+    def remove(self, indices):
+        """
+        Removes a set of sites, i.e., sets their charges to zero.
+
+        Args:
+            indices ([int]): Unique indices of the sites.
+        """
+        self.apply(indices, np.zeros(len(indices)))
+
+
+def _cardinal_bspline(x, order):
+    """
+    Evaluates the cardinal B-spline M_n(x) of order n >= 2, which is
+    nonzero for 0 < x < n.
+    """
+    if order == 2:
+        return np.where((x >= 0) & (x <= 2), 1 - np.abs(x - 1), 0)
+    return (x * _cardinal_bspline(x, order - 1) +
+            (order - x) * _cardinal_bspline(x - 1, order - 1)) / (order - 1)
+
+
+def _get_bspline_moduli(n, order):
+    """
+    Returns |b(m)|**2 for m = 0, ..., n - 1 of the smooth particle-mesh Ewald
+    method for a mesh with n points and B-splines of a given order.
+    """
+    k = np.arange(order - 1)
+    denom = np.abs(np.sum(_cardinal_bspline(k + 1.0, order) *
+                          np.exp(2j * pi * np.arange(n)[:, None] * k / n),
+                          axis=1)) ** 2
+    # For odd orders, the denominator vanishes at m = n / 2. As in Essmann
+    # et al., J. Chem. Phys. 103, 8577 (1995), it is replaced by the average
+    # of its neighbors.
+    for m in np.where(denom < 1e-7)[0]:
+        denom[m] = (denom[m - 1] + denom[(m + 1) % n]) / 2
+    return 1 / denom
+
+
+def _get_fft_size(n):
+    """
+    Returns the smallest integer >= n with no prime factors other than 2, 3
+    and 5, for which FFTs are fast.
+    """
+    n = int(np.ceil(n))
+    while True:
+        m = n
+        for p in (2, 3, 5):
+            while m % p == 0:
+                m //= p
+        if m == 1:
+            return n
+        n += 1
+
+
 def compute_average_oxidation_state(site):
     """
     Calculates the average oxidation state of a site
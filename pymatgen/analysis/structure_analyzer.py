@@ -71,11 +71,14 @@ class VoronoiCoordFinder(object):
             n and their solid angle weights
         """
         localtarget = self._target
-        center = self._structure[n]
-        neighbors = self._structure.get_sites_in_sphere(
-            center.coords, self.cutoff)
-        neighbors = [i[0] for i in sorted(neighbors, key=lambda s: s[1])]
-        qvoronoi_input = [s.coords for s in neighbors]
+        structure = self._structure
+        center = structure[n]
+        _, inds, images, dists = structure.get_neighbor_list(
+            self.cutoff, sites=[center], exclude_self=False)
+        order = np.argsort(dists, kind="mergesort")
+        inds = inds[order]
+        nfcoords = structure.frac_coords[inds] + images[order]
+        qvoronoi_input = structure.lattice.get_cartesian_coords(nfcoords)
         voro = Voronoi(qvoronoi_input)
         all_vertices = voro.vertices
 
@@ -90,8 +93,13 @@ class VoronoiCoordFinder(object):
                                        "construction")
 
                 facets = [all_vertices[i] for i in vind]
-                results[neighbors[sorted(nn)[1]]] = solid_angle(
-                    center.coords, facets)
+                # Sites are only created for the facet-sharing neighbors.
+                k = sorted(nn)[1]
+                j = inds[k]
+                nnsite = PeriodicSite(structure[j].species_and_occu,
+                                      nfcoords[k], structure.lattice,
+                                      properties=structure[j].properties)
+                results[nnsite] = solid_angle(center.coords, facets)
 
         maxangle = max(results.values())
 
@@ -206,9 +214,11 @@ class VoronoiAnalyzer(object):
                 where c_i denotes number of facets with i vertices.
         """
         center = structure[n]
-        neighbors = structure.get_sites_in_sphere(center.coords, self.cutoff)
-        neighbors = [i[0] for i in sorted(neighbors, key=lambda s: s[1])]
-        qvoronoi_input = np.array([s.coords for s in neighbors])
+        _, inds, images, dists = structure.get_neighbor_list(
+            self.cutoff, sites=[center], exclude_self=False)
+        order = np.argsort(dists, kind="mergesort")
+        qvoronoi_input = structure.lattice.get_cartesian_coords(
+            structure.frac_coords[inds[order]] + images[order])
         voro = Voronoi(qvoronoi_input, qhull_options=self.qhull_options)
         vor_index = np.array([0, 0, 0, 0, 0, 0, 0, 0])
 
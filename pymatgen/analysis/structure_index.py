@@ -0,0 +1,227 @@
+# coding: utf-8
+# Copyright (c) Pymatgen Development Team.
+# Distributed under the terms of the MIT License.
+
+from __future__ import division, unicode_literals
+
+"""
+This module provides a persistent index of structures for fast "have we seen
+this structure before?" queries against large structure databases.
+"""
+
+import collections
+import json
+import sqlite3
+
+from pymatgen.core.composition import Composition
+from pymatgen.core.structure import Structure
+from pymatgen.analysis.structure_matcher import StructureMatcher
+
+
+class StructureIndex(object):
+    """
+    A persistent, SQLite backed index of structures built on top of
+    StructureMatcher. For every structure, the reduced (niggli and
+    primitive) cell used by StructureMatcher is computed once at insertion
+    and stored together with cheap invariants, i.e., the composition hash of
+    the comparator and the number of sites in the reduced cell. A query
+    first narrows down the database to the structures with the same
+    invariants with an indexed lookup, and then performs an exact fit
+    against those candidates only.
+
+    Usage::
+
+        index = StructureIndex("structures.db")
+        index.add_structures(structures)
+        index.get_matches(new_structure)  # => list of ids of matches
+        index.close()
+
+    Args:
+        filename (str): Path to the SQLite database. Defaults to ":memory:",
+            i.e., a non-persistent in-memory index. An existing database is
+            reopened and can be further extended.
+        structure_matcher (StructureMatcher): The matcher used to compare
+            structures. Defaults to None, which means the matcher stored in
+            an existing database is used, or the default StructureMatcher
+            for a new one. Note that only the settings serialized by
+            StructureMatcher.as_dict are stored in the database.
+    """
+
+    def __init__(self, filename=":memory:", structure_matcher=None):
+        self.filename = filename
+        _check_structure_matcher(structure_matcher)
+        self._conn = sqlite3.connect(filename)
+        try:
+            self._init_db(structure_matcher)
+        except Exception:
+            self._conn.rollback()
+            self._conn.close()
+            raise
+
+    def _init_db(self, structure_matcher):
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS settings "
+            "(name TEXT PRIMARY KEY, value TEXT)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS structures "
+            "(id INTEGER PRIMARY KEY AUTOINCREMENT, comp_key TEXT, "
+            "nsites INTEGER, structure TEXT, reduced TEXT)")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS invariants "
+            "ON structures (comp_key, nsites)")
+
+        row = self._conn.execute("SELECT value FROM settings WHERE "
+                                 "name = 'structure_matcher'").fetchone()
+        if row is None:
+            self.structure_matcher = structure_matcher or StructureMatcher()
+            self._conn.execute(
+                "INSERT INTO settings VALUES ('structure_matcher', ?)",
+                (json.dumps(self.structure_matcher.as_dict()),))
+        else:
+            if structure_matcher is None:
+                structure_matcher = StructureMatcher.from_dict(
+                    json.loads(row[0]))
+                _check_structure_matcher(structure_matcher)
+            elif structure_matcher.as_dict() != json.loads(row[0]):
+                raise ValueError("The StructureMatcher settings differ from "
+                                 "those the index was built with.")
+            self.structure_matcher = structure_matcher
+        self._conn.commit()
+
+    def _get_invariants(self, structure):
+        """
+        Returns the processed composition hash, the database key and the
+        reduced structure.
+        """
+        m = self.structure_matcher
+        processed = m._process_species([structure])[0]
+        reduced = m._get_reduced_structure(processed)
+        comp_hash = m._comparator.get_hash(processed.composition)
+        if isinstance(comp_hash, Composition):
+            # Composition equality is tolerance based, so only the elements
+            # are used in the database key.
+            comp_key = " ".join(sorted(
+                el.symbol for el, amt in comp_hash.items()
+                if abs(amt) > Composition.amount_tolerance))
+        else:
+            comp_key = str(comp_hash)
+        # Structures with different number of sites in the reduced cell can
+        # only be matched with supercells.
+        nsites = 0 if m._supercell else len(reduced)
+        return comp_hash, (comp_key, nsites), reduced
+
+    def add_structure(self, structure):
+        """
+        Adds a structure to the index.
+
+        Args:
+            structure (Structure): Structure to add.
+
+        Returns:
+            The id of the structure in the index.
+        """
+        return self.add_structures([structure])[0]
+
+    def add_structures(self, structures):
+        """
+        Adds structures to the index in a single transaction.
+
+        Args:
+            structures ([Structure]): Structures to add.
+
+        Returns:
+            List of the ids of the structures in the index.
+        """
+        ids = []
+        with self._conn:
+            for s in structures:
+                _, (comp_key, nsites), reduced = self._get_invariants(s)
+                cur = self._conn.execute(
+                    "INSERT INTO structures (comp_key, nsites, structure, "
+                    "reduced) VALUES (?, ?, ?, ?)",
+                    (comp_key, nsites, json.dumps(s.as_dict()),
+                     json.dumps(reduced.as_dict())))
+                ids.append(cur.lastrowid)
+        return ids
+
+    def get_matches(self, structure):
+        """
+        Finds all structures in the index matching a structure.
+
+        Args:
+            structure (Structure): Structure to look for.
+
+        Returns:
+            List of ids of the matching structures. Empty if the structure
+            has not been seen before.
+        """
+        return self.get_matches_batch([structure])[0]
+
+    def get_matches_batch(self, structures):
+        """
+        Finds all structures in the index matching each of a list of
+        structures. Queries with the same invariants share a single database
+        lookup and the decoding of the candidates.
+
+        Args:
+            structures ([Structure]): Structures to look for.
+
+        Returns:
+            List of lists of ids of the matching structures, in the same
+            order as structures.
+        """
+        m = self.structure_matcher
+        queries = collections.defaultdict(list)
+        for i, s in enumerate(structures):
+            comp_hash, key, reduced = self._get_invariants(s)
+            queries[key].append((i, comp_hash, reduced))
+
+        matches = [[] for s in structures]
+        for key, q in queries.items():
+            candidates = []
+            for idx, reduced in self._conn.execute(
+                    "SELECT id, reduced FROM structures WHERE comp_key = ? "
+                    "AND nsites = ? ORDER BY id", key):
+                c = Structure.from_dict(json.loads(reduced))
+                candidates.append(
+                    (idx, m._comparator.get_hash(c.composition), c))
+            for i, comp_hash, reduced in q:
+                for idx, c_hash, c in candidates:
+                    if c_hash == comp_hash and m._fit_reduced(reduced, c):
+                        matches[i].append(idx)
+        return matches
+
+    def get_structure(self, idx):
+        """
+        Returns the structure with a particular id.
+
+        Args:
+            idx (int): Id of the structure in the index.
+
+        Returns:
+            Structure as inserted into the index.
+        """
+        row = self._conn.execute("SELECT structure FROM structures "
+                                 "WHERE id = ?", (idx,)).fetchone()
+        if row is None:
+            raise KeyError("No structure with id {}".format(idx))
+        return Structure.from_dict(json.loads(row[0]))
+
+    def __len__(self):
+        return self._conn.execute(
+            "SELECT COUNT(*) FROM structures").fetchone()[0]
+
+    def __contains__(self, structure):
+        return len(self.get_matches(structure)) > 0
+
+    def close(self):
+        """
+        Closes the underlying database connection.
+        """
+        self._conn.close()
+
+
+def _check_structure_matcher(structure_matcher):
+    if structure_matcher is not None and structure_matcher._subset:
+        raise ValueError("allow_subset cannot be used with a "
+                         "StructureIndex")
@@ -14,6 +14,7 @@ from six.moves import zip
 
 import numpy as np
 import itertools
+import collections
 import abc
 
 from monty.json import MSONable
@@ -258,6 +259,27 @@ class OrderDisorderElementComparator(AbstractComparator):
         return 1
 
 
+# Data shared with the worker processes of StructureMatcher.group_structures.
+_GROUPING_DATA = {}
+
+
+def _init_grouping_worker(matcher, reduced, anonymous):
+    _GROUPING_DATA["matcher"] = matcher
+    _GROUPING_DATA["reduced"] = reduced
+    _GROUPING_DATA["anonymous"] = anonymous
+
+
+def _get_reduced_structure(args):
+    matcher, s = args
+    return matcher._get_reduced_structure(s)
+
+
+def _fit_reduced_pair(pair):
+    reduced = _GROUPING_DATA["reduced"]
+    return _GROUPING_DATA["matcher"]._fit_reduced(
+        reduced[pair[0]], reduced[pair[1]], _GROUPING_DATA["anonymous"])
+
+
 class StructureMatcher(MSONable):
     """
     Class to match structures by similarity.
@@ -593,18 +615,32 @@ class StructureMatcher(MSONable):
         and finds fu, the supercell size to make struct1 comparable to
         s2
         """
-        struct1 = struct1.copy()
-        struct2 = struct2.copy()
+        struct1 = self._get_reduced_structure(struct1, niggli)
+        struct2 = self._get_reduced_structure(struct2, niggli)
+        return self._rescale(struct1, struct2)
 
+    def _get_reduced_structure(self, struct, niggli=True):
+        """
+        Returns a copy of struct reduced to the niggli and (if
+        primitive_cell is True) primitive cell. This is the part of the
+        preprocessing that only depends on a single structure, so that it
+        can be cached when many comparisons are performed.
+        """
+        struct = struct.copy()
         if niggli:
-            struct1 = struct1.get_reduced_structure(reduction_algo="niggli")
-            struct2 = struct2.get_reduced_structure(reduction_algo="niggli")
+            struct = struct.get_reduced_structure(reduction_algo="niggli")
 
         # primitive cell transformation
         if self._primitive_cell:
-            struct1 = struct1.get_primitive_structure()
-            struct2 = struct2.get_primitive_structure()
+            struct = struct.get_primitive_structure()
+        return struct
 
+    def _rescale(self, struct1, struct2):
+        """
+        Finds fu, the supercell size to make struct1 comparable to struct2,
+        and rescales the (reduced) structures to the same volume. The
+        structures are modified in place.
+        """
         if self._supercell:
             fu, s1_supercell = self._get_supercell_size(struct1, struct2)
         else:
@@ -699,14 +735,25 @@ class StructureMatcher(MSONable):
         if best_match and best_match[0] < self.stol:
             return best_match
 
-    def group_structures(self, s_list, anonymous=False):
+    def group_structures(self, s_list, anonymous=False, ncpus=None):
         """
         Given a list of structures, use fit to group
         them by structural equality.
 
+        The reduced (niggli and primitive) cell of each structure is computed
+        only once. Structures are then bucketed by their composition hash
+        and, unless attempt_supercell is set, by the number of sites in the
+        reduced cell, since structures that differ in either can never be
+        matched. Within each bucket, the usual greedy matching against the
+        first unmatched structure is performed. The result is identical to
+        calling fit on the structures in order.
+
         Args:
             s_list ([Structure]): List of structures to be grouped
             anonymous (bool): Wheher to use anonymous mode.
+            ncpus (int): Number of processes used to reduce the structures
+                and to perform the fits within each bucket. Default of None
+                means serial processing.
 
         Returns:
             A list of lists of matched structures
@@ -720,6 +767,20 @@ class StructureMatcher(MSONable):
         original_s_list = list(s_list)
         s_list = self._process_species(s_list)
 
+        pool = None
+        if ncpus and ncpus > 1:
+            import multiprocessing as mp
+            p = mp.Pool(ncpus)
+            reduced = p.map(_get_reduced_structure,
+                            [(self, s) for s in s_list])
+            p.close()
+            p.join()
+            # The reduced structures are sent to each worker only once.
+            pool = mp.Pool(ncpus, initializer=_init_grouping_worker,
+                           initargs=(self, reduced, anonymous))
+        else:
+            reduced = [self._get_reduced_structure(s) for s in s_list]
+
         # Use structure hash to pre-group structures
         if anonymous:
             c_hash = lambda c: c.anonymized_formula
@@ -729,26 +790,75 @@ class StructureMatcher(MSONable):
         sorted_s_list = sorted(enumerate(s_list), key=s_hash)
         all_groups = []
 
-        # For each pre-grouped list of structures, perform actual matching.
-        for k, g in itertools.groupby(sorted_s_list, key=s_hash):
-            unmatched = list(g)
-            while len(unmatched) > 0:
-                i, refs = unmatched.pop(0)
-                matches = [i]
-                if anonymous:
-                    inds = filter(lambda i: self.fit_anonymous(refs,
-                            unmatched[i][1]), list(range(len(unmatched))))
-                else:
-                    inds = filter(lambda i: self.fit(refs, unmatched[i][1]),
-                                  list(range(len(unmatched))))
-                inds = list(inds)
-                matches.extend([unmatched[i][0] for i in inds])
-                unmatched = [unmatched[i] for i in range(len(unmatched))
-                             if i not in inds]
-                all_groups.append([original_s_list[i] for i in matches])
+        try:
+            # For each pre-grouped list of structures, perform actual
+            # matching.
+            for k, g in itertools.groupby(sorted_s_list, key=s_hash):
+                buckets = collections.OrderedDict()
+                for i, s in g:
+                    key = 0 if self._supercell else len(reduced[i])
+                    buckets.setdefault(key, []).append(i)
+                groups = []
+                for inds in buckets.values():
+                    groups.extend(self._group_reduced(
+                        inds, reduced, anonymous, pool=pool, ncpus=ncpus))
+                # Order the groups as the greedy matching over the entire
+                # hash group would have found them.
+                for grp in sorted(groups, key=lambda grp: grp[0]):
+                    all_groups.append([original_s_list[i] for i in grp])
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
 
         return all_groups
 
+    def _group_reduced(self, inds, reduced, anonymous, pool=None, ncpus=1):
+        """
+        Greedily groups the reduced structures with indices inds.
+
+        Args:
+            inds ([int]): Indices of the structures to group.
+            reduced ([Structure]): Reduced structures.
+            anonymous (bool): Whether to use anonymous mode.
+            pool (Pool): Optional multiprocessing pool initialized with
+                _init_grouping_worker, used to perform the fits.
+            ncpus (int): Number of processes in the pool.
+
+        Returns:
+            List of groups of indices.
+        """
+        groups = []
+        unmatched = list(inds)
+        while len(unmatched) > 0:
+            i = unmatched.pop(0)
+            pairs = [(i, j) for j in unmatched]
+            if pool is not None and len(pairs) > 1:
+                chunksize = max(1, len(pairs) // (4 * ncpus))
+                fits = pool.map(_fit_reduced_pair, pairs, chunksize)
+            else:
+                fits = [self._fit_reduced(reduced[i], reduced[j], anonymous)
+                        for i, j in pairs]
+            groups.append([i] + [j for j, f in zip(unmatched, fits) if f])
+            unmatched = [j for j, f in zip(unmatched, fits) if not f]
+        return groups
+
+    def _fit_reduced(self, struct1, struct2, anonymous=False):
+        """
+        Equivalent of fit (or fit_anonymous) for structures which have
+        already been processed and reduced with _get_reduced_structure.
+        The input structures are not modified.
+        """
+        struct1, struct2, fu, s1_supercell = self._rescale(struct1.copy(),
+                                                           struct2.copy())
+        if anonymous:
+            return bool(self._anonymous_match(
+                struct1, struct2, fu, s1_supercell, break_on_match=True,
+                single_match=True))
+        match = self._match(struct1, struct2, fu, s1_supercell,
+                            break_on_match=True)
+        return match is not None and match[0] <= self.stol
+
     def as_dict(self):
         return {"version": __version__, "@module": self.__class__.__module__,
                 "@class": self.__class__.__name__,
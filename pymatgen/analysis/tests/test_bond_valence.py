@@ -24,7 +24,9 @@ import os
 
 from pymatgen.core.structure import Structure
 from pymatgen.core.periodic_table import Specie
-from pymatgen.analysis.bond_valence import BVAnalyzer
+from pymatgen.core.lattice import Lattice
+from pymatgen.analysis.bond_valence import BVAnalyzer, calculate_bv_sum, \
+    calculate_bv_sums
 from pymatgen.util.testing import PymatgenTest
 
 test_dir = os.path.join(os.path.dirname(__file__), "..", "..", "..",
@@ -64,6 +66,30 @@ class BVAnalyzerTest(PymatgenTest):
         self.assertIn(Specie("Mn", 3), news.composition.elements)
         self.assertIn(Specie("Mn", 4), news.composition.elements)
 
+    def test_get_valences_batch(self):
+        structures = [Structure.from_file(os.path.join(test_dir,
+                                                       "LiMn2O4.json")),
+                      self.get_structure("LiFePO4"),
+                      Structure(Lattice.cubic(3.5), ["Li", "Li"],
+                                [[0, 0, 0], [0.5, 0.5, 0.5]])]
+        ans = [self.analyzer.get_valences(s) for s in structures[:2]] + [None]
+        self.assertEqual(self.analyzer.get_valences_batch(structures), ans)
+        self.assertEqual(
+            self.analyzer.get_valences_batch(structures, ncpus=2), ans)
+
+
+class FuncTest(PymatgenTest):
+
+    def test_calculate_bv_sums(self):
+        s = self.get_structure("LiFePO4")
+        bv_sums = calculate_bv_sums(s, 4, scale_factor=1.015)
+        self.assertArrayAlmostEqual(
+            bv_sums, [calculate_bv_sum(site, s.get_neighbors(site, 4), 1.015)
+                      for site in s])
+        self.assertArrayAlmostEqual(
+            calculate_bv_sums(s, 4, scale_factor=1.015, sites=s[4:8]),
+            bv_sums[4:8])
+
 if __name__ == "__main__":
     #import sys;sys.argv = ['', 'Test.testName']
     unittest.main()
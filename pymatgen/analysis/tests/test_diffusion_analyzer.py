@@ -10,11 +10,13 @@ import json
 import random
 import numpy as np
 import csv
+import warnings
 import scipy.constants as const
 
 from pymatgen.analysis.diffusion_analyzer import DiffusionAnalyzer,\
     get_conversion_factor, fit_arrhenius
 from pymatgen.core.structure import Structure
+from pymatgen.io.vasp.outputs import Vasprun
 from pymatgen.util.testing import PymatgenTest
 from monty.tempfile import ScratchDir
 
@@ -176,6 +178,20 @@ class DiffusionAnalyzerTest(PymatgenTest):
             self.assertArrayAlmostEqual(data[:, 1], d.msd)
             os.remove("test.csv")
 
+    def test_from_vaspruns(self):
+        filepath = os.path.join(test_dir, "vasprun.xml.unconverged")
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            vaspruns = [Vasprun(filepath, parse_potcar_file=False),
+                        Vasprun(filepath, parse_potcar_file=False,
+                                ionic_step_fields=["lattice",
+                                                   "frac_coords"])]
+        d1, d2 = [DiffusionAnalyzer.from_vaspruns([v], "V", smoothed=False)
+                  for v in vaspruns]
+        self.assertEqual(d1.disp.shape, (14, 5, 3))
+        self.assertArrayAlmostEqual(d1.disp, d2.disp)
+        self.assertEqual(d1.structure, d2.structure)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -6,10 +6,16 @@ from __future__ import unicode_literals
 
 import unittest2 as unittest
 import os
+import shutil
+import tempfile
 import warnings
 
-from pymatgen.analysis.ewald import EwaldSummation, EwaldMinimizer
+from pymatgen.analysis.ewald import EwaldSummation, EwaldMinimizer, \
+    EwaldDeltaEvaluator
 from pymatgen.io.vasp.inputs import Poscar
+from pymatgen.symmetry.analyzer import SpacegroupAnalyzer
+from pymatgen.util.testing import PymatgenTest
+from monty.serialization import dumpfn, loadfn
 import numpy as np
 
 test_dir = os.path.join(os.path.dirname(__file__), "..", "..", "..",
@@ -62,6 +68,119 @@ class EwaldSummationTest(unittest.TestCase):
         ham2 = EwaldSummation(original_s)
         self.assertAlmostEqual(ham2.real_space_energy, -502.23549897772602, 4)
 
+    def test_pme(self):
+        filepath = os.path.join(test_dir, 'POSCAR')
+        s = Poscar.from_file(filepath).structure
+        s.add_oxidation_state_by_element({"Li": 1, "Fe": 2,
+                                          "P": 5, "O": -2})
+        ham = EwaldSummation(s, compute_forces=True)
+        # Same screening parameter, since the structure is charged.
+        pme = EwaldSummation(s, eta=ham.eta, compute_forces=True,
+                             method="pme")
+        self.assertAlmostEqual(pme.real_space_energy, -502.23549897772602, 4)
+        self.assertAlmostEqual(pme.reciprocal_space_energy,
+                               6.1541071599534654, 4)
+        self.assertAlmostEqual(pme.point_energy, -620.22598358035918, 4)
+        self.assertTrue(np.allclose(pme.forces, ham.forces, atol=1e-4))
+        self.assertRaises(AttributeError, getattr, pme,
+                          "total_energy_matrix")
+        self.assertRaises(AttributeError, getattr, pme,
+                          "real_space_energy_matrix")
+        self.assertRaises(ValueError, EwaldSummation, s, method="fft")
+
+        s.make_supercell([1, 2, 2])
+        s.remove_sites([i for i, site in enumerate(s)
+                        if site.specie.symbol == "O"][:8])
+        s.perturb(0.05)
+        self.assertAlmostEqual(s.charge, 0)
+        ham = EwaldSummation(s, compute_forces=True)
+        pme = EwaldSummation(s, compute_forces=True, method="pme")
+        self.assertNotAlmostEqual(pme.eta, ham.eta)
+        self.assertAlmostEqual(pme.total_energy, ham.total_energy, 4)
+        self.assertTrue(np.allclose(pme.forces, ham.forces, atol=1e-3))
+
+        # The B-spline moduli vanish at the Nyquist frequency for odd orders.
+        for order, tol in [(5, 1e-2), (7, 1e-3)]:
+            pme = EwaldSummation(s, compute_forces=True, method="pme",
+                                 pme_order=order)
+            self.assertAlmostEqual(pme.total_energy, ham.total_energy,
+                                   delta=tol)
+            self.assertTrue(np.allclose(pme.forces, ham.forces, atol=tol))
+        self.assertRaises(ValueError, EwaldSummation, s, method="pme",
+                          pme_order=2)
+
+
+class EwaldDeltaEvaluatorTest(unittest.TestCase):
+
+    def setUp(self):
+        filepath = os.path.join(test_dir, 'POSCAR')
+        s = Poscar.from_file(filepath).structure
+        s.add_oxidation_state_by_element({"Li": 1, "Fe": 2,
+                                          "P": 5, "O": -2})
+        self.ewald = EwaldSummation(s)
+        self.matrix = self.ewald.total_energy_matrix
+        self.charges = np.array(self.ewald._oxi_states, dtype=np.float)
+
+    def get_energy(self, charges):
+        scale = charges / self.charges
+        return np.dot(scale, np.dot(self.matrix, scale))
+
+    def test_deltas(self):
+        ev = EwaldDeltaEvaluator.from_ewald_summation(self.ewald)
+        e0 = ev.energy
+        self.assertAlmostEqual(e0, np.sum(self.matrix))
+
+        # Swap the charges of a Li and an O site.
+        q = self.charges.copy()
+        q[[0, 20]] = q[[20, 0]]
+        self.assertAlmostEqual(ev.get_swap_delta(0, 20),
+                               self.get_energy(q) - e0)
+        q = self.charges.copy()
+        q[[4, 10]] = [3, -1.5]
+        self.assertAlmostEqual(ev.get_delta([4, 10], [3, -1.5]),
+                               self.get_energy(q) - e0)
+        self.assertAlmostEqual(ev.get_removal_delta([1, 2, 8]),
+                               self.ewald.compute_partial_energy([1, 2, 8]) -
+                               e0)
+
+        pairs = [[0, 20], [3, 3], [5, 12], [7, 1]]
+        deltas = ev.get_swap_deltas(pairs)
+        self.assertEqual(deltas.shape, (4,))
+        self.assertAlmostEqual(deltas[1], 0)
+        for (i, j), d in zip(pairs, deltas):
+            self.assertAlmostEqual(d, ev.get_swap_delta(i, j))
+        deltas = ev.get_removal_deltas([[1, 2], [3, 9], [0, 23]])
+        self.assertAlmostEqual(
+            deltas[2], self.ewald.compute_partial_energy([0, 23]) - e0)
+
+        # Apply changes and check against recomputation.
+        ev.swap(0, 20)
+        ev.remove([1, 2])
+        ev.apply([5], [3])
+        q = self.charges.copy()
+        q[[0, 20]] = q[[20, 0]]
+        q[[1, 2]] = 0
+        q[5] = 3
+        self.assertAlmostEqual(ev.energy, self.get_energy(q))
+        self.assertTrue(np.allclose(ev.charges, q))
+        q2 = q.copy()
+        q2[[0, 7]] = q2[[7, 0]]
+        self.assertAlmostEqual(ev.get_swap_delta(0, 7),
+                               self.get_energy(q2) - ev.energy)
+        ev.apply([1], [1])
+        self.assertAlmostEqual(ev.energy, self.get_energy(
+            np.where(np.arange(len(q)) == 1, 1, q)))
+
+        # Sites with zero charge in the original structure are fixed.
+        q = self.charges.copy()
+        q[1] = 0
+        ev = EwaldDeltaEvaluator(self.matrix * np.outer(q, q) /
+                                 np.outer(self.charges, self.charges), q)
+        self.assertAlmostEqual(ev.energy, self.get_energy(q))
+        self.assertAlmostEqual(ev.get_removal_delta([1]), 0)
+        self.assertRaises(ValueError, ev.apply, [1], [1])
+        self.assertRaises(ValueError, ev.get_swap_delta, 1, 0)
+
 
 class EwaldMinimizerTest(unittest.TestCase):
 
@@ -88,5 +207,93 @@ class EwaldMinimizerTest(unittest.TestCase):
         self.assertEqual(len(e_min.best_m_list), 6,
                          "Returned wrong number of permutations")
 
+    def _get_lfp_problem(self):
+        s = PymatgenTest.get_structure("LiFePO4")
+        s.add_oxidation_state_by_element({"Li": 1, "Fe": 2, "P": 5, "O": -2})
+        s.make_supercell([1, 1, 2])
+        matrix = EwaldSummation(s).total_energy_matrix
+        li = [i for i, site in enumerate(s) if site.specie.symbol == "Li"]
+        return s, matrix, li
+
+    def test_parallel(self):
+        s, matrix, li = self._get_lfp_problem()
+        serial = EwaldMinimizer(matrix, [[0, 4, list(li), None]], 10)
+        parallel = EwaldMinimizer(matrix, [[0, 4, list(li), None]], 10,
+                                  ncpus=2)
+        self.assertEqual(len(parallel.output_lists), 10)
+        for o1, o2 in zip(serial.output_lists, parallel.output_lists):
+            self.assertAlmostEqual(o1[0], o2[0])
+        self.assertAlmostEqual(serial.minimized_sum, parallel.minimized_sum)
+
+    def test_equivalent_indices(self):
+        s, matrix, li = self._get_lfp_problem()
+        eq = SpacegroupAnalyzer(s).get_symmetrized_structure()\
+            .equivalent_indices
+        full = EwaldMinimizer(matrix, [[0, 4, list(li), None]], 1)
+        pruned = EwaldMinimizer(matrix, [[0, 4, list(li), None]], 1,
+                                equivalent_indices=eq)
+        self.assertAlmostEqual(full.minimized_sum, pruned.minimized_sum)
+
+        # Symmetry cannot be used if a manipulation breaks the orbits.
+        m_list = [[0, 2, li[:5], None]]
+        self.assertAlmostEqual(
+            EwaldMinimizer(matrix, m_list, 1).minimized_sum,
+            EwaldMinimizer(matrix, [[0, 2, li[:5], None]], 1,
+                           equivalent_indices=eq).minimized_sum)
+
+    def test_checkpoint(self):
+        s, matrix, li = self._get_lfp_problem()
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(tmp_dir, "checkpoint.json")
+            full = EwaldMinimizer(matrix, [[0, 4, list(li), None]], 10,
+                                  checkpoint_file=filename,
+                                  checkpoint_interval=0)
+            d = loadfn(filename)
+            completed = d["completed_branches"]
+            self.assertEqual(len(d["output_lists"]), 10)
+            self.assertGreater(len(completed), 2)
+
+            # Resume a minimization interrupted after two branches.
+            d["completed_branches"] = completed[:2]
+            first = [d["branch_indices"][i] for i in completed[:2]]
+            d["output_lists"] = [o for o in d["output_lists"]
+                                 if o[1][0][0] in first]
+            dumpfn(d, filename)
+            resumed = EwaldMinimizer(matrix, [[0, 4, list(li), None]], 10,
+                                     checkpoint_file=filename)
+            for o1, o2 in zip(full.output_lists, resumed.output_lists):
+                self.assertAlmostEqual(o1[0], o2[0])
+            self.assertEqual(loadfn(filename)["completed_branches"],
+                             completed)
+
+            self.assertRaises(ValueError, EwaldMinimizer, matrix,
+                              [[0, 3, list(li), None]], 10,
+                              checkpoint_file=filename)
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_iter_m_lists(self):
+        s, matrix, li = self._get_lfp_problem()
+        m_list = [[0, 4, list(li), None]]
+        full = EwaldMinimizer(matrix, m_list, 10)
+        streamed = EwaldMinimizer.iter_m_lists(matrix, m_list)
+        for o1 in full.output_lists:
+            o2 = next(streamed)
+            self.assertAlmostEqual(o1[0], o2[0])
+        # 8 choose 4 orderings in total.
+        self.assertEqual(len(list(streamed)), 60)
+
+        # A bounded queue may miss orderings, but still yields them sorted.
+        bounded = list(EwaldMinimizer.iter_m_lists(matrix, m_list,
+                                                   max_queue_size=10))
+        self.assertLess(len(bounded), 70)
+        self.assertGreaterEqual(bounded[0][0], full.minimized_sum - 1e-8)
+        energies = [o[0] for o in bounded]
+        self.assertEqual(energies, sorted(energies))
+        self.assertEqual(
+            list(EwaldMinimizer.iter_m_lists(matrix, m_list, time_limit=0)),
+            [])
+
 if __name__ == "__main__":
     unittest.main()
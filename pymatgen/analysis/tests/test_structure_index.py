@@ -0,0 +1,89 @@
+# coding: utf-8
+# Copyright (c) Pymatgen Development Team.
+# Distributed under the terms of the MIT License.
+
+from __future__ import division, unicode_literals
+
+import unittest2 as unittest
+import os
+import json
+import shutil
+import tempfile
+import sqlite3
+
+from monty.json import MontyDecoder
+from pymatgen.analysis.structure_index import StructureIndex
+from pymatgen.analysis.structure_matcher import StructureMatcher, \
+    ElementComparator
+from pymatgen.util.testing import PymatgenTest
+
+
+test_dir = os.path.join(os.path.dirname(__file__), "..", "..", "..",
+                        'test_files')
+
+
+class StructureIndexTest(PymatgenTest):
+
+    def setUp(self):
+        with open(os.path.join(test_dir, "TiO2_entries.json"), 'rb') as fp:
+            entries = json.load(fp, cls=MontyDecoder)
+        self.struct_list = [e.structure for e in entries]
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_get_matches(self):
+        sm = StructureMatcher()
+        index = StructureIndex()
+        ids = index.add_structures(self.struct_list[:10])
+        self.assertEqual(len(index), 10)
+        for s in self.struct_list:
+            expected = [i for i, s2 in zip(ids, self.struct_list[:10])
+                        if sm.fit(s, s2)]
+            self.assertEqual(index.get_matches(s), expected)
+
+        batch = index.get_matches_batch(self.struct_list)
+        self.assertEqual(batch, [index.get_matches(s)
+                                 for s in self.struct_list])
+
+        s = self.struct_list[0].copy()
+        s.make_supercell([1, 2, 1])
+        self.assertIn(s, index)
+        self.assertNotIn(self.get_structure("LiFePO4"), index)
+        self.assertEqual(index.get_structure(ids[3]), self.struct_list[3])
+        self.assertRaises(KeyError, index.get_structure, 1000)
+
+    def test_persistence(self):
+        filename = os.path.join(self.tmp_dir, "index.db")
+        sm = StructureMatcher(comparator=ElementComparator(), stol=0.2)
+        index = StructureIndex(filename, structure_matcher=sm)
+        index.add_structures(self.struct_list[:5])
+        index.close()
+
+        index = StructureIndex(filename)
+        self.assertEqual(index.structure_matcher.stol, 0.2)
+        self.assertEqual(len(index), 5)
+        idx = index.add_structure(self.struct_list[5])
+        self.assertIn(idx, index.get_matches(self.struct_list[5]))
+        index.close()
+
+        self.assertRaises(ValueError, StructureIndex, filename,
+                          structure_matcher=StructureMatcher())
+        self.assertRaises(ValueError, StructureIndex,
+                          structure_matcher=StructureMatcher(
+                              allow_subset=True))
+
+        # A rejected matcher is not stored in a new database.
+        filename = os.path.join(self.tmp_dir, "subset.db")
+        self.assertRaises(ValueError, StructureIndex, filename,
+                          structure_matcher=StructureMatcher(
+                              allow_subset=True))
+        conn = sqlite3.connect(filename)
+        self.assertEqual(conn.execute("SELECT name FROM sqlite_master WHERE "
+                                      "name = 'settings'").fetchall(), [])
+        conn.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
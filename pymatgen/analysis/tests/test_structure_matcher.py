@@ -295,6 +295,30 @@ class StructureMatcherTest(PymatgenTest):
         out = sm.group_structures(self.struct_list, anonymous=True)
         self.assertEqual(list(map(len, out)), [4, 1, 1, 1, 1, 1, 1, 1, 2, 2, 1])
 
+    def test_group_structures_parallel(self):
+        sm = StructureMatcher()
+        structures = self.struct_list + [s.copy() for s in
+                                         self.struct_list[::3]]
+        structures[-1].make_supercell([1, 2, 1])
+
+        # Reference greedy grouping using fit on all pairs.
+        expected = []
+        unmatched = list(range(len(structures)))
+        while unmatched:
+            i = unmatched.pop(0)
+            matches = [j for j in unmatched
+                       if sm.fit(structures[i], structures[j])]
+            unmatched = [j for j in unmatched if j not in matches]
+            expected.append(sorted([i] + matches))
+        expected = sorted(expected)
+
+        for ncpus in [None, 2]:
+            out = sm.group_structures(structures, ncpus=ncpus)
+            groups = [sorted([[s is t for t in structures].index(True)
+                              for s in g]) for g in out]
+            self.assertEqual(sorted(groups), expected)
+            self.assertEqual(out, sm.group_structures(structures))
+
     def test_mix(self):
         structures = [self.get_structure("Li2O"),
                       self.get_structure("Li2O2"),
@@ -148,7 +148,10 @@ class VaspToComputedEntryDrone(AbstractDrone):
                     filepath = fname
 
         try:
-            vasprun = Vasprun(filepath)
+            # Only the final ionic step is needed for the entry, unless
+            # additional data are requested.
+            vasprun = Vasprun(filepath,
+                              ionic_step_fields=None if self._data else [])
         except Exception as ex:
             logger.debug("error in {}: {}".format(filepath, ex))
             return None
@@ -56,8 +56,8 @@ def get_chgint_plot(args):
 
     from pymatgen.util.plotting_utils import get_publication_quality_plot
     plt = get_publication_quality_plot(12, 8)
-    for i in atom_ind:
-        d = chgcar.get_integrated_diff(i, args.radius, 30)
+    all_data = chgcar.get_integrated_diff_batch(atom_ind, args.radius, 30)
+    for i, d in zip(atom_ind, all_data):
         plt.plot(d[:, 0], d[:, 1],
                  label="Atom {} - {}".format(i, s[i].species_string))
     plt.legend(loc="upper left")
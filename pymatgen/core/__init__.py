@@ -4,14 +4,6 @@
 
 from __future__ import unicode_literals
 
-from .periodic_table import Element, Specie, DummySpecie
-from .composition import Composition
-from .structure import Structure, IStructure, Molecule, IMolecule
-from .lattice import Lattice
-from .sites import Site, PeriodicSite
-from .operations import SymmOp
-from .units import Unit, FloatWithUnit, ArrayWithUnit
-
 """
 This package contains core modules and classes for representing structures and
 operations on them.
@@ -20,3 +12,28 @@ operations on them.
 __author__ = "Shyue Ping Ong"
 __date__ = "Dec 15, 2010 7:21:29 PM"
 
+from pymatgen.util.lazy_import import lazy_import
+
+# The classes are only imported on first access, e.g., importing
+# pymatgen.core.units does not import the structure modules.
+_CLASSES = {
+    "Element": "pymatgen.core.periodic_table",
+    "Specie": "pymatgen.core.periodic_table",
+    "DummySpecie": "pymatgen.core.periodic_table",
+    "Composition": "pymatgen.core.composition",
+    "Structure": "pymatgen.core.structure",
+    "IStructure": "pymatgen.core.structure",
+    "Molecule": "pymatgen.core.structure",
+    "IMolecule": "pymatgen.core.structure",
+    "Lattice": "pymatgen.core.lattice",
+    "Site": "pymatgen.core.sites",
+    "PeriodicSite": "pymatgen.core.sites",
+    "SymmOp": "pymatgen.core.operations",
+    "Unit": "pymatgen.core.units",
+    "FloatWithUnit": "pymatgen.core.units",
+    "ArrayWithUnit": "pymatgen.core.units"
+}
+
+__all__ = sorted(_CLASSES.keys())
+
+lazy_import(__name__, _CLASSES)
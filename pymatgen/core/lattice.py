@@ -15,7 +15,8 @@ from numpy import pi, dot, transpose, radians
 
 from monty.json import MSONable
 from monty.dev import deprecated
-from pymatgen.util.coord_utils import pbc_shortest_vectors
+from pymatgen.util.coord_utils import pbc_shortest_vectors, \
+    find_points_in_spheres
 from pymatgen.util.num_utils import abs_cap
 
 """
@@ -948,7 +949,10 @@ class Lattice(MSONable):
 
            Nxmax = r * length_of_b_1 / (2 Pi)
 
-        2. keep points falling within r.
+        2. keep points falling within r. Candidate points are found with a
+           linked-cell search (see
+           pymatgen.util.coord_utils.find_points_in_spheres), so only images
+           close to the sphere are ever generated.
 
         Args:
             frac_points: All points in the lattice in fractional coordinates.
@@ -964,46 +968,52 @@ class Lattice(MSONable):
             else:
                 fcoords, dists, inds
         """
-        # TODO: refactor to use lll matrix (nmax will be smaller)
-        recp_len = np.array(self.reciprocal_lattice.abc) / (2 * pi)
-        nmax = float(r) * recp_len + 0.01
-
-        pcoords = self.get_fractional_coords(center)
-        center = np.array(center)
-
-        n = len(frac_points)
         fcoords = np.array(frac_points) % 1
-        indices = np.arange(n)
-
-        mins = np.floor(pcoords - nmax)
-        maxes = np.ceil(pcoords + nmax)
-        arange = np.arange(start=mins[0], stop=maxes[0])
-        brange = np.arange(start=mins[1], stop=maxes[1])
-        crange = np.arange(start=mins[2], stop=maxes[2])
-        arange = arange[:, None] * np.array([1, 0, 0])[None, :]
-        brange = brange[:, None] * np.array([0, 1, 0])[None, :]
-        crange = crange[:, None] * np.array([0, 0, 1])[None, :]
-        images = arange[:, None, None] + brange[None, :, None] +\
-            crange[None, None, :]
-
-        shifted_coords = fcoords[:, None, None, None, :] + \
-            images[None, :, :, :, :]
-
-        cart_coords = self.get_cartesian_coords(fcoords)
-        cart_images = self.get_cartesian_coords(images)
-        coords = cart_coords[:, None, None, None, :] + \
-            cart_images[None, :, :, :, :]
-        coords -= center[None, None, None, None, :]
-        coords **= 2
-        d_2 = np.sum(coords, axis=4)
-
-        within_r = np.where(d_2 <= r ** 2)
+        _, inds, images, dists = find_points_in_spheres(
+            self, fcoords, [center], r)
+        shifted_coords = fcoords[inds] + images
         if zip_results:
-            return list(zip(shifted_coords[within_r], np.sqrt(d_2[within_r]),
-                            indices[within_r[0]]))
+            return list(zip(shifted_coords, dists, inds))
         else:
-            return shifted_coords[within_r], np.sqrt(d_2[within_r]), \
-                indices[within_r[0]]
+            return shifted_coords, dists, inds
+
+    def get_neighbor_list(self, r, frac_points, center_coords=None,
+                          numerical_tol=1e-8, exclude_self=True):
+        """
+        Array-based neighbor search. This is the counterpart of
+        get_points_in_sphere for many centers at once, and returns plain
+        numpy arrays instead of lists of tuples, which is much faster when
+        no per-neighbor objects are needed.
+
+        Args:
+            r (float): Radius of sphere.
+            frac_points: All points in the lattice in fractional coordinates.
+            center_coords: Cartesian coordinates of the centers of the
+                spheres. Defaults to None, which means the points themselves
+                are used as centers.
+            numerical_tol (float): Pairs closer than this distance are
+                considered to be the same point.
+            exclude_self (bool): Whether to exclude pairs closer than
+                numerical_tol, e.g., a point and itself.
+
+        Returns:
+            (center_indices, points_indices, images, distances) as
+            contiguous numpy arrays. The neighbor of center
+            center_indices[k] is frac_points[points_indices[k]] + images[k],
+            at a distance of distances[k]. images are integer lattice
+            translations.
+        """
+        frac_points = np.array(frac_points, dtype=np.float64)
+        if center_coords is None:
+            center_coords = self.get_cartesian_coords(frac_points)
+        cinds, pinds, images, dists = find_points_in_spheres(
+            self, frac_points, center_coords, r)
+        if exclude_self:
+            keep = dists > numerical_tol
+            cinds, pinds, images, dists = cinds[keep], pinds[keep], \
+                images[keep], dists[keep]
+        return np.ascontiguousarray(cinds), np.ascontiguousarray(pinds), \
+            np.ascontiguousarray(images), np.ascontiguousarray(dists)
 
     def get_all_distances(self, fcoords1, fcoords2):
         """
@@ -11,6 +11,8 @@ import warnings
 from io import open
 from enum import Enum
 
+import numpy as np
+
 from pymatgen.core.units import Mass, Length, unitized, FloatWithUnit, Unit, \
     SUPPORTED_UNIT_NAMES
 from pymatgen.util.string_utils import formula_double_format
@@ -38,6 +40,9 @@ with open(os.path.join(os.path.dirname(__file__),
 
 _pt_row_sizes = (2, 8, 8, 18, 18, 32, 32)
 
+# Element symbols indexed by atomic number.
+_pt_symbols = {d["Atomic no"]: sym for sym, d in _pt_data.items()}
+
 
 class Element(Enum):
     """
@@ -437,6 +442,9 @@ class Element(Enum):
                         except ValueError as ex:
                             # Ignore error. val will just remain a string.
                             pass
+            # Element is a singleton, so the parsed value is simply stored as
+            # an attribute, which is looked up before __getattr__ is called.
+            self.__dict__[item] = val
             return val
         raise AttributeError
 
@@ -562,9 +570,8 @@ class Element(Enum):
         Returns:
             Element with atomic number z.
         """
-        for sym, data in _pt_data.items():
-            if data["Atomic no"] == z:
-                return Element(sym)
+        if z in _pt_symbols:
+            return Element(_pt_symbols[z])
         raise ValueError("No element with this atomic number %s" % z)
 
     @staticmethod
@@ -825,13 +832,22 @@ class Specie(MSONable):
         Properties are now checked when comparing two Species for equality.
     """
 
+    # Pool of instances, i.e., creating a Specie equal to an existing one
+    # returns the existing instance.
     cache = {}
 
     def __new__(cls, *args, **kwargs):
-        key = (cls,) + args + tuple(kwargs.items())
+        if not args and not kwargs:
+            # Unpickling creates an empty instance, which must not be shared.
+            return object.__new__(cls)
+        params = dict(zip(("symbol", "oxidation_state", "properties"), args))
+        params.update(kwargs)
+        properties = params.get("properties") or {}
         try:
+            key = (cls, params.get("symbol"), params.get("oxidation_state"),
+                   tuple(sorted(properties.items())))
             inst = Specie.cache.get(key, None)
-        except TypeError:
+        except (TypeError, AttributeError):
             # Can't cache this set of arguments
             inst = key = None
         if inst is None:
@@ -845,7 +861,7 @@ class Specie(MSONable):
     def __init__(self, symbol, oxidation_state, properties=None):
         self._el = Element(symbol)
         self._oxi_state = oxidation_state
-        self._properties = properties if properties else {}
+        self._properties = dict(properties) if properties else {}
         for k in self._properties.keys():
             if k not in Specie.supported_properties:
                 raise ValueError("{} is not a supported property".format(k))
@@ -1085,7 +1101,7 @@ class DummySpecie(Specie):
         # most instances.
         self._symbol = symbol
         self._oxi_state = oxidation_state
-        self._properties = properties if properties else {}
+        self._properties = dict(properties) if properties else {}
         for k in self._properties.keys():
             if k not in Specie.supported_properties:
                 raise ValueError("{} is not a supported property".format(k))
@@ -1232,6 +1248,57 @@ class DummySpecie(Specie):
         return output
 
 
+# Tables of element properties indexed by atomic number.
+_property_tables = {}
+
+
+def _get_property_table(name):
+    if name not in _property_tables:
+        table = np.full(max(_pt_symbols) + 1, np.nan)
+        valid = False
+        for z, sym in _pt_symbols.items():
+            try:
+                val = getattr(Element(sym), name)
+            except AttributeError:
+                raise ValueError("{} is not a property of Element".format(
+                    name))
+            if val is None:
+                continue
+            try:
+                table[z] = float(val)
+                valid = True
+            except (TypeError, ValueError):
+                pass
+        if not valid:
+            raise ValueError("{} is not a numerical property of "
+                             "Element".format(name))
+        table.flags.writeable = False
+        _property_tables[name] = table
+    return _property_tables[name]
+
+
+def element_property_array(name, zs):
+    """
+    Returns a numerical property of many elements at once. The property is
+    evaluated for all elements only once and stored in a table indexed by
+    atomic number, so that e.g. the property of all sites of many structures
+    can be obtained by array indexing instead of attribute lookups.
+
+    Args:
+        name (str): Name of a numerical attribute of Element, e.g., "X",
+            "atomic_mass", "atomic_radius", "molar_volume", "row" or
+            "average_ionic_radius".
+        zs: Atomic number or array-like of atomic numbers, e.g.,
+            Structure.atomic_numbers.
+
+    Returns:
+        Array of floats with the shape of zs. Quantities with units are
+        given in the units of the Element attribute (e.g., amu or ang).
+        Missing data is represented by NaN.
+    """
+    return _get_property_table(name)[np.asarray(zs, dtype=np.int)]
+
+
 def get_el_sp(obj):
     """
     Utility method to get an Element or Specie from an input obj.
@@ -772,8 +772,10 @@ class IStructure(SiteCollection, MSONable):
         crystal. If you only want neighbors for a particular site, use the
         method get_neighbors as it may not have to build such a large supercell
         However if you are looping over all sites in the crystal, this method
-        is more efficient since it only performs one pass over a large enough
-        supercell to contain all possible atoms out to a distance r.
+        is more efficient since it performs a single linked-cell neighbor
+        search (see get_neighbor_list) for all sites at once, which scales
+        roughly linearly with the number of sites. PeriodicSites are only
+        created for the neighbors found.
         The return type is a [(site, dist) ...] since most of the time,
         subsequent processing requires the distance.
 
@@ -790,37 +792,48 @@ class IStructure(SiteCollection, MSONable):
             structure. This is needed for ewaldmatrix by keeping track of which
             sites contribute to the ewald sum.
         """
-        # Use same algorithm as get_sites_in_sphere to determine supercell but
-        # loop over all atoms in crystal
-        recp_len = np.array(self.lattice.reciprocal_lattice.abc)
-        maxr = np.ceil((r + 0.15) * recp_len / (2 * math.pi))
-        nmin = np.floor(np.min(self.frac_coords, axis=0)) - maxr
-        nmax = np.ceil(np.max(self.frac_coords, axis=0)) + maxr
-
-        all_ranges = [np.arange(x, y) for x, y in zip(nmin, nmax)]
-
         latt = self._lattice
         neighbors = [list() for i in range(len(self._sites))]
-        all_fcoords = np.mod(self.frac_coords, 1)
-        coords_in_cell = latt.get_cartesian_coords(all_fcoords)
-        site_coords = self.cart_coords
-
-        indices = np.arange(len(self))
-        for image in itertools.product(*all_ranges):
-            coords = latt.get_cartesian_coords(image) + coords_in_cell
-            all_dists = all_distances(coords, site_coords)
-            all_within_r = np.bitwise_and(all_dists <= r, all_dists > 1e-8)
-
-            for (j, d, within_r) in zip(indices, all_dists, all_within_r):
-                nnsite = PeriodicSite(self[j].species_and_occu, coords[j],
-                                      latt, properties=self[j].properties,
-                                      coords_are_cartesian=True)
-                for i in indices[within_r]:
-                    item = (nnsite, d[i], j) if include_index else (
-                        nnsite, d[i])
-                    neighbors[i].append(item)
+        all_fcoords = self.frac_coords
+        cinds, pinds, images, dists = self.get_neighbor_list(r)
+        for i, j, image, d in zip(cinds, pinds, images, dists):
+            nnsite = PeriodicSite(self[j].species_and_occu,
+                                  all_fcoords[j] + image, latt,
+                                  properties=self[j].properties)
+            neighbors[i].append((nnsite, d, j) if include_index else
+                                (nnsite, d))
         return neighbors
 
+    def get_neighbor_list(self, r, sites=None, numerical_tol=1e-8,
+                          exclude_self=True):
+        """
+        Get neighbors for each site (or for a list of sites) out to a
+        distance r as numpy arrays. This is the preferred method for large
+        structures or for analyses that only need indices and distances,
+        since no Site objects are created.
+
+        Args:
+            r (float): Radius of sphere.
+            sites (list of Sites): Sites to find neighbors for. Defaults to
+                None, which means all sites in the structure.
+            numerical_tol (float): Pairs closer than this distance are
+                considered to be the same site.
+            exclude_self (bool): Whether to exclude a site from its own
+                neighbors.
+
+        Returns:
+            (center_indices, points_indices, images, distances). The neighbor
+            of the center center_indices[k] (an index into sites, or into the
+            structure if sites is None) is the site points_indices[k] of the
+            structure translated by images[k] lattice vectors, at a distance
+            of distances[k].
+        """
+        centers = self.cart_coords if sites is None else \
+            [site.coords for site in sites]
+        return self._lattice.get_neighbor_list(
+            r, self.frac_coords, center_coords=centers,
+            numerical_tol=numerical_tol, exclude_self=exclude_self)
+
     def get_neighbors_in_shell(self, origin, r, dr, include_index=False):
         """
         Returns all sites in a shell centered on origin (coords) between radii
@@ -342,6 +342,27 @@ class LatticeTestCase(PymatgenTest):
         self.assertEqual(len(latt.get_points_in_sphere(
             pts, [0.5, 0.5, 0.5], 1.0001)), 552)
 
+    def test_get_neighbor_list(self):
+        latt = Lattice([[1, 5, 0], [0, 1, 0], [5, 0, 1]])
+        pts = np.array(list(itertools.product(range(5), repeat=3))) / 5
+        pts = latt.get_fractional_coords(pts)
+
+        cinds, pinds, images, dists = latt.get_neighbor_list(
+            0.20001, pts, center_coords=[[0, 0, 0], [0.4, 0.4, 0.4]])
+        self.assertArrayEqual(np.bincount(cinds), [6, 6])
+        self.assertArrayAlmostEqual(dists, [0.2] * 12)
+        self.assertEqual(images.dtype.kind, "i")
+        coords = latt.get_cartesian_coords(pts[pinds] + images)
+        centers = np.array([[0, 0, 0], [0.4, 0.4, 0.4]])[cinds]
+        self.assertArrayAlmostEqual(
+            np.sum((coords - centers) ** 2, axis=1) ** 0.5, dists)
+
+        # All points as centers.
+        cinds, pinds, images, dists = latt.get_neighbor_list(0.20001, pts)
+        self.assertEqual(len(cinds), 6 * 125)
+        self.assertEqual(len(latt.get_neighbor_list(
+            0.20001, pts, exclude_self=False)[0]), 7 * 125)
+
     def test_get_all_distances(self):
         fcoords = np.array([[0.3, 0.3, 0.5],
                             [0.1, 0.1, 0.3],
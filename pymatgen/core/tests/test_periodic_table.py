@@ -7,8 +7,11 @@ from __future__ import division, unicode_literals
 import unittest2 as unittest
 import pickle
 
+import numpy as np
+
 from pymatgen.util.testing import PymatgenTest
-from pymatgen.core.periodic_table import Element, Specie, DummySpecie, get_el_sp
+from pymatgen.core.periodic_table import Element, Specie, DummySpecie, \
+    get_el_sp, element_property_array
 from pymatgen.core.composition import Composition
 from copy import deepcopy
 
@@ -142,6 +145,24 @@ class ElementTestCase(PymatgenTest):
     def test_print_periodic_table(self):
         Element.print_periodic_table()
 
+    def test_element_property_array(self):
+        zs = np.array([[1, 8], [26, 92]])
+        for name in ["X", "atomic_mass", "atomic_radius", "molar_volume",
+                     "row", "average_ionic_radius", "max_oxidation_state"]:
+            a = element_property_array(name, zs)
+            self.assertEqual(a.shape, (2, 2))
+            for z, val in zip(zs.flat, a.flat):
+                expected = getattr(Element.from_Z(z), name)
+                if expected is None:
+                    self.assertTrue(np.isnan(val))
+                else:
+                    self.assertAlmostEqual(val, expected)
+        self.assertAlmostEqual(element_property_array("X", 26), 1.83)
+        self.assertTrue(np.isnan(element_property_array("atomic_radius",
+                                                        [2])[0]))
+        self.assertRaises(ValueError, element_property_array, "block", [1])
+        self.assertRaises(ValueError, element_property_array, "spam", [1])
+
 
 class SpecieTestCase(PymatgenTest):
 
@@ -157,6 +178,9 @@ class SpecieTestCase(PymatgenTest):
     def test_cached(self):
         specie5 = Specie("Fe", 2)
         self.assertEqual(id(specie5), id(self.specie3))
+        self.assertIs(Specie("Fe", oxidation_state=2, properties={"spin": 5}),
+                      self.specie4)
+        self.assertIsNot(self.specie4, self.specie3)
 
     def test_ionic_radius(self):
         self.assertEqual(self.specie2.ionic_radius, 78.5 / 100)
@@ -190,6 +214,8 @@ class SpecieTestCase(PymatgenTest):
 
     def test_pickle(self):
         self.assertEqual(self.specie1, pickle.loads(pickle.dumps(self.specie1)))
+        species = pickle.loads(pickle.dumps([self.specie2, self.specie4]))
+        self.assertEqual(species, [self.specie2, self.specie4])
         for i in range(1, 5):
             self.serialize_with_pickle(getattr(self, "specie%d" % i) , test_eq=True)
 
@@ -12,6 +12,7 @@ from pymatgen.core.structure import IStructure, Structure, IMolecule, \
     StructureError, Molecule
 from pymatgen.core.lattice import Lattice
 import random
+import itertools
 import os
 import numpy as np
 
@@ -365,6 +366,41 @@ class IStructureTest(PymatgenTest):
         s.make_supercell([2,2,2])
         self.assertEqual(sum(map(len, s.get_all_neighbors(3))), 976)
 
+    def test_get_neighbor_list(self):
+        s = self.struct
+        r = random.uniform(3, 6)
+        cinds, pinds, images, dists = s.get_neighbor_list(r)
+        # Brute force search over enough periodic images to cover the
+        # sphere.
+        nmax = np.ceil(r * np.linalg.norm(
+            s.lattice.inv_matrix, axis=0)).astype(int) + 1
+        expected = []
+        for i, j in itertools.product(range(len(s)), repeat=2):
+            for image in itertools.product(*[range(-n, n + 1)
+                                             for n in nmax]):
+                d = np.linalg.norm(s.lattice.get_cartesian_coords(
+                    s.frac_coords[j] + image - s.frac_coords[i]))
+                if d <= r and not (i == j and not any(image)):
+                    expected.append((i, j, image, d))
+        expected.sort()
+        found = sorted(zip(cinds.tolist(), pinds.tolist(),
+                           map(tuple, images.astype(int).tolist()),
+                           dists.tolist()))
+        self.assertEqual([e[:3] for e in found], [e[:3] for e in expected])
+        self.assertArrayAlmostEqual([e[3] for e in found],
+                                    [e[3] for e in expected])
+        coords = s.lattice.get_cartesian_coords(s.frac_coords[pinds] +
+                                                images)
+        self.assertArrayAlmostEqual(
+            np.sum((coords - s.cart_coords[cinds]) ** 2, axis=1) ** 0.5,
+            dists)
+
+        cinds, pinds, images, dists = s.get_neighbor_list(
+            r, sites=[s[1]], exclude_self=False)
+        self.assertEqual(len(dists), len(s.get_sites_in_sphere(s[1].coords,
+                                                               r)))
+        self.assertTrue(np.all(cinds == 0))
+        self.assertEqual(np.min(dists), 0)
 
     def test_get_all_neighbors_outside_cell(self):
         s = Structure(Lattice.cubic(2), ['Li', 'Li', 'Li', 'Si'],
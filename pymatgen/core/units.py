@@ -9,6 +9,7 @@ import numpy as np
 import six
 
 import collections
+import copy
 from numbers import Number
 import numbers
 from functools import partial
@@ -170,6 +171,10 @@ class UnitError(BaseException):
     """
 
 
+# Cache of the parsed string unit definitions.
+_PARSED_UNIT_DEFS = {}
+
+
 def check_mappings(u):
     for v in DERIVED_UNITS.values():
         for k2, v2 in v.items():
@@ -199,16 +204,22 @@ class Unit(collections.Mapping):
         """
 
         if isinstance(unit_def, six.string_types):
-            unit = collections.defaultdict(int)
-            import re
-            for m in re.finditer("([A-Za-z]+)\s*\^*\s*([\-0-9]*)", unit_def):
-                p = m.group(2)
-                p = 1 if not p else int(p)
-                k = m.group(1)
-                unit[k] += p
+            # Parsing is relatively expensive and the same few definitions
+            # are used over and over again, e.g., for all elements.
+            if unit_def not in _PARSED_UNIT_DEFS:
+                unit = collections.defaultdict(int)
+                import re
+                for m in re.finditer("([A-Za-z]+)\s*\^*\s*([\-0-9]*)",
+                                     unit_def):
+                    p = m.group(2)
+                    p = 1 if not p else int(p)
+                    k = m.group(1)
+                    unit[k] += p
+                _PARSED_UNIT_DEFS[unit_def] = check_mappings(unit)
+            self._unit = copy.copy(_PARSED_UNIT_DEFS[unit_def])
         else:
             unit = {k: v for k, v in dict(unit_def).items() if v != 0}
-        self._unit = check_mappings(unit)
+            self._unit = check_mappings(unit)
 
     def __mul__(self, other):
         new_units = collections.defaultdict(int)
@@ -128,13 +128,52 @@ class Kpoint(MSONable):
                 "@class": self.__class__.__name__}
 
 
+class KpointList(collections.Sequence):
+    """
+    Read-only sequence of the kpoints of a band structure. The kpoints are
+    stored as an array of fractional coordinates and an array of labels, and
+    the Kpoint objects are only created when they are accessed, so that
+    dense meshes do not require one object per kpoint.
+
+    Args:
+        frac_coords: (nk, 3) array of the fractional coordinates of the
+            kpoints.
+        labels: Sequence of the labels of the kpoints (None for kpoints
+            without label).
+        lattice: The reciprocal lattice as a pymatgen Lattice object.
+    """
+
+    def __init__(self, frac_coords, labels, lattice):
+        self._frac_coords = frac_coords
+        self._labels = labels
+        self._lattice = lattice
+        self._kpoints = [None] * len(frac_coords)
+
+    def __len__(self):
+        return len(self._kpoints)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        kpoint = self._kpoints[i]
+        if kpoint is None:
+            kpoint = Kpoint(self._frac_coords[i].copy(), self._lattice,
+                            label=self._labels[i])
+            self._kpoints[i] = kpoint
+        return kpoint
+
+
 class BandStructure(object):
     """
     This is the most generic band structure data possible
     it's defined by a list of kpoints + energies for each of them
 
     .. attribute:: kpoints:
-        the list of kpoints (as Kpoint objects) in the band structure
+        the list of kpoints (as Kpoint objects) in the band structure. The
+        Kpoint objects are created on access, see KpointList.
+
+    .. attribute:: kpoints_frac_coords:
+        the fractional coordinates of the kpoints as a (nk, 3) array
 
     .. attribute:: lattice_rec
 
@@ -199,7 +238,6 @@ class BandStructure(object):
                  coords_are_cartesian=False, structure=None, projections=None):
         self.efermi = efermi
         self.lattice_rec = lattice
-        self.kpoints = []
         self.labels_dict = {}
         self.structure = structure
         self.projections = projections or {}
@@ -211,18 +249,32 @@ class BandStructure(object):
             raise Exception("if projections are provided a structure object"
                             " needs also to be given")
 
-        for k in kpoints:
-            # let see if this kpoint has been assigned a label
-            label = None
-            for c in labels_dict:
-                if np.linalg.norm(k - np.array(labels_dict[c])) < 0.0001:
-                    label = c
-                    self.labels_dict[label] = Kpoint(
-                        k, lattice, label=label,
+        coords = np.reshape(np.array(kpoints, dtype=np.float), (-1, 3))
+        self._kpoint_labels = np.empty(len(coords), dtype=object)
+        if labels_dict:
+            # match all the kpoints against all the labels at once. As in a
+            # sequential scan, a kpoint matching several labels gets the last
+            # one and a label matching several kpoints the last kpoint
+            names = list(labels_dict.keys())
+            label_coords = np.array([labels_dict[c] for c in names],
+                                    dtype=np.float)
+            matches = np.linalg.norm(
+                coords[:, None, :] - label_coords[None, :, :],
+                axis=2) < 0.0001
+            has_label = np.any(matches, axis=1)
+            last = len(names) - 1 - np.argmax(matches[:, ::-1], axis=1)
+            self._kpoint_labels[has_label] = np.array(
+                names, dtype=object)[last[has_label]]
+            for j, c in enumerate(names):
+                if np.any(matches[:, j]):
+                    k = len(coords) - 1 - np.argmax(matches[::-1, j])
+                    self.labels_dict[c] = Kpoint(
+                        coords[k].copy(), lattice, label=c,
                         coords_are_cartesian=coords_are_cartesian)
-            self.kpoints.append(
-                Kpoint(k, lattice, label=label,
-                       coords_are_cartesian=coords_are_cartesian))
+        self.kpoints_frac_coords = lattice.get_fractional_coords(coords) \
+            if coords_are_cartesian else coords
+        self.kpoints = KpointList(self.kpoints_frac_coords,
+                                  self._kpoint_labels, lattice)
         self.bands = {spin: np.array(v) for spin, v in eigenvals.items()}
         self.nb_bands = len(eigenvals[Spin.up])
         self.is_spin_polarized = len(self.bands) == 2
@@ -297,10 +349,9 @@ class BandStructure(object):
             True if a metal, False if not
         """
         for spin, values in self.bands.items():
-            for i in range(self.nb_bands):
-                if np.any(values[i, :] < self.efermi) and \
-                        np.any(values[i, :] > self.efermi):
-                    return True
+            if np.any((values.min(axis=1) < self.efermi) &
+                      (values.max(axis=1) > self.efermi)):
+                return True
         return False
 
     def get_vbm(self):
@@ -328,38 +379,7 @@ class BandStructure(object):
         if self.is_metal():
             return {"band_index": [], "kpoint_index": [],
                     "kpoint": [], "energy": None, "projections": {}}
-        max_tmp = -float("inf")
-        index = None
-        kpointvbm = None
-        for spin, v in self.bands.items():
-            for i, j in zip(*np.where(v < self.efermi)):
-                if v[i, j] > max_tmp:
-                    max_tmp = float(v[i, j])
-                    index = j
-                    kpointvbm = self.kpoints[j]
-
-        list_ind_kpts = []
-        if kpointvbm.label is not None:
-            for i in range(len(self.kpoints)):
-                if self.kpoints[i].label == kpointvbm.label:
-                    list_ind_kpts.append(i)
-        else:
-            list_ind_kpts.append(index)
-        # get all other bands sharing the vbm
-        list_ind_band = collections.defaultdict(list)
-        for spin in self.bands:
-            for i in range(self.nb_bands):
-                if math.fabs(self.bands[spin][i][index] - max_tmp) < 0.001:
-                    list_ind_band[spin].append(i)
-        proj = {}
-        for spin, v in self.projections.items():
-            if len(list_ind_band[spin]) == 0:
-                continue
-            proj[spin] = v[list_ind_band[spin][0]][list_ind_kpts[0]]
-        return {'band_index': list_ind_band,
-                'kpoint_index': list_ind_kpts,
-                'kpoint': kpointvbm, 'energy': max_tmp,
-                'projections': proj}
+        return self._get_band_edge(valence=True)
 
     def get_cbm(self):
         """
@@ -386,31 +406,43 @@ class BandStructure(object):
         if self.is_metal():
             return {"band_index": [], "kpoint_index": [],
                     "kpoint": [], "energy": None, "projections": {}}
-        max_tmp = float("inf")
+        return self._get_band_edge(valence=False)
 
+    def _get_band_edge(self, valence):
+        """
+        Returns the data of the VBM (if valence is True) or of the CBM of a
+        band structure which is not a metal, in the format of get_vbm.
+        """
+        energy = None
         index = None
-        kpointcbm = None
         for spin, v in self.bands.items():
-            for i, j in zip(*np.where(v > self.efermi)):
-                if v[i, j] < max_tmp:
-                    max_tmp = float(v[i, j])
-                    index = j
-                    kpointcbm = self.kpoints[j]
-
-        list_index_kpoints = []
-        if kpointcbm.label is not None:
-            for i in range(len(self.kpoints)):
-                if self.kpoints[i].label == kpointcbm.label:
-                    list_index_kpoints.append(i)
+            # the extremum over all bands and kpoints, the first in
+            # [band, kpoint] order if it is degenerate
+            if valence:
+                masked = np.where(v < self.efermi, v, -np.inf)
+                i = np.argmax(masked)
+            else:
+                masked = np.where(v > self.efermi, v, np.inf)
+                i = np.argmin(masked)
+            e = masked.flat[i]
+            if np.isfinite(e) and (energy is None or (
+                    e > energy if valence else e < energy)):
+                energy = float(e)
+                index = int(i % v.shape[1])
+
+        label = self._kpoint_labels[index]
+        if label is not None:
+            list_index_kpoints = np.flatnonzero(
+                self._kpoint_labels == label).tolist()
         else:
-            list_index_kpoints.append(index)
+            list_index_kpoints = [index]
 
-        # get all other bands sharing the cbm
+        # get all other bands sharing the band edge
         list_index_band = collections.defaultdict(list)
-        for spin in self.bands:
-            for i in range(self.nb_bands):
-                if math.fabs(self.bands[spin][i][index] - max_tmp) < 0.001:
-                    list_index_band[spin].append(i)
+        for spin, v in self.bands.items():
+            bands = np.flatnonzero(np.abs(v[:, index] - energy) < 0.001)
+            if len(bands) != 0:
+                list_index_band[spin] = bands.tolist()
         proj = {}
         for spin, v in self.projections.items():
             if len(list_index_band[spin]) == 0:
@@ -419,7 +451,7 @@ class BandStructure(object):
 
         return {'band_index': list_index_band,
                 'kpoint_index': list_index_kpoints,
-                'kpoint': kpointcbm, 'energy': max_tmp,
+                'kpoint': self.kpoints[index], 'energy': energy,
                 'projections': proj}
 
     def get_band_gap(self):
@@ -463,21 +495,12 @@ class BandStructure(object):
         """
         if self.is_metal():
             return 0.0
-        cb = collections.defaultdict(list)
-        vb = collections.defaultdict(list)
-        for spin, v in self.bands.items():
-            for i in range(len(v)):
-                for j in range(len(self.kpoints)):
-                    if self.bands[Spin.up][i][j] > self.efermi:
-                        cb[spin].append(v[i][j])
-                        vb[spin].append(v[i - 1][j])
-        diff = []
-        for i in range(len(self.kpoints)):
-            diff.append(min(
-                [cb[Spin.up][i], cb.get(Spin.down, cb[Spin.up])[i]])
-                        - max(
-                [vb[Spin.up][i], vb.get(Spin.down, vb[Spin.up])[i]]))
-        return min(diff)
+        # the lowest conduction band (according to the spin up channel) and
+        # the band below it, at each kpoint
+        icb = np.argmax(np.any(self.bands[Spin.up] > self.efermi, axis=1))
+        cb = np.min([v[icb] for v in self.bands.values()], axis=0)
+        vb = np.max([v[icb - 1] for v in self.bands.values()], axis=0)
+        return np.min(cb - vb)
 
     def as_dict(self):
         """
@@ -489,8 +512,7 @@ class BandStructure(object):
              "kpoints": []}
         # kpoints are not kpoint objects dicts but are frac coords (this makes
         # the dict smaller and avoids the repetition of the lattice
-        for k in self.kpoints:
-            d["kpoints"].append(k.as_dict()["fcoords"])
+        d["kpoints"] = self.kpoints_frac_coords.tolist()
         d["bands"] = {str(int(spin)): self.bands[spin]
                       for spin in self.bands}
         d["is_metal"] = self.is_metal()
@@ -589,26 +611,24 @@ class BandStructureSymmLine(BandStructure, MSONable):
         super(BandStructureSymmLine, self).__init__(
             kpoints, eigenvals, lattice, efermi, labels_dict,
             coords_are_cartesian, structure, projections)
-        self.distance = []
         self.branches = []
         one_group = []
         branches_tmp = []
-        # get labels and distance for each kpoint
-        previous_kpoint = self.kpoints[0]
-        previous_distance = 0.0
-
-        previous_label = self.kpoints[0].label
-        for i in range(len(self.kpoints)):
-            label = self.kpoints[i].label
-            if label is not None and previous_label is not None:
-                self.distance.append(previous_distance)
-            else:
-                self.distance.append(
-                    np.linalg.norm(self.kpoints[i].cart_coords -
-                                   previous_kpoint.cart_coords) +
-                    previous_distance)
-            previous_kpoint = self.kpoints[i]
-            previous_distance = self.distance[i]
+        labels = self._kpoint_labels
+        # get the distance of each kpoint along the line, the distance
+        # between two consecutive labelled kpoints (e.g., the end and the
+        # start of two branches) being zero
+        cart_coords = self.lattice_rec.get_cartesian_coords(
+            self.kpoints_frac_coords)
+        steps = np.zeros(len(cart_coords))
+        steps[1:] = np.linalg.norm(np.diff(cart_coords, axis=0), axis=1)
+        labelled = np.array([label is not None for label in labels],
+                            dtype=bool)
+        steps[1:][labelled[1:] & labelled[:-1]] = 0
+        self.distance = np.cumsum(steps).tolist()
+
+        previous_label = labels[0]
+        for i, label in enumerate(labels):
             if label:
                 if previous_label:
                     if len(one_group) != 0:
@@ -622,8 +642,7 @@ class BandStructureSymmLine(BandStructure, MSONable):
         for b in branches_tmp:
             self.branches.append(
                 {"start_index": b[0], "end_index": b[-1],
-                 "name": str(self.kpoints[b[0]].label) + "-" +
-                         str(self.kpoints[b[-1]].label)})
+                 "name": str(labels[b[0]]) + "-" + str(labels[b[-1]])})
 
         self.is_spin_polarized = False
         if len(self.bands) == 2:
@@ -646,15 +665,11 @@ class BandStructureSymmLine(BandStructure, MSONable):
         # if the kpoint has no label it can"t have a repetition along the band
         # structure line object
 
-        if self.kpoints[index].label is None:
+        label = self._kpoint_labels[index]
+        if label is None:
             return [index]
 
-        list_index_kpoints = []
-        for i in range(len(self.kpoints)):
-            if self.kpoints[i].label == self.kpoints[index].label:
-                list_index_kpoints.append(i)
-
-        return list_index_kpoints
+        return np.flatnonzero(self._kpoint_labels == label).tolist()
 
     def get_branch(self, index):
         """
@@ -754,8 +769,7 @@ class BandStructureSymmLine(BandStructure, MSONable):
              "kpoints": []}
         # kpoints are not kpoint objects dicts but are frac coords (this makes
         # the dict smaller and avoids the repetition of the lattice
-        for k in self.kpoints:
-            d["kpoints"].append(k.as_dict()["fcoords"])
+        d["kpoints"] = self.kpoints_frac_coords.tolist()
         d["branches"] = self.branches
         d["bands"] = {str(int(spin)): self.bands[spin].tolist()
                       for spin in self.bands}
@@ -891,8 +905,7 @@ def get_reconstructed_band_structure(list_bs, efermi=None):
     nb_bands = min([list_bs[i].nb_bands for i in range(len(list_bs))])
 
     for bs in list_bs:
-        for k in bs.kpoints:
-            kpoints.append(k.frac_coords)
+        kpoints.extend(bs.kpoints_frac_coords)
         for k, v in bs.labels_dict.items():
             labels_dict[k] = v.frac_coords
     eigenvals = {Spin.up: [list_bs[0].bands[Spin.up][i]
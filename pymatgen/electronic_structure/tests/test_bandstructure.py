@@ -9,10 +9,13 @@ import os
 import json
 from io import open
 
+import numpy as np
+
 from pymatgen.electronic_structure.bandstructure import Kpoint
 from pymatgen import Lattice
 from pymatgen.electronic_structure.core import Spin, Orbital
-from pymatgen.electronic_structure.bandstructure import BandStructureSymmLine
+from pymatgen.electronic_structure.bandstructure import BandStructureSymmLine, \
+    BandStructure
 from pymatgen.util.testing import PymatgenTest
 
 test_dir = os.path.join(os.path.dirname(__file__), "..", "..", "..",
@@ -39,6 +42,74 @@ class KpointTest(unittest.TestCase):
         self.assertEqual(self.kpoint.label, "X")
 
 
+class BandStructureTest(PymatgenTest):
+
+    def setUp(self):
+        self.lattice = Lattice.cubic(2 * np.pi)
+        self.kpoints = np.array([[i, j, k] for i in range(4) for j in range(4)
+                                 for k in range(4)]) / 4.0
+        x = self.kpoints[:, 0]
+        self.bands = {Spin.up: np.array([-2 - x, -1 + x, 2 + x ** 2, 3 + x])}
+        self.labels_dict = {"\\Gamma": [0, 0, 0], "X": [0.5, 0, 0],
+                            "M": [0.5, 0.5, 0]}
+        self.bs = BandStructure(self.kpoints, self.bands, self.lattice, 0.0,
+                                self.labels_dict)
+
+    def test_kpoints(self):
+        self.assertEqual(len(self.bs.kpoints), 64)
+        self.assertArrayAlmostEqual(self.bs.kpoints_frac_coords, self.kpoints)
+        self.assertIs(self.bs.kpoints[17], self.bs.kpoints[17])
+        self.assertIs(self.bs.kpoints[-1], self.bs.kpoints[63])
+        self.assertArrayAlmostEqual(self.bs.kpoints[17].frac_coords,
+                                    [0.25, 0, 0.25])
+        self.assertArrayAlmostEqual(self.bs.kpoints[17].cart_coords,
+                                    [np.pi / 2, 0, np.pi / 2])
+        self.assertEqual([k.label for k in self.bs.kpoints[16:33:8]],
+                         [None, None, "X"])
+        self.assertEqual(self.bs.kpoints[0].label, "\\Gamma")
+        self.assertEqual(self.bs.kpoints[40].label, "M")
+        self.assertEqual(sorted(self.bs.labels_dict.keys()),
+                         ["M", "X", "\\Gamma"])
+        self.assertArrayAlmostEqual(self.bs.labels_dict["M"].frac_coords,
+                                    [0.5, 0.5, 0])
+        self.assertRaises(IndexError, self.bs.kpoints.__getitem__, 64)
+
+        bs = BandStructure(self.lattice.get_cartesian_coords(self.kpoints),
+                           self.bands, self.lattice, 0.0,
+                           {"X": [np.pi, 0, 0]}, coords_are_cartesian=True)
+        self.assertArrayAlmostEqual(bs.kpoints_frac_coords, self.kpoints)
+        self.assertEqual([k.label for k in bs.kpoints].count("X"), 1)
+        self.assertEqual(bs.kpoints[32].label, "X")
+        self.assertArrayAlmostEqual(bs.labels_dict["X"].frac_coords,
+                                    [0.5, 0, 0])
+
+    def test_band_edges(self):
+        self.assertFalse(self.bs.is_metal())
+        vbm = self.bs.get_vbm()
+        self.assertAlmostEqual(vbm["energy"], -0.25)
+        self.assertEqual(vbm["kpoint_index"], [48])
+        self.assertEqual(vbm["band_index"], {Spin.up: [1]})
+        self.assertIsNone(vbm["kpoint"].label)
+        cbm = self.bs.get_cbm()
+        self.assertAlmostEqual(cbm["energy"], 2)
+        self.assertEqual(cbm["kpoint_index"], [0])
+        self.assertEqual(cbm["band_index"], {Spin.up: [2]})
+        self.assertEqual(cbm["kpoint"].label, "\\Gamma")
+        gap = self.bs.get_band_gap()
+        self.assertAlmostEqual(gap["energy"], 2.25)
+        self.assertFalse(gap["direct"])
+        self.assertEqual(gap["transition"], "(0.750,0.000,0.000)-\\Gamma")
+        self.assertAlmostEqual(self.bs.get_direct_band_gap(), 2.75)
+
+        self.bs.efermi = 2.1
+        self.assertTrue(self.bs.is_metal())
+        self.assertEqual(self.bs.get_band_gap()["energy"], 0.0)
+        self.assertEqual(self.bs.get_direct_band_gap(), 0.0)
+
+        d = self.bs.as_dict()
+        self.assertEqual(d["kpoints"], self.kpoints.tolist())
+
+
 class BandStructureSymmLine_test(PymatgenTest):
 
     def setUp(self):
@@ -101,6 +172,9 @@ class BandStructureSymmLine_test(PymatgenTest):
 
     def test_get_branch(self):
         self.assertAlmostEqual(self.bs2.get_branch(110)[0]['name'], "U-W")
+        self.assertEqual(self.bs2.get_equivalent_kpoints(110), [110])
+        self.assertEqual(self.bs2.get_equivalent_kpoints(0),
+                         [0, 63, 64])
 
     def test_get_direct_band_gap(self):
         self.assertAlmostEqual(self.bs2.get_direct_band_gap(),
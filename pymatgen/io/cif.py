@@ -4,7 +4,6 @@
 
 from __future__ import division, unicode_literals, print_function
 
-import math
 import re
 import os
 import textwrap
@@ -20,7 +19,7 @@ from inspect import getargspec
 from itertools import groupby
 from pymatgen.core.periodic_table import Element, Specie, get_el_sp
 from monty.io import zopen
-from pymatgen.util.coord_utils import in_coord_list_pbc, pbc_diff
+from pymatgen.util.coord_utils import pbc_diff, unique_coords_pbc
 from monty.string import remove_non_ascii
 from pymatgen.core.lattice import Lattice
 from pymatgen.core.structure import Structure
@@ -319,15 +318,11 @@ class CifParser(object):
         """
         Generate unique coordinates using coord and symmetry positions.
         """
-        coords = []
-        for tmp_coord in coords_in:
-            for op in self.symmetry_operations:
-                coord = op.operate(tmp_coord)
-                coord = np.array([i - math.floor(i) for i in coord])
-                if not in_coord_list_pbc(coords, coord,
-                                         atol=self._site_tolerance):
-                    coords.append(coord)
-        return coords
+        coords = _get_symmetry_images(self.symmetry_operations,
+                                      coords_in).reshape((-1, 3))
+        coords = coords - np.floor(coords)
+        return list(coords[unique_coords_pbc(coords,
+                                             atol=self._site_tolerance)])
 
     def get_lattice(self, data, length_strings=("a", "b", "c"),
                     angle_strings=("alpha", "beta", "gamma"),
@@ -511,13 +506,19 @@ class CifParser(object):
                 return ""
 
         def get_matching_coord(coord):
-            for op in self.symmetry_operations:
-                c = op.operate(coord)
-                for k in coord_to_species.keys():
-                    if np.allclose(pbc_diff(c, k), (0, 0, 0),
-                                   atol=self._site_tolerance):
-                        return tuple(k)
-            return False
+            keys = list(coord_to_species.keys())
+            if not keys:
+                return False
+            # Images of coord by each symmetry operation, compared to all
+            # the coords found so far.
+            images = _get_symmetry_images(self.symmetry_operations,
+                                          [coord])[0]
+            close = np.all(np.abs(pbc_diff(images[:, None, :], keys)) <=
+                           self._site_tolerance, axis=2)
+            matches = np.where(np.any(close, axis=1))[0]
+            if len(matches) == 0:
+                return False
+            return tuple(keys[np.argmax(close[matches[0]])])
 
         ############################################################
         """
@@ -710,6 +711,44 @@ class CifParser(object):
             raise ValueError("Invalid cif file with no structures!")
         return structures
 
+    @staticmethod
+    def get_structures_batch(filenames, primitive=True, ncpus=None,
+                             occupancy_tolerance=1., site_tolerance=1e-4):
+        """
+        Returns the structures of many cif files, e.g., to import a database
+        dump. Files which cannot be parsed do not stop the batch, and their
+        errors are returned instead.
+
+        Args:
+            filenames ([str]): Cif filenames.
+            primitive (bool): Set to False to return conventional unit cells.
+                Defaults to True.
+            ncpus (int): Number of processes to use. Default of None means
+                serial processing.
+            occupancy_tolerance (float): See CifParser.
+            site_tolerance (float): See CifParser.
+
+        Returns:
+            (structures, errors), where structures is a list of the output of
+            get_structures for each file, with None for the files which
+            cannot be parsed, and errors is a dict of the error messages of
+            these files keyed by filename.
+        """
+        args = [(f, primitive, occupancy_tolerance, site_tolerance)
+                for f in filenames]
+        if ncpus and ncpus > 1:
+            import multiprocessing as mp
+            p = mp.Pool(ncpus)
+            chunksize = max(1, len(args) // (4 * ncpus))
+            results = p.map(_get_cif_structures, args, chunksize)
+            p.close()
+            p.join()
+        else:
+            results = [_get_cif_structures(a) for a in args]
+        errors = OrderedDict((a[0], error) for a, (structures, error)
+                             in zip(args, results) if error is not None)
+        return [structures for structures, error in results], errors
+
     def as_dict(self):
         d = OrderedDict()
         for k, v in self._cif.data.items():
@@ -719,6 +758,32 @@ class CifParser(object):
         return d
 
 
+def _get_symmetry_images(symmops, coords):
+    """
+    Returns the images of coords by all symmops at once, with shape
+    (len(coords), len(symmops), 3). The results are those of SymmOp.operate.
+    """
+    coords = np.array(coords, dtype=np.float64).reshape((-1, 3))
+    if not symmops:
+        return np.zeros((len(coords), 0, 3))
+    affine_coords = np.concatenate([coords, np.ones((len(coords), 1))],
+                                   axis=1)
+    return np.inner(affine_coords,
+                    [op.affine_matrix for op in symmops])[..., :3]
+
+
+def _get_cif_structures(args):
+    filename, primitive, occupancy_tolerance, site_tolerance = args
+    try:
+        parser = CifParser(filename, occupancy_tolerance=occupancy_tolerance,
+                           site_tolerance=site_tolerance)
+        return parser.get_structures(primitive=primitive), None
+    except Exception as exc:
+        # Errors of each file are returned, as invalid cifs may raise
+        # almost any exception.
+        return None, "{}: {}".format(exc.__class__.__name__, exc)
+
+
 class CifWriter(object):
     """
     A wrapper around CifFile to write CIF files from pymatgen structures.
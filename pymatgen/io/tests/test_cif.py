@@ -946,6 +946,25 @@ loop_
         s = p.get_structures()[0]
         self.assertEqual(s.formula, "K1 Mn1 F3")
 
+    def test_get_structures_batch(self):
+        filenames = [os.path.join(test_dir, f) for f in
+                     ["LiFePO4.cif", "bad_occu.cif", "ICSD59959.cif"]]
+        for ncpus in [None, 2]:
+            structures, errors = CifParser.get_structures_batch(
+                filenames, ncpus=ncpus)
+            self.assertEqual(len(structures), 3)
+            self.assertEqual(structures[0][0],
+                             CifParser(filenames[0]).get_structures()[0])
+            self.assertIsNone(structures[1])
+            self.assertEqual(structures[2][0].formula, "K1 Mn1 F3")
+            self.assertEqual(list(errors.keys()), [filenames[1]])
+            self.assertTrue(errors[filenames[1]].startswith("ValueError"))
+        structures, errors = CifParser.get_structures_batch(
+            filenames[1:2], occupancy_tolerance=2)
+        self.assertAlmostEqual(structures[0][0][0].species_and_occu["Al3+"],
+                               0.5)
+        self.assertEqual(errors, {})
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -5,6 +5,7 @@
 from __future__ import division, unicode_literals, print_function
 
 import glob
+import hashlib
 import itertools
 import logging
 import math
@@ -13,13 +14,11 @@ import re
 import warnings
 import xml.etree.cElementTree as ET
 from collections import defaultdict
-from io import StringIO
 
 import numpy as np
 from monty.io import zopen, reverse_readfile
 from monty.json import MSONable
 from monty.json import jsanitize
-from monty.re import regrep
 from six import string_types
 from six.moves import map, zip
 
@@ -36,7 +35,8 @@ from pymatgen.electronic_structure.dos import CompleteDos, Dos
 from pymatgen.entries.computed_entries import \
     ComputedEntry, ComputedStructureEntry
 from pymatgen.io.vasp.inputs import Incar, Kpoints, Poscar, Potcar
-from pymatgen.util.io_utils import clean_lines, micro_pyawk
+from pymatgen.util.io_utils import clean_lines, open_mmap, \
+    reverse_grep, PatternScanner
 
 """
 Classes for reading/manipulating/writing VASP ouput files.
@@ -151,6 +151,161 @@ def _vasprun_float(f):
         raise e
 
 
+def _parse_varray_array(elem):
+    """
+    Parses a varray into a numpy array. Falls back to _parse_varray to deal
+    with overflowed values.
+    """
+    try:
+        return np.array([v.text.split() for v in elem], dtype=np.float)
+    except ValueError:
+        return np.array(_parse_varray(elem))
+
+
+def _parse_set_array(elem, dtype=np.float):
+    """
+    Parses all the <r> rows within a (possibly nested) <set> into a 2D numpy
+    array, converting their text with a single call. Falls back to
+    _vasprun_float to deal with overflowed values.
+    """
+    rows = [r.text for r in elem.iter("r")]
+    if not rows:
+        return np.zeros((0, 0), dtype=dtype)
+    ncols = len(rows[0].split())
+    text = " ".join(rows)
+    data = None
+    if "*" not in text:
+        data = np.fromstring(text, dtype=dtype, sep=" ")
+    if data is None or data.size != len(rows) * ncols:
+        data = np.array([_vasprun_float(f) for f in text.split()],
+                        dtype=dtype)
+    return data.reshape(len(rows), ncols)
+
+
+def _parse_atominfo(elem):
+    for a in elem.findall("array"):
+        if a.attrib["name"] == "atoms":
+            atomic_symbols = [rc.find("c").text.strip()
+                              for rc in a.find("set")]
+        elif a.attrib["name"] == "atomtypes":
+            potcar_symbols = [rc.findall("c")[4].text.strip()
+                              for rc in a.find("set")]
+
+    # ensure atomic symbols are valid elements
+    def parse_atomic_symbol(symbol):
+        try:
+            return str(Element(symbol))
+        # vasprun.xml uses X instead of Xe for xenon
+        except ValueError as e:
+            if symbol == "X":
+                return "Xe"
+            elif symbol == "r":
+                return "Zr"
+            raise e
+
+    elem.clear()
+    return [parse_atomic_symbol(sym) for
+            sym in atomic_symbols], potcar_symbols
+
+
+def _parse_ionic_step_fields(elem, fields, atomic_symbols):
+    """
+    Parses only the selected fields of a calculation element. Energies are
+    returned as floats, varrays (e.g., "forces" and "stress") as well as the
+    "lattice" and "frac_coords" of the structure as numpy arrays. The
+    "structure" and "electronic_steps" fields are returned as a Structure
+    and a list of dicts, as in Vasprun.ionic_steps.
+    """
+    istep = {}
+    energy = elem.find("energy")
+    if energy is not None:
+        for i in energy.findall("i"):
+            if i.attrib["name"] in fields:
+                istep[i.attrib["name"]] = _vasprun_float(i.text)
+    for va in elem.findall("varray"):
+        if va.attrib["name"] in fields:
+            istep[va.attrib["name"]] = _parse_varray_array(va)
+    s = elem.find("structure")
+    if s is not None and fields.intersection(
+            ["lattice", "frac_coords", "structure"]):
+        latt = _parse_varray_array(s.find("crystal").find("varray"))
+        pos = _parse_varray_array(s.find("varray"))
+        if "lattice" in fields:
+            istep["lattice"] = latt
+        if "frac_coords" in fields:
+            istep["frac_coords"] = pos
+        if "structure" in fields:
+            istep["structure"] = Structure(latt, atomic_symbols, pos)
+    if "electronic_steps" in fields:
+        esteps = []
+        for scstep in elem.findall("scstep"):
+            try:
+                esteps.append({i.attrib["name"]: _vasprun_float(i.text)
+                               for i in scstep.find("energy").findall("i")})
+            except AttributeError:  # not all calculations have an energy
+                pass
+        istep["electronic_steps"] = esteps
+    return istep
+
+
+def iter_ionic_steps(filename, fields=None, ionic_step_skip=None,
+                     ionic_step_offset=0):
+    """
+    Iterates over the ionic steps of a vasprun.xml file, parsing a single
+    ionic step at a time. The XML of each step is released as soon as it
+    has been parsed, so that the memory usage is independent of the number
+    of ionic steps. This is useful to process very long MD runs, for which
+    even a Vasprun with ionic_step_fields set may be too much.
+
+    Args:
+        filename (str): Filename to parse.
+        fields ([str]): Fields to parse for each ionic step. Supported are
+            the energies ("e_fr_energy", "e_wo_entrp", "e_0_energy"), the
+            varrays of the calculation ("forces", "stress"), "lattice" and
+            "frac_coords" for the structure as numpy arrays, "structure" for
+            a Structure object and "electronic_steps". Defaults to None,
+            meaning the energies, "forces", "stress", "lattice" and
+            "frac_coords".
+        ionic_step_skip (int): Only every ionic_step_skip ionic steps are
+            parsed. See Vasprun.
+        ionic_step_offset (int): Index of the first ionic step parsed. See
+            Vasprun.
+
+    Yields:
+        Dict of the selected fields of each ionic step. Energies are floats
+        and all other numerical data are numpy arrays.
+    """
+    if fields is None:
+        fields = {"e_fr_energy", "e_wo_entrp", "e_0_energy", "forces",
+                  "stress", "lattice", "frac_coords"}
+    fields = set(fields)
+    skip = int(ionic_step_skip or 1)
+    atomic_symbols = None
+    nsteps = 0
+    selected = True
+    with zopen(filename, "rt") as f:
+        context = ET.iterparse(f, events=("start", "end"))
+        root = None
+        for event, elem in context:
+            if root is None:
+                root = elem
+            if elem.tag != "calculation":
+                if event == "end" and elem.tag == "atominfo":
+                    atomic_symbols = _parse_atominfo(elem)[0]
+                continue
+            if event == "start":
+                selected = nsteps >= ionic_step_offset and \
+                    (nsteps - ionic_step_offset) % skip == 0
+                nsteps += 1
+                continue
+            istep = _parse_ionic_step_fields(elem, fields, atomic_symbols) \
+                if selected else None
+            # Release the XML of all elements parsed so far.
+            root.clear()
+            if istep is not None:
+                yield istep
+
+
 class Vasprun(MSONable):
     """
     Vastly improved cElementTree-based parser for vasprun.xml files. Uses
@@ -184,6 +339,9 @@ class Vasprun(MSONable):
             eigenvalues. Defaults to False. Set to True to obtain projected
             eigenvalues. **Note that this can take an extreme amount of time
             and memory.** So use this wisely.
+        projected_eigen_dtype: numpy dtype in which the projected
+            eigenvalues are stored. Defaults to np.float. Set to np.float32
+            to halve the memory needed for large projections.
         parse_potcar_file (bool/str): Whether to parse the potcar file to read
             the potcar hashes for the potcar_spec attribute. Defaults to True,
             where no hashes will be determined and the potcar_spec dictionaries
@@ -198,6 +356,20 @@ class Vasprun(MSONable):
             proper vasprun.xml are parsed. You can set to False if you want
             partial results (e.g., if you are monitoring a calculation during a
             run), but use the results with care. A warning is issued.
+        ionic_step_fields ([str]): Fields to parse for all but the last ionic
+            step, which is always parsed completely. Supported are the
+            energies ("e_fr_energy", "e_wo_entrp", "e_0_energy"), the varrays
+            of the calculation ("forces", "stress"), "lattice" and
+            "frac_coords" of the structure, "structure" and
+            "electronic_steps". Numerical fields are stored as numpy arrays
+            in ionic_step_arrays instead of the ionic_steps dicts, which
+            only contain "structure" and "electronic_steps". Defaults to
+            None, which means all fields are parsed into ionic_steps as
+            usual. Setting this for long MD runs, e.g., to ["e_fr_energy",
+            "frac_coords"], saves a lot of time and memory. Note that
+            structures then requires either "structure" or both "lattice"
+            and "frac_coords", and that as_dict is not available. See also
+            iter_ionic_steps.
 
     **Vasp results**
 
@@ -208,9 +380,19 @@ class Vasprun(MSONable):
         "electronic_steps": {All electronic step data in vasprun file},
         "stresses": stress matrix}
 
+    .. attribute:: ionic_step_arrays
+
+        Available only if ionic_step_fields is set. Dict of the numerical
+        ionic_step_fields, e.g., {"e_fr_energy": array of nsteps energies,
+        "frac_coords": nsteps x nsites x 3 array}, including the last ionic
+        step.
+
     .. attribute:: structures
 
-        List of Structure objects for the structure at each ionic step.
+        List of Structure objects for the structure at each ionic step. If
+        ionic_step_fields is set, they are created from the "lattice" and
+        "frac_coords" ionic_step_arrays on demand, and a ValueError is
+        raised if neither these nor "structure" were parsed.
 
     .. attribute:: tdos
 
@@ -347,36 +529,21 @@ class Vasprun(MSONable):
                  ionic_step_offset=0, parse_dos=True,
                  parse_eigen=True, parse_projected_eigen=False,
                  parse_potcar_file=True, occu_tol=1e-8,
-                 exception_on_bad_xml=True):
+                 exception_on_bad_xml=True, ionic_step_fields=None,
+                 projected_eigen_dtype=np.float):
         self.filename = filename
+        self.projected_eigen_dtype = projected_eigen_dtype
         self.ionic_step_skip = ionic_step_skip
         self.ionic_step_offset = ionic_step_offset
+        self.ionic_step_fields = set(ionic_step_fields) \
+            if ionic_step_fields is not None else None
         self.occu_tol = occu_tol
         self.exception_on_bad_xml = exception_on_bad_xml
 
         with zopen(filename, "rt") as f:
-            if ionic_step_skip or ionic_step_offset:
-                # remove parts of the xml file and parse the string
-                run = f.read()
-                steps = run.split("<calculation>")
-                # The text before the first <calculation> is the preamble!
-                preamble = steps.pop(0)
-                self.nionic_steps = len(steps)
-                new_steps = steps[ionic_step_offset::int(ionic_step_skip)]
-                # add the tailing informat in the last step from the run
-                to_parse = "<calculation>".join(new_steps)
-                if steps[-1] != new_steps[-1]:
-                    to_parse = "{}<calculation>{}{}".format(
-                        preamble, to_parse,
-                        steps[-1].split("</calculation>")[-1])
-                else:
-                    to_parse = "{}<calculation>{}".format(preamble, to_parse)
-                self._parse(StringIO(to_parse), parse_dos=parse_dos,
-                            parse_eigen=parse_eigen,
-                            parse_projected_eigen=parse_projected_eigen)
-            else:
-                self._parse(f, parse_dos=parse_dos, parse_eigen=parse_eigen,
-                            parse_projected_eigen=parse_projected_eigen)
+            self._parse(f, parse_dos=parse_dos, parse_eigen=parse_eigen,
+                        parse_projected_eigen=parse_projected_eigen)
+            if not (ionic_step_skip or ionic_step_offset):
                 self.nionic_steps = len(self.ionic_steps)
 
             if parse_potcar_file:
@@ -394,11 +561,35 @@ class Vasprun(MSONable):
         self.eigenvalues = None
         self.projected_eigenvalues = None
         self.other_dielectric = {}
+        self.ionic_step_arrays = {}
+        self._narray_steps = 0
         ionic_steps = []
         parsed_header = False
+        # Skipped ionic steps are detected from the start events of the
+        # calculations, and everything within them is ignored.
+        skip = int(self.ionic_step_skip or 1)
+        offset = self.ionic_step_offset
+        events = ("start", "end") if skip > 1 or offset else ("end",)
+        ncalculations = 0
+        in_skipped_step = False
+        # With ionic_step_fields, the last calculation is kept until the end
+        # to be parsed completely.
+        last_calculation = None
         try:
-            for event, elem in ET.iterparse(stream):
+            for event, elem in ET.iterparse(stream, events=events):
                 tag = elem.tag
+                if event == "start":
+                    if tag == "calculation":
+                        in_skipped_step = ncalculations < offset or \
+                            (ncalculations - offset) % skip != 0
+                        ncalculations += 1
+                    continue
+                if in_skipped_step:
+                    if tag == "calculation":
+                        parsed_header = True
+                        in_skipped_step = False
+                    elem.clear()
+                    continue
                 if not parsed_header:
                     if tag == "generator":
                         self.generator = self._parse_params(elem)
@@ -415,16 +606,23 @@ class Vasprun(MSONable):
                         self.initial_structure = self._parse_structure(elem)
                     elif tag == "atominfo":
                         self.atomic_symbols, self.potcar_symbols = \
-                            self._parse_atominfo(elem)
+                            _parse_atominfo(elem)
                         self.potcar_spec = [{"titel": p,
                                              "hash": None} for
                                             p in self.potcar_symbols]
                 if tag == "calculation":
                     parsed_header = True
-                    if not self.parameters.get("LCHIMAG", False):
+                    if self.parameters.get("LCHIMAG", False):
+                        ionic_steps.extend(
+                            self._parse_chemical_shift_calculation(elem))
+                    elif self.ionic_step_fields is None:
                         ionic_steps.append(self._parse_calculation(elem))
                     else:
-                        ionic_steps.extend(self._parse_chemical_shift_calculation(elem))
+                        if last_calculation is not None:
+                            ionic_steps.append(
+                                self._parse_calculation_fields(
+                                    last_calculation))
+                        last_calculation = elem
                 elif parse_dos and tag == "dos":
                     try:
                         self.tdos, self.idos, self.pdos = self._parse_dos(elem)
@@ -436,7 +634,7 @@ class Vasprun(MSONable):
                     self.eigenvalues = self._parse_eigen(elem)
                 elif parse_projected_eigen and tag == "projected":
                     self.projected_eigenvalues = self._parse_projected_eigen(
-                        elem)
+                        elem, dtype=self.projected_eigen_dtype)
                 elif tag == "dielectricfunction":
                     if ("comment" not in elem.attrib) or \
                        elem.attrib["comment"] == "INVERSE MACROSCOPIC DIELECTRIC TENSOR (including local field effects in RPA (Hartree))":
@@ -467,12 +665,64 @@ class Vasprun(MSONable):
                 warnings.warn(
                     "XML is malformed. Parsing has stopped but partial data"
                     "is available.", UserWarning)
+        if last_calculation is not None:
+            self._parse_calculation_fields(last_calculation, clear=False)
+            ionic_steps.append(self._parse_calculation(last_calculation))
+        self.ionic_step_arrays = {k: v[:self._narray_steps] for k, v in
+                                  self.ionic_step_arrays.items()}
         self.ionic_steps = ionic_steps
+        if skip > 1 or offset:
+            self.nionic_steps = ncalculations
         self.vasp_version = self.generator["version"]
 
+    def _parse_calculation_fields(self, elem, clear=True):
+        """
+        Parses the ionic_step_fields of a calculation. Numerical data are
+        stored in ionic_step_arrays, which are preallocated from the number
+        of ionic steps expected from NSW and grown as needed. Returns a dict
+        with the remaining fields, i.e., "structure" and "electronic_steps".
+        """
+        istep = _parse_ionic_step_fields(elem, self.ionic_step_fields,
+                                         self.atomic_symbols)
+        if clear:
+            elem.clear()
+        n = self._narray_steps
+        for k in list(istep.keys()):
+            if k in ("structure", "electronic_steps"):
+                continue
+            v = np.asarray(istep.pop(k))
+            arr = self.ionic_step_arrays.get(k)
+            if arr is None:
+                skip = int(self.ionic_step_skip or 1)
+                nsw = max(self.parameters.get("NSW", 0), 1)
+                size = max(n + 1, int(np.ceil(
+                    (nsw - self.ionic_step_offset) / skip)))
+                arr = np.full((size,) + v.shape, np.nan)
+            elif n >= len(arr):
+                arr = np.concatenate([arr, np.full(arr.shape, np.nan)])
+            arr[n] = v
+            self.ionic_step_arrays[k] = arr
+        self._narray_steps = n + 1
+        return istep
+
     @property
     def structures(self):
-        return [step["structure"] for step in self.ionic_steps]
+        if self.ionic_step_fields is not None and \
+                "structure" not in self.ionic_step_fields and \
+                "lattice" in self.ionic_step_arrays and \
+                "frac_coords" in self.ionic_step_arrays:
+            # Structures are only created when requested.
+            return [Structure(latt, self.atomic_symbols, fcoords)
+                    for latt, fcoords in zip(
+                        self.ionic_step_arrays["lattice"],
+                        self.ionic_step_arrays["frac_coords"])]
+        if self.ionic_step_fields is not None and any(
+                "structure" not in step for step in self.ionic_steps[:-1]):
+            raise ValueError(
+                "The structures of the ionic steps are not available since "
+                "ionic_step_fields includes neither \"structure\" nor "
+                "\"lattice\" and \"frac_coords\".")
+        return [step.get("structure") for step in self.ionic_steps]
 
     @property
     def epsilon_static(self):
@@ -834,8 +1084,14 @@ class Vasprun(MSONable):
 
     def as_dict(self):
         """
-        Json-serializable dict representation.
+        Json-serializable dict representation. Not available if
+        ionic_step_fields is set and there is more than one ionic step,
+        since the ionic_steps are then incomplete.
         """
+        if self.ionic_step_fields is not None and len(self.ionic_steps) > 1:
+            raise ValueError("as_dict requires the complete ionic_steps. "
+                             "Parse the vasprun.xml without "
+                             "ionic_step_fields.")
         d = {"vasp_version": self.vasp_version,
              "has_vasp_completed": self.converged,
              "nsites": len(self.final_structure)}
@@ -933,31 +1189,6 @@ class Vasprun(MSONable):
         elem.clear()
         return Incar(params)
 
-    def _parse_atominfo(self, elem):
-        for a in elem.findall("array"):
-            if a.attrib["name"] == "atoms":
-                atomic_symbols = [rc.find("c").text.strip()
-                                  for rc in a.find("set")]
-            elif a.attrib["name"] == "atomtypes":
-                potcar_symbols = [rc.findall("c")[4].text.strip()
-                                  for rc in a.find("set")]
-
-        # ensure atomic symbols are valid elements
-        def parse_atomic_symbol(symbol):
-            try:
-                return str(Element(symbol))
-            # vasprun.xml uses X instead of Xe for xenon
-            except ValueError as e:
-                if symbol == "X":
-                    return "Xe"
-                elif symbol == "r":
-                    return "Zr"
-                raise e
-
-        elem.clear()
-        return [parse_atomic_symbol(sym) for
-                sym in atomic_symbols], potcar_symbols
-
     def _parse_kpoints(self, elem):
         e = elem
         if elem.find("generation"):
@@ -1070,7 +1301,7 @@ class Vasprun(MSONable):
         idensities = {}
 
         for s in elem.find("total").find("array").find("set").findall("set"):
-            data = np.array(_parse_varray(s))
+            data = _parse_set_array(s)
             energies = data[:, 0]
             spin = Spin.up if s.attrib["comment"] == "spin 1" else Spin.down
             tdensities[spin] = data[:, 1]
@@ -1088,7 +1319,7 @@ class Vasprun(MSONable):
                 for ss in s.findall("set"):
                     spin = Spin.up if ss.attrib["comment"] == "spin 1" else \
                         Spin.down
-                    data = np.array(_parse_varray(ss))
+                    data = _parse_set_array(ss)
                     nrow, ncol = data.shape
                     for j in range(1, ncol):
                         if lm:
@@ -1102,30 +1333,38 @@ class Vasprun(MSONable):
             Dos(efermi, energies, idensities), pdoss
 
     def _parse_eigen(self, elem):
-        eigenvalues = defaultdict(list)
+        eigenvalues = {}
         for s in elem.find("array").find("set").findall("set"):
             spin = Spin.up if s.attrib["comment"] == "spin 1" else Spin.down
-            for ss in s.findall("set"):
-                eigenvalues[spin].append(_parse_varray(ss))
-        eigenvalues = {spin: np.array(v) for spin, v in eigenvalues.items()}
+            # all the kpoints of a spin are converted at once, as a
+            # (nkpoints, nbands, 2) array of eigenvalues and occupations
+            data = _parse_set_array(s)
+            eigenvalues[spin] = data.reshape(len(s.findall("set")), -1,
+                                             data.shape[1])
         elem.clear()
         return eigenvalues
 
-    def _parse_projected_eigen(self, elem):
+    def _parse_projected_eigen(self, elem, dtype=np.float):
         root = elem.find("array").find("set")
-        proj_eigen = defaultdict(list)
+        proj_eigen = {}
         for s in root.findall("set"):
             spin = int(re.match("spin(\d+)", s.attrib["comment"]).group(1))
 
             # Force spin to be +1 or -1
             spin = Spin.up if spin == 1 else Spin.down
-            for kpt, ss in enumerate(s.findall("set")):
-                dk = []
-                for band, sss in enumerate(ss.findall("set")):
-                    db = _parse_varray(sss)
-                    dk.append(db)
-                proj_eigen[spin].append(dk)
-        proj_eigen = {spin: np.array(v) for spin, v in proj_eigen.items()}
+            # each kpoint is converted at once and written in a preallocated
+            # (nkpoints, nbands, nions, norbitals) array
+            kpoints = s.findall("set")
+            data = None
+            for kpt, ss in enumerate(kpoints):
+                dk = _parse_set_array(ss, dtype=dtype)
+                if data is None:
+                    nbands = len(ss.findall("set"))
+                    data = np.empty((len(kpoints), nbands,
+                                     len(dk) // nbands, dk.shape[1]),
+                                    dtype=dtype)
+                data[kpt] = dk.reshape(data.shape[1:])
+            proj_eigen[spin] = data
         elem.clear()
         return proj_eigen
 
@@ -1154,9 +1393,11 @@ class BSVasprun(Vasprun):
     """
 
     def __init__(self, filename, parse_projected_eigen=False,
-                 parse_potcar_file=False, occu_tol=1e-8):
+                 parse_potcar_file=False, occu_tol=1e-8,
+                 projected_eigen_dtype=np.float):
         self.filename = filename
         self.occu_tol = occu_tol
+        self.projected_eigen_dtype = projected_eigen_dtype
 
         with zopen(filename, "rt") as f:
             self.efermi = None
@@ -1178,7 +1419,7 @@ class BSVasprun(Vasprun):
                         self.parameters = self._parse_params(elem)
                     elif tag == "atominfo":
                         self.atomic_symbols, self.potcar_symbols = \
-                            self._parse_atominfo(elem)
+                            _parse_atominfo(elem)
                         self.potcar_spec = [{"titel": p,
                                              "hash": None} for
                                             p in self.potcar_symbols]
@@ -1189,7 +1430,7 @@ class BSVasprun(Vasprun):
                     self.eigenvalues = self._parse_eigen(elem)
                 elif parse_projected_eigen and tag == "projected":
                     self.projected_eigenvalues = self._parse_projected_eigen(
-                        elem)
+                        elem, dtype=self.projected_eigen_dtype)
                 elif tag == "structure" and elem.attrib.get("name") == \
                         "finalpos":
                     self.final_structure = self._parse_structure(elem)
@@ -1282,6 +1523,8 @@ class Outcar(MSONable):
 
     Args:
         filename (str): OUTCAR filename to parse.
+        properties (list): Properties to read at once with read_properties,
+            e.g. ["elastic_tensor", "piezo_tensor"]. Defaults to None.
 
     .. attribute:: magnetization
 
@@ -1329,10 +1572,13 @@ class Outcar(MSONable):
 
     See the documentation of those methods for more documentation.
 
+    Each reader scans the whole OUTCAR. To read several properties of a large
+    OUTCAR, use read_properties(), which runs the readers in a single pass.
+
     Authors: Rickard Armiento, Shyue Ping Ong
     """
 
-    def __init__(self, filename):
+    def __init__(self, filename, properties=None):
         self.filename = filename
         self.is_stopped = False
 
@@ -1352,82 +1598,112 @@ class Outcar(MSONable):
         mag_patt = re.compile("number of electron\s+\S+\s+magnetization\s+(\S+)")
         toten_pattern = re.compile("free  energy   TOTEN\s+=\s+([\d\-\.]+)")
 
-        all_lines = []
-        for line in reverse_readfile(self.filename):
-            clean = line.strip()
-            all_lines.append(clean)
-            if clean.find("soft stop encountered!  aborting job") != -1:
-                self.is_stopped = True
-            else:
-                if time_patt.search(line):
-                    tok = line.strip().split(":")
-                    run_stats[tok[0].strip()] = float(tok[1].strip())
-                    continue
-                m = efermi_patt.search(clean)
-                if m:
-                    try:
-                        # try-catch because VASP sometimes prints
-                        # 'E-fermi: ********     XC(G=0):  -6.1327
-                        # alpha+bet : -1.8238'
-                        efermi = float(m.group(1))
-                        continue
-                    except ValueError:
-                        efermi = None
+        stop_msg = "soft stop encountered!  aborting job"
+        with open_mmap(self.filename) as text:
+            # Only the lines matching one of the patterns are read, which
+            # gives the same results as reading all the lines since the
+            # other lines only test if all the data was found.
+            start = 0
+            for offset, line in reverse_grep(
+                    text, [stop_msg, time_patt.pattern, efermi_patt.pattern,
+                           nelect_patt.pattern, toten_pattern.pattern]):
+                clean = line.strip()
+                if clean.find(stop_msg) != -1:
+                    self.is_stopped = True
+                else:
+                    if time_patt.search(line):
+                        tok = line.strip().split(":")
+                        run_stats[tok[0].strip()] = float(tok[1].strip())
                         continue
-                m = nelect_patt.search(clean)
-                if m:
-                    nelect = float(m.group(1))
-                m = mag_patt.search(clean)
-                if m:
-                    total_mag = float(m.group(1))
-                if total_energy is None:
-                    m = toten_pattern.search(clean)
+                    m = efermi_patt.search(clean)
                     if m:
-                        total_energy = float(m.group(1))
-            if all([nelect, total_mag is not None, efermi is not None,
-                    run_stats]):
-                break
-
-        # For single atom systems, VASP doesn't print a total line, so
-        # reverse parsing is very difficult
-        read_charge = False
-        read_mag = False
-        all_lines.reverse()
-        for clean in all_lines:
-            if read_charge or read_mag:
-                if clean.startswith("# of ion"):
-                    header = re.split("\s{2,}", clean.strip())
-                    header.pop(0)
-                else:
-                    m = re.match("\s*(\d+)\s+(([\d\.\-]+)\s+)+", clean)
+                        try:
+                            # try-catch because VASP sometimes prints
+                            # 'E-fermi: ********     XC(G=0):  -6.1327
+                            # alpha+bet : -1.8238'
+                            efermi = float(m.group(1))
+                            continue
+                        except ValueError:
+                            efermi = None
+                            continue
+                    m = nelect_patt.search(clean)
                     if m:
-                        toks = [float(i)
-                                for i in re.findall("[\d\.\-]+", clean)]
-                        toks.pop(0)
-                        if read_charge:
-                            charge.append(dict(zip(header, toks)))
-                        else:
-                            mag.append(dict(zip(header, toks)))
-                    elif clean.startswith('tot'):
-                        read_charge = False
-                        read_mag = False
-            if clean == "total charge":
-                charge = []
-                read_charge = True
-                read_mag = False
-            elif clean == "magnetization (x)":
-                mag = []
-                read_mag = True
-                read_charge = False
-
-        # data from beginning of OUTCAR
-        run_stats['cores'] = 0
-        with zopen(filename, "rt") as f:
-            for line in f:
-                if "running" in line:
-                    run_stats['cores'] = line.split()[2]
+                        nelect = float(m.group(1))
+                    m = mag_patt.search(clean)
+                    if m:
+                        total_mag = float(m.group(1))
+                    if total_energy is None:
+                        m = toten_pattern.search(clean)
+                        if m:
+                            total_energy = float(m.group(1))
+                if all([nelect, total_mag is not None, efermi is not None,
+                        run_stats]):
+                    start = offset
                     break
 
+            # The charges and magnetizations are in the last "total charge"
+            # and "magnetization (x)" sections after the lines read above.
+            # For single atom systems, VASP doesn't print a total line, so
+            # reverse parsing is very difficult
+            sections = []
+            for title in [b"total charge", b"magnetization (x)"]:
+                i = text.rfind(title, start)
+                while i != -1:
+                    line_start = text.rfind(b"\n", 0, i) + 1
+                    line_end = text.find(b"\n", i)
+                    if line_end == -1:
+                        line_end = len(text)
+                    if text[line_start:line_end].strip() == title:
+                        sections.append(line_start)
+                        break
+                    i = text.rfind(title, start, i)
+            read_charge = False
+            read_mag = False
+            pos = min(sections) if sections else len(text)
+            while pos < len(text):
+                line_end = text.find(b"\n", pos)
+                if line_end == -1:
+                    line_end = len(text)
+                clean = text[pos:line_end].decode("utf-8").strip()
+                if read_charge or read_mag:
+                    if clean.startswith("# of ion"):
+                        header = re.split("\s{2,}", clean.strip())
+                        header.pop(0)
+                    else:
+                        m = re.match("\s*(\d+)\s+(([\d\.\-]+)\s+)+", clean)
+                        if m:
+                            toks = [float(i)
+                                    for i in re.findall("[\d\.\-]+", clean)]
+                            toks.pop(0)
+                            if read_charge:
+                                charge.append(dict(zip(header, toks)))
+                            else:
+                                mag.append(dict(zip(header, toks)))
+                        elif clean.startswith('tot'):
+                            read_charge = False
+                            read_mag = False
+                if clean == "total charge":
+                    charge = []
+                    read_charge = True
+                    read_mag = False
+                elif clean == "magnetization (x)":
+                    mag = []
+                    read_mag = True
+                    read_charge = False
+                elif not (read_charge or read_mag) and pos >= max(sections):
+                    break
+                pos = line_end + 1
+
+            # data from beginning of OUTCAR
+            run_stats['cores'] = 0
+            i = text.find(b"running")
+            if i != -1:
+                line_end = text.find(b"\n", i)
+                if line_end == -1:
+                    line_end = len(text)
+                line = text[text.rfind(b"\n", 0, i) + 1:line_end]
+                run_stats['cores'] = line.decode("utf-8").split()[2]
+
         self.run_stats = run_stats
         self.magnetization = tuple(mag)
         self.charge = tuple(charge)
@@ -1440,16 +1716,52 @@ class Outcar(MSONable):
         # Check to see if LEPSILON is true and read piezo data if so
         self.lepsilon = False
         self.read_pattern({'epsilon': 'LEPSILON=     T'})
+        properties = list(properties or [])
         if self.data.get('epsilon',[]):
             self.lepsilon = True
-            self.read_lepsilon()
-            self.read_lepsilon_ionic()
+            properties = ["lepsilon", "lepsilon_ionic"] + [
+                p for p in properties if p not in ["lepsilon",
+                                                   "lepsilon_ionic"]]
+        if properties:
+            self.read_properties(properties)
+
+    def read_properties(self, properties):
+        """
+        Reads several properties in a single pass over the OUTCAR, instead of
+        one pass per reader.
+
+        Args:
+            properties (list): Properties to read, given by the names of the
+                readers without the "read_" prefix, i.e. "pattern",
+                "table_pattern", "chemical_shifts", "nmr_efg",
+                "elastic_tensor", "piezo_tensor", "corrections", "neb",
+                "igpar", "lepsilon", "lepsilon_ionic", "lcalcpol" and
+                "core_state_eigen". Arguments of a reader are passed with a
+                (name, kwargs) tuple, e.g.
+                ("pattern", {"patterns": {"efermi": "E-fermi\s*:\s*(\S+)"}}).
+
+        Returns:
+            List of the values returned by the readers.
+        """
+        scanner = PatternScanner(self.filename)
+        finishers = []
+        for prop in properties:
+            name, kwargs = (prop, {}) if isinstance(prop, string_types) \
+                else prop
+            scan = getattr(self, "_scan_" + name, None)
+            if scan is None:
+                raise ValueError("%s cannot be read with read_properties."
+                                 % name)
+            finishers.append(scan(scanner, **kwargs))
+        scanner.run()
+        return [finish() for finish in finishers]
 
     def read_pattern(self, patterns, reverse=False, terminate_on_match=False,
                      postprocess=str):
         """
-        General pattern reading. Uses monty's regrep method. Takes the same
-        arguments.
+        General pattern reading. Takes the same arguments as monty's regrep
+        method and gives the same results as its version 0.9.6, see
+        pymatgen.util.io_utils.PatternScanner.
 
         Args:
             patterns (dict): A dict of patterns, e.g.,
@@ -1469,11 +1781,20 @@ class Outcar(MSONable):
             results from regex and postprocess. Note that the returned values
             are lists of lists, because you can grep multiple items on one line.
         """
-        matches = regrep(self.filename, patterns, reverse=reverse,
-                         terminate_on_match=terminate_on_match,
-                         postprocess=postprocess)
-        for k in patterns.keys():
-            self.data[k] = [i[0] for i in matches.get(k, [])]
+        self.read_properties([("pattern", dict(
+            patterns=patterns, reverse=reverse,
+            terminate_on_match=terminate_on_match, postprocess=postprocess))])
+
+    def _scan_pattern(self, scanner, patterns, reverse=False,
+                      terminate_on_match=False, postprocess=str):
+        matches = scanner.add_patterns(patterns, reverse=reverse,
+                                       terminate_on_match=terminate_on_match,
+                                       postprocess=postprocess)
+
+        def finish():
+            for k in patterns.keys():
+                self.data[k] = [i[0] for i in matches.get(k, [])]
+        return finish
 
     def read_table_pattern(self, header_pattern, row_pattern, footer_pattern,
                            postprocess=str, attribute_name=None,
@@ -1511,32 +1832,43 @@ class Outcar(MSONable):
             row_pattern, or a dict in case that named capturing groups are defined by
             row_pattern.
         """
-        with zopen(self.filename, 'rt') as f:
-            text = f.read()
+        return self.read_properties([("table_pattern", dict(
+            header_pattern=header_pattern, row_pattern=row_pattern,
+            footer_pattern=footer_pattern, postprocess=postprocess,
+            attribute_name=attribute_name,
+            last_one_only=last_one_only))])[0]
+
+    def _scan_table_pattern(self, scanner, header_pattern, row_pattern,
+                            footer_pattern, postprocess=str,
+                            attribute_name=None, last_one_only=True):
         table_pattern_text = header_pattern + r"\s*^(?P<table_body>(?:\s+" + \
                              row_pattern + r")+)\s+" + footer_pattern
-        table_pattern = re.compile(table_pattern_text, re.MULTILINE | re.DOTALL)
+        matches = scanner.add_multiline_pattern(table_pattern_text)
         rp = re.compile(row_pattern)
-        tables = []
-        for mt in table_pattern.finditer(text):
-            table_body_text = mt.group("table_body")
-            table_contents = []
-            for line in table_body_text.split("\n"):
-                ml = rp.search(line)
-                d = ml.groupdict()
-                if len(d) > 0:
-                    processed_line = {k: postprocess(v) for k, v in d.items()}
-                else:
-                    processed_line = [postprocess(v) for v in ml.groups()]
-                table_contents.append(processed_line)
-            tables.append(table_contents)
-        if last_one_only:
-            retained_data = tables[-1]
-        else:
-            retained_data = tables
-        if attribute_name is not None:
-            self.data[attribute_name] = retained_data
-        return retained_data
+
+        def finish():
+            tables = []
+            for mt in matches:
+                table_body_text = mt["table_body"]
+                table_contents = []
+                for line in table_body_text.split("\n"):
+                    ml = rp.search(line)
+                    d = ml.groupdict()
+                    if len(d) > 0:
+                        processed_line = {k: postprocess(v)
+                                          for k, v in d.items()}
+                    else:
+                        processed_line = [postprocess(v) for v in ml.groups()]
+                    table_contents.append(processed_line)
+                tables.append(table_contents)
+            if last_one_only:
+                retained_data = tables[-1]
+            else:
+                retained_data = tables
+            if attribute_name is not None:
+                self.data[attribute_name] = retained_data
+            return retained_data
+        return finish
 
     def read_freq_dielectric(self):
         """
@@ -1587,6 +1919,9 @@ class Outcar(MSONable):
         Returns:
             List of chemical shifts in the order of atoms from the OUTCAR. Maryland notation is adopted.
         """
+        self.read_properties(["chemical_shifts"])
+
+    def _scan_chemical_shifts(self, scanner):
         header_pattern = r"\s+CSA tensor \(J\. Mason, Solid State Nucl\. Magn\. Reson\. 2, " \
                          r"285 \(1993\)\)\s+" \
                          r"\s+-{50,}\s+" \
@@ -1600,22 +1935,26 @@ class Outcar(MSONable):
             [r"([-]?\d+\.\d+)"] * 3)
         footer_pattern = "-{50,}\s*$"
         h1 = header_pattern + first_part_pattern
-        cs_valence_only = self.read_table_pattern(
-            h1, row_pattern, footer_pattern, postprocess=float,
+        read_valence_only = self._scan_table_pattern(
+            scanner, h1, row_pattern, footer_pattern, postprocess=float,
             last_one_only=True)
         h2 = header_pattern + swallon_valence_body_pattern
-        cs_valence_and_core = self.read_table_pattern(
-            h2, row_pattern, footer_pattern, postprocess=float,
+        read_valence_and_core = self._scan_table_pattern(
+            scanner, h2, row_pattern, footer_pattern, postprocess=float,
             last_one_only=True)
-        all_cs = {}
-        for name, cs_table in [["valence_only", cs_valence_only],
-                               ["valence_and_core", cs_valence_and_core]]:
-            cs = []
-            for sigma_iso, omega, kappa in cs_table:
-                tensor = NMRChemicalShiftNotation.from_maryland_notation(sigma_iso, omega, kappa)
-                cs.append(tensor)
-            all_cs[name] = tuple(cs)
-        self.data["chemical_shifts"] = all_cs
+
+        def finish():
+            all_cs = {}
+            for name, cs_table in [["valence_only", read_valence_only()],
+                                   ["valence_and_core",
+                                    read_valence_and_core()]]:
+                cs = []
+                for sigma_iso, omega, kappa in cs_table:
+                    tensor = NMRChemicalShiftNotation.from_maryland_notation(sigma_iso, omega, kappa)
+                    cs.append(tensor)
+                all_cs[name] = tuple(cs)
+            self.data["chemical_shifts"] = all_cs
+        return finish
 
     def read_nmr_efg(self):
         """
@@ -1625,6 +1964,9 @@ class Outcar(MSONable):
             Electric Field Gradient tensors as a list of dict in the order of atoms from OUTCAR.
             Each dict key/value pair corresponds to a component of the tensors.
         """
+        self.read_properties(["nmr_efg"])
+
+    def _scan_nmr_efg(self, scanner):
         header_pattern = r"^\s+NMR quadrupolar parameters\s+$\n" \
                          r"^\s+Cq : quadrupolar parameter\s+Cq=e[*]Q[*]V_zz/h$\n" \
                          r"^\s+eta: asymmetry parameters\s+\(V_yy - V_xx\)/ V_zz$\n" \
@@ -1635,8 +1977,10 @@ class Outcar(MSONable):
         row_pattern = r"\d+\s+(?P<cq>[-]?\d+\.\d+)\s+(?P<eta>[-]?\d+\.\d+)\s+" \
                       r"(?P<nuclear_quadrupole_moment>[-]?\d+\.\d+)"
         footer_pattern = "-{50,}\s*$"
-        self.read_table_pattern(header_pattern, row_pattern, footer_pattern, postprocess=float,
-                                last_one_only=True, attribute_name="efg")
+        return self._scan_table_pattern(scanner, header_pattern, row_pattern,
+                                        footer_pattern, postprocess=float,
+                                        last_one_only=True,
+                                        attribute_name="efg")
 
     def read_elastic_tensor(self):
         """
@@ -1645,36 +1989,51 @@ class Outcar(MSONable):
         Returns:
             6x6 array corresponding to the elastic tensor from the OUTCAR.
         """
+        self.read_properties(["elastic_tensor"])
+
+    def _scan_elastic_tensor(self, scanner):
         header_pattern = "TOTAL ELASTIC MODULI \(kBar\)\s+"\
                          "Direction\s+([X-Z][X-Z]\s+)+"\
                          "\-+"
         row_pattern = "[X-Z][X-Z]\s+"+"\s+".join(["(\-*[\.\d]+)"] * 6)
         footer_pattern = "\-+"
-        et_table = self.read_table_pattern(header_pattern, row_pattern, 
-                                           footer_pattern, postprocess=float)
-        self.data["elastic_tensor"] = et_table
+        return self._scan_table_pattern(scanner, header_pattern, row_pattern,
+                                        footer_pattern, postprocess=float,
+                                        attribute_name="elastic_tensor")
 
     def read_piezo_tensor(self):
         """
         Parse the piezo tensor data
         """
+        self.read_properties(["piezo_tensor"])
+
+    def _scan_piezo_tensor(self, scanner):
         header_pattern = "PIEZOELECTRIC TENSOR  for field in x, y, z\s+\(C/m\^2\)\s+" \
                          "([X-Z][X-Z]\s+)+" \
                          "\-+"
         row_pattern = "[x-z]\s+"+"\s+".join(["(\-*[\.\d]+)"] * 6)
         footer_pattern = "BORN EFFECTIVE"
-        pt_table = self.read_table_pattern(header_pattern, row_pattern,
-                                           footer_pattern, postprocess=float)
-        self.data["piezo_tensor"] = pt_table
+        return self._scan_table_pattern(scanner, header_pattern, row_pattern,
+                                        footer_pattern, postprocess=float,
+                                        attribute_name="piezo_tensor")
 
     def read_corrections(self, reverse=True, terminate_on_match=True):
+        self.read_properties([("corrections", dict(
+            reverse=reverse, terminate_on_match=terminate_on_match))])
+
+    def _scan_corrections(self, scanner, reverse=True,
+                          terminate_on_match=True):
         patterns = {
             "dipol_quadrupol_correction": "dipol\+quadrupol energy correction\s+([\d\-\.]+)"
         }
-        self.read_pattern(patterns, reverse=reverse,
-                          terminate_on_match=terminate_on_match,
-                          postprocess=float)
-        self.data["dipol_quadrupol_correction"] = self.data["dipol_quadrupol_correction"][0][0]
+        read_patterns = self._scan_pattern(
+            scanner, patterns, reverse=reverse,
+            terminate_on_match=terminate_on_match, postprocess=float)
+
+        def finish():
+            read_patterns()
+            self.data["dipol_quadrupol_correction"] = self.data["dipol_quadrupol_correction"][0][0]
+        return finish
 
     def read_neb(self, reverse=True, terminate_on_match=True):
         """
@@ -1696,19 +2055,27 @@ class Outcar(MSONable):
             energy - Final energy.
             These can be accessed under Outcar.data[key]
         """
+        self.read_properties([("neb", dict(
+            reverse=reverse, terminate_on_match=terminate_on_match))])
+
+    def _scan_neb(self, scanner, reverse=True, terminate_on_match=True):
         patterns = {
             "energy": "energy\(sigma->0\)\s+=\s+([\d\-\.]+)",
             "tangent_force": "(NEB: projections on to tangent \("
             "spring, REAL\)\s+\S+|tangential force \(eV/A\))\s+(["
             "\d\-\.]+)"
         }
-        self.read_pattern(patterns, reverse=reverse,
-                          terminate_on_match=terminate_on_match,
-                          postprocess=str)
-        self.data["energy"] = float(self.data["energy"][0][0])
-        if self.data.get("tangent_force"):
-            self.data["tangent_force"] = float(
-                self.data["tangent_force"][0][1])
+        read_patterns = self._scan_pattern(
+            scanner, patterns, reverse=reverse,
+            terminate_on_match=terminate_on_match, postprocess=str)
+
+        def finish():
+            read_patterns()
+            self.data["energy"] = float(self.data["energy"][0][0])
+            if self.data.get("tangent_force"):
+                self.data["tangent_force"] = float(
+                    self.data["tangent_force"][0][1])
+        return finish
 
     def read_igpar(self):
         """
@@ -1723,7 +2090,9 @@ class Outcar(MSONable):
         (See VASP section "LBERRY,  IGPAR,  NPPSTR,  DIPOL tags" for info on
         what these are).
         """
+        self.read_properties(["igpar"])
 
+    def _scan_igpar(self, scanner):
         # variables to be filled
         self.er_ev = {}  # will  be  dict (Spin.up/down) of array(3*float)
         self.er_bp = {}  # will  be  dics (Spin.up/down) of array(3*float)
@@ -1731,347 +2100,362 @@ class Outcar(MSONable):
         self.er_bp_tot = None  # will be array(3*float)
         self.p_elec = None
         self.p_ion = None
-        try:
-            search = []
-
-            # Nonspin cases
-            def er_ev(results, match):
-                results.er_ev[Spin.up] = np.array(map(float,
-                                                      match.groups()[1:4])) / 2
-                results.er_ev[Spin.down] = results.er_ev[Spin.up]
-                results.context = 2
-
-            search.append(["^ *e<r>_ev=\( *([-0-9.Ee+]*) *([-0-9.Ee+]*) "
-                           "*([-0-9.Ee+]*) *\)",
-                           None, er_ev])
-
-            def er_bp(results, match):
-                results.er_bp[Spin.up] = np.array([float(match.group(i))
-                                                   for i in range(1, 4)]) / 2
-                results.er_bp[Spin.down] = results.er_bp[Spin.up]
-
-            search.append(["^ *e<r>_bp=\( *([-0-9.Ee+]*) *([-0-9.Ee+]*) "
-                           "*([-0-9.Ee+]*) *\)",
-                           lambda results, line: results.context == 2, er_bp])
-
-            # Spin cases
-            def er_ev_up(results, match):
-                results.er_ev[Spin.up] = np.array([float(match.group(i))
-                                                   for i in range(1, 4)])
-                results.context = Spin.up
-
-            search.append(["^.*Spin component 1 *e<r>_ev=\( *([-0-9.Ee+]*) "
-                           "*([-0-9.Ee+]*) *([-0-9.Ee+]*) *\)",
-                           None, er_ev_up])
-
-            def er_bp_up(results, match):
-                results.er_bp[Spin.up] = np.array([float(match.group(1)),
-                                                   float(match.group(2)),
-                                                   float(match.group(3))])
-
-            search.append(["^ *e<r>_bp=\( *([-0-9.Ee+]*) *([-0-9.Ee+]*) "
-                           "*([-0-9.Ee+]*) *\)",
-                           lambda results,
-                           line: results.context == Spin.up, er_bp_up])
-
-            def er_ev_dn(results, match):
-                results.er_ev[Spin.down] = np.array([float(match.group(1)),
-                                                     float(match.group(2)),
-                                                     float(match.group(3))])
-                results.context = Spin.down
-            search.append(["^.*Spin component 2 *e<r>_ev=\( *([-0-9.Ee+]*) "
-                           "*([-0-9.Ee+]*) *([-0-9.Ee+]*) *\)",
-                           None, er_ev_dn])
-
-            def er_bp_dn(results, match):
-                results.er_bp[Spin.down] = np.array([float(match.group(i))
-                                                     for i in range(1, 4)])
-            search.append(["^ *e<r>_bp=\( *([-0-9.Ee+]*) *([-0-9.Ee+]*) "
-                           "*([-0-9.Ee+]*) *\)",
-                           lambda results,
-                           line: results.context == Spin.down, er_bp_dn])
-
-            # Always present spin/non-spin
-            def p_elc(results, match):
-                results.p_elc = np.array([float(match.group(i))
-                                          for i in range(1, 4)])
-
-            search.append(["^.*Total electronic dipole moment: "
-                           "*p\[elc\]=\( *([-0-9.Ee+]*) *([-0-9.Ee+]*) "
-                           "*([-0-9.Ee+]*) *\)", None, p_elc])
-
-            def p_ion(results, match):
-                results.p_ion = np.array([float(match.group(i))
-                                          for i in range(1, 4)])
-
-            search.append(["^.*ionic dipole moment: "
-                           "*p\[ion\]=\( *([-0-9.Ee+]*) *([-0-9.Ee+]*) "
-                           "*([-0-9.Ee+]*) *\)", None, p_ion])
-
-            self.context = None
-            self.er_ev = {Spin.up: None, Spin.down: None}
-            self.er_bp = {Spin.up: None, Spin.down: None}
-
-            micro_pyawk(self.filename, search, self)
-
-            if self.er_ev[Spin.up] is not None and \
-                    self.er_ev[Spin.down] is not None:
-                self.er_ev_tot = self.er_ev[Spin.up] + self.er_ev[Spin.down]
-
-            if self.er_bp[Spin.up] is not None and \
-                    self.er_bp[Spin.down] is not None:
-                self.er_bp_tot = self.er_bp[Spin.up] + self.er_bp[Spin.down]
-
-        except:
-            self.er_ev_tot = None
-            self.er_bp_tot = None
-            raise Exception("IGPAR OUTCAR could not be parsed.")
+        search = []
+
+        # Nonspin cases
+        def er_ev(results, match):
+            results.er_ev[Spin.up] = np.array(map(float,
+                                                  match.groups()[1:4])) / 2
+            results.er_ev[Spin.down] = results.er_ev[Spin.up]
+            results.context = 2
+
+        search.append(["^ *e<r>_ev=\( *([-0-9.Ee+]*) *([-0-9.Ee+]*) "
+                       "*([-0-9.Ee+]*) *\)",
+                       None, er_ev])
+
+        def er_bp(results, match):
+            results.er_bp[Spin.up] = np.array([float(match.group(i))
+                                               for i in range(1, 4)]) / 2
+            results.er_bp[Spin.down] = results.er_bp[Spin.up]
+
+        search.append(["^ *e<r>_bp=\( *([-0-9.Ee+]*) *([-0-9.Ee+]*) "
+                       "*([-0-9.Ee+]*) *\)",
+                       lambda results, line: results.context == 2, er_bp])
+
+        # Spin cases
+        def er_ev_up(results, match):
+            results.er_ev[Spin.up] = np.array([float(match.group(i))
+                                               for i in range(1, 4)])
+            results.context = Spin.up
+
+        search.append(["^.*Spin component 1 *e<r>_ev=\( *([-0-9.Ee+]*) "
+                       "*([-0-9.Ee+]*) *([-0-9.Ee+]*) *\)",
+                       None, er_ev_up])
+
+        def er_bp_up(results, match):
+            results.er_bp[Spin.up] = np.array([float(match.group(1)),
+                                               float(match.group(2)),
+                                               float(match.group(3))])
+
+        search.append(["^ *e<r>_bp=\( *([-0-9.Ee+]*) *([-0-9.Ee+]*) "
+                       "*([-0-9.Ee+]*) *\)",
+                       lambda results,
+                       line: results.context == Spin.up, er_bp_up])
+
+        def er_ev_dn(results, match):
+            results.er_ev[Spin.down] = np.array([float(match.group(1)),
+                                                 float(match.group(2)),
+                                                 float(match.group(3))])
+            results.context = Spin.down
+        search.append(["^.*Spin component 2 *e<r>_ev=\( *([-0-9.Ee+]*) "
+                       "*([-0-9.Ee+]*) *([-0-9.Ee+]*) *\)",
+                       None, er_ev_dn])
+
+        def er_bp_dn(results, match):
+            results.er_bp[Spin.down] = np.array([float(match.group(i))
+                                                 for i in range(1, 4)])
+        search.append(["^ *e<r>_bp=\( *([-0-9.Ee+]*) *([-0-9.Ee+]*) "
+                       "*([-0-9.Ee+]*) *\)",
+                       lambda results,
+                       line: results.context == Spin.down, er_bp_dn])
+
+        # Always present spin/non-spin
+        def p_elc(results, match):
+            results.p_elc = np.array([float(match.group(i))
+                                      for i in range(1, 4)])
+
+        search.append(["^.*Total electronic dipole moment: "
+                       "*p\[elc\]=\( *([-0-9.Ee+]*) *([-0-9.Ee+]*) "
+                       "*([-0-9.Ee+]*) *\)", None, p_elc])
+
+        def p_ion(results, match):
+            results.p_ion = np.array([float(match.group(i))
+                                      for i in range(1, 4)])
+
+        search.append(["^.*ionic dipole moment: "
+                       "*p\[ion\]=\( *([-0-9.Ee+]*) *([-0-9.Ee+]*) "
+                       "*([-0-9.Ee+]*) *\)", None, p_ion])
+
+        self.context = None
+        self.er_ev = {Spin.up: None, Spin.down: None}
+        self.er_bp = {Spin.up: None, Spin.down: None}
+        errors = scanner.add_pyawk(search, self)
+
+        def finish():
+            try:
+                if errors:
+                    raise errors[0]
+                if self.er_ev[Spin.up] is not None and \
+                        self.er_ev[Spin.down] is not None:
+                    self.er_ev_tot = self.er_ev[Spin.up] + self.er_ev[Spin.down]
+
+                if self.er_bp[Spin.up] is not None and \
+                        self.er_bp[Spin.down] is not None:
+                    self.er_bp_tot = self.er_bp[Spin.up] + self.er_bp[Spin.down]
+            except:
+                self.er_ev_tot = None
+                self.er_bp_tot = None
+                raise Exception("IGPAR OUTCAR could not be parsed.")
+        return finish
 
     def read_lepsilon(self):
-        # variables to be filled
-        try:
-            search = []
-
-            def dielectric_section_start(results, match):
-                results.dielectric_index = -1
-
-            search.append(["MACROSCOPIC STATIC DIELECTRIC TENSOR \(", None,
-                           dielectric_section_start])
-
-            def dielectric_section_start2(results, match):
-                results.dielectric_index = 0
-
-            search.append(
-                ["-------------------------------------",
-                 lambda results, line: results.dielectric_index == -1,
-                 dielectric_section_start2])
-
-            def dielectric_data(results, match):
-                results.dielectric_tensor[results.dielectric_index, :] = \
-                    np.array([float(match.group(i)) for i in range(1, 4)])
-                results.dielectric_index += 1
-
-            search.append(
-                ["^ *([-0-9.Ee+]+) +([-0-9.Ee+]+) +([-0-9.Ee+]+) *$",
-                 lambda results, line: results.dielectric_index >= 0
-                 if results.dielectric_index is not None
-                 else None,
-                 dielectric_data])
-
-            def dielectric_section_stop(results, match):
-                results.dielectric_index = None
-
-            search.append(
-                ["-------------------------------------",
-                 lambda results, line: results.dielectric_index >= 1
-                 if results.dielectric_index is not None
-                 else None,
-                 dielectric_section_stop])
-
-            self.dielectric_index = None
-            self.dielectric_tensor = np.zeros((3, 3))
-
-            def piezo_section_start(results, match):
-                results.piezo_index = 0
-
-            search.append(["PIEZOELECTRIC TENSOR  for field in x, y, z        "
-                           "\(C/m\^2\)",
-                           None, piezo_section_start])
-
-            def piezo_data(results, match):
-                results.piezo_tensor[results.piezo_index, :] = \
-                    np.array([float(match.group(i)) for i in range(1, 7)])
-                results.piezo_index += 1
-
-            search.append(
-                ["^ *[xyz] +([-0-9.Ee+]+) +([-0-9.Ee+]+)" +
-                 " +([-0-9.Ee+]+) *([-0-9.Ee+]+) +([-0-9.Ee+]+)" +
-                 " +([-0-9.Ee+]+)*$",
-                 lambda results, line: results.piezo_index >= 0
-                 if results.piezo_index is not None
-                 else None,
-                 piezo_data])
-
-            def piezo_section_stop(results, match):
-                results.piezo_index = None
-
-            search.append(
-                ["-------------------------------------",
-                 lambda results, line: results.piezo_index >= 1
-                 if results.piezo_index is not None
-                 else None,
-                 piezo_section_stop])
-
-            self.piezo_index = None
-            self.piezo_tensor = np.zeros((3, 6))
-
-            def born_section_start(results, match):
-                results.born_ion = -1
-
-            search.append(["BORN EFFECTIVE CHARGES " +
-                           "\(in e, cummulative output\)",
-                           None, born_section_start])
-
-            def born_ion(results, match):
-                results.born_ion = int(match.group(1)) - 1
-                results.born.append(np.zeros((3, 3)))
-
-            search.append(["ion +([0-9]+)", lambda results,
-                           line: results.born_ion is not None, born_ion])
-
-            def born_data(results, match):
-                results.born[results.born_ion][int(match.group(1)) - 1, :] = \
-                    np.array([float(match.group(i)) for i in range(2, 5)])
+        self.read_properties(["lepsilon"])
 
-            search.append(
-                ["^ *([1-3]+) +([-0-9.Ee+]+) +([-0-9.Ee+]+) +([-0-9.Ee+]+)$",
-                 lambda results, line: results.born_ion >= 0
-                 if results.born_ion is not None
-                 else results.born_ion,
-                 born_data])
+    def _scan_lepsilon(self, scanner):
+        # variables to be filled
+        search = []
+
+        def dielectric_section_start(results, match):
+            results.dielectric_index = -1
+
+        search.append(["MACROSCOPIC STATIC DIELECTRIC TENSOR \(", None,
+                       dielectric_section_start])
+
+        def dielectric_section_start2(results, match):
+            results.dielectric_index = 0
+
+        search.append(
+            ["-------------------------------------",
+             lambda results, line: results.dielectric_index == -1,
+             dielectric_section_start2])
+
+        def dielectric_data(results, match):
+            results.dielectric_tensor[results.dielectric_index, :] = \
+                np.array([float(match.group(i)) for i in range(1, 4)])
+            results.dielectric_index += 1
+
+        search.append(
+            ["^ *([-0-9.Ee+]+) +([-0-9.Ee+]+) +([-0-9.Ee+]+) *$",
+             lambda results, line: results.dielectric_index >= 0
+             if results.dielectric_index is not None
+             else None,
+             dielectric_data])
+
+        def dielectric_section_stop(results, match):
+            results.dielectric_index = None
+
+        search.append(
+            ["-------------------------------------",
+             lambda results, line: results.dielectric_index >= 1
+             if results.dielectric_index is not None
+             else None,
+             dielectric_section_stop])
+
+        self.dielectric_index = None
+        self.dielectric_tensor = np.zeros((3, 3))
+
+        def piezo_section_start(results, match):
+            results.piezo_index = 0
+
+        search.append(["PIEZOELECTRIC TENSOR  for field in x, y, z        "
+                       "\(C/m\^2\)",
+                       None, piezo_section_start])
+
+        def piezo_data(results, match):
+            results.piezo_tensor[results.piezo_index, :] = \
+                np.array([float(match.group(i)) for i in range(1, 7)])
+            results.piezo_index += 1
+
+        search.append(
+            ["^ *[xyz] +([-0-9.Ee+]+) +([-0-9.Ee+]+)" +
+             " +([-0-9.Ee+]+) *([-0-9.Ee+]+) +([-0-9.Ee+]+)" +
+             " +([-0-9.Ee+]+)*$",
+             lambda results, line: results.piezo_index >= 0
+             if results.piezo_index is not None
+             else None,
+             piezo_data])
+
+        def piezo_section_stop(results, match):
+            results.piezo_index = None
+
+        search.append(
+            ["-------------------------------------",
+             lambda results, line: results.piezo_index >= 1
+             if results.piezo_index is not None
+             else None,
+             piezo_section_stop])
+
+        self.piezo_index = None
+        self.piezo_tensor = np.zeros((3, 6))
+
+        def born_section_start(results, match):
+            results.born_ion = -1
+
+        search.append(["BORN EFFECTIVE CHARGES " +
+                       "\(in e, cummulative output\)",
+                       None, born_section_start])
+
+        def born_ion(results, match):
+            results.born_ion = int(match.group(1)) - 1
+            results.born.append(np.zeros((3, 3)))
+
+        search.append(["ion +([0-9]+)", lambda results,
+                       line: results.born_ion is not None, born_ion])
+
+        def born_data(results, match):
+            results.born[results.born_ion][int(match.group(1)) - 1, :] = \
+                np.array([float(match.group(i)) for i in range(2, 5)])
+
+        search.append(
+            ["^ *([1-3]+) +([-0-9.Ee+]+) +([-0-9.Ee+]+) +([-0-9.Ee+]+)$",
+             lambda results, line: results.born_ion >= 0
+             if results.born_ion is not None
+             else results.born_ion,
+             born_data])
+
+        def born_section_stop(results, match):
+            results.born_index = None
+
+        search.append(
+            ["-------------------------------------",
+             lambda results, line: results.born_ion >= 1
+             if results.born_ion is not None
+             else results.born_ion,
+             born_section_stop])
+
+        self.born_ion = None
+        self.born = []
+        errors = scanner.add_pyawk(search, self)
+
+        def finish():
+            try:
+                if errors:
+                    raise errors[0]
+                self.born = np.array(self.born)
 
-            def born_section_stop(results, match):
-                results.born_index = None
-
-            search.append(
-                ["-------------------------------------",
-                 lambda results, line: results.born_ion >= 1
-                 if results.born_ion is not None
-                 else results.born_ion,
-                 born_section_stop])
-
-            self.born_ion = None
-            self.born = []
-
-            micro_pyawk(self.filename, search, self)
-
-            self.born = np.array(self.born)
-
-            self.dielectric_tensor = self.dielectric_tensor.tolist()
-            self.piezo_tensor = self.piezo_tensor.tolist()
-
-        except:
-            raise Exception("LEPSILON OUTCAR could not be parsed.")
+                self.dielectric_tensor = self.dielectric_tensor.tolist()
+                self.piezo_tensor = self.piezo_tensor.tolist()
+            except:
+                raise Exception("LEPSILON OUTCAR could not be parsed.")
+        return finish
 
     def read_lepsilon_ionic(self):
+        self.read_properties(["lepsilon_ionic"])
+
+    def _scan_lepsilon_ionic(self, scanner):
         # variables to be filled
-        try:
-            search = []
-
-            def dielectric_section_start(results, match):
-                results.dielectric_ionic_index = -1
-
-            search.append(["MACROSCOPIC STATIC DIELECTRIC TENSOR IONIC", None,
-                           dielectric_section_start])
-
-            def dielectric_section_start2(results, match):
-                results.dielectric_ionic_index = 0
-
-            search.append(
-                ["-------------------------------------",
-                 lambda results, line: results.dielectric_ionic_index == -1
-                 if results.dielectric_ionic_index is not None
-                 else results.dielectric_ionic_index,
-                 dielectric_section_start2])
-
-            def dielectric_data(results, match):
-                results.dielectric_ionic_tensor[results.dielectric_ionic_index, :] = \
-                    np.array([float(match.group(i)) for i in range(1, 4)])
-                results.dielectric_ionic_index += 1
-
-            search.append(
-                ["^ *([-0-9.Ee+]+) +([-0-9.Ee+]+) +([-0-9.Ee+]+) *$",
-                 lambda results, line: results.dielectric_ionic_index >= 0
-                 if results.dielectric_ionic_index is not None
-                 else results.dielectric_ionic_index,
-                 dielectric_data])
-
-            def dielectric_section_stop(results, match):
-                results.dielectric_ionic_index = None
-
-            search.append(
-                ["-------------------------------------",
-                 lambda results, line: results.dielectric_ionic_index >= 1
-                 if results.dielectric_ionic_index is not None
-                 else results.dielectric_ionic_index,
-                 dielectric_section_stop])
-
-            self.dielectric_ionic_index = None
-            self.dielectric_ionic_tensor = np.zeros((3, 3))
-
-            def piezo_section_start(results, match):
-                results.piezo_ionic_index = 0
-
-            search.append(["PIEZOELECTRIC TENSOR IONIC CONTR  for field in x, y, z        ",
-                           None, piezo_section_start])
-
-            def piezo_data(results, match):
-                results.piezo_ionic_tensor[results.piezo_ionic_index, :] = \
-                    np.array([float(match.group(i)) for i in range(1, 7)])
-                results.piezo_ionic_index += 1
-
-            search.append(
-                ["^ *[xyz] +([-0-9.Ee+]+) +([-0-9.Ee+]+)" +
-                 " +([-0-9.Ee+]+) *([-0-9.Ee+]+) +([-0-9.Ee+]+)" +
-                 " +([-0-9.Ee+]+)*$",
-                 lambda results, line: results.piezo_ionic_index >= 0
-                 if results.piezo_ionic_index is not None
-                 else results.piezo_ionic_index,
-                 piezo_data])
-
-            def piezo_section_stop(results, match):
-                results.piezo_ionic_index = None
-
-            search.append(
-                ["-------------------------------------",
-                 lambda results, line: results.piezo_ionic_index >= 1
-                 if results.piezo_ionic_index is not None
-                 else results.piezo_ionic_index,
-                 piezo_section_stop])
-
-            self.piezo_ionic_index = None
-            self.piezo_ionic_tensor = np.zeros((3, 6))
-
-            micro_pyawk(self.filename, search, self)
-
-            self.dielectric_ionic_tensor = self.dielectric_ionic_tensor.tolist()
-            self.piezo_ionic_tensor = self.piezo_ionic_tensor.tolist()
-
-        except:
-            raise Exception(
-                "ionic part of LEPSILON OUTCAR could not be parsed.")
+        search = []
+
+        def dielectric_section_start(results, match):
+            results.dielectric_ionic_index = -1
+
+        search.append(["MACROSCOPIC STATIC DIELECTRIC TENSOR IONIC", None,
+                       dielectric_section_start])
+
+        def dielectric_section_start2(results, match):
+            results.dielectric_ionic_index = 0
+
+        search.append(
+            ["-------------------------------------",
+             lambda results, line: results.dielectric_ionic_index == -1
+             if results.dielectric_ionic_index is not None
+             else results.dielectric_ionic_index,
+             dielectric_section_start2])
+
+        def dielectric_data(results, match):
+            results.dielectric_ionic_tensor[results.dielectric_ionic_index, :] = \
+                np.array([float(match.group(i)) for i in range(1, 4)])
+            results.dielectric_ionic_index += 1
+
+        search.append(
+            ["^ *([-0-9.Ee+]+) +([-0-9.Ee+]+) +([-0-9.Ee+]+) *$",
+             lambda results, line: results.dielectric_ionic_index >= 0
+             if results.dielectric_ionic_index is not None
+             else results.dielectric_ionic_index,
+             dielectric_data])
+
+        def dielectric_section_stop(results, match):
+            results.dielectric_ionic_index = None
+
+        search.append(
+            ["-------------------------------------",
+             lambda results, line: results.dielectric_ionic_index >= 1
+             if results.dielectric_ionic_index is not None
+             else results.dielectric_ionic_index,
+             dielectric_section_stop])
+
+        self.dielectric_ionic_index = None
+        self.dielectric_ionic_tensor = np.zeros((3, 3))
+
+        def piezo_section_start(results, match):
+            results.piezo_ionic_index = 0
+
+        search.append(["PIEZOELECTRIC TENSOR IONIC CONTR  for field in x, y, z        ",
+                       None, piezo_section_start])
+
+        def piezo_data(results, match):
+            results.piezo_ionic_tensor[results.piezo_ionic_index, :] = \
+                np.array([float(match.group(i)) for i in range(1, 7)])
+            results.piezo_ionic_index += 1
+
+        search.append(
+            ["^ *[xyz] +([-0-9.Ee+]+) +([-0-9.Ee+]+)" +
+             " +([-0-9.Ee+]+) *([-0-9.Ee+]+) +([-0-9.Ee+]+)" +
+             " +([-0-9.Ee+]+)*$",
+             lambda results, line: results.piezo_ionic_index >= 0
+             if results.piezo_ionic_index is not None
+             else results.piezo_ionic_index,
+             piezo_data])
+
+        def piezo_section_stop(results, match):
+            results.piezo_ionic_index = None
+
+        search.append(
+            ["-------------------------------------",
+             lambda results, line: results.piezo_ionic_index >= 1
+             if results.piezo_ionic_index is not None
+             else results.piezo_ionic_index,
+             piezo_section_stop])
+
+        self.piezo_ionic_index = None
+        self.piezo_ionic_tensor = np.zeros((3, 6))
+        errors = scanner.add_pyawk(search, self)
+
+        def finish():
+            try:
+                if errors:
+                    raise errors[0]
+                self.dielectric_ionic_tensor = self.dielectric_ionic_tensor.tolist()
+                self.piezo_ionic_tensor = self.piezo_ionic_tensor.tolist()
+            except:
+                raise Exception(
+                    "ionic part of LEPSILON OUTCAR could not be parsed.")
+        return finish
 
     def read_lcalcpol(self):
+        self.read_properties(["lcalcpol"])
+
+    def _scan_lcalcpol(self, scanner):
         # variables to be filled
         self.p_elec = None
         self.p_ion = None
-        try:
-            search = []
-
-            # Always present spin/non-spin
-            def p_elc(results, match):
-                results.p_elc = np.array([float(match.group(1)),
-                                          float(match.group(2)),
-                                          float(match.group(3))])
-
-            search.append(["^.*Total electronic dipole moment: "
-                           "*p\[elc\]=\( *([-0-9.Ee+]*) *([-0-9.Ee+]*) "
-                           "*([-0-9.Ee+]*) *\)",
-                           None, p_elc])
-
-            def p_ion(results, match):
-                results.p_ion = np.array([float(match.group(1)),
-                                          float(match.group(2)),
-                                          float(match.group(3))])
-            search.append(["^.*Ionic dipole moment: *p\[ion\]="
-                           "\( *([-0-9.Ee+]*)"
-                           " *([-0-9.Ee+]*) *([-0-9.Ee+]*) *\)",
-                           None, p_ion])
-
-            micro_pyawk(self.filename, search, self)
-
-        except:
-            raise Exception("CLACLCPOL OUTCAR could not be parsed.")
+        search = []
+
+        # Always present spin/non-spin
+        def p_elc(results, match):
+            results.p_elc = np.array([float(match.group(1)),
+                                      float(match.group(2)),
+                                      float(match.group(3))])
+
+        search.append(["^.*Total electronic dipole moment: "
+                       "*p\[elc\]=\( *([-0-9.Ee+]*) *([-0-9.Ee+]*) "
+                       "*([-0-9.Ee+]*) *\)",
+                       None, p_elc])
+
+        def p_ion(results, match):
+            results.p_ion = np.array([float(match.group(1)),
+                                      float(match.group(2)),
+                                      float(match.group(3))])
+        search.append(["^.*Ionic dipole moment: *p\[ion\]="
+                       "\( *([-0-9.Ee+]*)"
+                       " *([-0-9.Ee+]*) *([-0-9.Ee+]*) *\)",
+                       None, p_ion])
+        errors = scanner.add_pyawk(search, self)
+
+        def finish():
+            if errors:
+                raise Exception("CLACLCPOL OUTCAR could not be parsed.")
+        return finish
 
     def read_core_state_eigen(self):
         """
@@ -2086,33 +2470,34 @@ class Outcar(MSONable):
             The core state eigenenergie of the 2s AO of the 6th atom of the
             structure at the last ionic step is [5]["2s"][-1]
         """
+        return self.read_properties(["core_state_eigen"])[0]
+
+    def _scan_core_state_eigen(self, scanner):
+        # don't know number of lines to parse without knowing specific
+        # species, so a block of core states ends at the line with "E-fermi"
+        matches = scanner.add_multiline_pattern(
+            r"NIONS =(?P<natom>[^\n]*)|the core state eigen[^\n]*\n"
+            r"(?P<block>.*?)(?:^[^\n]*E-fermi|\Z)")
 
-        with zopen(self.filename, "rt") as foutcar:
-            line = foutcar.readline()
-            while line != "":
-                line = foutcar.readline()
-                if "NIONS =" in line:   
-                    natom = int(line.split("NIONS =")[1])
+        def finish():
+            for m in matches:
+                if m["natom"] is not None:
+                    natom = int(m["natom"])
                     cl = [defaultdict(list) for i in range(natom)]
-                if "the core state eigen" in line:
-                    iat = -1
-                    while line != "":
-                        line = foutcar.readline()
-                        # don't know number of lines to parse without knowing
-                        # specific species, so stop parsing when we reach
-                        # "E-fermi" instead
-                        if "E-fermi" in line:
-                            break
-                        data = line.split()
-                        # data will contain odd number of elements if it is
-                        # the start of a new entry, or even number of elements
-                        # if it continues the previous entry
-                        if len(data) % 2 == 1:
-                            iat += 1 # started parsing a new ion
-                            data = data[1:] # remove element with ion number
-                        for i in range(0, len(data), 2):
-                            cl[iat][data[i]].append(float(data[i + 1]))
-        return cl
+                    continue
+                iat = -1
+                for line in m["block"].split("\n"):
+                    data = line.split()
+                    # data will contain odd number of elements if it is
+                    # the start of a new entry, or even number of elements
+                    # if it continues the previous entry
+                    if len(data) % 2 == 1:
+                        iat += 1 # started parsing a new ion
+                        data = data[1:] # remove element with ion number
+                    for i in range(0, len(data), 2):
+                        cl[iat][data[i]].append(float(data[i + 1]))
+            return cl
+        return finish
 
     def as_dict(self):
         d = {"@module": self.__class__.__module__,
@@ -2131,6 +2516,134 @@ class Outcar(MSONable):
         return d
 
 
+def _get_memmap_file(memmap_dir, filename, key):
+    """
+    Returns the path of the .npy file in memmap_dir storing the array key
+    of filename. The name includes a hash of the absolute path of filename,
+    so that files with the same name in different directories do not share
+    their .npy files.
+    """
+    path_hash = hashlib.md5(
+        os.path.abspath(filename).encode("utf-8")).hexdigest()[:8]
+    return os.path.join(memmap_dir, "%s.%s.%s.npy" % (
+        os.path.basename(filename), path_hash, key))
+
+
+def _read_volumetric_block(f, dim, memmap_file=None, chunk_lines=100000):
+    """
+    Reads a grid of volumetric data in the vasp format, i.e., with x as the
+    fastest index, followed by y then z, from an open file. Lines are read in
+    chunks which are converted with a single np.fromstring call. Chunks
+    which do not give the expected number of values, e.g., because of an
+    invalid token at which np.fromstring stops silently, are converted token
+    by token instead, which raises a ValueError for invalid tokens.
+
+    Args:
+        f: File object positioned after the line with the grid dimensions.
+        dim (tuple): Dimensions of the grid.
+        memmap_file (str): If set, the grid is stored in a .npy file at this
+            path and returned as a np.memmap.
+        chunk_lines (int): Maximum number of lines converted at once.
+
+    Returns:
+        Grid as a Fortran ordered np.array of shape dim.
+    """
+    if memmap_file is not None:
+        dataset = np.lib.format.open_memmap(
+            memmap_file, mode="w+", dtype=np.float64, shape=dim,
+            fortran_order=True)
+    else:
+        dataset = np.empty(dim, order="F")
+    flat = dataset.reshape(-1, order="F")
+    ngrid_pts = flat.shape[0]
+    data_count = 0
+    vals_per_line = None
+    while data_count < ngrid_pts:
+        if vals_per_line is None:
+            lines = [next(f)]
+            vals = np.array([float(tok) for tok in lines[0].split()])
+            vals_per_line = len(vals)
+        else:
+            nlines = -(-(ngrid_pts - data_count) // vals_per_line)
+            lines = list(itertools.islice(f, min(nlines, chunk_lines)))
+            vals = np.fromstring(" ".join(lines), sep=" ")
+            if len(vals) != min(len(lines) * vals_per_line,
+                                ngrid_pts - data_count):
+                vals = np.array([float(tok) for line in lines
+                                 for tok in line.split()])
+        if len(vals) == 0:
+            raise ValueError("Incomplete volumetric data after %d of %d "
+                             "grid points." % (data_count, ngrid_pts))
+        vals = vals[:ngrid_pts - data_count]
+        flat[data_count:data_count + len(vals)] = vals
+        data_count += len(vals)
+    if memmap_file is not None:
+        dataset.flush()
+    return dataset
+
+
+def _parse_volumetric_file(filename, memmap_dir=None):
+    """
+    Parses a volumetric data file, as VolumetricData.parse_file, and also
+    returns the raw lines following each grid, i.e., the augmentation
+    occupancies and, after the total grid of spin-polarized CHGCARs, the
+    magnetic moments of the atoms, as {string: [str]} with the same keys as
+    data.
+
+    Returns:
+        (poscar, data, data_aug)
+    """
+    poscar_string = []
+    all_dataset = []
+    all_aug = []
+    with zopen(filename, "rt") as f:
+        for line in f:
+            line = line.strip()
+            if line == "" and len(poscar_string) > 0:
+                break
+            poscar_string.append(line)
+        poscar = Poscar.from_string("\n".join(poscar_string))
+
+        dimline = None
+        for raw_line in f:
+            line = raw_line.strip()
+            if dimline is None and line != "":
+                dimline = line
+                dim = tuple(int(i) for i in line.split())
+            if line == dimline:
+                memmap_file = None
+                if memmap_dir is not None:
+                    i = len(all_dataset)
+                    key = ["total", "diff"][i] if i < 2 else "data%d" % i
+                    memmap_file = _get_memmap_file(memmap_dir, filename,
+                                                   key)
+                all_dataset.append(
+                    _read_volumetric_block(f, dim, memmap_file))
+                all_aug.append([])
+            elif line.startswith("augmentation"):
+                # The header gives the number of occupancies that follow.
+                all_aug[-1].append(line)
+                nvals = int(line.split()[-1])
+                while nvals > 0:
+                    aug_line = next(f).rstrip("\n")
+                    all_aug[-1].append(aug_line)
+                    nvals -= len(aug_line.split())
+            elif line != "":
+                # E.g., the magnetic moments of the atoms, which follow the
+                # augmentation occupancies of the total grid in
+                # spin-polarized CHGCARs.
+                all_aug[-1].append(raw_line.rstrip("\n"))
+
+    if len(all_dataset) == 2:
+        data = {"total": all_dataset[0], "diff": all_dataset[1]}
+        data_aug = {"total": all_aug[0], "diff": all_aug[1]}
+    else:
+        data = {"total": all_dataset[0]}
+        data_aug = {"total": all_aug[0]}
+    data_aug = {k: v for k, v in data_aug.items() if v}
+    return poscar, data, data_aug
+
+
 class VolumetricData(object):
     """
     Simple volumetric object for reading LOCPOT and CHGCAR type files.
@@ -2157,9 +2670,16 @@ class VolumetricData(object):
     .. attribute:: ngridpts
 
         Total number of grid points in volumetric data.
+
+    .. attribute:: data_aug
+
+        Raw lines following each grid of CHGCAR files, i.e., the
+        augmentation occupancies and, after the total grid of spin-polarized
+        files, the magnetic moments of the atoms, as a dict of
+        {string: [str]} with the same keys as data. Empty if not present.
     """
 
-    def __init__(self, structure, data, distance_matrix=None):
+    def __init__(self, structure, data, distance_matrix=None, data_aug=None):
         """
         Typically, this constructor is not used directly and the static
         from_file constructor is used. This constructor is designed to allow
@@ -2171,11 +2691,14 @@ class VolumetricData(object):
             distance_matrix: A pre-computed distance matrix if available.
                 Useful so pass distance_matrices between sums,
                 shortcircuiting an otherwise expensive operation.
+            data_aug: Raw lines following each grid, e.g., the
+                augmentation occupancies, written back by write_file.
         """
         self.structure = structure
         self.is_spin_polarized = len(data) == 2
         self.dim = data["total"].shape
         self.data = data
+        self.data_aug = data_aug if data_aug else {}
         self.ngridpts = self.dim[0] * self.dim[1] * self.dim[2]
         # lazy init the spin data since this is not always needed.
         self._spin_data = {}
@@ -2240,70 +2763,39 @@ class VolumetricData(object):
         return VolumetricData(self.structure, data, self._distance_matrix)
 
     @staticmethod
-    def parse_file(filename):
+    def parse_file(filename, memmap_dir=None):
         """
         Convenience method to parse a generic volumetric data file in the vasp
         like format. Used by subclasses for parsing file.
 
+        Each dataset is read in large blocks of lines which are converted with
+        a single vectorized call and stored in Fortran order, since vasp
+        outputs x as the fastest index, followed by y then z.
+
         Args:
-            filename (str): Path of file to parse
+            filename (str): Path of file to parse. Gzipped and bzipped files
+                are supported.
+            memmap_dir (str): If set, each grid is stored in a .npy file in
+                this directory and returned as a np.memmap instead of being
+                held in memory. The files are named after filename, a hash
+                of its absolute path and the data key, e.g.,
+                CHGCAR.1a2b3c4d.total.npy. Their paths are given by the
+                filename attribute of the memmaps, and they can be reopened
+                later with np.load(..., mmap_mode="r").
 
         Returns:
             (poscar, data)
         """
-        poscar_read = False
-        poscar_string = []
-        dataset = []
-        all_dataset = []
-        dim = None
-        dimline = None
-        read_dataset = False
-        ngrid_pts = 0
-        data_count = 0
-        poscar = None
-        with zopen(filename, "rt") as f:
-            for line in f:
-                line = line.strip()
-                if read_dataset:
-                    toks = line.split()
-                    for tok in toks:
-                        if data_count < ngrid_pts:
-                            # This complicated procedure is necessary because
-                            # vasp outputs x as the fastest index, followed by y
-                            # then z.
-                            x = data_count % dim[0]
-                            y = int(math.floor(data_count / dim[0])) % dim[1]
-                            z = int(math.floor(data_count / dim[0] / dim[1]))
-                            dataset[x, y, z] = float(tok)
-                            data_count += 1
-                    if data_count >= ngrid_pts:
-                        read_dataset = False
-                        data_count = 0
-                        all_dataset.append(dataset)
-                elif not poscar_read:
-                    if line != "" or len(poscar_string) == 0:
-                        poscar_string.append(line)
-                    elif line == "":
-                        poscar = Poscar.from_string("\n".join(poscar_string))
-                        poscar_read = True
-                elif not dim:
-                    dim = [int(i) for i in line.split()]
-                    ngrid_pts = dim[0] * dim[1] * dim[2]
-                    dimline = line
-                    read_dataset = True
-                    dataset = np.zeros(dim)
-                elif line == dimline:
-                    read_dataset = True
-                    dataset = np.zeros(dim)
-            if len(all_dataset) == 2:
-                data = {"total": all_dataset[0], "diff": all_dataset[1]}
-            else:
-                data = {"total": all_dataset[0]}
-            return poscar, data
+        poscar, data, data_aug = _parse_volumetric_file(filename, memmap_dir)
+        return poscar, data
 
     def write_file(self, file_name, vasp4_compatible=False):
         """
-        Write the VolumetricData object to a vasp compatible file.
+        Write the VolumetricData object to a vasp compatible file. The grids
+        are formatted in large vectorized blocks, and the lines of data_aug
+        are written back after them if present. These then take the place of
+        the blank line which otherwise separates the grids of spin-polarized
+        data.
 
         Args:
             file_name (str): Path to a file
@@ -2330,30 +2822,35 @@ class VolumetricData(object):
             a = self.dim
 
             def write_spin(data_type):
-                lines = []
-                count = 0
                 f.write("{} {} {}\n".format(a[0], a[1], a[2]))
-                for (k, j, i) in itertools.product(list(range(a[2])), list(range(a[1])),
-                                                   list(range(a[0]))):
-                    lines.append("%0.11e" % self.data[data_type][i, j, k])
-                    count += 1
-                    if count % 5 == 0:
-                        f.write("".join(lines) + "\n")
-                        lines = []
-                    else:
-                        lines.append(" ")
-                f.write("".join(lines) + "\n")
+                # x is the fastest index in the file.
+                vals = np.ravel(self.data[data_type], order="F")
+                nvals = len(vals)
+                # Multiple of the 5 values per line.
+                chunk_size = 500000
+                for start in range(0, nvals, chunk_size):
+                    chunk = vals[start:start + chunk_size]
+                    nlines = len(chunk) // 5
+                    f.write(("%0.11e %0.11e %0.11e %0.11e %0.11e\n" * nlines)
+                            % tuple(chunk[:5 * nlines].tolist()))
+                    f.write("".join(["%0.11e " % v
+                                     for v in chunk[5 * nlines:].tolist()]))
+                f.write("\n")
+                for line in self.data_aug.get(data_type, []):
+                    f.write(line + "\n")
 
             write_spin("total")
             if self.is_spin_polarized:
-                f.write("\n")
+                if not self.data_aug.get("total"):
+                    f.write("\n")
                 write_spin("diff")
 
     def get_integrated_diff(self, ind, radius, nbins=1):
         """
-        Get integrated difference of atom index ind up to radius. This can be
-        an extremely computationally intensive process, depending on how many
-        grid points are in the VolumetricData.
+        Get integrated difference of atom index ind up to radius. Only the
+        grid points in the box enclosing the sphere around the atom are
+        considered, and the distances are cached per atom for subsequent
+        calls with the same or smaller radius.
 
         Args:
             ind (int): Index of atom.
@@ -2375,36 +2872,101 @@ class VolumetricData(object):
             data[:, 0] = radii
             return data
 
-        struct = self.structure
-        a = self.dim
-        if ind not in self._distance_matrix or\
-                self._distance_matrix[ind]["max_radius"] < radius:
-            coords = []
-            for (x, y, z) in itertools.product(*[list(range(i)) for i in a]):
-                coords.append([x / a[0], y / a[1], z / a[2]])
-            sites_dist = struct.lattice.get_points_in_sphere(
-                coords, struct[ind].coords, radius)
-            self._distance_matrix[ind] = {"max_radius": radius,
-                                          "data": np.array(sites_dist)}
-
-        data = self._distance_matrix[ind]["data"]
-
-        # Use boolean indexing to find all charges within the desired distance.
-        inds = data[:, 1] <= radius
-        dists = data[inds, 1]
-        data_inds = np.rint(np.mod(list(data[inds, 0]), 1) *
-                            np.tile(a, (len(dists), 1))).astype(int)
-        vals = [self.data["diff"][x, y, z] for x, y, z in data_inds]
+        dists, grid_inds = self._get_sphere_points(ind, radius)
+        vals = self.data["diff"][grid_inds]
 
         hist, edges = np.histogram(dists, bins=nbins,
                                    range=[0, radius],
                                    weights=vals)
         data = np.zeros((nbins, 2))
         data[:, 0] = edges[1:]
-        data[:, 1] = [sum(hist[0:i + 1]) / self.ngridpts
-                      for i in range(nbins)]
+        data[:, 1] = np.cumsum(hist) / self.ngridpts
+        return data
+
+    def get_integrated_diff_batch(self, inds=None, radius=1, nbins=1):
+        """
+        Get the integrated difference of several atoms up to radius. The
+        grid points within radius of all the atoms are binned in a single
+        weighted histogram, with nbins bins per atom. The results are those
+        of get_integrated_diff for each atom.
+
+        Args:
+            inds ([int]): Indices of atoms. Defaults to None, i.e., all atoms.
+            radius (float): Radius of integration.
+            nbins (int): Number of bins, i.e., the number of radii
+                [radius/nbins, 2 * radius/nbins, ....] the charge is
+                integrated up to.
+
+        Returns:
+            np.array of shape (len(inds), nbins, 2), with the output of
+            get_integrated_diff for each atom.
+        """
+        inds = list(range(len(self.structure)) if inds is None else inds)
+        data = np.zeros((len(inds), nbins, 2))
+        if not self.is_spin_polarized:
+            data[:, :, 0] = [radius / nbins * (i + 1) for i in range(nbins)]
+            return data
+
+        # Same bins as np.histogram in get_integrated_diff.
+        edges = np.linspace(0, radius, nbins + 1)
+        data[:, :, 0] = edges[1:]
+        if not inds:
+            return data
+        points = [self._get_sphere_points(ind, radius) for ind in inds]
+        dists = np.concatenate([d for d, grid_inds in points])
+        grid_inds = tuple(np.concatenate([g[i] for d, g in points])
+                          for i in range(3))
+        atoms = np.repeat(np.arange(len(inds)), [len(d) for d, g in points])
+        bins = np.minimum(np.searchsorted(edges, dists, side="right") - 1,
+                          nbins - 1)
+        hist = np.bincount(atoms * nbins + bins,
+                           weights=self.data["diff"][grid_inds],
+                           minlength=len(inds) * nbins)
+        data[:, :, 1] = np.cumsum(hist.reshape((len(inds), nbins)),
+                                  axis=1) / self.ngridpts
         return data
 
+    def _get_sphere_points(self, ind, radius):
+        """
+        Returns the distances to site ind and the grid indices of all grid
+        points (including periodic images) within radius of that site.
+
+        Args:
+            ind (int): Index of atom.
+            radius (float): Radius of the sphere.
+
+        Returns:
+            (dists, (x, y, z)) as np.arrays.
+        """
+        cached = self._distance_matrix.get(ind)
+        if cached is not None and cached["max_radius"] >= radius:
+            dists, grid_inds = cached["data"]
+            mask = dists <= radius
+            return dists[mask], tuple(i[mask] for i in grid_inds)
+
+        latt = self.structure.lattice
+        fcoords = self.structure[ind].frac_coords
+        # Half widths of the box enclosing the sphere in fractional
+        # coordinates.
+        widths = radius * np.linalg.norm(latt.inv_matrix, axis=0)
+        ranges = []
+        offsets = []
+        for i, n in enumerate(self.dim):
+            r = np.arange(int(math.floor((fcoords[i] - widths[i]) * n)),
+                          int(math.ceil((fcoords[i] + widths[i]) * n)) + 1)
+            ranges.append(r)
+            offsets.append(np.outer(r / n - fcoords[i], latt.matrix[i]))
+        cart = offsets[0][:, None, None, :] + offsets[1][None, :, None, :] + \
+            offsets[2][None, None, :, :]
+        dists = np.sqrt(np.sum(cart ** 2, axis=-1))
+        mask = dists <= radius
+        grid_inds = tuple(r[i] % n for r, i, n in
+                          zip(ranges, np.nonzero(mask), self.dim))
+        dists = dists[mask]
+        self._distance_matrix[ind] = {"max_radius": radius,
+                                      "data": (dists, grid_inds)}
+        return dists, grid_inds
+
     def get_average_along_axis(self, ind):
         """
         Get the averaged total of the volumetric data a certain axis direction.
@@ -2435,16 +2997,28 @@ class Locpot(VolumetricData):
     Args:
         poscar (Poscar): Poscar object containing structure.
         data: Actual data.
+        data_aug: Raw lines following each grid, e.g., the augmentation
+            occupancies, if any.
     """
 
-    def __init__(self, poscar, data):
-        super(Locpot, self).__init__(poscar.structure, data)
+    def __init__(self, poscar, data, data_aug=None):
+        super(Locpot, self).__init__(poscar.structure, data,
+                                     data_aug=data_aug)
         self.name = poscar.comment
 
     @staticmethod
-    def from_file(filename):
-        (poscar, data) = VolumetricData.parse_file(filename)
-        return Locpot(poscar, data)
+    def from_file(filename, memmap_dir=None):
+        """
+        Reads a LOCPOT file.
+
+        Args:
+            filename (str): Path of the file.
+            memmap_dir (str): Optional directory in which to store the grids
+                as memory-mapped .npy files. See VolumetricData.parse_file.
+        """
+        (poscar, data, data_aug) = _parse_volumetric_file(
+            filename, memmap_dir=memmap_dir)
+        return Locpot(poscar, data, data_aug)
 
 
 class Chgcar(VolumetricData):
@@ -2454,26 +3028,104 @@ class Chgcar(VolumetricData):
     Args:
         poscar (Poscar): Poscar object containing structure.
         data: Actual data.
+        data_aug: Raw lines following each grid, e.g., the augmentation
+            occupancies, if any.
     """
 
-    def __init__(self, poscar, data):
-        super(Chgcar, self).__init__(poscar.structure, data)
+    def __init__(self, poscar, data, data_aug=None):
+        super(Chgcar, self).__init__(poscar.structure, data,
+                                     data_aug=data_aug)
         self.poscar = poscar
         self.name = poscar.comment
         self._distance_matrix = {}
 
     @staticmethod
-    def from_file(filename):
-        (poscar, data) = VolumetricData.parse_file(filename)
-        return Chgcar(poscar, data)
+    def from_file(filename, memmap_dir=None):
+        """
+        Reads a CHGCAR file.
+
+        Args:
+            filename (str): Path of the file.
+            memmap_dir (str): Optional directory in which to store the grids
+                as memory-mapped .npy files. See VolumetricData.parse_file.
+        """
+        (poscar, data, data_aug) = _parse_volumetric_file(
+            filename, memmap_dir=memmap_dir)
+        return Chgcar(poscar, data, data_aug)
+
+
+# Matches the lines which start the sections of a PROCAR, i.e., the band
+# lines, the k-point lines and the headers with the dimensions. The leading
+# newline makes the search much faster than with a multiline "^".
+_PROCAR_RE = re.compile(
+    r"\n(?:band\s+(\d+)"
+    r"| *k-point\s+(\d+)\s*:[^\n]*weight = ([0-9.]+)"
+    r"|# of k-points:\s+(\d+)\s+# of bands:\s+(\d+)\s+# of ions:\s+(\d+))")
+
+
+# Matches the rows of a PROCAR table which start with an ion index.
+_PROCAR_ION_ROW_RE = re.compile(r"^ *\d+ [^\n]*", re.MULTILINE)
+
+
+def _parse_procar_phase_tables(tables, nions, ncols):
+    """
+    Converts the text of a list of PROCAR phase factor tables into a complex
+    (ntables, nions, ncols) array, or returns None if their layout is not
+    known. The phase factors are given either with the real and imaginary
+    parts of each ion on two successive rows, or with one row per ion of
+    the real and imaginary parts of each orbital (VASP 5.4.4).
+    """
+    vals = np.fromstring(" ".join(tables), sep=" ")
+    if vals.size == len(tables) * 2 * nions * (ncols + 1):
+        vals = vals.reshape(len(tables), nions, 2, ncols + 1)
+        return vals[:, :, 0, 1:] + 1j * vals[:, :, 1, 1:]
+    if vals.size == len(tables) * nions * (2 * ncols + 1):
+        vals = vals.reshape(len(tables), nions, 2 * ncols + 1)
+        return vals[:, :, 1::2] + 1j * vals[:, :, 2::2]
+    return None
+
+
+def _parse_procar_tables(tables, nrows, ncols):
+    """
+    Converts the text of a list of PROCAR tables of nrows rows into a
+    (ntables, nrows, ncols) array with a single conversion. Falls back to
+    parsing the rows one by one, keeping their first ncols values.
+    """
+    vals = np.fromstring(" ".join(tables), sep=" ")
+    if vals.size != len(tables) * nrows * ncols:
+        vals = np.array([[float(t) for t in l.split()[:ncols]]
+                         for table in tables for l in table.splitlines()
+                         if l.strip()])
+    return vals.reshape(len(tables), nrows, ncols)
 
 
 class Procar(object):
     """
-    Object for reading a PROCAR file.
+    Object for reading a PROCAR file. The file is read in large chunks in
+    which the band sections are located with a single regular expression and
+    the tables of all the sections of a chunk are converted at once, so that
+    large files can be read in bounded memory.
 
     Args:
         filename: Name of file containing PROCAR.
+        parse_phase_factors (bool): Whether to parse the phase factors, if
+            present. Defaults to True. Set to False to save the time and the
+            memory (a complex array of the size of data) if they are not
+            needed.
+        ions ([int]): 0-based indices of the ions to read. Defaults to None,
+            i.e., all ions.
+        orbitals ([str]): Names of the orbitals to read, e.g., ["s", "dxy"].
+            Defaults to None, i.e., all orbitals.
+        dtype: numpy dtype of data. Defaults to np.float. The phase factors
+            are stored with the corresponding complex dtype.
+        memmap_dir (str): If set, data and phase factors are stored in .npy
+            files in this directory and returned as np.memmap instead of
+            being held in memory. The files are named after filename, a
+            hash of its absolute path, the attribute and the spin, e.g.,
+            PROCAR.1a2b3c4d.data.up.npy. Their paths are given by the
+            filename attribute of the memmaps, and they can be reopened
+            later with np.load(..., mmap_mode="r").
+        chunk_size (int): Number of characters read at once.
 
     .. attribute:: data
 
@@ -2507,82 +3159,163 @@ class Procar(object):
     ..attribute:: nions
 
         Number of ions
+
+    ..attribute:: ions
+
+        0-based indices of the ions read, in the order of the ion index of
+        data and phase_factors.
+
+    ..attribute:: orbitals
+
+        Names of the orbitals read, in the order of the orbital index of
+        data and phase_factors.
     """
 
-    def __init__(self, filename):
-        headers = None
+    def __init__(self, filename, parse_phase_factors=True, ions=None,
+                 orbitals=None, dtype=np.float, memmap_dir=None,
+                 chunk_size=2 ** 24):
+        self.filename = filename
+        self.nkpoints = None
+        self.nbands = None
+        self.nions = None
+        self.weights = None
+        self.ions = list(ions) if ions is not None else None
+        self.orbitals = list(orbitals) if orbitals is not None else None
+        self.data = {}
+        self.phase_factors = {}
+        self._parse_phase_factors = parse_phase_factors
+        self._dtype = dtype
+        self._memmap_dir = memmap_dir
+        self._headers = None
+        self._spin = Spin.down
+        self._kpoint = 0
 
         with zopen(filename, "rt") as f:
-            preambleexpr = re.compile(
-                "# of k-points:\s+(\d+)\s+# of bands:\s+(\d+)\s+# of ions:\s+(\d+)")
-            kpointexpr = re.compile("^k-point\s+(\d+).*weight = ([0-9\.]+)")
-            bandexpr = re.compile("^band\s+(\d+)")
-            ionexpr = re.compile("^ion.*")
-            expr = re.compile("^([0-9]+)\s+")
-            current_kpoint = 0
-            current_band = 0
-            done = False
-            spin = Spin.down
+            text = ""
+            while True:
+                chunk = f.read(chunk_size)
+                text += chunk
+                # Only the text up to the last band line is complete.
+                end = text.rfind("\nband") if chunk else len(text)
+                if end > 0:
+                    self._parse_text(text[:end])
+                    text = text[end:]
+                if not chunk:
+                    break
 
-            for l in f:
-                l = l.strip()
-                if bandexpr.match(l):
-                    m = bandexpr.match(l)
-                    current_band = int(m.group(1)) - 1
-                    done = False
-                elif kpointexpr.match(l):
-                    m = kpointexpr.match(l)
-                    current_kpoint = int(m.group(1)) - 1
-                    weights[current_kpoint] = float(m.group(2))
-                    if current_kpoint == 0:
-                        spin = Spin.up if spin == Spin.down else Spin.down
-                    done = False
-                elif headers is None and ionexpr.match(l):
-                    headers = l.split()
-                    headers.pop(0)
-                    headers.pop(-1)
-
-                    def f():
-                        return np.zeros((nkpoints, nbands, nions, len(headers)))
-
-                    data = defaultdict(f)
-
-                    def f2():
-                        return np.full((nkpoints, nbands, nions, len(headers)),
-                                       np.NaN, dtype=np.complex128)
-                    phase_factors = defaultdict(f2)
-                elif expr.match(l):
-                    toks = l.split()
-                    index = int(toks.pop(0)) - 1
-                    num_data = np.array([float(t)
-                                         for t in toks[:len(headers)]])
-                    if not done:
-                        data[spin][current_kpoint, current_band,
-                                   index, :] = num_data
-                    else:
-                        if np.isnan(phase_factors[spin][
-                                current_kpoint, current_band, index, 0]):
-                            phase_factors[spin][current_kpoint, current_band,
-                                                index, :] = num_data
-                        else:
-                            phase_factors[spin][current_kpoint, current_band,
-                                                index, :] += 1j * num_data
-                elif l.startswith("tot"):
-                    done = True
-                elif preambleexpr.match(l):
-                    m = preambleexpr.match(l)
-                    nkpoints = int(m.group(1))
-                    nbands = int(m.group(2))
-                    nions = int(m.group(3))
-                    weights = np.zeros(nkpoints)
-
-            self.nkpoints = nkpoints
-            self.nbands = nbands
-            self.nions = nions
-            self.weights = weights
-            self.orbitals = headers
-            self.data = data
-            self.phase_factors = phase_factors
+        for d in itertools.chain(self.data.values(),
+                                 self.phase_factors.values()):
+            if isinstance(d, np.memmap):
+                d.flush()
+
+    def _allocate(self, name, dtype, fill_value):
+        shape = (self.nkpoints, self.nbands, len(self.ions),
+                 len(self.orbitals))
+        if self._memmap_dir is None:
+            return np.full(shape, fill_value, dtype=dtype)
+        a = np.lib.format.open_memmap(
+            _get_memmap_file(self._memmap_dir, self.filename,
+                             "%s.%s" % (name, self._spin.name)),
+            mode="w+", dtype=dtype, shape=shape)
+        a[...] = fill_value
+        return a
+
+    def _parse_text(self, text):
+        """
+        Parses a chunk of complete lines of the PROCAR and stores the
+        projections and phase factors of all its band sections.
+        """
+        sections = []
+        tables = []
+        phase_tables = []
+        matches = list(_PROCAR_RE.finditer(text))
+        for i, m in enumerate(matches):
+            if m.group(1) is not None:
+                # A band section is a table of projections, whose rows are
+                # the ion index, the orbitals and the total, ending with a
+                # "tot" row, possibly followed by a table of phase factors.
+                end = matches[i + 1].start() if i + 1 < len(matches) \
+                    else len(text)
+                header = text.find("\nion", m.end(), end)
+                start = text.find("\n", header + 1, end)
+                tot = text.find("\ntot", start, end)
+                if header < 0 or tot < 0:
+                    # incomplete section at the end of a truncated file
+                    continue
+                phase = None
+                tot_end = text.find("\n", tot + 1, end)
+                if tot_end >= 0 and text.startswith("ion", tot_end + 1, end):
+                    # Only the rows of the ions, e.g., not the "charge" row
+                    # of VASP 5.4.4.
+                    phase = "\n".join(_PROCAR_ION_ROW_RE.findall(
+                        text, text.find("\n", tot_end + 1, end) + 1, end))
+                if self._headers is None:
+                    self._headers = text[header + 1:start].split()[1:-1]
+                    if self.ions is None:
+                        self.ions = list(range(self.nions))
+                    if self.orbitals is None:
+                        self.orbitals = list(self._headers)
+                if self._spin not in self.data:
+                    self.data[self._spin] = self._allocate(
+                        "data", self._dtype, 0)
+                if self._parse_phase_factors and phase is not None \
+                        and self._spin not in self.phase_factors:
+                    self.phase_factors[self._spin] = self._allocate(
+                        "phase_factors",
+                        np.result_type(self._dtype, np.complex64), np.nan)
+                sections.append((self._spin, self._kpoint,
+                                 int(m.group(1)) - 1))
+                tables.append(text[start + 1:tot + 1])
+                phase_tables.append(phase)
+            elif m.group(2) is not None:
+                self._kpoint = int(m.group(2)) - 1
+                self.weights[self._kpoint] = float(m.group(3))
+                if self._kpoint == 0:
+                    self._spin = Spin.up if self._spin == Spin.down \
+                        else Spin.down
+                step = max(1, self.nkpoints // 10)
+                if (self._kpoint + 1) % step == 0:
+                    logger.info("Reading k-point %d of %d (%s) of %s" % (
+                        self._kpoint + 1, self.nkpoints, self._spin.name,
+                        self.filename))
+            else:
+                self.nkpoints = int(m.group(4))
+                self.nbands = int(m.group(5))
+                self.nions = int(m.group(6))
+                if self.weights is None:
+                    self.weights = np.zeros(self.nkpoints)
+        if not sections:
+            return
+
+        ncols = len(self._headers)
+        cols = [self._headers.index(o) + 1 for o in self.orbitals]
+        ions = np.array(self.ions)
+        spins = np.array([int(sp) for sp, k, b in sections])
+        kpoints = np.array([k for sp, k, b in sections])
+        bands = np.array([b for sp, k, b in sections])
+        # Projection rows are the ion index, the orbitals and the total.
+        vals = _parse_procar_tables(tables, self.nions, ncols + 2)
+        vals = vals[:, ions][:, :, cols]
+        has_phase = np.array([t is not None for t in phase_tables])
+        if self._parse_phase_factors and np.any(has_phase):
+            phase = _parse_procar_phase_tables(
+                [t for t in phase_tables if t is not None], self.nions,
+                ncols)
+            if phase is None:
+                warnings.warn("The phase factors of %s have an unknown "
+                              "layout and are not parsed." % self.filename)
+                self._parse_phase_factors = False
+                self.phase_factors = {}
+            else:
+                phase = phase[:, ions][:, :, [c - 1 for c in cols]]
+        for spin in (Spin.up, Spin.down):
+            mask = spins == int(spin)
+            if np.any(mask):
+                self.data[spin][kpoints[mask], bands[mask]] = vals[mask]
+            mask &= has_phase
+            if self._parse_phase_factors and np.any(mask):
+                self.phase_factors[spin][kpoints[mask], bands[mask]] = \
+                    phase[mask[has_phase]]
 
     def get_projection_on_elements(self, structure):
         """
@@ -2600,12 +3333,12 @@ class Procar(object):
                            for i in range(self.nkpoints)]
                           for j in range(self.nbands)]
 
-        for iat in range(self.nions):
+        for i, iat in enumerate(self.ions):
             name = structure.species[iat].symbol
             for spin, d in self.data.items():
                 for k, b in itertools.product(range(self.nkpoints),
                                               range(self.nbands)):
-                    dico[spin][b][k][name] = np.sum(d[k, b, iat, :])
+                    dico[spin][b][k][name] = np.sum(d[k, b, i, :])
 
         return dico
 
@@ -2629,7 +3362,8 @@ class Procar(object):
         """
 
         orbital_index = self.orbitals.index(orbital)
-        return {spin: np.sum(d[:, :, atom_index, orbital_index] * self.weights[:, None])
+        ion_index = self.ions.index(atom_index)
+        return {spin: np.sum(d[:, :, ion_index, orbital_index] * self.weights[:, None])
                 for spin, d in self.data.items()}
 
 
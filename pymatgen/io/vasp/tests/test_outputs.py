@@ -8,6 +8,8 @@ from __future__ import division, unicode_literals
 import unittest2 as unittest
 import os
 import json
+import shutil
+import tempfile
 import numpy as np
 import warnings
 
@@ -17,7 +19,8 @@ import xml.etree.cElementTree as ET
 from pymatgen.electronic_structure.core import OrbitalType
 from pymatgen.io.vasp.inputs import Kpoints
 from pymatgen.io.vasp.outputs import Chgcar, Locpot, Oszicar, Outcar, \
-    Vasprun, Procar, Xdatcar, Dynmat, BSVasprun, UnconvergedVASPWarning
+    Vasprun, Procar, Xdatcar, Dynmat, BSVasprun, UnconvergedVASPWarning, \
+    VolumetricData, iter_ionic_steps
 from pymatgen import Spin, Orbital, Lattice, Structure
 from pymatgen.entries.compatibility import MaterialsProjectCompatibility
 
@@ -261,6 +264,49 @@ class VasprunTest(unittest.TestCase):
         self.assertEqual(vasprun_fc.normalmode_eigenvecs.shape, (48, 16, 3))
         self.assertTrue(np.allclose(vasprun_fc.normalmode_eigenvecs[33], nm_ans))
 
+    def test_ionic_step_fields(self):
+        filepath = os.path.join(test_dir, "vasprun.xml.unconverged")
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            vasprun = Vasprun(filepath, parse_potcar_file=False)
+            v = Vasprun(filepath, parse_potcar_file=False,
+                        ionic_step_fields=["e_fr_energy", "forces",
+                                           "lattice", "frac_coords"])
+            v_skip = Vasprun(filepath, 2, 1, parse_potcar_file=False,
+                             ionic_step_fields=["stress"])
+        self.assertEqual(len(v.ionic_steps), 5)
+        self.assertNotIn("structure", v.ionic_steps[0])
+        self.assertEqual(v.ionic_steps[-1], vasprun.ionic_steps[-1])
+        self.assertAlmostEqual(v.final_energy, vasprun.final_energy)
+        self.assertEqual(v.structures, vasprun.structures)
+        self.assertEqual(v.ionic_step_arrays["frac_coords"].shape, (5, 14, 3))
+        self.assertTrue(np.allclose(
+            v.ionic_step_arrays["e_fr_energy"],
+            [s["e_fr_energy"] for s in vasprun.ionic_steps]))
+        self.assertTrue(np.allclose(
+            v.ionic_step_arrays["forces"],
+            [s["forces"] for s in vasprun.ionic_steps]))
+        self.assertEqual(v_skip.nionic_steps, 5)
+        self.assertEqual(len(v_skip.ionic_steps), 2)
+        self.assertTrue(np.allclose(
+            v_skip.ionic_step_arrays["stress"],
+            [s["stress"] for s in vasprun.ionic_steps[1::2]]))
+        # Incomplete ionic steps give no structures and no dict.
+        self.assertRaises(ValueError, lambda: v_skip.structures)
+        self.assertRaises(ValueError, v_skip.as_dict)
+
+        steps = list(iter_ionic_steps(filepath))
+        self.assertEqual(len(steps), 5)
+        self.assertTrue(np.allclose(steps[2]["frac_coords"],
+                                    vasprun.structures[2].frac_coords))
+        self.assertTrue(np.allclose(steps[2]["lattice"],
+                                    vasprun.structures[2].lattice.matrix))
+        self.assertAlmostEqual(steps[2]["e_wo_entrp"],
+                               vasprun.ionic_steps[2]["e_wo_entrp"])
+        steps = list(iter_ionic_steps(filepath, ["structure"], 2))
+        self.assertEqual([s["structure"] for s in steps],
+                         vasprun.structures[::2])
+
     def test_Xe(self):
         vr = Vasprun(os.path.join(test_dir, 'vasprun.xml.xe'), parse_potcar_file=False)
         self.assertEqual(vr.atomic_symbols, ['Xe'])
@@ -491,6 +537,36 @@ class OutcarTest(unittest.TestCase):
         self.assertAlmostEqual(outcar.data["piezo_tensor"][1][3], 0.35998)
         self.assertAlmostEqual(outcar.data["piezo_tensor"][2][5], 0.35997)
 
+    def test_read_properties(self):
+        filepath = os.path.join(test_dir, "OUTCAR.lepsilon.gz")
+        patterns = {"efermi": "E-fermi\s*:\s*(\S+)"}
+        outcar = Outcar(filepath, properties=[
+            "piezo_tensor", "neb", "lcalcpol",
+            ("pattern", {"patterns": patterns, "postprocess": float})])
+        self.assertAlmostEqual(outcar.data["piezo_tensor"][1][3], 0.35998)
+        self.assertAlmostEqual(outcar.data["efermi"][0][0], 4.1186)
+        self.assertAlmostEqual(outcar.born[0][1][2], -0.385)
+
+        # Same results as the readers called one by one.
+        outcar2 = Outcar(filepath)
+        outcar2.read_piezo_tensor()
+        outcar2.read_neb()
+        outcar2.read_lcalcpol()
+        outcar2.read_pattern(patterns, postprocess=float)
+        self.assertEqual(outcar.data, outcar2.data)
+
+        tables = outcar.read_properties([
+            ("table_pattern", {"header_pattern": r"ion\s+1\n",
+                               "row_pattern": r"\d\s+([\d\.\-]+)\s+"
+                                              r"([\d\.\-]+)\s+([\d\.\-]+)",
+                               "footer_pattern": "ion",
+                               "postprocess": float,
+                               "last_one_only": False})])[0]
+        self.assertEqual(len(tables), 1)
+        self.assertAlmostEqual(tables[0][0][1], -0.38491)
+        self.assertRaises(ValueError, outcar.read_properties,
+                          ["freq_dielectric"])
+
     def test_core_state_eigen(self):
         filepath = os.path.join(test_dir, "OUTCAR.CL")
         cl = Outcar(filepath).read_core_state_eigen()
@@ -596,6 +672,42 @@ class BSVasprunTest(unittest.TestCase):
         self.assertEqual(vbm['kpoint'].label, "\Gamma", "wrong vbm label")
         self.assertEqual(cbm['kpoint'].label, None, "wrong cbm label")
 
+    def test_projected_eigen(self):
+        filepath = os.path.join(test_dir, 'vasprun_Si_bands.xml')
+        vasprun = Vasprun(filepath, parse_projected_eigen=True,
+                          parse_potcar_file=False)
+        bs_vasprun = BSVasprun(filepath, parse_projected_eigen=True,
+                               projected_eigen_dtype=np.float32)
+        for spin, v in vasprun.projected_eigenvalues.items():
+            self.assertEqual(v.shape, (160, 13, 2, 9))
+            v32 = bs_vasprun.projected_eigenvalues[spin]
+            self.assertEqual(v32.dtype, np.float32)
+            self.assertTrue(np.allclose(v32, v, atol=1e-6))
+            self.assertTrue(np.array_equal(bs_vasprun.eigenvalues[spin],
+                                           vasprun.eigenvalues[spin]))
+        self.assertAlmostEqual(
+            vasprun.projected_eigenvalues[Spin.up][0][1][0][1], 0.0751)
+
+        # overflowed values are parsed as nan
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            with open(filepath) as f:
+                xml = f.read().replace("<r>    5.6157    1.0000 </r>",
+                                       "<r> *********    1.0000 </r>")
+            filepath = os.path.join(tmp_dir, "vasprun.xml")
+            with open(filepath, "w") as f:
+                f.write(xml)
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                overflow = BSVasprun(filepath)
+        finally:
+            shutil.rmtree(tmp_dir)
+        eigenvalues = overflow.eigenvalues[Spin.up]
+        self.assertEqual(eigenvalues.shape, (160, 13, 2))
+        self.assertTrue(np.isnan(eigenvalues[0, 1, 0]))
+        self.assertEqual(eigenvalues[0, 1, 1], 1)
+        self.assertEqual(eigenvalues[0, 2, 0], 5.6158)
+
 
 class OszicarTest(unittest.TestCase):
 
@@ -642,6 +754,101 @@ class ChgcarTest(unittest.TestCase):
         myans = chg.get_integrated_diff(0, 3, 6)
         self.assertTrue(np.allclose(myans[:, 1], ans))
 
+    def test_get_integrated_diff_batch(self):
+        chg = Chgcar.from_file(os.path.join(test_dir, 'CHGCAR.spin'))
+        data = chg.get_integrated_diff_batch(radius=1, nbins=2)
+        self.assertEqual(data.shape, (1, 2, 2))
+        self.assertAlmostEqual(data[0, -1, 1], -0.0043896932237534022)
+        self.assertTrue(np.allclose(data[0], chg.get_integrated_diff(0, 1, 2)))
+        # Smaller radii reuse the cached distances.
+        d1 = chg.get_integrated_diff(0, 0.5, 3)
+        chg._distance_matrix = {}
+        self.assertTrue(np.allclose(d1, chg.get_integrated_diff(0, 0.5, 3)))
+        data = chg.get_integrated_diff_batch([0, 0], radius=2.5, nbins=7)
+        for d in data:
+            self.assertTrue(np.allclose(d, chg.get_integrated_diff(0, 2.5, 7)))
+
+        chg = Chgcar.from_file(os.path.join(test_dir, 'CHGCAR.nospin'))
+        data = chg.get_integrated_diff_batch([0, 0], 2)
+        self.assertEqual(data.shape, (2, 1, 2))
+        self.assertTrue(np.allclose(data[:, 0, 1], 0))
+
+    def test_write_file(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            chg = Chgcar.from_file(os.path.join(test_dir, 'CHGCAR.spin'))
+            self.assertEqual(chg.dim, (48, 48, 48))
+            # The augmentation occupancies and the magnetic moment.
+            self.assertEqual(len(chg.data_aug["total"]), 5)
+            self.assertEqual(chg.data_aug["total"][-1],
+                             "  0.600000000000E+00")
+            self.assertEqual(chg.data_aug["diff"][0],
+                             "augmentation occupancies   1  15")
+            for fname in ["CHGCAR", "CHGCAR.gz"]:
+                filepath = os.path.join(tmp_dir, fname)
+                chg.write_file(filepath)
+                chg2 = Chgcar.from_file(filepath)
+                for k in ["total", "diff"]:
+                    self.assertTrue(np.allclose(chg.data[k], chg2.data[k],
+                                                rtol=1e-10))
+                self.assertEqual(chg.data_aug, chg2.data_aug)
+
+            # The lines between the grids are written back in place.
+            def get_lines_between_grids(filepath):
+                with open(filepath) as f:
+                    lines = f.read().split("\n")
+                start = lines.index("augmentation occupancies   1  15")
+                end = start
+                while lines[end].split() != ["48", "48", "48"]:
+                    end += 1
+                return lines[start:end]
+            self.assertEqual(
+                get_lines_between_grids(os.path.join(tmp_dir, "CHGCAR")),
+                get_lines_between_grids(os.path.join(test_dir,
+                                                     "CHGCAR.spin")))
+            self.assertEqual(len(VolumetricData.parse_file(filepath)), 2)
+
+            chg2 = Chgcar.from_file(os.path.join(tmp_dir, "CHGCAR.gz"),
+                                    memmap_dir=tmp_dir)
+            self.assertIsInstance(chg2.data["diff"], np.memmap)
+            self.assertAlmostEqual(chg2.get_integrated_diff(0, 1)[0, 1],
+                                   -0.0043896932237534022)
+            data = np.load(chg2.data["total"].filename, mmap_mode="r")
+            self.assertTrue(np.array_equal(data, chg2.data["total"]))
+            # Files of the same name in other directories do not overwrite
+            # the grids.
+            os.mkdir(os.path.join(tmp_dir, "other"))
+            shutil.copy(os.path.join(tmp_dir, "CHGCAR.gz"),
+                        os.path.join(tmp_dir, "other", "CHGCAR.gz"))
+            chg3 = Chgcar.from_file(os.path.join(tmp_dir, "other",
+                                                 "CHGCAR.gz"),
+                                    memmap_dir=tmp_dir)
+            self.assertNotEqual(chg3.data["total"].filename,
+                                chg2.data["total"].filename)
+            del chg2, chg3, data
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_invalid_value(self):
+        with open(os.path.join(test_dir, "CHGCAR.spin")) as f:
+            lines = f.readlines()
+        # Without augmentation occupancies, the total grid is directly
+        # followed by numbers, which must not be read as part of it after an
+        # invalid token in the middle of the grid.
+        aug = [i for i, l in enumerate(lines)
+               if l.startswith("augmentation")]
+        diff = lines.index(lines[10], aug[0])
+        lines = lines[:aug[0]] + lines[diff:aug[1]]
+        lines[1000] = lines[1000].replace("E", "X", 1)
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            filepath = os.path.join(tmp_dir, "CHGCAR")
+            with open(filepath, "w") as f:
+                f.writelines(lines)
+            self.assertRaises(ValueError, Chgcar.from_file, filepath)
+        finally:
+            shutil.rmtree(tmp_dir)
+
 
 class ProcarTest(unittest.TestCase):
 
@@ -686,6 +893,103 @@ class ProcarTest(unittest.TestCase):
         self.assertAlmostEqual(p.phase_factors[Spin.down][0, 0, 2, 0],
                                0.027-0.047j)
 
+    def test_options(self):
+        filepath = os.path.join(test_dir, 'PROCAR.phase')
+        p = Procar(filepath)
+        # Small chunks split the file within band sections.
+        for chunk_size in [100, 1001, 4096]:
+            p2 = Procar(filepath, chunk_size=chunk_size)
+            for spin in p.data:
+                self.assertTrue(np.array_equal(p2.data[spin], p.data[spin]))
+                self.assertTrue(np.array_equal(p2.phase_factors[spin],
+                                               p.phase_factors[spin]))
+            self.assertTrue(np.array_equal(p2.weights, p.weights))
+
+        p2 = Procar(filepath, parse_phase_factors=False, ions=[2, 0],
+                    orbitals=["pz", "s"], dtype=np.float32)
+        self.assertEqual(p2.phase_factors, {})
+        self.assertEqual(p2.ions, [2, 0])
+        self.assertEqual(p2.orbitals, ["pz", "s"])
+        for spin, d in p2.data.items():
+            self.assertEqual(d.dtype, np.float32)
+            self.assertEqual(d.shape, (60, 12, 2, 2))
+            self.assertTrue(np.allclose(d, p.data[spin][:, :, [2, 0]][
+                :, :, :, [2, 0]], atol=1e-6))
+        self.assertAlmostEqual(p2.get_occupation(0, "s")[Spin.up],
+                               p.get_occupation(0, "s")[Spin.up], 4)
+        self.assertRaises(ValueError, p2.get_occupation, 1, "s")
+
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            p2 = Procar(filepath, memmap_dir=tmp_dir)
+            self.assertIsInstance(p2.data[Spin.up], np.memmap)
+            self.assertTrue(np.array_equal(p2.phase_factors[Spin.down],
+                                           p.phase_factors[Spin.down]))
+            data_file = p2.data[Spin.down].filename
+            del p2
+            data = np.load(data_file, mmap_mode="r")
+            self.assertTrue(np.array_equal(data, p.data[Spin.down]))
+            # PROCARs of the same name in other directories do not
+            # overwrite the arrays.
+            os.mkdir(os.path.join(tmp_dir, "other"))
+            other = os.path.join(tmp_dir, "other", "PROCAR.phase")
+            shutil.copy(filepath, other)
+            p3 = Procar(other, memmap_dir=tmp_dir)
+            self.assertNotEqual(p3.data[Spin.down].filename, data_file)
+            del data, p3
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_phase_factor_layouts(self):
+        filepath = os.path.join(test_dir, 'PROCAR.phase')
+        p = Procar(filepath)
+        with open(filepath) as f:
+            lines = f.read().splitlines()
+        # Phase factor tables follow the "tot" row of the projections, with
+        # the real and imaginary parts of each ion on two successive rows.
+        blocks = [i + 2 for i, l in enumerate(lines) if l.startswith("tot")
+                  and i + 1 < len(lines) and lines[i + 1].startswith("ion")]
+        nrows = 2 * p.nions
+
+        def write(filename, get_block):
+            new_lines = lines[:blocks[0]]
+            for i, start in enumerate(blocks):
+                new_lines.extend(get_block(lines[start:start + nrows]))
+                end = blocks[i + 1] if i + 1 < len(blocks) else len(lines)
+                new_lines.extend(lines[start + nrows:end])
+            with open(filename, "w") as f:
+                f.write("\n".join(new_lines) + "\n")
+
+        def get_vasp544_block(rows):
+            # One row per ion with the real and imaginary parts of each
+            # orbital, followed by a "charge" row.
+            return ["%3s " % r.split()[0] + " ".join(
+                "%s %s" % c for c in zip(r.split()[1:], i.split()[1:]))
+                for r, i in zip(rows[::2], rows[1::2])] + \
+                ["charge" + " 0.000" * 18]
+
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            filepath = os.path.join(tmp_dir, "PROCAR")
+            write(filepath, get_vasp544_block)
+            p2 = Procar(filepath)
+            for spin in p.data:
+                self.assertTrue(np.array_equal(p2.data[spin], p.data[spin]))
+                self.assertTrue(np.array_equal(p2.phase_factors[spin],
+                                               p.phase_factors[spin]))
+
+            # Phase factors of an unknown layout are skipped.
+            write(filepath, lambda rows: rows[::2])
+            with warnings.catch_warnings(record=True) as w:
+                warnings.simplefilter("always")
+                p2 = Procar(filepath)
+                self.assertEqual(len(w), 1)
+            self.assertEqual(p2.phase_factors, {})
+            for spin in p.data:
+                self.assertTrue(np.array_equal(p2.data[spin], p.data[spin]))
+        finally:
+            shutil.rmtree(tmp_dir)
+
 
 class XdatcarTest(unittest.TestCase):
 
@@ -22,8 +22,6 @@ import numpy as np
 import itertools
 import collections
 
-from monty.functools import lru_cache
-
 from pymatgen.core.composition import Composition
 from pymatgen.phasediagram.maker import PhaseDiagram, \
     GrandPotentialPhaseDiagram, get_facets
@@ -57,6 +55,7 @@ class PDAnalyzer(object):
             pd: Phase Diagram to analyze.
         """
         self._pd = pd
+        self._facet_data = None
 
     def _make_comp_matrix(self, complist):
         """
@@ -66,20 +65,103 @@ class PDAnalyzer(object):
         return np.array([[comp.get_atomic_fraction(el)
                           for el in self._pd.elements] for comp in complist])
 
-    @lru_cache(1)
+    def _get_facet_data(self):
+        """
+        Returns the origins and inverse transformation matrices of all
+        simplices of the phase diagram, as well as the transposed composition
+        matrices of all facets, as stacked arrays. These allow the barycentric
+        coordinates and decompositions of many compositions to be computed
+        at once. Recomputed only when the facets of the phase diagram change,
+        e.g., after PhaseDiagram.add_entries.
+        """
+        if self._facet_data is None or \
+                self._facet_data[0] is not self._pd.facets:
+            simplices = np.array(self._pd.simplices, dtype=np.float)
+            origins = simplices[:, -1, :]
+            t = simplices[:, :-1, :] - origins[:, None, :]
+            if t.shape[1] > 0:
+                t_inv = np.linalg.inv(t)
+            else:
+                t_inv = t[:, :, :0]
+            comp_matrices = np.array([
+                self._make_comp_matrix(
+                    [self._pd.qhull_entries[i].composition for i in facet]).T
+                for facet in self._pd.facets])
+            self._facet_data = self._pd.facets, origins, t_inv, comp_matrices
+        return self._facet_data[1:]
+
+    def _get_comp_coords(self, comps):
+        """
+        Returns the coordinates of compositions in the space of the
+        simplices, i.e., the atomic fractions of all but the first element.
+        """
+        coords = np.zeros((len(comps), len(self._pd.elements) - 1))
+        for i, comp in enumerate(comps):
+            if set(comp.elements).difference(self._pd.elements):
+                raise ValueError('{} has elements not in the phase diagram {}'
+                                 ''.format(comp, self._pd.elements))
+            coords[i] = [comp.get_atomic_fraction(e)
+                         for e in self._pd.elements[1:]]
+        return coords
+
+    def _find_facets(self, coords, chunk_size=1000000):
+        """
+        Finds the index of the first facet in the phase diagram containing
+        each of a set of composition coordinates, by testing the barycentric
+        coordinates with respect to all facets at once.
+
+        Args:
+            coords (ndarray): N x (dim - 1) array of composition coordinates.
+            chunk_size (int): Maximum number of barycentric coordinates
+                evaluated at once. Limits the memory usage for large batches.
+
+        Returns:
+            Array of N facet indices, with -1 where no facet was found.
+        """
+        origins, t_inv, _ = self._get_facet_data()
+        tol = PDAnalyzer.numerical_tol / 10
+        nfacets, dim = origins.shape
+        step = max(1, chunk_size // max(1, nfacets * (dim + 1)))
+        inds = np.empty(len(coords), dtype=np.int)
+        for start in range(0, len(coords), step):
+            c = coords[start:start + step]
+            bary = np.einsum("nfi,fij->nfj", c[:, None, :] - origins, t_inv)
+            inside = np.all(bary >= -tol, axis=2) & \
+                (1 - np.sum(bary, axis=2) >= -tol)
+            inds[start:start + step] = np.where(np.any(inside, axis=1),
+                                                np.argmax(inside, axis=1), -1)
+        return inds
+
     def _get_facet(self, comp):
         """
-        Get any facet that a composition falls into. Cached so successive
-        calls at same composition are fast.
+        Get any facet that a composition falls into.
+        """
+        ind = self._find_facets(self._get_comp_coords([comp]))[0]
+        if ind < 0:
+            raise RuntimeError("No facet found for comp = {}".format(comp))
+        return self._pd.facets[ind]
+
+    def _get_decomp_amts_batch(self, comps):
         """
-        if set(comp.elements).difference(self._pd.elements):
-            raise ValueError('{} has elements not in the phase diagram {}'
-                             ''.format(comp, self._pd.elements))
-        c = [comp.get_atomic_fraction(e) for e in self._pd.elements[1:]]
-        for f, s in zip(self._pd.facets, self._pd.simplices):
-            if Simplex(s).in_simplex(c, PDAnalyzer.numerical_tol / 10):
-                return f
-        raise RuntimeError("No facet found for comp = {}".format(comp))
+        Computes the facets and decomposition amounts for many compositions
+        with a single batched linear solve.
+
+        Returns:
+            (facet indices, decomposition amounts) as N and N x dim arrays.
+        """
+        inds = self._find_facets(self._get_comp_coords(comps))
+        for comp, ind in zip(comps, inds):
+            if ind < 0:
+                raise RuntimeError("No facet found for comp = {}".format(comp))
+        comp_matrices = self._get_facet_data()[2]
+        compm = self._make_comp_matrix(comps)
+        amts = np.linalg.solve(comp_matrices[inds],
+                               compm[:, :, None])[:, :, 0]
+        return inds, amts
+
+    def _make_decomp(self, facet, amts):
+        return {self._pd.qhull_entries[f]: amt for f, amt in zip(facet, amts)
+                if abs(amt) > PDAnalyzer.numerical_tol}
 
     def get_decomposition(self, comp):
         """
@@ -100,6 +182,27 @@ class PDAnalyzer(object):
                 for f, amt in zip(facet, decomp_amts)
                 if abs(amt[0]) > PDAnalyzer.numerical_tol}
 
+    def get_decomposition_batch(self, comps):
+        """
+        Provides the decompositions at many compositions. All compositions
+        are located in the phase diagram with a vectorized search over the
+        facets and decomposed with a single batched linear solve, which is
+        much faster than repeated calls to get_decomposition for large
+        numbers of compositions.
+
+        Args:
+            comps ([Composition]): List of compositions.
+
+        Returns:
+            List of decompositions as dicts of {Entry: amount}, in the same
+            order as comps.
+        """
+        if len(comps) == 0:
+            return []
+        inds, amts = self._get_decomp_amts_batch(comps)
+        return [self._make_decomp(self._pd.facets[i], a)
+                for i, a in zip(inds, amts)]
+
     def get_hull_energy(self, comp):
         """
         Args:
@@ -117,8 +220,7 @@ class PDAnalyzer(object):
     def get_decomp_and_e_above_hull(self, entry, allow_negative=False):
         """
         Provides the decomposition and energy above convex hull for an entry.
-        Due to caching, can be much faster if entries with the same composition
-        are processed together.
+        Use get_decomp_and_e_above_hull_batch for large numbers of entries.
 
         Args:
             entry: A PDEntry like object
@@ -147,6 +249,60 @@ class PDAnalyzer(object):
             return decomp, ehull
         raise ValueError("No valid decomp found!")
 
+    def get_decomp_and_e_above_hull_batch(self, entries,
+                                          allow_negative=False):
+        """
+        Provides the decompositions and energies above convex hull for many
+        entries. Equivalent to calling get_decomp_and_e_above_hull for each
+        entry, but the facets and decompositions are computed for all
+        entries at once.
+
+        Args:
+            entries ([PDEntry]): List of PDEntry like objects
+            allow_negative: Whether to allow negative e_above_hulls. Defaults
+                to False.
+
+        Returns:
+            List of (decomp, energy above convex hull), in the same order as
+            entries.
+        """
+        stable = set(self._pd.stable_entries)
+        unstable = [e for e in entries if e not in stable]
+        results = {}
+        if unstable:
+            inds, amts = self._get_decomp_amts_batch(
+                [e.composition for e in unstable])
+            energies = np.array([[self._pd.qhull_entries[i].energy_per_atom
+                                  for i in facet]
+                                 for facet in self._pd.facets])
+            ehulls = np.array([e.energy_per_atom for e in unstable]) - \
+                np.sum(amts * energies[inds], axis=1)
+            if not allow_negative and \
+                    np.any(ehulls < -PDAnalyzer.numerical_tol):
+                raise ValueError("No valid decomp found!")
+            for e, i, a, ehull in zip(unstable, inds, amts, ehulls):
+                results[id(e)] = self._make_decomp(self._pd.facets[i], a), \
+                    ehull
+        return [({e: 1}, 0) if e in stable else results[id(e)]
+                for e in entries]
+
+    def get_e_above_hull_batch(self, entries, allow_negative=False):
+        """
+        Provides the energies above convex hull for many entries. See
+        get_decomp_and_e_above_hull_batch.
+
+        Args:
+            entries ([PDEntry]): List of PDEntry like objects
+            allow_negative: Whether to allow negative e_above_hulls. Defaults
+                to False.
+
+        Returns:
+            Array of energies above convex hull, in the same order as
+            entries. Stable entries have energy above hull of 0.
+        """
+        return np.array([d[1] for d in self.get_decomp_and_e_above_hull_batch(
+            entries, allow_negative=allow_negative)])
+
     def get_e_above_hull(self, entry):
         """
         Provides the energy above convex hull for an entry
@@ -152,7 +152,21 @@ class PhaseDiagram(MSONable):
         extra_point[-1] = np.max(qhull_data) + 1
         qhull_data = np.concatenate([qhull_data, [extra_point]], axis=0)
 
-        if dim == 1:
+        self.all_entries = all_entries
+        self.qhull_data = qhull_data
+        self.dim = dim
+        self.el_refs = el_refs
+        self.elements = elements
+        self.qhull_entries = qhull_entries
+        self._compute_facets()
+
+    def _compute_facets(self):
+        """
+        Computes the facets and simplices from the full convex hull of
+        qhull_data.
+        """
+        qhull_data = self.qhull_data
+        if self.dim == 1:
             self.facets = [qhull_data.argmin(axis=0)]
         else:
             facets = get_facets(qhull_data)
@@ -161,19 +175,182 @@ class PhaseDiagram(MSONable):
                 # Skip facets that include the extra point
                 if max(facet) == len(qhull_data)-1:
                     continue
-                m = qhull_data[facet]
-                m[:, -1] = 1
-                if abs(np.linalg.det(m)) > 1e-14:
+                if not self._is_degenerate(facet):
                     finalfacets.append(facet)
             self.facets = finalfacets
-
         self.simplices = [qhull_data[f, :-1] for f in self.facets]
+
+    def _is_degenerate(self, facet):
+        m = self.qhull_data[facet]
+        m[:, -1] = 1
+        return abs(np.linalg.det(m)) <= 1e-14
+
+    def _get_hull_row(self, entry):
+        """
+        Returns the atomic fractions of all elements and the energy per atom
+        of an entry, i.e., a row of qhull_data with the fraction of the first
+        element prepended.
+        """
+        comp = entry.composition
+        return np.array([comp.get_atomic_fraction(el)
+                         for el in self.elements] + [entry.energy_per_atom])
+
+    def add_entries(self, entries):
+        """
+        Adds entries to the phase diagram, updating the convex hull
+        incrementally instead of reconstructing the phase diagram.
+
+        An entry that is not the lowest energy entry at its composition or
+        that lies on or above the current convex hull only updates
+        all_entries (and qhull_entries), without touching the facets. An
+        entry below the hull replaces the facets it lies below by new facets
+        joining it to their boundary ridges. Only an entry lowering an
+        elemental reference, which changes all formation energies, leads to
+        a full reconstruction. The resulting phase diagram is equivalent to
+        a PhaseDiagram constructed with all entries, up to the ordering of
+        the entries and facets.
+
+        Args:
+            entries ([PDEntry]): PDEntry-like objects to add. They may only
+                contain elements of the phase diagram.
+        """
+        for entry in entries:
+            if set(entry.composition.elements).difference(self.elements):
+                raise ValueError("{} has elements not in the phase diagram {}"
+                                 "".format(entry.composition, self.elements))
+        for entry in entries:
+            self._add_entry(entry)
+
+    def _add_entry(self, entry):
+        self.all_entries.append(entry)
+        comp = entry.composition
+        if comp.is_element:
+            el = comp.elements[0]
+            if entry.energy_per_atom < self.el_refs[el].energy_per_atom:
+                PhaseDiagram.__init__(self, self.all_entries, self.elements)
+            return
+
+        row = self._get_hull_row(entry)
+        refs = [self.el_refs[el].energy_per_atom for el in self.elements]
+        form_e = row[-1] - np.dot(row[:-1], refs)
+        row = row[1:]
+        qhull_data = self.qhull_data
+        same = np.where(np.all(
+            np.abs(qhull_data[:-1, :-1] - row[:-1]) <
+            Composition.amount_tolerance, axis=1))[0]
+        if len(same) > 0:
+            ind = same[0]
+            if row[-1] >= qhull_data[ind, -1]:
+                return
+        elif form_e < -self.formation_energy_tol:
+            ind = len(self.qhull_entries)
+        else:
+            return
+
+        # Find the facets lying above the new point, i.e., the facets
+        # "visible" from below.
+        if len(self.facets) > 0:
+            pts = qhull_data[np.array(self.facets)]
+            a = pts.copy()
+            a[:, :, -1] = 1
+            planes = np.linalg.solve(a, pts[:, :, -1])
+            hull_e = np.dot(planes[:, :-1], row[:-1]) + planes[:, -1]
+            visible = row[-1] < hull_e - self.formation_energy_tol
+        else:
+            visible = []
+
+        if ind == len(self.qhull_entries):
+            self.qhull_entries.append(entry)
+            self.qhull_data = np.concatenate(
+                [qhull_data[:-1], [row], qhull_data[-1:]], axis=0)
+        else:
+            self.qhull_entries[ind] = entry
+            self.qhull_data = qhull_data.copy()
+            self.qhull_data[ind] = row
+
+        # The new lower hull consists of the facets that are not visible,
+        # plus the cones from the new point over the ridges bounding the
+        # visible region. Degenerate cones are those over ridges lying in
+        # the same boundary of the composition space as the new point.
+        facets = [f for f, v in zip(self.facets, visible) if not v]
+        ridges = collections.Counter()
+        for f, v in zip(self.facets, visible):
+            if v:
+                ridges.update(tuple(sorted(r)) for r in
+                              itertools.combinations(f, self.dim - 1))
+        for r, count in ridges.items():
+            if count == 1 and ind not in r:
+                facet = np.array(r + (ind,))
+                if not self._is_degenerate(facet):
+                    facets.append(facet)
+        self.facets = facets
+        self.simplices = [self.qhull_data[f, :-1] for f in self.facets]
+
+    def remove_entries(self, entries):
+        """
+        Removes entries from the phase diagram. Removing an entry that is
+        not part of the convex hull only updates all_entries and
+        qhull_entries. If stable entries are removed, only the convex hull
+        is recomputed, which is much cheaper than processing all the entries
+        again. Removing an elemental reference leads to a full
+        reconstruction. The resulting phase diagram is equivalent to a
+        PhaseDiagram constructed without the entries, up to the ordering of
+        the entries and facets.
+
+        Args:
+            entries ([PDEntry]): Entries to remove. Must be in all_entries.
+        """
+        all_entries = list(self.all_entries)
+        for entry in entries:
+            if entry not in all_entries:
+                raise ValueError("{} is not in the phase diagram".format(
+                    entry))
+            all_entries.remove(entry)
+        if any(e in self.el_refs.values() for e in entries):
+            PhaseDiagram.__init__(self, all_entries, self.elements)
+            return
         self.all_entries = all_entries
-        self.qhull_data = qhull_data
-        self.dim = dim
-        self.el_refs = el_refs
-        self.elements = elements
-        self.qhull_entries = qhull_entries
+
+        refs = [self.el_refs[el].energy_per_atom for el in self.elements]
+        stable = set(itertools.chain(*self.facets))
+        data = self.all_entries_hulldata if all_entries else None
+        hull_changed = False
+        removed = set()
+        for entry in entries:
+            if entry not in self.qhull_entries:
+                continue
+            ind = self.qhull_entries.index(entry)
+            hull_changed = hull_changed or ind in stable
+            # Replace the entry by the next lowest energy entry with the same
+            # composition, if it has a negative formation energy.
+            row = self._get_hull_row(entry)
+            same = np.where(np.all(np.abs(data[:, :-1] - row[1:-1]) <
+                                   Composition.amount_tolerance, axis=1))[0]
+            if len(same) > 0:
+                new_entry = min([all_entries[i] for i in same],
+                                key=lambda e: e.energy_per_atom)
+                new_row = self._get_hull_row(new_entry)
+                if new_row[-1] - np.dot(new_row[:-1], refs) < \
+                        -self.formation_energy_tol:
+                    self.qhull_entries[ind] = new_entry
+                    self.qhull_data[ind] = new_row[1:]
+                    continue
+            removed.add(ind)
+
+        keep = np.array([i not in removed
+                         for i in range(len(self.qhull_data))])
+        self.qhull_entries = [e for e, k in zip(self.qhull_entries, keep)
+                              if k]
+        self.qhull_data = self.qhull_data[keep]
+        if hull_changed:
+            self.qhull_data[-1, -1] = np.max(self.qhull_data[:-1]) + 1
+            self._compute_facets()
+        else:
+            # Only unstable entries were removed, so the facets are unchanged
+            # apart from the shift of the indices.
+            new_inds = np.cumsum(keep) - 1
+            self.facets = [new_inds[f] for f in self.facets]
+            self.simplices = [self.qhull_data[f, :-1] for f in self.facets]
 
     @property
     def all_entries_hulldata(self):
@@ -300,6 +477,32 @@ class GrandPotentialPhaseDiagram(PhaseDiagram):
                 all_entries.append(GrandPotPDEntry(e, self.chempots))
         super(GrandPotentialPhaseDiagram, self).__init__(all_entries, elements)
 
+    def add_entries(self, entries):
+        """
+        Adds entries to the grand potential phase diagram. See
+        PhaseDiagram.add_entries.
+
+        Args:
+            entries ([PDEntry]): PDEntry-like objects to add. Entries
+                containing only open elements are ignored.
+        """
+        elements = set(self.elements)
+        super(GrandPotentialPhaseDiagram, self).add_entries(
+            [GrandPotPDEntry(e, self.chempots) for e in entries
+             if elements.intersection(e.composition.elements)])
+
+    def remove_entries(self, entries):
+        """
+        Removes entries from the grand potential phase diagram. See
+        PhaseDiagram.remove_entries.
+
+        Args:
+            entries ([PDEntry]): The original entries to remove.
+        """
+        super(GrandPotentialPhaseDiagram, self).remove_entries(
+            [e for e in self.all_entries
+             if any(e.original_entry is o for o in entries)])
+
     def __str__(self):
         output = []
         chemsys = "-".join([el.symbol for el in self.elements])
@@ -361,6 +564,35 @@ class CompoundPhaseDiagram(PhaseDiagram):
         super(CompoundPhaseDiagram, self).__init__(
             pentries, elements=species_mapping.values())
 
+    def add_entries(self, entries):
+        """
+        Adds entries to the compound phase diagram. See
+        PhaseDiagram.add_entries.
+
+        Args:
+            entries ([PDEntry]): PDEntry-like objects to add. Entries not
+                falling within the space defined by the terminal
+                compositions are ignored.
+        """
+        self.original_entries = list(self.original_entries) + list(entries)
+        pentries = self.transform_entries(entries,
+                                          self.terminal_compositions)[0]
+        super(CompoundPhaseDiagram, self).add_entries(pentries)
+
+    def remove_entries(self, entries):
+        """
+        Removes entries from the compound phase diagram. See
+        PhaseDiagram.remove_entries.
+
+        Args:
+            entries ([PDEntry]): The original entries to remove.
+        """
+        super(CompoundPhaseDiagram, self).remove_entries(
+            [e for e in self.all_entries
+             if any(e.original_entry is o for o in entries)])
+        self.original_entries = [e for e in self.original_entries
+                                 if not any(e is o for o in entries)]
+
     def transform_entries(self, entries, terminal_compositions):
         """
         Method to transform all entries to the composition coordinate in the
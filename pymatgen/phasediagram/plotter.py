@@ -267,14 +267,14 @@ class PDPlotter(object):
             font = FontProperties()
             font.set_size(16)
             pda = PDAnalyzer(self._pd)
-            energies_unstable = [pda.get_e_above_hull(entry)
-                                 for entry, coord in unstable.items()]
+            energies_unstable = list(pda.get_e_above_hull_batch(
+                list(unstable.keys())))
             if energy_colormap is not None:
                 energies.extend(energies_unstable)
                 vals_unstable = _map.to_rgba(energies_unstable)
             ii = 0
-            for entry, coords in unstable.items():
-                ehull = pda.get_e_above_hull(entry)
+            for (entry, coords), ehull in zip(unstable.items(),
+                                              energies_unstable):
                 if ehull < self.show_unstable:
                     vec = (np.array(coords) - center)
                     vec = vec / np.linalg.norm(vec) * 10 \
@@ -507,8 +507,7 @@ class PDPlotter(object):
         plt = self._get_2d_plot()
         analyzer = PDAnalyzer(pd)
         data[:, 0:2] = triangular_coord(data[:, 0:2]).transpose()
-        for i, e in enumerate(entries):
-            data[i, 2] = analyzer.get_e_above_hull(e)
+        data[:, 2] = analyzer.get_e_above_hull_batch(entries)
 
         gridsize = 0.005
         xnew = np.arange(0, 1., gridsize)
@@ -35,6 +35,20 @@ class PDAnalyzerTest(unittest.TestCase):
                 self.assertGreaterEqual(e_ah, 0)
                 self.assertTrue(isinstance(e_ah, Number))
 
+    def test_get_decomp_and_e_above_hull_batch(self):
+        entries = self.pd.all_entries
+        batch = self.analyzer.get_decomp_and_e_above_hull_batch(entries)
+        for entry, (decomp, e_ah) in zip(entries, batch):
+            decomp2, e_ah2 = self.analyzer.get_decomp_and_e_above_hull(entry)
+            self.assertAlmostEqual(e_ah, e_ah2)
+            self.assertEqual(set(decomp.keys()), set(decomp2.keys()))
+            for k, v in decomp.items():
+                self.assertAlmostEqual(v, decomp2[k])
+        e_ahs = self.analyzer.get_e_above_hull_batch(entries)
+        self.assertEqual(len(e_ahs), len(entries))
+        self.assertAlmostEqual(e_ahs[0], batch[0][1])
+        self.assertEqual(self.analyzer.get_e_above_hull_batch([]).shape, (0,))
+
     def test_get_equilibrium_reaction_energy(self):
         for entry in self.pd.stable_entries:
             self.assertLessEqual(
@@ -61,6 +75,18 @@ class PDAnalyzerTest(unittest.TestCase):
         for k, v in expected_ans.items():
             self.assertAlmostEqual(ansdict[k], v)
 
+    def test_get_decomposition_batch(self):
+        comps = [e.composition for e in self.pd.all_entries]
+        comps.append(Composition("Li3Fe7O11"))
+        for comp, decomp in zip(
+                comps, self.analyzer.get_decomposition_batch(comps)):
+            expected = self.analyzer.get_decomposition(comp)
+            self.assertEqual(set(decomp.keys()), set(expected.keys()))
+            for k, v in decomp.items():
+                self.assertAlmostEqual(v, expected[k])
+        self.assertRaises(ValueError, self.analyzer.get_decomposition_batch,
+                          [Composition("LiNa")])
+
     def test_get_transition_chempots(self):
         for el in self.pd.elements:
             self.assertLessEqual(len(self.analyzer.get_transition_chempots(el)),
@@ -109,6 +135,8 @@ class PDAnalyzerTest(unittest.TestCase):
         decomp, e = pda.get_decomp_and_e_above_hull(PDEntry('H', 1))
         self.assertAlmostEqual(e, 1)
         self.assertAlmostEqual(decomp[entry], 1.0)
+        self.assertAlmostEqual(
+            pda.get_e_above_hull_batch([PDEntry('H', 1), entry])[0], 1)
 
 
 if __name__ == '__main__':
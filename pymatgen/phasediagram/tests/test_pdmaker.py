@@ -73,6 +73,53 @@ class PhaseDiagramTest(unittest.TestCase):
         for formula, energy in expected_formation_energies.items():
             self.assertAlmostEqual(energy, stable_formation_energies[formula],
                                    7)
+
+    def test_add_remove_entries(self):
+        def facet_entries(pd):
+            return set(frozenset(pd.qhull_entries[i] for i in f)
+                       for f in pd.facets)
+
+        entries = [e for e in self.entries if e.composition.is_element] + \
+            [e for e in self.entries if not e.composition.is_element]
+        pd = PhaseDiagram(entries[:200])
+        for i in range(200, len(entries), 50):
+            pd.add_entries(entries[i:i + 50])
+            ref = PhaseDiagram(entries[:i + 50])
+            self.assertEqual(set(pd.all_entries), set(ref.all_entries))
+            self.assertEqual(set(pd.qhull_entries), set(ref.qhull_entries))
+            self.assertEqual(pd.stable_entries, ref.stable_entries)
+            self.assertEqual(facet_entries(pd), facet_entries(ref))
+
+        # Entries below the hull, including a new lowest energy entry for an
+        # existing stable composition.
+        new = [PDEntry("Li3FeO4", -60), PDEntry("Fe2O3", -40)]
+        pd.add_entries(new)
+        ref = PhaseDiagram(self.entries + new)
+        self.assertIn(new[0], pd.stable_entries)
+        self.assertEqual(pd.stable_entries, ref.stable_entries)
+        self.assertEqual(facet_entries(pd), facet_entries(ref))
+        self.assertRaises(ValueError, pd.add_entries, [PDEntry("NaCl", -1)])
+
+        removed = new + [e for e in ref.stable_entries
+                         if e.name == "LiFeO2"] + self.entries[-20:]
+        pd.remove_entries(removed)
+        ref = PhaseDiagram([e for e in self.entries + new
+                            if e not in removed])
+        self.assertEqual(set(pd.all_entries), set(ref.all_entries))
+        self.assertEqual(set(pd.qhull_entries), set(ref.qhull_entries))
+        self.assertEqual(pd.stable_entries, ref.stable_entries)
+        self.assertEqual(facet_entries(pd), facet_entries(ref))
+        analyzer, ref_analyzer = PDAnalyzer(pd), PDAnalyzer(ref)
+        for e in pd.all_entries:
+            self.assertAlmostEqual(analyzer.get_e_above_hull(e),
+                                   ref_analyzer.get_e_above_hull(e))
+        self.assertRaises(ValueError, pd.remove_entries, new)
+
+        # Changing an elemental reference reconstructs the phase diagram.
+        li = PDEntry("Li", -10)
+        pd.add_entries([li])
+        self.assertEqual(pd.el_refs[Element("Li")], li)
+
     def test_all_entries_hulldata(self):
         self.assertEqual(len(self.pd.all_entries_hulldata), 492)
 
@@ -159,6 +206,19 @@ class CompoundPhaseDiagramTest(unittest.TestCase):
             self.assertAlmostEqual(energy, stable_formation_energies[formula],
                                    7)
 
+    def test_add_remove_entries(self):
+        terminals = [Composition("Li2O"), Composition("Fe2O3")]
+        pd = CompoundPhaseDiagram(self.entries[:100], terminals)
+        pd.add_entries(self.entries[100:])
+        self.assertEqual(set(e.name for e in pd.stable_entries),
+                         set(e.name for e in self.pd.stable_entries))
+        self.assertEqual(len(pd.original_entries), len(self.entries))
+        pd.remove_entries(self.entries[100:])
+        ref = CompoundPhaseDiagram(self.entries[:100], terminals)
+        self.assertEqual(set(e.name for e in pd.stable_entries),
+                         set(e.name for e in ref.stable_entries))
+        self.assertEqual(len(pd.original_entries), 100)
+
     def test_str(self):
         self.assertIsNotNone(str(self.pd))
 
@@ -3,9 +3,11 @@
 # Distributed under the terms of the MIT License.
 
 from __future__ import division, unicode_literals, print_function
+import copy
 import itertools
 import logging
-from collections import defaultdict
+import threading
+from collections import defaultdict, OrderedDict
 
 import math
 from math import cos
@@ -13,6 +15,7 @@ from math import sin
 from fractions import Fraction
 
 import numpy as np
+from scipy.spatial import cKDTree
 
 from six.moves import filter, map, zip
 from monty.dev import deprecated
@@ -47,6 +50,97 @@ __date__ = "May 14, 2016"
 logger = logging.getLogger(__name__)
 
 
+class SpglibCache(object):
+    """
+    A process-wide, bounded LRU cache of the results of spglib calls, which
+    are keyed on the cell passed to spglib (lattice, fractional coordinates,
+    species numbers and magnetic moments) and the tolerances. All
+    SpacegroupAnalyzer instances share the module-level instance
+    spglib_cache, so that a structure analyzed repeatedly, e.g., by several
+    analysis methods, is only passed to spglib once per function. Cached
+    results are copied on retrieval, so they can be safely modified.
+
+    Usage::
+
+        spglib_cache.hits, spglib_cache.misses, spglib_cache.hit_rate
+        spglib_cache.clear()
+        spglib_cache.maxsize = 0  # Disables caching.
+
+    Args:
+        maxsize (int): Maximum number of cached results. Caching is
+            disabled if maxsize is 0.
+    """
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, func, cell, **kwargs):
+        """
+        Returns the result of func(cell, **kwargs), from the cache if
+        possible.
+
+        Args:
+            func: spglib function.
+            cell: Tuple of (lattice, positions, numbers, magmoms) as passed
+                to spglib.
+            \*\*kwargs: Keyword arguments (tolerances) of func.
+        """
+        if self.maxsize <= 0:
+            return func(cell, **kwargs)
+        latt, positions, numbers, magmoms = cell
+        try:
+            key = (func.__name__,
+                   np.ascontiguousarray(latt, dtype=np.float).tobytes(),
+                   np.ascontiguousarray(positions, dtype=np.float).tobytes(),
+                   np.ascontiguousarray(numbers, dtype=np.int).tobytes(),
+                   np.ascontiguousarray(magmoms, dtype=np.float).tobytes(),
+                   tuple(sorted(kwargs.items())))
+        except (TypeError, ValueError):
+            # E.g., magnetic moments which are not simple numbers.
+            return func(cell, **kwargs)
+        with self._lock:
+            if key in self._results:
+                self.hits += 1
+                # Mark as most recently used.
+                result = self._results.pop(key)
+                self._results[key] = result
+                return copy.deepcopy(result)
+        result = func(cell, **kwargs)
+        with self._lock:
+            self.misses += 1
+            self._results[key] = copy.deepcopy(result)
+            while len(self._results) > self.maxsize:
+                self._results.popitem(last=False)
+        return result
+
+    @property
+    def hit_rate(self):
+        """
+        Fraction of the calls served from the cache.
+        """
+        calls = self.hits + self.misses
+        return self.hits / calls if calls else 0
+
+    def clear(self):
+        """
+        Removes all cached results and resets the statistics.
+        """
+        with self._lock:
+            self._results.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._results)
+
+
+spglib_cache = SpglibCache()
+
+
 class SpacegroupAnalyzer(object):
     """
     Takes a pymatgen.core.structure.Structure object and a symprec.
@@ -62,6 +156,9 @@ class SpacegroupAnalyzer(object):
             codes), a looser tolerance of 0.1 (the value used in Materials
             Project) is often needed.
         angle_tolerance (float): Angle tolerance for symmetry finding.
+
+    The results of spglib are cached in spglib_cache (see SpglibCache), so
+    creating several analyzers for the same structure is cheap.
     """
 
     def __init__(self, structure, symprec=1e-3, angle_tolerance=5):
@@ -96,8 +193,9 @@ class SpacegroupAnalyzer(object):
         # For now, we are setting magmom to zero.
         self._cell = latt, positions, zs, magmoms
 
-        self._space_group_data = spglib.get_symmetry_dataset(
-            self._cell, symprec=self._symprec, angle_tolerance=angle_tolerance)
+        self._space_group_data = spglib_cache.get(
+            spglib.get_symmetry_dataset, self._cell, symprec=self._symprec,
+            angle_tolerance=angle_tolerance)
 
     @deprecated(message="get_spacegroup has been renamed "
                         "get_space_group_operations. Will be removed in "
@@ -265,8 +363,9 @@ class SpacegroupAnalyzer(object):
             "translations" gives the numpy float64 array of the translation
             vectors in scaled positions.
         """
-        d = spglib.get_symmetry(self._cell, symprec=self._symprec,
-                                angle_tolerance=self._angle_tol)
+        d = spglib_cache.get(spglib.get_symmetry, self._cell,
+                             symprec=self._symprec,
+                             angle_tolerance=self._angle_tol)
         # Sometimes spglib returns small translation vectors, e.g. [1e-4, 2e-4, 1e-4]
         # (these are in fractional coordinates, so should be small denominator fractions)
         trans = []
@@ -346,8 +445,9 @@ class SpacegroupAnalyzer(object):
             Refined structure.
         """
         # Atomic positions have to be specified by scaled positions for spglib.
-        lattice, scaled_positions, numbers \
-            = spglib.refine_cell(self._cell, self._symprec, self._angle_tol)
+        lattice, scaled_positions, numbers = spglib_cache.get(
+            spglib.refine_cell, self._cell, symprec=self._symprec,
+            angle_tolerance=self._angle_tol)
 
         species = [self._unique_species[i - 1] for i in numbers]
         s = Structure(lattice, species, scaled_positions)
@@ -362,8 +462,8 @@ class SpacegroupAnalyzer(object):
             as an Structure object. If no primitive cell is found, None is
             returned.
         """
-        lattice, scaled_positions, numbers = spglib.find_primitive(
-            self._cell, symprec=self._symprec)
+        lattice, scaled_positions, numbers = spglib_cache.get(
+            spglib.find_primitive, self._cell, symprec=self._symprec)
 
         species = [self._unique_species[i - 1] for i in numbers]
 
@@ -839,6 +939,16 @@ class PointGroupAnalyzer(object):
         self.tol = tolerance
         self.eig_tol = eigen_tolerance
         self.mat_tol = matrix_tol
+
+        # KD-tree of the sites and integer labels of their species, which
+        # are used to check candidate operations.
+        self._coords = self.centered_mol.cart_coords
+        self._tree = cKDTree(self._coords)
+        labels = {}
+        self._species_labels = np.array(
+            [labels.setdefault(site.species_and_occu, len(labels))
+             for site in self.centered_mol])
+
         self._analyze()
         if self.sch_symbol in ["C1v", "C1h"]:
             self.sch_symbol = "Cs"
@@ -847,18 +957,14 @@ class PointGroupAnalyzer(object):
         if len(self.centered_mol) == 1:
             self.sch_symbol = "Kh"
         else:
-            inertia_tensor = np.zeros((3, 3))
-            total_inertia = 0
-            for site in self.mol:
-                c = site.coords
-                wt = site.species_and_occu.weight
-                for i in range(3):
-                    inertia_tensor[i, i] += wt * (c[(i + 1) % 3] ** 2
-                                                  + c[(i + 2) % 3] ** 2)
-                for i, j in itertools.combinations(list(range(3)), 2):
-                    inertia_tensor[i, j] += -wt * c[i] * c[j]
-                    inertia_tensor[j, i] += -wt * c[j] * c[i]
-                total_inertia += wt * np.dot(c, c)
+            coords = self.mol.cart_coords
+            wts = np.array([float(site.species_and_occu.weight)
+                            for site in self.mol])
+            # I = sum_k w_k (|c_k|^2 E - c_k c_k^T)
+            sq_norms = np.sum(coords ** 2, axis=1)
+            inertia_tensor = np.eye(3) * np.dot(wts, sq_norms) - \
+                np.dot(coords.T * wts, coords)
+            total_inertia = np.dot(wts, sq_norms)
 
             # Normalize the inertia tensor so that it does not scale with size
             # of the system.  This mitigates the problem of choosing a proper
@@ -1180,15 +1286,17 @@ class PointGroupAnalyzer(object):
         Returns:
             (bool): Whether SymmOp is valid for Molecule.
         """
-        coords = self.centered_mol.cart_coords
-        for site in self.centered_mol:
-            coord = symmop.operate(site.coords)
-            ind = find_in_coord_list(coords, coord, self.tol)
-            if not (len(ind) == 1 and
-                            self.centered_mol[ind[0]].species_and_occu
-                            == site.species_and_occu):
-                return False
-        return True
+        # Each transformed site must have exactly one site of the same
+        # species within tol (in each Cartesian direction, i.e., the
+        # Chebyshev distance) of it.
+        new_coords = symmop.operate_multi(self._coords)
+        dists, inds = self._tree.query(new_coords, k=2, p=np.inf,
+                                       distance_upper_bound=self.tol)
+        found = dists[:, 0] < self.tol
+        if not np.all(found) or np.any(dists[:, 1] < self.tol):
+            return False
+        return bool(np.all(self._species_labels[inds[:, 0]] ==
+                           self._species_labels))
 
 
 def cluster_sites(mol, tol):
@@ -1226,32 +1334,64 @@ def cluster_sites(mol, tol):
 
 def generate_full_symmops(symmops, tol, max_recursion_depth=300):
     """
-    Recursive algorithm to permute through all possible combinations of the
-    initially supplied symmetry operations to arrive at a complete set of
-    operations mapping a single atom to all other equivalent atoms in the
-    point group.  This assumes that the initial number already uniquely
-    identifies all operations.
+    Closes an initial set of symmetry operations under multiplication to
+    arrive at a complete set of operations mapping a single atom to all
+    other equivalent atoms in the point group. This assumes that the initial
+    number already uniquely identifies all operations.
+
+    The products of each newly found operation with all known operations
+    are computed in one batch, and are looked up in a hash of the known
+    affine matrices rounded to the tolerance. Only products not found in
+    the hash are compared with all known operations, so that closing a group
+    of order n costs O(n^2) products and lookups.
 
     Args:
         symmops ([SymmOp]): Initial set of symmetry operations.
+        tol (float): Tolerance for two operations to be considered the same,
+            i.e., the maximum absolute difference of their affine matrices.
+        max_recursion_depth (int): Maximum number of operations. If more
+            operations are generated, the generation is aborted, which
+            usually indicates an error in the initial operations or a too
+            low tolerance.
 
     Returns:
         Full set of symmetry operations.
     """
+    symmops = list(symmops)
+    if not symmops:
+        return symmops
 
-    a = [o.affine_matrix for o in symmops]
-
-    if len(symmops) > max_recursion_depth:
-        logger.debug("Generation of symmetry operations in infinite loop.  " +
-                     "Possible error in initial operations or tolerance too "
-                     "low.")
-    else:
-        for op1, op2 in itertools.product(symmops, symmops):
-            m = np.dot(op1.affine_matrix, op2.affine_matrix)
-            d = np.abs(a - m) < tol
-            if not np.any(np.all(np.all(d, axis=2), axis=1)):
-                return generate_full_symmops(symmops + [SymmOp(m)], tol, 
-                                             max_recursion_depth)
+    def get_keys(matrices):
+        rounded = np.round(matrices / tol).astype(np.int64)
+        return [r.tobytes() for r in rounded]
+
+    matrices = np.array([o.affine_matrix for o in symmops])
+    known = set(get_keys(matrices))
+    n_processed = 0
+    while n_processed < len(symmops):
+        new = matrices[n_processed:]
+        n_processed = len(symmops)
+        products = np.concatenate([
+            np.einsum("aij,bjk->abik", new, matrices).reshape(-1, 4, 4),
+            np.einsum("aij,bjk->abik", matrices, new).reshape(-1, 4, 4)])
+        added = []
+        for m, key in zip(products, get_keys(products)):
+            if key in known:
+                continue
+            known.add(key)
+            # The rounded matrices of operations within tol may differ.
+            if np.any(np.all(np.abs(matrices - m) < tol, axis=(1, 2))) or \
+                    any(np.all(np.abs(a - m) < tol) for a in added):
+                continue
+            added.append(m)
+            symmops.append(SymmOp(m))
+            if len(symmops) > max_recursion_depth:
+                logger.debug("Generation of symmetry operations in infinite "
+                             "loop.  Possible error in initial operations or "
+                             "tolerance too low.")
+                return symmops
+        if added:
+            matrices = np.concatenate([matrices, np.array(added)])
 
     return symmops
 
@@ -25,7 +25,7 @@ from pymatgen.core.sites import PeriodicSite
 from pymatgen.io.vasp.inputs import Poscar
 from pymatgen.io.vasp.outputs import Vasprun
 from pymatgen.symmetry.analyzer import SpacegroupAnalyzer, \
-    PointGroupAnalyzer, cluster_sites
+    PointGroupAnalyzer, cluster_sites, generate_full_symmops, spglib_cache
 from pymatgen.io.cif import CifParser
 from pymatgen.util.testing import PymatgenTest
 from pymatgen.core.structure import Molecule, Structure
@@ -100,6 +100,41 @@ class SpacegroupAnalyzerTest(PymatgenTest):
         ds = self.sg.get_symmetry_dataset()
         self.assertEqual(ds['international'], 'Pnma')
 
+    def test_spglib_cache(self):
+        spglib_cache.clear()
+        sg = SpacegroupAnalyzer(self.structure, 0.001)
+        self.assertEqual(spglib_cache.misses, 1)
+        sg2 = SpacegroupAnalyzer(self.structure.copy(), 0.001)
+        self.assertEqual(spglib_cache.hits, 1)
+        self.assertEqual(sg2.get_space_group_symbol(), "Pnma")
+        self.assertAlmostEqual(spglib_cache.hit_rate, 0.5)
+
+        # Modifying a result must not modify the cache.
+        sg2.get_symmetry_dataset()["rotations"][:] = 0
+        self.assertTrue(np.any(SpacegroupAnalyzer(
+            self.structure, 0.001).get_symmetry_dataset()["rotations"]))
+
+        # Tolerances and coordinates are part of the key.
+        SpacegroupAnalyzer(self.structure, 0.1)
+        s = self.structure.copy()
+        s.translate_sites([0], [0.01, 0, 0])
+        SpacegroupAnalyzer(s, 0.001)
+        self.assertEqual(spglib_cache.misses, 3)
+        self.assertEqual(len(sg.get_symmetry_operations()),
+                         len(sg2.get_symmetry_operations()))
+        self.assertEqual(spglib_cache.misses, 4)
+
+        maxsize = spglib_cache.maxsize
+        try:
+            spglib_cache.maxsize = 0
+            SpacegroupAnalyzer(self.structure, 0.001)
+            self.assertEqual(spglib_cache.misses, 4)
+            spglib_cache.maxsize = 2
+            SpacegroupAnalyzer(self.structure, 0.01)
+            self.assertEqual(len(spglib_cache), 2)
+        finally:
+            spglib_cache.maxsize = maxsize
+
     def test_get_crystal_system(self):
         crystal_system = self.sg.get_crystal_system()
         self.assertEqual('orthorhombic', crystal_system)
@@ -416,6 +451,10 @@ class PointGroupAnalyzerTest(PymatgenTest):
         m = Molecule.from_file(os.path.join(test_dir_mol, "c60.xyz"))
         a = PointGroupAnalyzer(m)
         self.assertEqual(a.sch_symbol, "Ih")
+        ops = a.get_pointgroup()
+        self.assertEqual(len(ops), 120)
+        for op in ops:
+            self.assertTrue(a.is_valid_op(op))
 
     def test_linear(self):
         coords = [[0.000000, 0.000000, 0.000000],
@@ -530,6 +569,29 @@ class FuncTest(unittest.TestCase):
         self.assertIsNone(o)
         self.assertEqual(len(c), 4)
 
+    def test_generate_full_symmops(self):
+        a = PointGroupAnalyzer(PF6)
+        ops = a.get_pointgroup()
+        # C4 along z, C3 along [111] and inversion generate Oh.
+        gens = [op for op in ops
+                if np.allclose(op.rotation_matrix,
+                               [[0, -1, 0], [1, 0, 0], [0, 0, 1]]) or
+                np.allclose(op.rotation_matrix,
+                            [[0, 0, 1], [1, 0, 0], [0, 1, 0]]) or
+                np.allclose(op.rotation_matrix, -np.eye(3))]
+        self.assertEqual(len(gens), 3)
+        full = generate_full_symmops(gens, 0.01)
+        self.assertEqual(len(full), 48)
+        mats = [op.affine_matrix for op in full]
+        for m1 in mats:
+            for m2 in mats:
+                self.assertTrue(any(np.allclose(np.dot(m1, m2), m)
+                                    for m in mats))
+        # The closure stops once max_recursion_depth operations are found.
+        self.assertLess(len(generate_full_symmops(gens, 0.01,
+                                                  max_recursion_depth=10)),
+                        48)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,6 +1,8 @@
 import unittest
 
 import os
+import subprocess
+import sys
 import yaml
 from pymatgen import SETTINGS_FILE, _load_pmg_settings
 
@@ -19,5 +21,26 @@ class SettingsTestCase(unittest.TestCase):
                 self.assertEqual(v, os.environ.get(k))
 
 
+class LazyImportTestCase(unittest.TestCase):
+
+    def test_lazy_import(self):
+        # Heavy modules must not be imported by "import pymatgen".
+        code = "import sys, pymatgen; print(' '.join(sorted(sys.modules)))"
+        modules = subprocess.check_output(
+            [sys.executable, "-c", code]).decode("utf-8").split()
+        for m in ["pymatgen.core.structure", "pymatgen.matproj.rest",
+                  "scipy", "matplotlib", "requests"]:
+            self.assertNotIn(m, modules)
+
+        import pymatgen
+        from pymatgen import Structure, MPRester
+        from pymatgen.core.structure import Structure as Structure2
+        self.assertIs(Structure, Structure2)
+        self.assertIs(pymatgen.core.Structure, Structure2)
+        self.assertIn("Element", dir(pymatgen))
+        self.assertEqual(pymatgen.core.periodic_table.Element("Fe").Z, 26)
+        self.assertRaises(AttributeError, getattr, pymatgen, "NotAnAlias")
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -5,6 +5,11 @@
 from __future__ import division, unicode_literals
 
 import numpy as np
+import collections
+import hashlib
+import heapq
+import json
+import os
 from fractions import gcd, Fraction
 from itertools import groupby
 from warnings import warn
@@ -12,7 +17,8 @@ import logging
 import math
 
 import six
-from monty.json import MontyDecoder
+from monty.json import MontyDecoder, MontyEncoder
+from monty.serialization import dumpfn, loadfn
 from monty.fractions import lcm
 
 from pymatgen.core.structure import Composition
@@ -270,17 +276,26 @@ class EnumerateStructureTransformation(AbstractTransformation):
             structures. But sometimes including ordered sites
             slows down enumeration to the point that it cannot be
             completed. Switch to False in those cases. Defaults to True.
+        cache_dir (str): Directory in which the enumerated structures are
+            stored, keyed by the parent structure and the enumeration
+            parameters, so that enumerating the same structure again does
+            not call enumlib. Default of None means no caching.
+        ncpus (int): Number of processes among which the Ewald energies of
+            the enumerated structures are computed, one supercell per
+            process. Default of None means serial processing.
     """
 
     def __init__(self, min_cell_size=1, max_cell_size=1, symm_prec=0.1,
                  refine_structure=False, enum_precision_parameter=0.001,
-                 check_ordered_symmetry=True):
+                 check_ordered_symmetry=True, cache_dir=None, ncpus=None):
         self.symm_prec = symm_prec
         self.min_cell_size = min_cell_size
         self.max_cell_size = max_cell_size
         self.refine_structure = refine_structure
         self.enum_precision_parameter = enum_precision_parameter
         self.check_ordered_symmetry = check_ordered_symmetry
+        self.cache_dir = cache_dir
+        self.ncpus = ncpus
 
     def apply_transformation(self, structure, return_ranked_list=False):
         """
@@ -320,50 +335,130 @@ class EnumerateStructureTransformation(AbstractTransformation):
         if structure.is_ordered:
             warn("Enumeration skipped for structure with composition {} "
                  "because it is ordered".format(structure.composition))
-            structures = [structure.copy()]
+            records = [_get_enumeration_record(structure)]
         else:
-            adaptor = EnumlibAdaptor(
-                structure, min_cell_size=self.min_cell_size,
-                max_cell_size=self.max_cell_size,
-                symm_prec=self.symm_prec, refine_structure=False,
-                enum_precision_parameter=self.enum_precision_parameter,
-                check_ordered_symmetry=self.check_ordered_symmetry)
-            adaptor.run()
-            structures = adaptor.structures
-
-        original_latt = structure.lattice
-        inv_latt = np.linalg.inv(original_latt.matrix)
-        ewald_matrices = {}
-        all_structures = []
-        for s in structures:
-            new_latt = s.lattice
-            transformation = np.dot(new_latt.matrix, inv_latt)
-            transformation = tuple([tuple([int(round(cell)) for cell in row])
-                                    for row in transformation])
+            records = self._get_enumerated_records(structure)
+
+        # Only the structures which are returned are created from the
+        # records, after ranking.
+        num_sites = [len(r["species"]) for r in records]
+        if contains_oxidation_state:
+            energies = self._get_ewald_energies(structure, records)
+            keys = [e / n for e, n in zip(energies, num_sites)]
+        else:
+            keys = num_sites
+        ranked = heapq.nsmallest(max(1, num_to_return), range(len(records)),
+                                 key=lambda i: keys[i])
+
+        self._all_structures = []
+        for i in ranked:
+            r = records[i]
+            d = {"num_sites": num_sites[i],
+                 "structure": structure.copy() if structure.is_ordered else
+                 Structure(r["lattice"], r["species"], r["frac_coords"])}
             if contains_oxidation_state:
-                if transformation not in ewald_matrices:
-                    s_supercell = structure * transformation
-                    ewald = EwaldSummation(s_supercell)
-                    ewald_matrices[transformation] = ewald
-                else:
-                    ewald = ewald_matrices[transformation]
-                energy = ewald.compute_sub_structure(s)
-                all_structures.append({"num_sites": len(s), "energy": energy,
-                                       "structure": s})
-            else:
-                all_structures.append({"num_sites": len(s), "structure": s})
-
-        def sort_func(s):
-            return s["energy"] / s["num_sites"] if contains_oxidation_state \
-                else s["num_sites"]
-
-        self._all_structures = sorted(all_structures, key=sort_func)
+                d["energy"] = energies[i]
+            self._all_structures.append(d)
 
         if return_ranked_list:
             return self._all_structures[0:num_to_return]
         else:
             return self._all_structures[0]["structure"]
 
+    def _get_enumerated_records(self, structure):
+        """
+        Returns the records (see _get_enumeration_record) of the structures
+        enumerated by enumlib from a disordered structure, from the cache if
+        possible.
+        """
+        filename = self._get_cache_filename(structure)
+        if filename and os.path.exists(filename):
+            logger.debug("Loading enumerated structures from {}".format(
+                filename))
+            return loadfn(filename)
+        adaptor = EnumlibAdaptor(
+            structure, min_cell_size=self.min_cell_size,
+            max_cell_size=self.max_cell_size,
+            symm_prec=self.symm_prec, refine_structure=False,
+            enum_precision_parameter=self.enum_precision_parameter,
+            check_ordered_symmetry=self.check_ordered_symmetry)
+        adaptor.run()
+        if not adaptor.structures:
+            raise ValueError("Unable to enumerate structure.")
+        records = [_get_enumeration_record(s) for s in adaptor.structures]
+        if filename:
+            if not os.path.exists(self.cache_dir):
+                os.makedirs(self.cache_dir)
+            # Write to a temporary file first so that concurrent runs never
+            # read a partially written cache file.
+            tmp_filename = os.path.join(self.cache_dir, "tmp.{}.{}".format(
+                os.getpid(), os.path.basename(filename)))
+            dumpfn(records, tmp_filename)
+            os.rename(tmp_filename, filename)
+        return records
+
+    def _get_cache_filename(self, structure):
+        """
+        Returns the cache file of the enumeration of a structure, named
+        after a fingerprint of the structure and the enumeration parameters,
+        or None if there is no cache_dir.
+        """
+        if not self.cache_dir:
+            return None
+        # Species are given as strings, which do not depend on whether
+        # oxidation states are ints or floats.
+        d = {"lattice": structure.lattice.matrix.tolist(),
+             "species": [sorted((str(sp), occu) for sp, occu in
+                                site.species_and_occu.items())
+                         for site in structure],
+             "frac_coords": structure.frac_coords.tolist(),
+             "min_cell_size": self.min_cell_size,
+             "max_cell_size": self.max_cell_size,
+             "symm_prec": self.symm_prec,
+             "enum_precision_parameter": self.enum_precision_parameter,
+             "check_ordered_symmetry": self.check_ordered_symmetry}
+        key = hashlib.md5(json.dumps(d, sort_keys=True, cls=MontyEncoder)
+                          .encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, key + ".json.gz")
+
+    def _get_ewald_energies(self, structure, records):
+        """
+        Returns the Ewald energies of the records of structures enumerated
+        from a structure. The Ewald matrix of each supercell of the
+        structure is computed only once, in parallel if ncpus > 1.
+        """
+        inv_latt = np.linalg.inv(structure.lattice.matrix)
+        oxi_states = {}
+        supercells = collections.OrderedDict()
+        for i, r in enumerate(records):
+            transformation = np.dot(r["lattice"], inv_latt)
+            transformation = tuple([tuple([int(round(cell)) for cell in row])
+                                    for row in transformation])
+            supercells.setdefault(transformation, []).append(i)
+            for sp in r["species"]:
+                if sp not in oxi_states:
+                    oxi_states[sp] = get_el_sp(sp).oxi_state
+
+        args = [(structure, transformation,
+                 [(records[i]["frac_coords"],
+                   [oxi_states[sp] for sp in records[i]["species"]])
+                  for i in inds])
+                for transformation, inds in supercells.items()]
+        if self.ncpus and self.ncpus > 1 and len(args) > 1:
+            import multiprocessing as mp
+            p = mp.Pool(self.ncpus)
+            results = p.map(_get_sub_structure_energies, args, 1)
+            p.close()
+            p.join()
+        else:
+            results = [_get_sub_structure_energies(a) for a in args]
+
+        energies = [None] * len(records)
+        for inds, sub_energies in zip(supercells.values(), results):
+            for i, energy in zip(inds, sub_energies):
+                energies[i] = energy
+        return energies
+
     def __str__(self):
         return "EnumerateStructureTransformation"
 
@@ -831,3 +926,21 @@ class SlabTransformation(AbstractTransformation):
     @property
     def is_one_to_many(self):
         return None
+
+
+def _get_enumeration_record(structure):
+    """
+    Returns a lightweight record of an ordered structure, made of its
+    lattice, species strings and fractional coordinates, from which the
+    structure is only created if needed.
+    """
+    return {"lattice": structure.lattice.matrix.tolist(),
+            "species": [str(sp) for sp in structure.species],
+            "frac_coords": structure.frac_coords.tolist()}
+
+
+def _get_sub_structure_energies(args):
+    structure, transformation, sub_structures = args
+    ewald = EwaldSummation(structure * transformation)
+    return [ewald.compute_sub_structure_energy(frac_coords, charges)
+            for frac_coords, charges in sub_structures]
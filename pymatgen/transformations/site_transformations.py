@@ -18,7 +18,8 @@ import numpy as np
 
 from pymatgen.symmetry.analyzer import SpacegroupAnalyzer
 from pymatgen.transformations.transformation_abc import AbstractTransformation
-from pymatgen.analysis.ewald import EwaldSummation, EwaldMinimizer
+from pymatgen.analysis.ewald import EwaldSummation, EwaldMinimizer, \
+    EwaldDeltaEvaluator
 
 """
 This module defines site transformations which transforms a structure into
@@ -281,34 +282,30 @@ class PartialRemoveSitesTransformation(AbstractTransformation):
                           .format(time.time() - starttime))
         starttime = time.time()
 
-        ematrix = ewaldsum.total_energy_matrix
+        evaluator = EwaldDeltaEvaluator.from_ewald_summation(ewaldsum)
         to_delete = []
 
         totalremovals = sum(num_remove_dict.values())
         removed = {k: 0 for k in num_remove_dict.keys()}
         for i in range(totalremovals):
-            maxindex = None
-            maxe = float("-inf")
-            maxindices = None
+            candidates = []
             for indices in num_remove_dict.keys():
                 if removed[indices] < num_remove_dict[indices]:
                     for ind in indices:
                         if ind not in to_delete:
-                            energy = sum(ematrix[:, ind]) + \
-                                sum(ematrix[:, ind]) - ematrix[ind, ind]
-                            if energy > maxe:
-                                maxindex = ind
-                                maxe = energy
-                                maxindices = indices
+                            candidates.append((ind, indices))
+            # Remove the site which lowers the energy the most.
+            deltas = evaluator.get_removal_deltas(
+                [[c[0]] for c in candidates])
+            maxindex, maxindices = candidates[int(np.argmin(deltas))]
             removed[maxindices] += 1
             to_delete.append(maxindex)
-            ematrix[:, maxindex] = 0
-            ematrix[maxindex, :] = 0
+            evaluator.remove([maxindex])
         s = structure.copy()
         s.remove_sites(to_delete)
         self.logger.debug("Minimizing Ewald took {} seconds."
                           .format(time.time() - starttime))
-        return [{"energy": sum(sum(ematrix)),
+        return [{"energy": evaluator.energy,
                  "structure": s.get_sorted_structure()}]
 
     def complete_ordering(self, structure, num_remove_dict):
@@ -3,6 +3,7 @@
 # Distributed under the terms of the MIT License.
 
 from __future__ import division, unicode_literals
+import itertools
 import logging
 
 from pymatgen.analysis.bond_valence import BVAnalyzer
@@ -416,16 +417,26 @@ class OrderDisorderedStructureTransformation(AbstractTransformation):
         symmetrized_structures (bool): Whether the input structures are
             instances of SymmetrizedStructure, and that their symmetry
             should be used for the grouping of sites.
+        max_queue_size (int): If set, the orderings are enumerated in order
+            of increasing energy by a best first search (see
+            iter_ordered_structures) keeping at most this number of partial
+            orderings in memory. Beyond that, the least promising ones are
+            discarded and the ranking becomes approximate.
+        time_limit (float): If set, the orderings are enumerated by a best
+            first search which is stopped after this time in seconds.
     """
 
     ALGO_FAST = 0
     ALGO_COMPLETE = 1
     ALGO_BEST_FIRST = 2
 
-    def __init__(self, algo=ALGO_FAST, symmetrized_structures=False):
+    def __init__(self, algo=ALGO_FAST, symmetrized_structures=False,
+                 max_queue_size=None, time_limit=None):
         self.algo = algo
         self._all_structures = []
         self.symmetrized_structures = symmetrized_structures
+        self.max_queue_size = max_queue_size
+        self.time_limit = time_limit
 
     def apply_transformation(self, structure, return_ranked_list=False):
         """
@@ -460,6 +471,66 @@ class OrderDisorderedStructureTransformation(AbstractTransformation):
 
         num_to_return = max(1, num_to_return)
 
+        if self.max_queue_size is not None or self.time_limit is not None:
+            self._all_structures = list(itertools.islice(
+                self.iter_ordered_structures(structure), num_to_return))
+            if not self._all_structures:
+                raise ValueError("No ordered structure found within the "
+                                 "limits of the search")
+        else:
+            s, m_list = self._get_manipulations(structure)
+            matrix = EwaldSummation(s).total_energy_matrix
+            ewald_m = EwaldMinimizer(matrix, m_list, num_to_return, self.algo)
+
+            self._all_structures = []
+            lowest_energy = ewald_m.output_lists[0][0]
+            num_atoms = sum(structure.composition.values())
+            for output in ewald_m.output_lists:
+                self._all_structures.append(self._get_ordering(
+                    s, output, lowest_energy, num_atoms))
+
+        if return_ranked_list:
+            return self._all_structures
+        else:
+            return self._all_structures[0]["structure"]
+
+    def iter_ordered_structures(self, structure):
+        """
+        Generates the orderings of a disordered structure in order of
+        increasing Ewald energy, as they are found by a best first search
+        (see EwaldMinimizer.iter_m_lists). Unlike apply_transformation, the
+        lowest energy structures are available before the enumeration is
+        complete, and the enumeration only goes as far as the structures are
+        consumed, e.g., by a pipeline taking the first few of them. The
+        search is bounded by the max_queue_size and time_limit of the
+        transformation.
+
+        Args:
+            structure: Oxidation state decorated disordered structure to
+                order.
+
+        Returns:
+            A generator of dicts of the form {"energy": ...,
+            "energy_above_minimum": ..., "structure": ...}, as in the ranked
+            list returned by apply_transformation.
+        """
+        s, m_list = self._get_manipulations(structure)
+        matrix = EwaldSummation(s).total_energy_matrix
+        lowest_energy = None
+        num_atoms = sum(structure.composition.values())
+        for output in EwaldMinimizer.iter_m_lists(
+                matrix, m_list, max_queue_size=self.max_queue_size,
+                time_limit=self.time_limit):
+            if lowest_energy is None:
+                lowest_energy = output[0]
+            yield self._get_ordering(s, output, lowest_energy, num_atoms)
+
+    def _get_manipulations(self, structure):
+        """
+        Returns the structure with all disordered sites set to their species
+        with the highest oxidation state and the list of manipulations of
+        the EwaldMinimizer ordering it.
+        """
         equivalent_sites = []
         exemplars = []
         # generate list of equivalent sites to order
@@ -513,36 +584,27 @@ class OrderDisorderedStructureTransformation(AbstractTransformation):
             empty = len(g) - sum(total_occupancy.values())
             if empty > 0.5:
                 m_list.append([0, empty, list(g), None])
+        return s, m_list
 
-        matrix = EwaldSummation(s).total_energy_matrix
-        ewald_m = EwaldMinimizer(matrix, m_list, num_to_return, self.algo)
-
-        self._all_structures = []
-
-        lowest_energy = ewald_m.output_lists[0][0]
-        num_atoms = sum(structure.composition.values())
-
-        for output in ewald_m.output_lists:
-            s_copy = s.copy()
-            # do deletions afterwards because they screw up the indices of the
-            # structure
-            del_indices = []
-            for manipulation in output[1]:
-                if manipulation[1] is None:
-                    del_indices.append(manipulation[0])
-                else:
-                    s_copy[manipulation[0]] = manipulation[1]
-            s_copy.remove_sites(del_indices)
-            self._all_structures.append(
-                {"energy": output[0],
-                 "energy_above_minimum":
-                 (output[0] - lowest_energy) / num_atoms,
-                 "structure": s_copy.get_sorted_structure()})
-
-        if return_ranked_list:
-            return self._all_structures
-        else:
-            return self._all_structures[0]["structure"]
+    @staticmethod
+    def _get_ordering(s, output, lowest_energy, num_atoms):
+        """
+        Returns the ranked list entry of an output of the EwaldMinimizer.
+        """
+        s_copy = s.copy()
+        # do deletions afterwards because they screw up the indices of the
+        # structure
+        del_indices = []
+        for manipulation in output[1]:
+            if manipulation[1] is None:
+                del_indices.append(manipulation[0])
+            else:
+                s_copy[manipulation[0]] = manipulation[1]
+        s_copy.remove_sites(del_indices)
+        return {"energy": output[0],
+                "energy_above_minimum":
+                (output[0] - lowest_energy) / num_atoms,
+                "structure": s_copy.get_sorted_structure()}
 
     def __str__(self):
         return "Order disordered structure transformation"
@@ -6,6 +6,8 @@ from __future__ import division, unicode_literals
 import unittest2 as unittest
 import os
 import json
+import shutil
+import tempfile
 
 import numpy as np
 
@@ -17,7 +19,10 @@ from pymatgen.transformations.advanced_transformations import \
     SuperTransformation, EnumerateStructureTransformation, \
     MultipleSubstitutionTransformation, ChargeBalanceTransformation, \
     SubstitutionPredictorTransformation, MagOrderingTransformation, \
-    DopingTransformation, _find_codopant, SlabTransformation
+    DopingTransformation, _find_codopant, SlabTransformation, \
+    _get_enumeration_record
+from pymatgen.analysis.ewald import EwaldSummation
+from monty.serialization import dumpfn
 from monty.os.path import which
 from pymatgen.io.vasp.inputs import Poscar
 from pymatgen.symmetry.analyzer import SpacegroupAnalyzer
@@ -185,6 +190,52 @@ class EnumerateStructureTransformationTest(unittest.TestCase):
         self.assertEqual(trans.symm_prec, 0.1)
 
 
+class EnumerateStructureTransformationCacheTest(PymatgenTest):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_cached_enumeration(self):
+        s = self.get_structure("LiFePO4")
+        s.add_oxidation_state_by_element({"Li": 1, "Fe": 2, "P": 5, "O": -2})
+        s.replace_species({"Li+": {"Li+": 0.5}})
+        # Orderings in two supercells stand in for the enumlib output.
+        t = OrderDisorderedStructureTransformation()
+        orderings = []
+        for scaling in [[1, 1, 1], [1, 1, 2]]:
+            for d in t.apply_transformation(s * scaling,
+                                            return_ranked_list=10):
+                orderings.append(d["structure"])
+
+        trans = EnumerateStructureTransformation(cache_dir=self.tmp_dir)
+        dumpfn([_get_enumeration_record(o) for o in orderings],
+               trans._get_cache_filename(s))
+        alls = trans.apply_transformation(s, 100)
+        self.assertEqual(len(alls), len(orderings))
+        energies = [d["energy"] / d["num_sites"] for d in alls]
+        self.assertEqual(energies, sorted(energies))
+        for d in alls:
+            scaling = [1, 1, int(round(d["structure"].volume / s.volume))]
+            self.assertAlmostEqual(
+                d["energy"],
+                EwaldSummation(s * scaling).compute_sub_structure(
+                    d["structure"]))
+
+        trans = EnumerateStructureTransformation(cache_dir=self.tmp_dir,
+                                                 ncpus=2)
+        top = trans.apply_transformation(s, 3)
+        self.assertEqual(len(top), 3)
+        for d1, d2 in zip(alls, top):
+            self.assertAlmostEqual(d1["energy"], d2["energy"])
+            self.assertEqual(d1["structure"], d2["structure"])
+        self.assertEqual(trans.apply_transformation(s), alls[0]["structure"])
+        self.assertEqual(EnumerateStructureTransformation.from_dict(
+            trans.as_dict()).cache_dir, self.tmp_dir)
+
+
 class SubstitutionPredictorTransformationTest(unittest.TestCase):
     def test_apply_transformation(self):
         t = SubstitutionPredictorTransformation(threshold=1e-3, alpha=-5,
@@ -350,6 +350,32 @@ class OrderDisorderedStructureTransformationTest(unittest.TestCase):
         output = t.apply_transformation(struct, return_ranked_list=3)
         self.assertAlmostEqual(output[0]['energy'], -234.57813667648315, 4)
 
+    def test_iter_ordered_structures(self):
+        coords = [[0, 0, 0], [0.75, 0.75, 0.75], [0.5, 0.5, 0.5],
+                  [0.25, 0.25, 0.25]]
+        lattice = Lattice([[3.8401979337, 0.00, 0.00],
+                           [1.9200989668, 3.3257101909, 0.00],
+                           [0.00, -2.2171384943, 3.1355090603]])
+        struct = Structure(lattice, [{"Si4+": 0.5, "O2-": 0.25, "P5+": 0.25}]
+                           * 4, coords)
+        ranked = OrderDisorderedStructureTransformation()\
+            .apply_transformation(struct, return_ranked_list=50)
+        t = OrderDisorderedStructureTransformation(max_queue_size=1000)
+        streamed = list(t.iter_ordered_structures(struct))
+        self.assertEqual(len(streamed), 12)
+        for o1, o2 in zip(ranked, streamed):
+            self.assertAlmostEqual(o1["energy"], o2["energy"])
+            self.assertAlmostEqual(o1["energy_above_minimum"],
+                                   o2["energy_above_minimum"])
+        output = t.apply_transformation(struct, return_ranked_list=3)
+        self.assertEqual(len(output), 3)
+        self.assertAlmostEqual(output[0]["energy"], ranked[0]["energy"])
+
+        d = t.as_dict()
+        self.assertEqual(
+            OrderDisorderedStructureTransformation.from_dict(d)
+            .max_queue_size, 1000)
+
 
 class PrimitiveCellTransformationTest(unittest.TestCase):
     def test_apply_transformation(self):
@@ -247,6 +247,80 @@ def in_coord_list_pbc(fcoord_list, fcoord, atol=1e-8):
     return len(find_in_coord_list_pbc(fcoord_list, fcoord, atol=atol)) > 0
 
 
+def unique_coords_pbc(fcoords, atol=1e-8):
+    """
+    Get the indices of the unique fractional coords of a list, taking into
+    account periodic boundary conditions. The result is the same as adding
+    the coords one by one to a list if they are not already in it according
+    to in_coord_list_pbc, but the candidate duplicates are found by binning
+    the coords on a periodic grid with cells at least atol wide, so that the
+    cost is roughly linear instead of quadratic in the number of coords.
+
+    Args:
+        fcoords: List of fractional coords, shape (n, 3).
+        atol: Absolute tolerance. Defaults to 1e-8. Accepts both scalar and
+            array.
+
+    Returns:
+        Sorted indices of the coords kept, e.g., [0, 2, 5].
+    """
+    fcoords = np.array(fcoords, dtype=np.float64).reshape((-1, 3))
+    n = len(fcoords)
+    atol = np.broadcast_to(np.array(atol, dtype=np.float64), (3,))
+    # Coords within atol of each other are in the same or adjacent cells.
+    nbins = np.floor(1 / np.maximum(atol, 1e-20))
+    nbins = np.maximum(np.minimum(nbins, 2 ** 20), 1).astype(np.int64)
+    cells = np.floor((fcoords - np.floor(fcoords)) * nbins).astype(np.int64)
+    cells = np.minimum(cells, nbins - 1)
+    strides = np.array([nbins[1] * nbins[2], nbins[2], 1])
+    ids = np.dot(cells, strides)
+    order = np.argsort(ids, kind="mergesort")
+    sorted_ids = ids[order]
+    # With fewer than 3 bins, several offsets give the same cell.
+    offsets = [np.unique(np.mod([-1, 0, 1], nb)) for nb in nbins]
+    all_i = []
+    all_j = []
+    for offset in itertools.product(*offsets):
+        neighbor_ids = np.dot(np.mod(cells + offset, nbins), strides)
+        lo = np.searchsorted(sorted_ids, neighbor_ids, side="left")
+        counts = np.searchsorted(sorted_ids, neighbor_ids, side="right") - lo
+        total = np.sum(counts)
+        if total == 0:
+            continue
+        pos = np.repeat(lo - np.cumsum(counts) + counts, counts) + \
+            np.arange(total)
+        all_i.append(np.repeat(np.arange(n), counts))
+        all_j.append(order[pos])
+    unique = np.ones(n, dtype=np.bool)
+    if not all_i:
+        return np.where(unique)[0]
+    i = np.concatenate(all_i)
+    j = np.concatenate(all_j)
+    earlier = j < i
+    i, j = i[earlier], j[earlier]
+    fdist = fcoords[j] - fcoords[i]
+    fdist -= np.round(fdist)
+    close = np.all(np.abs(fdist) < atol, axis=1)
+    i, j = i[close], j[close]
+    # A coord close to a coord which is not close to any earlier coord is a
+    # duplicate. The others depend on whether the earlier coords they are
+    # close to are unique, which is decided in order.
+    has_earlier = np.zeros(n, dtype=np.bool)
+    has_earlier[i] = True
+    unique[i[~has_earlier[j]]] = False
+    undecided = i[unique[i]]
+    if len(undecided):
+        order = np.argsort(i, kind="mergesort")
+        i, j = i[order], j[order]
+        undecided = np.unique(undecided)
+        starts = np.searchsorted(i, undecided, side="left")
+        ends = np.searchsorted(i, undecided, side="right")
+        for k, start, end in zip(undecided, starts, ends):
+            if np.any(unique[j[start:end]]):
+                unique[k] = False
+    return np.where(unique)[0]
+
+
 def is_coord_subset_pbc(subset, superset, atol=1e-8, mask=None):
     """
     Tests if all fractional coords in subset are contained in superset.
@@ -309,6 +383,151 @@ def lattice_points_in_supercell(supercell_matrix):
     return tvects
 
 
+def find_points_in_spheres(lattice, frac_points, centers, r,
+                           method="cell"):
+    """
+    Finds all periodic images of a set of points that lie within a distance r
+    of a set of centers. This is the neighbor search engine used by
+    Structure and Lattice. Instead of computing all distances between all
+    points in all images of a supercell, only the images overlapping the
+    bounding box of the centers are generated and candidate pairs are found
+    either with a linked-cell grid (the default) or a KD-tree. The cost is
+    therefore roughly linear in the number of points and neighbors.
+
+    Args:
+        lattice (Lattice): Lattice defining the periodicity.
+        frac_points: Fractional coordinates of the points, shape (n, 3).
+        centers: Cartesian coordinates of the sphere centers, shape (m, 3).
+        r (float): Radius of the spheres.
+        method (str): Search backend. "cell" uses a linked-cell grid
+            with a cell edge of at least r. "kdtree" uses a
+            scipy.spatial.cKDTree over the image points.
+
+    Returns:
+        (center_indices, point_indices, images, distances) as numpy arrays,
+        such that the point frac_points[point_indices[k]] + images[k] is at
+        a distance distances[k] from centers[center_indices[k]]. images are
+        integer lattice translations. Results are sorted by center index,
+        point index and image.
+    """
+    if method not in _NEIGHBOR_METHODS:
+        raise ValueError("Unknown neighbor search method {}. Supported "
+                         "methods are {}".format(
+                             method, sorted(_NEIGHBOR_METHODS.keys())))
+    r = float(r)
+    frac_points = np.array(frac_points, dtype=np.float64).reshape((-1, 3))
+    centers = np.array(centers, dtype=np.float64).reshape((-1, 3))
+    if len(frac_points) == 0 or len(centers) == 0 or r < 0:
+        return (np.zeros(0, dtype=np.int), np.zeros(0, dtype=np.int),
+                np.zeros((0, 3), dtype=np.int), np.zeros(0))
+
+    matrix = lattice.matrix
+    inv_matrix = lattice.inv_matrix
+    floors = np.floor(frac_points)
+    fcoords = frac_points - floors
+
+    # The largest change in each fractional coordinate for a cartesian
+    # displacement of length r.
+    frac_ext = r * np.sqrt(np.sum(inv_matrix ** 2, axis=0)) + 1e-8
+    center_fcoords = np.dot(centers, inv_matrix)
+    fmin = np.min(center_fcoords, axis=0) - frac_ext
+    fmax = np.max(center_fcoords, axis=0) + frac_ext
+
+    # Generate only the image points that can be within r of a center.
+    all_ranges = [np.arange(x, y + 1) for x, y in
+                  zip(np.floor(fmin), np.floor(fmax))]
+    n = len(fcoords)
+    indices = np.arange(n)
+    point_inds = []
+    point_images = []
+    for image in itertools.product(*all_ranges):
+        shifted = fcoords + image
+        mask = np.all((shifted >= fmin) & (shifted <= fmax), axis=1)
+        if np.any(mask):
+            point_inds.append(indices[mask])
+            point_images.append(np.tile(image, (np.sum(mask), 1)))
+    if not point_inds:
+        return (np.zeros(0, dtype=np.int), np.zeros(0, dtype=np.int),
+                np.zeros((0, 3), dtype=np.int), np.zeros(0))
+    point_inds = np.concatenate(point_inds)
+    point_images = np.concatenate(point_images)
+    points = np.dot(fcoords[point_inds] + point_images, matrix)
+
+    cinds, pinds = _NEIGHBOR_METHODS[method](points, centers, r)
+    dists = np.sqrt(np.sum((points[pinds] - centers[cinds]) ** 2, axis=1))
+    within_r = dists <= r
+    cinds = cinds[within_r]
+    pinds = pinds[within_r]
+    images = (point_images[pinds] - floors[point_inds[pinds]]).astype(np.int)
+    inds = point_inds[pinds]
+    # Return results in a deterministic order, i.e., sorted by center, point
+    # and image.
+    order = np.lexsort((images[:, 2], images[:, 1], images[:, 0], inds,
+                        cinds))
+    return cinds[order], inds[order], images[order], dists[within_r][order]
+
+
+def _cell_list_pairs(points, centers, r):
+    """
+    Linked-cell candidate search. Points are binned into cubic cells with
+    an edge of at least r, so that every point within r of a center lies in
+    the center's cell or one of its 26 neighbors.
+    """
+    lower = np.min(centers, axis=0) - r
+    upper = np.max(centers, axis=0) + r
+    extent = upper - lower
+    # Keep the number of cells comparable to the number of points.
+    size = max(r, (np.prod(extent + 1e-8) / len(points)) ** (1 / 3), 1e-8)
+    nbins = np.maximum(np.ceil(extent / size).astype(np.int), 1)
+
+    def get_cells(coords):
+        cells = np.floor((coords - lower) / size).astype(np.int)
+        return np.minimum(np.maximum(cells, 0), nbins - 1)
+
+    strides = np.array([nbins[1] * nbins[2], nbins[2], 1])
+    point_ids = np.dot(get_cells(points), strides)
+    order = np.argsort(point_ids, kind="mergesort")
+    counts = np.bincount(point_ids, minlength=np.prod(nbins))
+    starts = np.cumsum(counts) - counts
+
+    center_cells = get_cells(centers)
+    center_inds = np.arange(len(centers))
+    all_cinds = []
+    all_pinds = []
+    for offset in itertools.product((-1, 0, 1), repeat=3):
+        cells = center_cells + offset
+        valid = np.all((cells >= 0) & (cells < nbins), axis=1)
+        ids = np.dot(cells[valid], strides)
+        n = counts[ids]
+        total = np.sum(n)
+        if total == 0:
+            continue
+        # Expand each (center, cell) into (center, point) pairs.
+        pos = np.repeat(starts[ids] - np.cumsum(n) + n, n) + \
+            np.arange(total)
+        all_cinds.append(np.repeat(center_inds[valid], n))
+        all_pinds.append(order[pos])
+    if not all_cinds:
+        return np.zeros(0, dtype=np.int), np.zeros(0, dtype=np.int)
+    return np.concatenate(all_cinds), np.concatenate(all_pinds)
+
+
+def _kdtree_pairs(points, centers, r):
+    """
+    KD-tree candidate search using scipy.spatial.cKDTree.
+    """
+    from scipy.spatial import cKDTree
+    results = cKDTree(points).query_ball_point(centers, r)
+    n = np.array([len(res) for res in results], dtype=np.int)
+    if np.sum(n) == 0:
+        return np.zeros(0, dtype=np.int), np.zeros(0, dtype=np.int)
+    return (np.repeat(np.arange(len(centers)), n),
+            np.concatenate([res for res in results if res]).astype(np.int))
+
+
+_NEIGHBOR_METHODS = {"cell": _cell_list_pairs, "kdtree": _kdtree_pairs}
+
+
 def barycentric_coords(coords, simplex):
     """
     Converts a list of coordinates to barycentric coordinates, given a
@@ -3,8 +3,13 @@
 # Distributed under the terms of the MIT License.
 
 from __future__ import unicode_literals
+import bz2
+import gzip
+import mmap
 import re
 import six
+from collections import defaultdict
+from contextlib import contextmanager
 from monty.io import zopen
 
 """
@@ -100,6 +105,392 @@ def micro_pyawk(filename, search, results=None, debug=None, postdebug=None):
     return results
 
 
+class PatternScanner(object):
+    """
+    Runs several regrep-like pattern searches, multiline (table) patterns and
+    micro_pyawk programs over a file in a single pass, instead of rereading
+    the file once per search.
+
+    Searches are registered with the add_* methods, which return containers
+    that are filled in place by run(). Uncompressed files are memory-mapped.
+    The patterns of each line-based search are combined into one regular
+    expression which locates its candidate lines at C speed, and only those
+    lines are checked in python against the search. Searches with
+    terminate_on_match are dropped as soon as they are complete, and the scan
+    stops when no line-based search is left. If all searches are reverse
+    searches with terminate_on_match, the file is scanned from its end.
+
+    The results are those of micro_pyawk and of regrep in monty 0.9.6, the
+    oldest version supported, including its numbering of lines in reverse
+    searches, which later versions of monty may not share. Lines are
+    numbered from 0 in forward searches. In reverse searches, the line
+    number is minus the index of the line in the reverse read. The reverse
+    read of an uncompressed file ending with a newline starts with an empty
+    line after it, so that its last line is -1, while the last line of a
+    compressed file is 0. Reverse reads of compressed files also strip all
+    trailing whitespace of the lines, and of uncompressed files only the
+    newline.
+
+    Args:
+        filename (str): Filename to scan.
+        chunk_size (int): Size in bytes of the blocks scanned at once when
+            reading the file from its end.
+    """
+
+    def __init__(self, filename, chunk_size=2 ** 20):
+        self.filename = filename
+        self.chunk_size = chunk_size
+        self._searches = []
+        self._multiline_patterns = []
+
+    def add_patterns(self, patterns, reverse=False, terminate_on_match=False,
+                     postprocess=str):
+        """
+        Registers a set of patterns to grep, with the same arguments as
+        monty's regrep.
+
+        Args:
+            patterns (dict): A dict of patterns, e.g.,
+                {"energy": "energy\(sigma->0\)\s+=\s+([\d\-\.]+)"}.
+            reverse (bool): Read the file in reverse. Only the order of the
+                matches and the line numbers are affected, unless all the
+                searches of the scan are reverse searches.
+            terminate_on_match (bool): Whether to terminate when there is at
+                least one match in each key in pattern.
+            postprocess (callable): A post processing function to convert all
+                matches. Defaults to str, i.e., no change.
+
+        Returns:
+            A defaultdict(list) filled by run() with the regrep results, i.e.
+            {key1: [[[matches...], lineno], ...], key2: ...}.
+        """
+        search = _Search([(k, v) for k, v in patterns.items()])
+        search.reverse = reverse
+        search.terminate_on_match = terminate_on_match
+        search.postprocess = postprocess
+        search.matches = defaultdict(list)
+        self._searches.append(search)
+        return search.matches
+
+    def add_pyawk(self, search, results=None):
+        """
+        Registers a micro_pyawk search program.
+
+        Args:
+            search: Search program as a list of [regex, test, run] lists, see
+                micro_pyawk.
+            results: Object passed to the test and run callables. Defaults
+                to an empty dict.
+
+        Returns:
+            A list of the exceptions raised by the program. A program is
+            dropped from the scan at its first exception.
+        """
+        program = _Search([(i, entry[0]) for i, entry in enumerate(search)])
+        program.actions = [(entry[1], entry[2]) for entry in search]
+        program.results = {} if results is None else results
+        program.errors = []
+        self._searches.append(program)
+        return program.errors
+
+    def add_multiline_pattern(self, pattern):
+        """
+        Registers a pattern matched over the whole text, with the MULTILINE
+        and DOTALL flags, e.g. to extract tables.
+
+        Args:
+            pattern (str): Regular expression pattern.
+
+        Returns:
+            A list filled by run() with the groupdict() of each match.
+        """
+        matches = []
+        self._multiline_patterns.append(
+            (re.compile(pattern.encode("utf-8"), re.MULTILINE | re.DOTALL),
+             matches))
+        return matches
+
+    def run(self):
+        """
+        Scans the file and fills the containers returned by the add_*
+        methods.
+        """
+        with open_mmap(self.filename) as text:
+            self._scan(text, compressed=not isinstance(text, mmap.mmap))
+
+    def _scan(self, text, compressed):
+        for regex, matches in self._multiline_patterns:
+            for m in regex.finditer(text):
+                matches.append({k: v if v is None else v.decode("utf-8")
+                                for k, v in m.groupdict().items()})
+        searches = [s for s in self._searches if s.patterns]
+        # As in monty 0.9.6's regrep, reverse reads yield an empty last line
+        # for uncompressed files ending with a newline, and the line indices
+        # of compressed files ending with a newline are offset by one.
+        empty_last = text[-1:] == b"\n" and not compressed
+        offset = int(text[-1:] == b"\n" and compressed)
+        if searches and all(s.reverse and s.terminate_on_match
+                            for s in searches):
+            self._scan_backward(text, searches, offset, empty_last,
+                                compressed)
+        elif searches:
+            self._scan_forward(text, searches, offset, empty_last,
+                               compressed)
+
+    def _scan_forward(self, text, searches, offset, empty_last, compressed):
+        # Each search only reads its own candidate lines, so that it costs
+        # the same as in a scan of its own.
+        finders = [_get_finders([s], every_line=s.reverse and compressed)
+                   for s in searches]
+        nexts = [_next_line(text, f, 0, len(text)) for f in finders]
+        lineno = 0
+        counted = 0
+        while True:
+            starts = [n[0] for n in nexts if n[0] is not None]
+            if not starts:
+                break
+            line_start = min(starts)
+            lineno += _count_newlines(text, counted, line_start)
+            counted = line_start
+            line_end = None
+            for i, s in enumerate(searches):
+                if nexts[i][0] != line_start:
+                    continue
+                if line_end is None:
+                    line_end = nexts[i][1]
+                    line = text[line_start:line_end].decode("utf-8")
+                # Reverse searches need all the lines of a forward scan.
+                if s.process(line, lineno, compressed) and not s.reverse:
+                    nexts[i] = (None, None)
+                else:
+                    nexts[i] = _next_line(text, finders[i], line_end,
+                                          len(text))
+        nlines = lineno + _count_newlines(text, counted, len(text))
+        for s in searches:
+            if s.reverse:
+                if empty_last:
+                    s.process("", nlines, compressed)
+                s.finalize(nlines - offset)
+
+    def _scan_backward(self, text, searches, offset, empty_last,
+                       compressed):
+        active = list(searches)
+        if empty_last:
+            active = [s for s in active if not s.process("", 0, compressed)]
+        # Number of newlines after the current line.
+        nafter = 0
+        counted = len(text)
+        for line_start, line_end in _reverse_candidate_lines(
+                text, _get_finders(active, every_line=compressed),
+                self.chunk_size):
+            nafter += _count_newlines(text, line_start, counted)
+            counted = line_start
+            line = text[line_start:line_end].decode("utf-8")
+            done = [s for s in active
+                    if s.process(line, nafter - offset, compressed)]
+            if done:
+                active = [s for s in active if s not in done]
+                if not active:
+                    break
+        for s in searches:
+            s.matches.update({k: [[m, -i] for m, i in v]
+                              for k, v in s.matches.items()})
+
+
+@contextmanager
+def open_mmap(filename):
+    """
+    Opens a file for reading as a bytes-like object, i.e. a read-only mmap
+    for uncompressed files and the decompressed bytes for gzipped or bzipped
+    files.
+
+    Args:
+        filename (str): Filename to open.
+
+    Yields:
+        mmap or bytes of the file content.
+    """
+    with zopen(filename, "rb") as f:
+        if isinstance(f, (gzip.GzipFile, bz2.BZ2File)):
+            yield f.read()
+            return
+        try:
+            text = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped.
+            text = b""
+        try:
+            yield text
+        finally:
+            if isinstance(text, mmap.mmap):
+                text.close()
+
+
+def reverse_grep(text, patterns, chunk_size=2 ** 20):
+    """
+    Greps the lines of a text from its end, e.g. to parse the end of a large
+    file without the python loop over all its lines of reverse_readfile.
+
+    Args:
+        text: Bytes-like text, e.g. from open_mmap.
+        patterns (list): Regular expression patterns (str) searched in each
+            line.
+        chunk_size (int): Size in bytes of the blocks scanned at once.
+
+    Yields:
+        (offset, line) for the lines matching at least one of the patterns,
+        in reverse order, where offset is the position of the line in text
+        and line is the decoded line without its newline. Each run of lines
+        not matching any pattern is yielded as a single empty line, with the
+        offset of its last line, so that loops which only act on matching
+        lines but test a stop condition on every line give the same results
+        as with all the lines.
+    """
+    search = _Search([(i, p) for i, p in enumerate(patterns)])
+    # Start of the last line yielded.
+    last = len(text)
+    for line_start, line_end in _reverse_candidate_lines(
+            text, _get_finders([search]), chunk_size):
+        line = text[line_start:line_end].decode("utf-8").rstrip("\n")
+        if not any(p.search(line) for p in search.patterns):
+            continue
+        if line_end < last:
+            yield text.rfind(b"\n", 0, last - 1) + 1, ""
+        yield line_start, line
+        last = line_start
+    if last > 0:
+        yield text.rfind(b"\n", 0, last - 1) + 1, ""
+
+
+class _Search(object):
+    """
+    A set of line patterns registered in a PatternScanner, either a regrep
+    search or a micro_pyawk program (with actions).
+    """
+
+    def __init__(self, patterns):
+        self.keys = [k for k, p in patterns]
+        self.patterns = [re.compile(p) for k, p in patterns]
+        self.actions = None
+        self.reverse = False
+        self.terminate_on_match = False
+
+    def process(self, line, lineno, compressed):
+        """
+        Processes a line. Returns True if the search is complete.
+        """
+        if self.actions is not None:
+            try:
+                for p, (test, run) in zip(self.patterns, self.actions):
+                    match = p.search(line)
+                    if match and (test is None or test(self.results, line)):
+                        run(self.results, match)
+            except Exception as ex:
+                self.errors.append(ex)
+                return True
+            return False
+        if self.reverse:
+            # monty 0.9.6's regrep strips the lines read in reverse.
+            line = line.rstrip() if compressed else line.rstrip("\n")
+        for k, p in zip(self.keys, self.patterns):
+            m = p.search(line)
+            if m:
+                self.matches[k].append(
+                    [[self.postprocess(g) for g in m.groups()], lineno])
+        return self.terminate_on_match and \
+            all(self.matches.get(k) for k in self.keys)
+
+    def finalize(self, last):
+        """
+        Converts the matches of a forward scan to the results of regrep,
+        given the index of the line read first by regrep in reverse.
+        """
+        if not self.reverse:
+            return
+        if self.terminate_on_match and all(self.matches.get(k)
+                                           for k in self.keys):
+            # A reverse read stops at the last line where all keys match.
+            first = min(v[-1][1] for v in self.matches.values())
+        else:
+            first = 0
+        for k, v in self.matches.items():
+            self.matches[k] = [[m, i - last] for m, i in reversed(v)
+                               if i >= first]
+
+
+def _get_finders(searches, every_line=False):
+    """
+    Returns a list of regular expressions on bytes whose matches start at or
+    before the first line matching any of the patterns of the searches, or
+    which match every line if every_line is True, e.g. as the lines stripped
+    by regrep's reverse reads of compressed files may match patterns that
+    the raw lines do not match.
+    """
+    if every_line:
+        return [re.compile(b"^", re.MULTILINE)]
+    patterns = defaultdict(list)
+    for s in searches:
+        for p in s.patterns:
+            flags = (p.flags & ~re.UNICODE) | re.MULTILINE
+            patterns[flags].append(p.pattern.encode("utf-8"))
+    finders = []
+    for flags, pats in patterns.items():
+        try:
+            finders.append(re.compile(
+                b"|".join(b"(?:" + p + b")" for p in pats), flags))
+        except re.error:
+            # e.g., group names defined in several patterns.
+            finders.extend(re.compile(p, flags) for p in pats)
+    return finders
+
+
+def _next_line(text, finders, pos, endpos):
+    """
+    Returns the start and end of the next line of text at or after pos which
+    contains a match of one of the finders, or (None, None).
+    """
+    start = None
+    for finder in finders:
+        m = finder.search(text, pos, endpos)
+        if m and (start is None or m.start() < start):
+            start = m.start()
+    if start is None or start >= endpos:
+        return None, None
+    line_start = text.rfind(b"\n", 0, start) + 1
+    line_end = text.find(b"\n", start, endpos)
+    return line_start, endpos if line_end == -1 else line_end + 1
+
+
+def _reverse_candidate_lines(text, finders, chunk_size):
+    """
+    Yields the start and end of the lines of text which contain a match of
+    one of the finders, from the end of text, scanning it in chunks.
+    """
+    end = len(text)
+    while end > 0:
+        start = text.rfind(b"\n", 0, max(end - chunk_size, 0)) + 1
+        lines = []
+        pos = start
+        while True:
+            line_start, line_end = _next_line(text, finders, pos, end)
+            if line_start is None:
+                break
+            lines.append((line_start, line_end))
+            pos = line_end
+        for line in reversed(lines):
+            yield line
+        end = start
+
+
+def _count_newlines(text, start, end, chunk_size=2 ** 24):
+    """
+    Counts the newlines in text[start:end] in chunks, as mmaps have no
+    count method.
+    """
+    return sum(text[i:min(i + chunk_size, end)].count(b"\n")
+               for i in range(start, end, chunk_size))
+
+
 import errno
 import os
 import tempfile
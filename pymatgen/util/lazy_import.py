@@ -0,0 +1,78 @@
+# coding: utf-8
+# Copyright (c) Pymatgen Development Team.
+# Distributed under the terms of the MIT License.
+
+from __future__ import division, unicode_literals
+
+"""
+This module implements lazily imported module attributes, which allow
+packages to expose aliases of commonly used objects without importing the
+(potentially heavy) modules defining them at import time of the package.
+"""
+
+import os
+import sys
+import types
+import importlib
+
+
+class _LazyModule(types.ModuleType):
+    """
+    Module type which imports the attributes listed in its
+    _lazy_attributes and its subpackages / submodules on first access.
+    """
+
+    def __getattr__(self, name):
+        lazy_attributes = self.__dict__.get("_lazy_attributes", {})
+        if name in lazy_attributes:
+            value = getattr(importlib.import_module(lazy_attributes[name]),
+                            name)
+        elif _is_submodule(self, name):
+            value = importlib.import_module(self.__name__ + "." + name)
+        else:
+            raise AttributeError("module {!r} has no attribute {!r}".format(
+                self.__name__, name))
+        setattr(self, name, value)
+        return value
+
+    def __dir__(self):
+        return sorted(set(self.__dict__.keys()) |
+                      set(self.__dict__.get("_lazy_attributes", {}).keys()))
+
+
+def _is_submodule(module, name):
+    if name.startswith("_"):
+        return False
+    for path in getattr(module, "__path__", []):
+        if os.path.isdir(os.path.join(path, name)) or \
+                os.path.isfile(os.path.join(path, name + ".py")):
+            return True
+    return False
+
+
+def lazy_import(module_name, attributes):
+    """
+    Makes the attributes of a module be imported only on first access. The
+    subpackages and submodules of a package are accessible as attributes as
+    well, as if they had been imported. Requires Python >= 3.5. With older
+    versions of Python, the attributes are imported immediately instead.
+
+    Usage, in the __init__.py of a package::
+
+        lazy_import(__name__, {"Structure": "pymatgen.core.structure"})
+
+    Args:
+        module_name (str): Name of the module, i.e., __name__.
+        attributes (dict): Dict of {attribute name: name of the module
+            the attribute is imported from}.
+    """
+    module = sys.modules[module_name]
+    try:
+        module.__class__ = _LazyModule
+    except TypeError:
+        # Modules do not support __class__ assignment before Python 3.5.
+        for name, source in attributes.items():
+            setattr(module, name,
+                    getattr(importlib.import_module(source), name))
+        return
+    module._lazy_attributes = dict(attributes)
@@ -17,6 +17,7 @@ __email__ = "shyuep@gmail.com"
 __date__ = "Apr 25, 2012"
 
 import random
+import itertools
 from pymatgen.core.lattice import Lattice
 from pymatgen.util.coord_utils import *
 from pymatgen.util.testing import PymatgenTest
@@ -129,6 +130,30 @@ class CoordUtilsTest(PymatgenTest):
         self.assertEqual(
             find_in_coord_list_pbc(coords, test_coord, atol=0.01)[0], 1)
 
+    def test_unique_coords_pbc(self):
+        coords = [[0, 0, 0], [0.5, 0.5, 0.5], [0.99, 0.99, 1.01],
+                  [-0.499, 0.501, 1.5], [0.1, 0.1, 0.1]]
+        self.assertEqual(list(unique_coords_pbc(coords)), [0, 1, 2, 3, 4])
+        self.assertEqual(list(unique_coords_pbc(coords, atol=0.02)),
+                         [0, 1, 4])
+        self.assertEqual(list(unique_coords_pbc(coords, atol=[0.2, 1, 1])),
+                         [0, 1])
+        # Same as adding the coords one by one to a list, including chains
+        # of close coords.
+        random.seed(0)
+        coords = [[random.gauss(0.5, 0.1) for i in range(3)]
+                  for j in range(200)]
+        for atol in [0.01, 0.05, 0.2]:
+            unique = []
+            indices = []
+            for i, c in enumerate(coords):
+                if not in_coord_list_pbc(unique, c, atol=atol):
+                    unique.append(c)
+                    indices.append(i)
+            self.assertEqual(list(unique_coords_pbc(coords, atol=atol)),
+                             indices)
+        self.assertEqual(len(unique_coords_pbc([])), 0)
+
     def test_is_coord_subset_pbc(self):
         c1 = [0, 0, 0]
         c2 = [0, 1.2, -1]
@@ -220,6 +245,40 @@ class CoordUtilsTest(PymatgenTest):
 
         coord_utils.LOOP_THRESHOLD = prev_threshold
 
+    def test_find_points_in_spheres(self):
+        fcoords = np.array([[0.3, 0.3, 0.5],
+                            [0.1, 0.1, 0.3],
+                            [0.9, 0.9, 0.8],
+                            [1.1, 0.0, -0.5]])
+        lattice = Lattice.from_lengths_and_angles([8, 8, 4],
+                                                  [90, 76, 58])
+        centers = lattice.get_cartesian_coords([[0.2, 0.1, 0.4],
+                                                [0.5, 0.5, 0.5]])
+        r = 6.5
+
+        # Brute force over a supercell large enough to contain the spheres.
+        expected = []
+        for image in itertools.product(range(-3, 4), repeat=3):
+            coords = lattice.get_cartesian_coords(fcoords + image)
+            dists = all_distances(centers, coords)
+            for i, j in zip(*np.where(dists <= r)):
+                expected.append((i, j) + image)
+        expected = sorted(expected)
+
+        for method in ["cell", "kdtree"]:
+            cinds, pinds, images, dists = find_points_in_spheres(
+                lattice, fcoords, centers, r, method=method)
+            self.assertEqual(
+                sorted(zip(cinds, pinds, *images.T)), expected)
+            coords = lattice.get_cartesian_coords(fcoords[pinds] + images)
+            self.assertArrayAlmostEqual(
+                np.sum((coords - centers[cinds]) ** 2, axis=1) ** 0.5, dists)
+
+        self.assertEqual(len(find_points_in_spheres(
+            lattice, fcoords, centers, 0.1)[0]), 0)
+        self.assertRaises(ValueError, find_points_in_spheres, lattice,
+                          fcoords, centers, r, method="octree")
+
     def test_get_angle(self):
         v1 = (1, 0, 0)
         v2 = (1, 1, 1)
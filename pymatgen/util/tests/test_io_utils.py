@@ -17,10 +17,14 @@ __email__ = "ajain@lbl.gov"
 __date__ = "Nov 14, 2012"
 
 import unittest2 as unittest
+import gzip
 import os
+import shutil
+import tempfile
 
 from pymatgen.util.testing import PymatgenTest
-from pymatgen.util.io_utils import micro_pyawk
+from pymatgen.util.io_utils import micro_pyawk, open_mmap, reverse_grep, \
+    PatternScanner
 
 test_dir = os.path.join(os.path.dirname(__file__), "..", "..", "..",
                         'test_files')
@@ -38,5 +42,130 @@ class FuncTest(PymatgenTest):
         micro_pyawk(filename, [["POTCAR:(.*)", f2, f]])
         self.assertEqual(len(data), 6)
 
+    def test_pattern_scanner(self):
+        patterns = {"energy": r"energy\(sigma->0\)\s+=\s+([\d\-\.]+)",
+                    "efermi": r"E-fermi\s*:\s*(\S+)",
+                    "empty": r"^$",
+                    "end": r"5$"}
+        forward = {"efermi": [[["1.0"], 0], [["2.0"], 3]],
+                   "energy": [[["-2.5"], 2], [["-3.5"], 4]],
+                   "empty": [[[], 1]],
+                   "end": [[[], 4]]}
+        # Reverse line numbers follow monty 0.9.6's regrep. Uncompressed
+        # files ending with a newline are read in reverse from an empty
+        # line after it, so their last line is -1.
+        reverse = {"efermi": [[["2.0"], -2], [["1.0"], -5]],
+                   "energy": [[["-3.5"], -1], [["-2.5"], -3]],
+                   "empty": [[[], 0], [[], -4]],
+                   "end": [[[], -1]]}
+        # The last line of compressed files is 0, and the reverse reads
+        # strip all trailing whitespace, so that "-2.5  " matches "5$".
+        reverse_gz = {"efermi": [[["2.0"], -1], [["1.0"], -4]],
+                      "energy": [[["-3.5"], 0], [["-2.5"], -2]],
+                      "empty": [[[], -3]],
+                      "end": [[[], 0], [[], -2]]}
+        # Reverse searches with terminate_on_match stop at the first line
+        # where all keys have matched.
+        reverse_terminated = {"efermi": [[["2.0"], -2]],
+                              "energy": [[["-3.5"], -1]],
+                              "empty": [[[], 0]],
+                              "end": [[[], -1]]}
+        reverse_gz_terminated = {"efermi": [[["2.0"], -1]],
+                                 "energy": [[["-3.5"], 0], [["-2.5"], -2]],
+                                 "empty": [[[], -3]],
+                                 "end": [[[], 0], [[], -2]]}
+        text = "E-fermi :   1.0\n\nenergy(sigma->0) =   -2.5  \n" \
+            "E-fermi :   2.0\nenergy(sigma->0) =   -3.5\n"
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(tmp_dir, "OUTCAR")
+            with open(filename, "w") as f:
+                f.write(text)
+            with gzip.open(filename + ".gz", "wt") as f:
+                f.write(text)
+            for fname, expected in [
+                    ("OUTCAR", [forward, forward, reverse,
+                                reverse_terminated]),
+                    ("OUTCAR.gz", [forward, forward, reverse_gz,
+                                   reverse_gz_terminated])]:
+                i = 0
+                for is_reverse in [False, True]:
+                    for terminate_on_match in [False, True]:
+                        scanner = PatternScanner(
+                            os.path.join(tmp_dir, fname), chunk_size=10)
+                        matches = scanner.add_patterns(
+                            patterns, reverse=is_reverse,
+                            terminate_on_match=terminate_on_match)
+                        scanner.run()
+                        self.assertEqual(dict(matches), expected[i])
+                        i += 1
+            scanner = PatternScanner(filename)
+            matches = scanner.add_patterns(
+                {k: patterns[k] for k in ["efermi", "energy"]},
+                terminate_on_match=True)
+            scanner.run()
+            self.assertEqual(dict(matches), {"efermi": [[["1.0"], 0]],
+                                             "energy": [[["-2.5"], 2]]})
+        finally:
+            shutil.rmtree(tmp_dir)
+
+        # Several searches in a single pass.
+        filename = os.path.join(test_dir, "OUTCAR.dielectric")
+        search = [["POTCAR:(.*)", None,
+                   lambda results, match: results.append(match.group(1))],
+                  ["energy-cutoff", lambda results, line: len(results) > 0,
+                   lambda results, match: results.append(match.group())]]
+        scanner = PatternScanner(filename)
+        results = []
+        errors = scanner.add_pyawk(search, results)
+        matches = scanner.add_patterns(
+            {"energy": patterns["energy"], "efermi": patterns["efermi"],
+             "potcar": r"^\s*POTCAR:\s+(.*)$"}, reverse=True,
+            terminate_on_match=True)
+        titels = scanner.add_multiline_pattern(
+            r"^\s*TITEL\s*=\s*(?P<titel>[^\n]*?)\s*$")
+        scanner.run()
+        self.assertEqual(results, micro_pyawk(filename, search, []))
+        self.assertEqual(len(results), 8)
+        self.assertEqual(errors, [])
+        # The reverse search stops at the first POTCAR line.
+        self.assertEqual(matches["potcar"],
+                         [[["PAW_PBE Fe_pv 06Sep2000                "],
+                           -5887]])
+        self.assertEqual(matches["efermi"], [[["0.1177"], -1329]])
+        self.assertEqual(len(matches["energy"]), 75)
+        self.assertEqual(matches["energy"][0], [["-797.46294064"], -58])
+        self.assertEqual(matches["energy"][-1], [["10330.54511526"], -5054])
+        self.assertEqual([t["titel"] for t in titels],
+                         ["PAW_PBE O 08Apr2002", "PAW_PBE Al 04Jan2001",
+                          "PAW_PBE Fe_pv 06Sep2000"])
+
+        # A failing program is dropped from the scan.
+        scanner = PatternScanner(filename)
+        errors = scanner.add_pyawk([["POTCAR", None, lambda r, m: 1 / 0]])
+        scanner.run()
+        self.assertEqual(len(errors), 1)
+        self.assertIsInstance(errors[0], ZeroDivisionError)
+
+    def test_reverse_grep(self):
+        filename = os.path.join(test_dir, "OUTCAR.lepsilon")
+        with open_mmap(filename) as text:
+            lines = list(reverse_grep(text, ["E-fermi", r"^\s*POTCAR:"]))
+            # Runs of other lines are yielded as a single empty line.
+            self.assertEqual(lines[0][1], "")
+            self.assertTrue(lines[1][1].startswith(" E-fermi :   4.1186"))
+            self.assertEqual([l.strip() for o, l in lines[-5:]],
+                             ["POTCAR:   PAW_PBE Si 05Jan2001", "",
+                              "POTCAR:   PAW_PBE C 08Apr2002",
+                              "POTCAR:   PAW_PBE Si 05Jan2001", ""])
+            # The offset of a run of lines is the one of its last line.
+            self.assertEqual(text[lines[-1][0]:lines[-2][0]].count(b"\n"), 1)
+            for offset, line in lines:
+                self.assertEqual(text[offset:offset + len(line)],
+                                 line.encode("utf-8"))
+            self.assertEqual(len([l for o, l in lines if l]),
+                             text[:].count(b"E-fermi") + 4)
+
+
 if __name__ == "__main__":
     unittest.main()